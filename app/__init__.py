@@ -3,11 +3,62 @@
 Inicialización de la aplicación Flask PlayTimeUY.
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session
-from flask_wtf.csrf import CSRFProtect
+from flask import Flask, current_app, render_template, request, redirect, url_for, flash, session
 from flask_talisman import Talisman
 from app.main.main_routes import main_bp
+from app.main.user_routes import MAX_FILE_SIZE_MB, user_bp
+from app.main.payments import mp_routes
+from app.main.media_routes import media_bp
+from app.main.moderation_routes import moderation_bp
+from app.main.upload_routes import uploads_bp
+from app.config.firebase import firebase_storage
+from app.repositories import init_repositories
+from app.utils import classifier
+from app.utils.blobstore import init_blobstore
+from app.utils.compression import ROUTE_ENVIRON_KEY, CompressionMiddleware
+from app.utils.csrf import DEFAULT_MAX_AGE, DEFAULT_WINDOW, LazyCsrfToken, init_csrf
+from app.utils.image_index import DEFAULT_MAX_DISTANCE, DEFAULT_REFRESH, init_image_index
+from app.utils.logging_config import configure_logging, init_request_id
+from app.utils.media import default_media_root
+from app.utils import metrics
+from app.utils.profiling import init_profiling
+from app.utils.sessions import init_sessions
+from app.utils.teasers import DEFAULT_BLUR as TEASER_BLUR, DEFAULT_WIDTH as TEASER_WIDTH, \
+    DEFAULT_WORKERS as TEASER_WORKERS, init_teasers
+from app.utils.text_filter import DEFAULT_REFRESH as TEXT_FILTER_REFRESH, init_text_filter
+from app.utils import watermark
+from app.utils.waveform import DEFAULT_POINTS as WAVEFORM_POINTS, init_waveforms
+from app.utils.shutdown import DEFAULT_DRAIN_TIMEOUT, init_shutdown
+from app.utils.upload_stream import incoming_dir
+from app.utils.uploads import DEFAULT_TICKET_MAX_AGE, init_uploads
+from app.utils.traffic_capture import TrafficCaptureMiddleware, default_capture_path
 import logging
+import os
+from datetime import datetime
+
+try:  # opentelemetry es opcional: sin él los spans de app/utils/tracing.py son no-op
+    import tracing_config
+except ImportError:  # pragma: no cover - depende del entorno
+    tracing_config = None
+
+# --- Config: clave de `config`, si no variable de entorno, si no default ---
+def _flag(cfg: dict, key: str, default: bool) -> bool:
+    if cfg.get(key) is not None:
+        return bool(cfg[key])
+    value = (os.getenv(key) or "").strip().lower()
+    return value in ("1", "true", "yes", "on") if value else default
+
+
+def _number(cfg: dict, key: str, default, cast=int):
+    value = cfg.get(key)
+    if value is None:
+        value = (os.getenv(key) or "").strip() or default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        logging.getLogger("PlayTimeUY").warning("⚠️ %s inválido (%r), usando %s", key, value, default)
+        return default
+
 
 def create_app(config: dict = None) -> Flask:
     # Crear app Flask
@@ -18,16 +69,183 @@ def create_app(config: dict = None) -> Flask:
     app.config["SESSION_COOKIE_HTTPONLY"] = True
     app.config["SESSION_COOKIE_SAMESITE"] = "Lax"
     app.config["DEBUG"] = config.get("DEBUG") if config else True
+    cfg = config or {}
 
     # --- Seguridad ---
-    CSRFProtect(app)
-    Talisman(app, content_security_policy=None)  # Puedes personalizar CSP si lo deseas
+    # CSRF: un solo mecanismo, tokens firmados que no escriben la sesión
+    # (csrf_protect en las vistas; los FlaskForm usan el mismo token vía app/forms.py)
+    app.config["WTF_CSRF_ENABLED"] = cfg.get("CSRF_ENABLED", True)
+    init_csrf(
+        app,
+        max_age=_number(cfg, "CSRF_TOKEN_MAX_AGE", DEFAULT_MAX_AGE),
+        window=_number(cfg, "CSRF_TOKEN_WINDOW", DEFAULT_WINDOW),
+        enabled=cfg.get("CSRF_ENABLED", True),
+    )
+    talisman = Talisman(
+        app,
+        content_security_policy=None,  # Puedes personalizar CSP si lo deseas
+        force_https=cfg.get("FORCE_HTTPS", True),
+        session_cookie_secure=cfg.get("FORCE_HTTPS", True),
+    )
+
+    # --- Contexto global de templates (footer usa datetime, navbar current_app, formularios csrf_token) ---
+    @app.context_processor
+    def inject_globals():
+        return {
+            "datetime": datetime,
+            "current_app": current_app,
+            "csrf_token": LazyCsrfToken(),
+            "has_endpoint": lambda endpoint: endpoint in current_app.view_functions,
+        }
+
+    # --- Capa de datos (DATA_BACKEND: firestore | sqlite) ---
+    init_repositories(
+        app,
+        backend=cfg.get("DATA_BACKEND") or os.getenv("DATA_BACKEND", "firestore"),
+        sqlite_path=cfg.get("SQLITE_PATH") or os.getenv("SQLITE_PATH"),
+        firestore_client=cfg.get("FIRESTORE_CLIENT"),
+    )
+
+    # --- Sesiones (SESSION_BACKEND: cookie | sqlite; sqlite = cookie con id opaco + store local) ---
+    init_sessions(
+        app,
+        backend=cfg.get("SESSION_BACKEND") or os.getenv("SESSION_BACKEND", "cookie"),
+        path=cfg.get("SESSION_STORE_PATH") or os.getenv("SESSION_STORE_PATH"),
+    )
 
     # --- Registro de Blueprints ---
     app.register_blueprint(main_bp)
+    app.register_blueprint(user_bp)
+    app.register_blueprint(mp_routes)
+
+    # --- Medios subidos (/media/<content_id>: Range + sendfile, fuera de /static) ---
+    app.config["MEDIA_ROOT"] = cfg.get("MEDIA_ROOT") or os.getenv("MEDIA_ROOT") or default_media_root()
+    app.register_blueprint(media_bp)
+
+    # --- Subidas directas al storage (UPLOAD_BACKEND: firebase | local; el worker no recibe el archivo) ---
+    uploads = init_uploads(
+        app,
+        backend=cfg.get("UPLOAD_BACKEND") or os.getenv("UPLOAD_BACKEND"),
+        local_url=cfg.get("UPLOAD_LOCAL_URL") or os.getenv("UPLOAD_LOCAL_URL"),
+        max_age=_number(cfg, "UPLOAD_TICKET_MAX_AGE", DEFAULT_TICKET_MAX_AGE),
+        avatar_mb=MAX_FILE_SIZE_MB,
+        content_mb=_number(cfg, "UPLOAD_MAX_CONTENT_MB", 2048),
+        firebase_bucket=cfg.get("FIREBASE_BUCKET", firebase_storage),
+    )
+    # Contenidos por sha256 (blobs/ab/cd/<sha>) con referencias: re-subidas sin copia, `flask blobs-gc`
+    init_blobstore(app, uploads.bucket)
+    # Teasers borrosos de las imágenes de suscriptores (pool de procesos, caché junto al original)
+    init_teasers(
+        app, uploads.bucket, scratch_dir=incoming_dir(app.config["MEDIA_ROOT"]),
+        workers=_number(cfg, "TEASER_WORKERS", TEASER_WORKERS),
+        width=_number(cfg, "TEASER_WIDTH", TEASER_WIDTH),
+        blur=_number(cfg, "TEASER_BLUR", TEASER_BLUR, float),
+    )
+    # Duración y forma de onda de los audios (thread en segundo plano; mp3 y otros con ffmpeg)
+    init_waveforms(
+        app, uploads.bucket,
+        points=_number(cfg, "WAVEFORM_POINTS", WAVEFORM_POINTS),
+        ffmpeg=cfg.get("WAVEFORM_FFMPEG") or os.getenv("WAVEFORM_FFMPEG"),
+    )
+    # Marca de agua por comprador en las imágenes pagas (caché por contenido y suscriptor)
+    if _flag(cfg, "WATERMARK_ENABLED", True):
+        watermark.init_watermarks(
+            app,
+            cache_mb=_number(cfg, "WATERMARK_CACHE_MB", watermark.DEFAULT_CACHE_MB),
+            base_cache_mb=_number(cfg, "WATERMARK_BASE_CACHE_MB", watermark.DEFAULT_BASE_CACHE_MB),
+            max_side=_number(cfg, "WATERMARK_MAX_SIDE", watermark.DEFAULT_MAX_SIDE),
+            quality=_number(cfg, "WATERMARK_QUALITY", watermark.DEFAULT_QUALITY),
+            opacity=_number(cfg, "WATERMARK_OPACITY", watermark.DEFAULT_OPACITY, float),
+        )
+    app.register_blueprint(uploads_bp)
 
-    # --- Logging ---
-    logging.basicConfig(level=logging.INFO)
+    # --- Moderación de imágenes (hash perceptual al subir: reposts y contenido removido) ---
+    init_image_index(
+        app,
+        max_distance=_number(cfg, "IMAGE_MATCH_DISTANCE", DEFAULT_MAX_DISTANCE),
+        refresh=_number(cfg, "IMAGE_INDEX_REFRESH", DEFAULT_REFRESH),
+    )
+
+    # --- Clasificador de moderación (modelo en un proceso aparte, micro-batching) ---
+    labels = cfg.get("MODERATION_LABELS") or [
+        l.strip() for l in os.getenv("MODERATION_LABELS", ",".join(classifier.DEFAULT_LABELS)).split(",") if l.strip()
+    ]
+    classifier.init_classifier(
+        app,
+        model=cfg.get("MODERATION_MODEL") or os.getenv("MODERATION_MODEL"),
+        labels=labels,
+        weights=cfg.get("MODERATION_WEIGHTS") or os.getenv("MODERATION_WEIGHTS"),
+        address=cfg.get("MODERATION_SERVICE_ADDRESS") or os.getenv("MODERATION_SERVICE_ADDRESS"),
+        max_batch=_number(cfg, "MODERATION_MAX_BATCH", classifier.DEFAULT_MAX_BATCH),
+        max_wait_ms=_number(cfg, "MODERATION_MAX_WAIT_MS", classifier.DEFAULT_MAX_WAIT_MS, float),
+        threads=_number(cfg, "MODERATION_THREADS", classifier.DEFAULT_THREADS),
+        timeout=_number(cfg, "MODERATION_TIMEOUT", classifier.DEFAULT_TIMEOUT, float),
+        flag_labels=cfg.get("MODERATION_FLAG_LABELS") or [
+            l.strip() for l in os.getenv("MODERATION_FLAG_LABELS", "").split(",") if l.strip()
+        ] or None,
+        threshold=_number(cfg, "MODERATION_FLAG_THRESHOLD", classifier.DEFAULT_FLAG_THRESHOLD, float),
+    )
+    app.register_blueprint(moderation_bp)
+
+    # --- Filtro de términos prohibidos (nombres de usuario, bios, títulos, mensajes) ---
+    init_text_filter(
+        app,
+        path=cfg.get("TEXT_FILTER_TERMS") or os.getenv("TEXT_FILTER_TERMS"),
+        refresh=_number(cfg, "TEXT_FILTER_REFRESH", TEXT_FILTER_REFRESH),
+    )
+
+    # --- Trazas OpenTelemetry (provider una vez por proceso; sampler / exporters por OTEL_*) ---
+    if tracing_config is not None and _flag(cfg, "TRACING_ENABLED", True):
+        tracing_config.configure_tracing(app)
+
+    # --- Métricas Prometheus (/metrics; opt-in con METRICS_ENABLED=1, protegido con METRICS_TOKEN) ---
+    metrics_enabled = _flag(cfg, "METRICS_ENABLED", False)
+    if metrics_enabled:
+        metrics.init_metrics(app, talisman=talisman)
+
+    # --- Profiling bajo demanda (/admin/profiling, solo admins; opt-in con PROFILING_ENABLED=1) ---
+    if _flag(cfg, "PROFILING_ENABLED", False):
+        init_profiling(
+            app,
+            slow_ms=_number(cfg, "PROFILING_SLOW_MS", 1000),
+            sample_ms=_number(cfg, "PROFILING_SAMPLE_MS", 10),
+            ring_size=_number(cfg, "PROFILING_RING_SIZE", 50),
+        )
+
+    # --- Compresión de respuestas (gzip / brotli) ---
+    if _flag(cfg, "COMPRESSION_ENABLED", True):
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app,
+            min_size=_number(cfg, "COMPRESSION_MIN_SIZE", 500),
+            gzip_level=_number(cfg, "COMPRESSION_GZIP_LEVEL", 6),
+            brotli_quality=_number(cfg, "COMPRESSION_BROTLI_QUALITY", 4),
+        )
+        app.extensions["compression"] = app.wsgi_app.stats
+
+    # --- Captura de tráfico (opt-in con CAPTURE_ENABLED=1; alimenta benchmarks/replay.py) ---
+    if _flag(cfg, "CAPTURE_ENABLED", False):
+        app.wsgi_app = TrafficCaptureMiddleware(
+            app.wsgi_app,
+            path=cfg.get("CAPTURE_PATH") or os.getenv("CAPTURE_PATH") or default_capture_path(),
+            max_bytes=_number(cfg, "CAPTURE_MAX_BYTES", _number(cfg, "CAPTURE_MAX_MB", 50) * 1024 * 1024),
+            backup_count=_number(cfg, "CAPTURE_BACKUP_COUNT", 5),
+            sample_rate=_number(cfg, "CAPTURE_SAMPLE_RATE", 1.0, float),
+        )
+        app.extensions["traffic_capture"] = app.wsgi_app
+
+    # --- Apagado ordenado (drenado + flush; lo disparan gunicorn / run_new / ASGI) ---
+    init_shutdown(
+        app,
+        drain_timeout=_number(cfg, "SHUTDOWN_DRAIN_TIMEOUT", DEFAULT_DRAIN_TIMEOUT, float),
+    )
+
+    # --- Logging (cola no bloqueante; no-op si run_new ya lo configuró) ---
+    configure_logging(
+        level=cfg.get("LOG_LEVEL", logging.INFO),
+        json_output=cfg.get("LOG_JSON", False),
+        debug_sample_rate=cfg.get("LOG_DEBUG_SAMPLE_RATE", 1.0),
+    )
+    init_request_id(app)
     app.logger.info("🚀 PlayTimeUY Flask App inicializada")
 
     # --- Manejo de errores ---
@@ -43,12 +261,19 @@ def create_app(config: dict = None) -> Flask:
     # --- Hooks opcionales (antes/después de cada request) ---
     @app.before_request
     def before_request():
-        # Aquí puedes agregar lógica antes de cada request
-        pass
+        # Regla de Flask visible para los middlewares WSGI (compresión / captura)
+        if request.url_rule is not None:
+            request.environ[ROUTE_ENVIRON_KEY] = request.url_rule.rule
+        if metrics_enabled:
+            metrics.before_request()
 
     @app.after_request
     def after_request(response):
-        # Aquí puedes agregar headers, logging o métricas
-        return response
+        return metrics.after_request(response) if metrics_enabled else response
+
+    @app.teardown_request
+    def teardown_request(exc=None):
+        if metrics_enabled:
+            metrics.teardown_request(exc)
 
     return app
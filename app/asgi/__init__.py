@@ -0,0 +1,192 @@
+"""
+Ruta ASGI de PlayTimeUY
+-----------------------
+✅ Login, creación de pagos y webhooks en async (Firestore AsyncClient + httpx)
+✅ Todo lo demás lo sigue atendiendo la app Flask (puente WSGI en un pool de threads),
+   con el body en streaming: solo las rutas async lo leen entero (tope max_body)
+✅ Las rutas async no pasan por los middlewares WSGI de compresión ni de captura
+   (respuestas JSON chicas; no quedan en la captura de tráfico)
+✅ Sesión, rate limit, CSRF, request id y métricas compartidos con la app Flask
+✅ Lifespan: clientes async creados dentro del event loop y cerrados al apagar
+   (más el apagado ordenado de la app Flask, ver app/utils/shutdown.py)
+
+Arranque (ver asgi.py en la raíz):
+    uvicorn asgi:app --workers 2 --proxy-headers
+
+Con `gunicorn wsgi:app` (sync) estas rutas siguen funcionando como siempre;
+la ruta async es opcional y se compara con `python -m benchmarks.async_compare`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from app.asgi.clients import AsyncServices
+from app.asgi.http import (
+    BodyTooLarge,
+    DEFAULT_MAX_BODY,
+    FlaskSession,
+    Request,
+    Response,
+    WSGIBridge,
+    json_response,
+    read_body,
+    redirect_response,
+    text_response,
+)
+from app.asgi.repositories import AsyncRepositories, build_async_repositories
+from app.asgi.routes import ROUTES, Context, Handler
+from app.utils import metrics
+from app.utils.csrf import CsrfTokens
+from app.utils.logging_config import ASYNC_REQUEST_ID
+from app.utils.shutdown import shutdown_app
+
+logger = logging.getLogger("PlayTimeUY.asgi")
+
+SECURITY_HEADERS = (
+    ("X-Content-Type-Options", "nosniff"),
+    ("X-Frame-Options", "SAMEORIGIN"),
+    ("Referrer-Policy", "strict-origin-when-cross-origin"),
+)
+
+
+class PlayTimeASGI:
+    def __init__(
+        self,
+        flask_app,
+        routes: Optional[Dict[Tuple[str, str], Handler]] = None,
+        wsgi_threads: int = 8,
+        force_https: bool = True,
+        max_body: int = DEFAULT_MAX_BODY,
+        firestore_async_client: Any = None,
+        mp_access_token: Optional[str] = None,
+        mp_base_url: Optional[str] = None,
+    ):
+        self.flask_app = flask_app
+        self.routes = dict(ROUTES if routes is None else routes)
+        self.bridge = WSGIBridge(flask_app.wsgi_app if hasattr(flask_app, "wsgi_app") else flask_app, wsgi_threads)
+        self.sessions = FlaskSession(flask_app)
+        self.csrf = flask_app.extensions.get("csrf") or CsrfTokens(flask_app.config)
+        self.force_https = force_https
+        self.max_body = max_body
+        self.services = AsyncServices(mp_access_token, mp_base_url)
+        self.repos: Optional[AsyncRepositories] = None
+        self._firestore_async_client = firestore_async_client
+        self._started = False
+        self._start_lock: Optional[asyncio.Lock] = None
+
+    # ---------------- Ciclo de vida ----------------
+    async def startup(self) -> None:
+        if self._started:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._started:
+                return
+            await self.services.start()
+            self.repos = build_async_repositories(
+                self.flask_app.extensions["repositories"], self._firestore_async_client
+            )
+            self._started = True
+            logger.info("⚡ Ruta ASGI lista (%d rutas async)", len(self.routes))
+
+    async def shutdown(self) -> None:
+        if not self._started:
+            return
+        await self.services.close()
+        if self.repos is not None:
+            await self.repos.close()
+        self.bridge.close()
+        # uvicorn ya esperó a los requests en curso: quedan los flush de la app Flask
+        await asyncio.to_thread(shutdown_app, self.flask_app, reason="lifespan")
+        self._started = False
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as exc:
+                    logger.exception("❌ Error iniciando la ruta ASGI")
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ---------------- Requests ----------------
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":  # websockets no soportados
+            return
+
+        handler = self.routes.get((scope["method"], scope["path"]))
+        if handler is None:  # Flask lee el body en streaming (subidas grandes, PUT reanudable)
+            return await self.bridge(scope, receive, send)
+
+        try:  # solo las rutas async leen el body entero (JSON chico) antes del handler
+            body = await read_body(receive, self.max_body)
+        except BodyTooLarge:
+            return await text_response("Payload demasiado grande", 413).send(send)
+
+        await self.startup()  # servidores sin lifespan
+        response = await self._handle(handler, Request(scope, body))
+        if response is None:
+            return await self.bridge(scope, receive, send, body)
+        await response.send(send)
+
+    async def _handle(self, handler: Handler, request: Request) -> Optional[Response]:
+        incoming = request.header("x-request-id").strip()
+        request_id = incoming[:64] if incoming else uuid.uuid4().hex
+        token = ASYNC_REQUEST_ID.set(request_id)
+        metrics.track_in_flight(1)
+        t0 = time.perf_counter()
+        status: Optional[int] = None  # None = delegado a Flask (lo mide Flask)
+        try:
+            if self.force_https and request.scope.get("scheme") == "http":
+                host = request.header("host") or "localhost"
+                query = request.scope.get("query_string", b"").decode("latin-1")
+                response = redirect_response(f"https://{host}{request.path}" + (f"?{query}" if query else ""), 301)
+            else:
+                session = self.sessions.open(request)
+                ctx = Context(request=request, session=session, repos=self.repos, services=self.services,
+                              csrf=self.csrf)
+                try:
+                    response = await handler(ctx)
+                except Exception as exc:
+                    logger.exception("❌ Error no controlado en %s %s: %s", request.method, request.path, exc)
+                    response = json_response({"ok": False, "error": "Error interno"}, 500)
+                if response is None:
+                    return None
+                self.sessions.save(session, response)
+            for name, value in SECURITY_HEADERS:
+                response.headers.append((name, value))
+            response.set_header("X-Request-ID", request_id)
+            status = response.status
+            return response
+        finally:
+            metrics.track_in_flight(-1)
+            if status is not None:
+                metrics.observe_http(request.path, request.method, status, time.perf_counter() - t0)
+            ASYNC_REQUEST_ID.reset(token)
+
+
+def create_asgi_app(flask_app=None, **options: Any) -> PlayTimeASGI:
+    """Envuelve la app Flask (o crea una con `create_app()`) con las rutas async."""
+    if flask_app is None:
+        from app import create_app
+
+        flask_app = create_app()
+    return PlayTimeASGI(flask_app, **options)
+
+
+__all__ = ["PlayTimeASGI", "create_asgi_app", "ROUTES"]
@@ -0,0 +1,82 @@
+"""
+Clientes HTTP async (Identity Toolkit y Mercado Pago)
+-----------------------------------------------------
+✅ Un solo httpx.AsyncClient por proceso (pool de conexiones keep-alive)
+✅ Login por REST con la misma URL que la ruta sync (emulador incluido)
+✅ Mercado Pago vía API REST (el SDK oficial es bloqueante)
+✅ Respuestas con la misma forma que el SDK: {"status": ..., "response": ...}
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.utils.tracing import mercadopago_span, record_mp_response
+
+logger = logging.getLogger("PlayTimeUY.asgi")
+# httpx loguea cada request en INFO; los spans / métricas ya cubren eso
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+MP_API_BASE = "https://api.mercadopago.com"
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=50)
+
+
+class AsyncMercadoPago:
+    """Subconjunto async de la API de Mercado Pago que usan las rutas de pago."""
+
+    def __init__(self, http: httpx.AsyncClient, access_token: str, base_url: Optional[str] = None):
+        self.http = http
+        self.access_token = access_token
+        self.base_url = (base_url or os.getenv("MP_API_BASE") or MP_API_BASE).rstrip("/")
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.access_token}", "Content-Type": "application/json"}
+
+    async def _request(self, operation: str, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+        with mercadopago_span(operation, **kwargs.pop("span_attributes", {})) as span:
+            resp = await self.http.request(method, self.base_url + path, headers=self._headers(), **kwargs)
+            try:
+                body = resp.json()
+            except ValueError:
+                body = {}
+            result = {"status": resp.status_code, "response": body}
+            record_mp_response(span, result)
+        return result
+
+    async def create_preference(self, preference_data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._request("preference.create", "POST", "/checkout/preferences", json=preference_data)
+
+    async def get_payment(self, payment_id: Any) -> Dict[str, Any]:
+        return await self._request("payment.get", "GET", f"/v1/payments/{payment_id}",
+                                   span_attributes={"mp__payment_id": str(payment_id)})
+
+
+class AsyncServices:
+    """Clientes compartidos; se abren en el startup del lifespan y se cierran al apagar."""
+
+    def __init__(self, mp_access_token: Optional[str] = None, mp_base_url: Optional[str] = None):
+        self.http: Optional[httpx.AsyncClient] = None
+        self.mp: Optional[AsyncMercadoPago] = None
+        self._mp_token = mp_access_token
+        self._mp_base = mp_base_url
+
+    async def start(self) -> None:
+        self.http = httpx.AsyncClient(timeout=DEFAULT_TIMEOUT, limits=DEFAULT_LIMITS)
+        token = self._mp_token if self._mp_token is not None else (os.getenv("MP_ACCESS_TOKEN") or "").strip()
+        self.mp = AsyncMercadoPago(self.http, token, self._mp_base) if token else None
+
+    async def close(self) -> None:
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+
+    async def firebase_sign_in(self, url: str, email: str, password: str) -> httpx.Response:
+        return await self.http.post(url, json={"email": email, "password": password, "returnSecureToken": True})
+
+
+__all__ = ["AsyncMercadoPago", "AsyncServices", "MP_API_BASE"]
@@ -0,0 +1,322 @@
+"""
+Primitivas HTTP para la ruta ASGI de PlayTimeUY
+-----------------------------------------------
+✅ Request / Response mínimos (JSON y texto) sin framework extra
+✅ Sesión compartida con Flask: mismo session_interface, misma cookie firmada
+✅ Puente WSGI: lo que no tiene variante async lo atiende la app Flask en un pool de threads
+✅ Bodies del puente en streaming: `wsgi.input` lee de `receive()` a medida que
+   Flask consume (subidas de 2 GB, PUT reanudable), sin tope ni buffer en memoria
+✅ Respuestas del puente en streaming con backpressure (cola acotada)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+from werkzeug.http import parse_cookie
+
+logger = logging.getLogger("PlayTimeUY.asgi")
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+DEFAULT_MAX_BODY = 16 * 1024 * 1024  # solo rutas async (el body se lee entero antes del handler)
+BRIDGE_QUEUE_CHUNKS = 8
+INPUT_BUFFER = 64 * 1024
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+# ===================== REQUEST / RESPONSE =====================
+class Request:
+    def __init__(self, scope: Scope, body: bytes):
+        self.scope = scope
+        self.body = body
+        self.method: str = scope["method"]
+        self.path: str = scope["path"]
+        self.headers: Dict[str, str] = {
+            k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope.get("headers", [])
+        }
+        self.query = dict(parse_qsl((scope.get("query_string") or b"").decode("latin-1")))
+        self.cookies = parse_cookie(self.headers.get("cookie", ""))
+        client = scope.get("client")
+        self.remote_addr: Optional[str] = client[0] if client else None
+
+    def header(self, name: str, default: str = "") -> str:
+        return self.headers.get(name.lower(), default)
+
+    @property
+    def is_json(self) -> bool:
+        mimetype = self.header("content-type").split(";", 1)[0].strip().lower()
+        return mimetype == "application/json" or (mimetype.startswith("application/") and mimetype.endswith("+json"))
+
+    def json(self) -> Optional[Any]:
+        """Como `request.get_json(silent=True)`: None si no es JSON válido."""
+        try:
+            return json.loads(self.body or b"null")
+        except (ValueError, UnicodeDecodeError):
+            return None
+
+
+class Response:
+    def __init__(self, body: bytes = b"", status: int = 200, content_type: str = "text/plain; charset=utf-8",
+                 headers: Optional[List[Tuple[str, str]]] = None):
+        self.body = body
+        self.status = status
+        self.headers: List[Tuple[str, str]] = [("Content-Type", content_type), *(headers or [])]
+
+    def set_header(self, name: str, value: str) -> None:
+        self.headers = [(k, v) for k, v in self.headers if k.lower() != name.lower()]
+        self.headers.append((name, value))
+
+    async def send(self, send: Send) -> None:
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in self.headers]
+        headers.append((b"content-length", str(len(self.body)).encode()))
+        await send({"type": "http.response.start", "status": self.status, "headers": headers})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    # Mismo formato compacto que jsonify() en producción
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Response(body + b"\n", status, "application/json")
+
+
+def text_response(text: str, status: int = 200) -> Response:
+    return Response(text.encode("utf-8"), status)
+
+
+def redirect_response(location: str, status: int = 302) -> Response:
+    return Response(b"", status, "text/html; charset=utf-8", [("Location", location)])
+
+
+async def read_body(receive: Receive, limit: int = DEFAULT_MAX_BODY) -> bytes:
+    chunks: List[bytes] = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            raise BodyTooLarge(size)
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+# ===================== SESIÓN (compartida con Flask) =====================
+class FlaskSession:
+    """
+    Abre y guarda la sesión con el `session_interface` de la app Flask, así
+    una sesión iniciada en la ruta async sirve en las vistas Flask y viceversa.
+    """
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+
+    def _environ(self, request: Request) -> Dict[str, Any]:
+        return {
+            "REQUEST_METHOD": request.method,
+            "PATH_INFO": request.path,
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "wsgi.url_scheme": request.scope.get("scheme", "http"),
+            "HTTP_COOKIE": request.header("cookie"),
+        }
+
+    def open(self, request: Request):
+        flask_request = self.app.request_class(self._environ(request))
+        session = self.app.session_interface.open_session(self.app, flask_request)
+        if session is None:  # sin SECRET_KEY
+            session = self.app.session_interface.make_null_session(self.app)
+        return session
+
+    def save(self, session, response: Response) -> None:
+        if self.app.session_interface.is_null_session(session):
+            return
+        flask_response = self.app.response_class()
+        self.app.session_interface.save_session(self.app, session, flask_response)
+        for name, value in flask_response.headers.items():
+            if name.lower() in ("set-cookie", "vary"):
+                response.headers.append((name, value))
+
+
+# ===================== PUENTE WSGI =====================
+class ReceiveStream(io.RawIOBase):
+    """
+    Body del request para el thread WSGI: cada lectura pide el próximo mensaje
+    a `receive()` en el event loop. Nada se lee antes de que Flask lo pida.
+    """
+
+    def __init__(self, receive: Receive, loop: asyncio.AbstractEventLoop, cancelled: threading.Event):
+        self._receive = receive
+        self._loop = loop
+        self._cancelled = cancelled
+        self._chunk = memoryview(b"")
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _pull(self) -> bool:
+        if self._done or self._cancelled.is_set():
+            return False
+        message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+        if message["type"] == "http.disconnect":  # Werkzeug ve un body corto (ClientDisconnected)
+            self._done = True
+            return False
+        self._chunk = memoryview(message.get("body", b""))
+        self._done = not message.get("more_body")
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._chunk and self._pull():
+            pass
+        n = min(len(buffer), len(self._chunk))
+        buffer[:n] = self._chunk[:n]
+        self._chunk = self._chunk[n:]
+        return n
+
+
+def build_environ(scope: Scope, body: Union[bytes, io.BufferedReader]) -> Dict[str, Any]:
+    """`body`: bytes ya leídos (rutas async que delegan) o stream de `receive()`."""
+    buffered = isinstance(body, bytes)
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client")
+    environ: Dict[str, Any] = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": (scope.get("query_string") or b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1] if server[1] is not None else 80),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0] if client else "",
+        "REMOTE_PORT": str(client[1]) if client else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body) if buffered else body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if buffered:
+        environ["CONTENT_LENGTH"] = str(len(body))
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        value = raw_value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name == "CONTENT_LENGTH":
+            if not buffered:
+                environ["CONTENT_LENGTH"] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    if not buffered and "CONTENT_LENGTH" not in environ:
+        environ["wsgi.input_terminated"] = True  # chunked: el stream termina con el último mensaje
+    return environ
+
+
+class WSGIBridge:
+    """
+    Corre la app WSGI (Flask + middlewares) en un pool de threads propio.
+    El body de la respuesta se pasa al event loop por una cola acotada:
+    si el cliente lee lento, el thread WSGI espera en vez de acumular memoria.
+    """
+
+    def __init__(self, wsgi_app: Callable, threads: int = 8):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="asgi-wsgi")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send, body: Optional[bytes] = None) -> None:
+        """`body`: ya leído por una ruta async que delegó; si no, se lee de `receive()` en streaming."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=BRIDGE_QUEUE_CHUNKS)
+        cancelled = threading.Event()
+        state: Dict[str, Any] = {}
+        if body is None:
+            body = io.BufferedReader(ReceiveStream(receive, loop, cancelled), INPUT_BUFFER)
+
+        def put(item: Tuple[str, Any]) -> None:
+            if not cancelled.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info and state.get("sent"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            state["status"], state["headers"] = int(status.split(" ", 1)[0]), headers
+            return lambda data: put(("body", bytes(data)))
+
+        def run() -> None:
+            try:
+                app_iter: Iterable[bytes] = self.wsgi_app(build_environ(scope, body), start_response)
+                try:
+                    for chunk in app_iter:
+                        if cancelled.is_set():
+                            break
+                        if chunk:
+                            put(("body", bytes(chunk)))
+                finally:
+                    if hasattr(app_iter, "close"):
+                        app_iter.close()
+                put(("end", None))
+            except BaseException as exc:  # se re-lanza en el event loop
+                put(("error", exc))
+
+        future = loop.run_in_executor(self.executor, run)
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == "error":
+                    raise value
+                if not state.get("sent"):
+                    await send({
+                        "type": "http.response.start",
+                        "status": state["status"],
+                        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in state["headers"]],
+                    })
+                    state["sent"] = True
+                if kind == "end":
+                    await send({"type": "http.response.body", "body": b""})
+                    break
+                await send({"type": "http.response.body", "body": value, "more_body": True})
+        except BaseException:
+            cancelled.set()
+            while not queue.empty():  # libera al thread si estaba esperando lugar en la cola
+                queue.get_nowait()
+            raise
+        await future
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+__all__ = [
+    "BodyTooLarge",
+    "FlaskSession",
+    "ReceiveStream",
+    "Request",
+    "Response",
+    "WSGIBridge",
+    "build_environ",
+    "json_response",
+    "read_body",
+    "redirect_response",
+    "text_response",
+]
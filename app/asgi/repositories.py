@@ -0,0 +1,189 @@
+"""
+Repositorios async para la ruta ASGI
+------------------------------------
+✅ Firestore: `google.cloud.firestore.AsyncClient` (gRPC asyncio, sin threads)
+✅ SQLite: el store sync de siempre en `asyncio.to_thread` (I/O local, corto)
+✅ Mismas colecciones, timestamps y QueryStats que los repositorios sync
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from app.repositories.base import (
+    SERVER_NOW,
+    DocumentStore,
+    NotFoundError,
+    QueryStats,
+    Record,
+    Repositories,
+    UserRepository,
+    _count,
+    _stamp,
+)
+from app.utils.tracing import firestore_span
+
+logger = logging.getLogger("PlayTimeUY.asgi")
+
+
+# ===================== STORES =====================
+class AsyncFirestoreStore:
+    def __init__(self, client: Any, collection: str):
+        self.client = client
+        self.name = collection
+
+    def _doc(self, doc_id: str):
+        return self.client.collection(self.name).document(doc_id)
+
+    async def get(self, doc_id: str):
+        with firestore_span("get", self.name):
+            return await self._doc(doc_id).get()
+
+    async def get_many(self, doc_ids: List[str]) -> List[Any]:
+        refs = [self._doc(i) for i in doc_ids]
+        with firestore_span("get_all", self.name, db__firestore__batch_size=len(doc_ids)):
+            by_id = {snap.id: snap async for snap in self.client.get_all(refs)}
+        return [by_id[i] for i in doc_ids if i in by_id]
+
+    async def set(self, doc_id: str, data: Dict[str, Any], merge: bool = False) -> None:
+        from app.repositories.firestore import _server_values
+
+        with firestore_span("set", self.name):
+            await self._doc(doc_id).set(_server_values(data), merge=merge)
+
+    async def update(self, doc_id: str, data: Dict[str, Any]) -> None:
+        from google.api_core.exceptions import NotFound
+
+        from app.repositories.firestore import _server_values
+
+        try:
+            with firestore_span("update", self.name):
+                await self._doc(doc_id).update(_server_values(data))
+        except NotFound as exc:
+            raise NotFoundError(f"{self.name}/{doc_id}") from exc
+
+    async def add(self, data: Dict[str, Any]) -> str:
+        from app.repositories.firestore import _server_values
+
+        with firestore_span("add", self.name):
+            _ts, ref = await self.client.collection(self.name).add(_server_values(data))
+        return ref.id
+
+
+class ThreadedStore:
+    """Adapta un DocumentStore sync (SQLite) corriéndolo en el pool por defecto del loop."""
+
+    def __init__(self, store: DocumentStore):
+        self.store = store
+        self.name = store.name
+
+    async def get(self, doc_id: str) -> Record:
+        return await asyncio.to_thread(self.store.get, doc_id)
+
+    async def get_many(self, doc_ids: List[str]) -> List[Record]:
+        return await asyncio.to_thread(self.store.get_many, doc_ids)
+
+    async def set(self, doc_id: str, data: Dict[str, Any], merge: bool = False) -> None:
+        await asyncio.to_thread(self.store.set, doc_id, data, merge)
+
+    async def update(self, doc_id: str, data: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self.store.update, doc_id, data)
+
+    async def add(self, data: Dict[str, Any]) -> str:
+        return await asyncio.to_thread(self.store.add, data)
+
+
+# ===================== REPOSITORIOS =====================
+class AsyncRepository:
+    def __init__(self, store: Any, stats: QueryStats):
+        self.store = store
+        self.stats = stats
+
+    async def _run(self, operation: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        t0 = time.perf_counter()
+        result = await fn(*args, **kwargs)
+        self.stats.record(self.store.name, operation, _count(result), time.perf_counter() - t0)
+        return result
+
+    async def get(self, doc_id: str):
+        return await self._run("get", self.store.get, doc_id)
+
+    async def get_many(self, doc_ids: List[str]) -> List[Any]:
+        ids = list(dict.fromkeys(i for i in doc_ids if i))
+        return await self._run("get_many", self.store.get_many, ids) if ids else []
+
+    async def create(self, doc_id: str, data: Dict[str, Any]) -> None:
+        await self._run("set", self.store.set, doc_id, _stamp(data, "created_at", "updated_at"))
+
+    async def update(self, doc_id: str, data: Dict[str, Any]) -> None:
+        await self._run("update", self.store.update, doc_id, {**data, "updated_at": SERVER_NOW})
+
+
+class AsyncUserRepository(AsyncRepository):
+    PUBLIC_FIELDS = UserRepository.PUBLIC_FIELDS
+
+
+class AsyncWebhookRepository(AsyncRepository):
+    async def log(self, data: Dict[str, Any]) -> str:
+        return await self._run("add", self.store.add, {"data": data, "received_at": SERVER_NOW})
+
+
+class AsyncRepositories:
+    """Lo que usan las rutas async: usuarios, pagos y webhooks."""
+
+    def __init__(self, backend: str, stores: Dict[str, Any], stats: QueryStats,
+                 close: Optional[Callable[[], Any]] = None):
+        self.backend = backend
+        self.stats = stats
+        self.users = AsyncUserRepository(stores["users"], stats)
+        self.payments = AsyncRepository(stores["payments"], stats)
+        self.webhooks = AsyncWebhookRepository(stores["webhooks"], stats)
+        self._close = close
+
+    async def close(self) -> None:
+        if self._close is not None:
+            result = self._close()
+            if asyncio.iscoroutine(result):
+                await result
+
+
+def _default_async_client() -> Any:
+    """AsyncClient con las mismas credenciales que firebase_admin (o el emulador)."""
+    from google.cloud.firestore import AsyncClient
+
+    from app.config import firebase
+
+    if firebase.firebase_app is None:
+        raise RuntimeError("Firebase Admin no inicializado: no se puede crear el AsyncClient")
+    credential = firebase.firebase_app.credential
+    return AsyncClient(project=firebase.firebase_app.project_id, credentials=credential.get_credential())
+
+
+def build_async_repositories(repos: Repositories, firestore_async_client: Any = None) -> AsyncRepositories:
+    """
+    Variante async de `repos` (mismo backend y mismas estadísticas).
+    Se llama dentro del event loop: el canal gRPC queda atado a ese loop.
+    """
+    names = ("users", "payments", "webhooks")
+    if repos.backend == "firestore":
+        client = firestore_async_client if firestore_async_client is not None else _default_async_client()
+        stores = {name: AsyncFirestoreStore(client, getattr(repos, name).store.name) for name in names}
+        close = getattr(client, "close", None) if firestore_async_client is None else None
+        logger.info("🔥 Repositorios async sobre Firestore AsyncClient")
+    else:
+        stores = {name: ThreadedStore(getattr(repos, name).store) for name in names}
+        close = None
+        logger.info("🗄️ Repositorios async sobre %s (threads)", repos.backend)
+    return AsyncRepositories(repos.backend, stores, repos.stats, close)
+
+
+__all__ = [
+    "AsyncFirestoreStore",
+    "AsyncRepositories",
+    "AsyncRepository",
+    "ThreadedStore",
+    "build_async_repositories",
+]
@@ -0,0 +1,220 @@
+"""
+Rutas async (I/O-bound) de PlayTimeUY
+-------------------------------------
+Variantes de las vistas que pasan casi todo el tiempo esperando red:
+✅ POST /login (JSON)            → CSRF + Identity Toolkit REST + Firestore get/set
+✅ POST /user/payment            → Mercado Pago (preferencia) + Firestore set
+✅ POST /user/payment/webhook    → HMAC + log + Firestore update (o consulta a MP)
+✅ POST /payment/webhook         → el mismo manejador (URL histórica)
+
+Reglas de negocio, mensajes y códigos de estado son los de las vistas Flask
+(los helpers se importan de ahí). Un handler que devuelve None delega el
+request a Flask (p.ej. login por formulario).
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from app.asgi.clients import AsyncServices
+from app.asgi.http import Request, Response, json_response, redirect_response, text_response
+from app.asgi.repositories import AsyncRepositories
+from app.main import main_routes, payments, user_routes
+from app.utils.csrf import CsrfTokens, session_binding, start_session
+
+logger = logging.getLogger("PlayTimeUY.asgi")
+
+
+@dataclass
+class Context:
+    request: Request
+    session: Any  # SessionMixin de Flask (mismo objeto que usa session_interface)
+    repos: AsyncRepositories
+    services: AsyncServices
+    csrf: CsrfTokens
+
+    def client_ip(self) -> str:
+        return (self.request.header("x-forwarded-for") or self.request.remote_addr or "anon").split(",")[0]
+
+    def flash(self, message: str, category: str = "message") -> None:
+        # Mismo formato que flask.flash (lo muestran los templates en el próximo GET)
+        flashes = self.session.get("_flashes", [])
+        flashes.append((category, message))
+        self.session["_flashes"] = flashes
+
+
+Handler = Callable[[Context], Awaitable[Optional[Response]]]
+
+
+# =========================================================
+# Helpers (equivalentes a los decoradores de main_routes)
+# =========================================================
+def _login_redirect(ctx: Context) -> Response:
+    ctx.flash("Iniciá sesión para continuar", "warning")
+    return redirect_response("/login")
+
+
+def _csrf_ok(ctx: Context) -> bool:
+    request = ctx.request
+    sent = (
+        request.header("x-csrf-token")
+        or (request.header("authorization").removeprefix("Bearer ").strip())
+    )
+    if ctx.csrf.enabled and not ctx.csrf.check(sent, session_binding(ctx.session)):
+        logger.warning("❌ CSRF inválido: %s %s", ctx.client_ip(), request.path)
+        return False
+    return True
+
+
+# =========================================================
+# Login (Firebase REST)
+# =========================================================
+async def firebase_login_password(
+    ctx: Context, email: str, password: str
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Versión async de payments.firebase_login_password (mismos mensajes)."""
+    if not payments.FIREBASE_REST_SIGNIN_URL:
+        return None, "Login no disponible (API key faltante)."
+    if not payments._valid_email(email) or not password:
+        return None, "Email o contraseña inválidos."
+
+    try:
+        resp = await ctx.services.firebase_sign_in(payments.FIREBASE_REST_SIGNIN_URL, email, password)
+        data = resp.json()
+        if resp.status_code != 200:
+            logger.info("Login fallido %s: %s", email, data.get("error"))
+            return None, "Usuario o contraseña incorrectos."
+
+        uid = data.get("localId")
+        if not uid:
+            logger.error("Respuesta inválida de Firebase Auth: %s", data)
+            return None, "Error autenticando usuario."
+
+        snap = await ctx.repos.users.get(uid)
+        if not snap.exists:
+            minimal = payments.minimal_user(uid, email, data)
+            await ctx.repos.users.create(uid, minimal)
+            return minimal, None
+        return snap.to_dict(), None
+
+    except httpx.HTTPError:
+        logger.exception("Error de red autenticando Firebase")
+        return None, "No se pudo conectar a Firebase."
+    except Exception:
+        logger.exception("Error inesperado en login Firebase")
+        return None, "Error interno autenticando usuario."
+
+
+async def login(ctx: Context) -> Optional[Response]:
+    if not ctx.request.is_json:
+        return None  # formulario HTML: lo atiende Flask (flash + redirect)
+
+    user = ctx.session.get("user")
+    key = f"{user.get('uid') if user else ctx.client_ip()}:login"
+    if main_routes.rate_limited(key, max_calls=10, per_seconds=60):
+        return json_response({"ok": False, "error": "Demasiadas solicitudes"}, 429)
+    if not _csrf_ok(ctx):  # token de GET /login, atado al `_sid` del visitante
+        return json_response({"ok": False, "error": "CSRF inválido"}, 403)
+
+    data = ctx.request.json() or {}
+    email = (data.get("email") or "").strip().lower()
+    user, error = await firebase_login_password(ctx, email, data.get("password") or "")
+    if error:
+        return json_response({"ok": False, "error": error}, 401)
+
+    ctx.session.permanent = True
+    ctx.session["user"] = main_routes.session_user(user)
+    start_session(ctx.session)
+    return json_response({"ok": True, "user": ctx.session["user"],
+                          "csrf_token": ctx.csrf.issue(session_binding(ctx.session))})
+
+
+# =========================================================
+# Crear Pago (Mercado Pago)
+# =========================================================
+async def payment_create(ctx: Context) -> Response:
+    user = ctx.session.get("user")
+    if not user:
+        return _login_redirect(ctx)
+    if not _csrf_ok(ctx):
+        return json_response({"ok": False, "error": "CSRF inválido"}, 403)
+    if ctx.services.mp is None:
+        return json_response({"ok": False, "error": "Mercado Pago no configurado"}, 503)
+
+    amount, creator_uid = user_routes.parse_payment_request(ctx.request.json() or {})
+    if amount <= 0 or not creator_uid:
+        return json_response({"ok": False, "error": "Datos inválidos"}, 400)
+
+    external_ref = user_routes.new_external_reference(user)
+    try:
+        mp_resp = await ctx.services.mp.create_preference(
+            user_routes.build_preference_data(user, amount, external_ref)
+        )
+        pref_id = mp_resp.get("response", {}).get("id")
+        if not pref_id:
+            raise ValueError("No se recibió preference_id de MP")
+
+        await ctx.repos.payments.create(
+            external_ref, user_routes.new_payment_doc(user, creator_uid, amount, pref_id, external_ref)
+        )
+        return json_response({"ok": True, "preference_id": pref_id})
+
+    except Exception as exc:
+        logger.exception("Error creando preferencia MP: %s", exc)
+        return json_response({"ok": False, "error": "No se pudo crear la preferencia"}, 500)
+
+
+# =========================================================
+# Webhooks
+# =========================================================
+async def payment_webhook(ctx: Context) -> Response:
+    request = ctx.request
+    signature = request.header("x-hub-signature") or request.header("x-signature")
+    if not user_routes.valid_webhook_signature(request.body, signature):
+        return json_response({"ok": False}, 403)
+
+    data = request.json()
+    data = data if isinstance(data, dict) else {}
+    try:  # registro crudo de la notificación (colección 'webhooks'); no frena la actualización
+        await ctx.repos.webhooks.log(data)
+    except Exception as exc:
+        logger.warning("⚠️ No se registró el webhook: %s", exc)
+    external_ref = data.get("external_reference")
+    status = data.get("status")
+
+    # Caso directo: MP envía referencia + estado
+    if external_ref and status:
+        await ctx.repos.payments.update(external_ref, {"status": status})
+        return json_response({"ok": True})
+
+    # Caso fallback: buscar por payment_id
+    payment_id = (data.get("data") or {}).get("id") or data.get("id")
+    if payment_id and ctx.services.mp is not None:
+        try:
+            detail = await ctx.services.mp.get_payment(payment_id)
+            body = detail.get("response", {})
+            external_ref = body.get("external_reference")
+            status = body.get("status")
+            if external_ref and status:
+                await ctx.repos.payments.update(external_ref, {"status": status})
+                return json_response({"ok": True})
+        except Exception as exc:
+            logger.exception("Error consultando pago MP %s: %s", payment_id, exc)
+
+    return json_response({"ok": True})
+
+
+# (método, path) → handler; el resto de las rutas las atiende Flask
+ROUTES: Dict[Tuple[str, str], Handler] = {
+    ("POST", "/login"): login,
+    ("POST", "/user/payment"): payment_create,
+    ("POST", "/user/payment/webhook"): payment_webhook,
+    ("POST", "/payment/webhook"): payment_webhook,  # URL histórica, mismo manejador
+}
+
+
+__all__ = ["Context", "ROUTES", "firebase_login_password"]
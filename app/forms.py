@@ -9,17 +9,39 @@ from wtforms import (
     StringField, PasswordField, SubmitField,
     BooleanField, DateField, SelectField
 )
+from wtforms.csrf.core import CSRF
 from wtforms.validators import (
     DataRequired, Email, Length, EqualTo,
     ValidationError
 )
 import datetime
 
+from app.utils.csrf import generate_csrf_token, validate_csrf_token
+from app.utils.text_filter import blocked_term
+
+
+# =========================================================
+# CSRF de formularios: el mismo token firmado que csrf_protect
+# (no guarda nada en la sesión, a diferencia del CSRF propio de Flask-WTF)
+# =========================================================
+class SignedCSRF(CSRF):
+    def generate_csrf_token(self, csrf_token_field):
+        return generate_csrf_token()
+
+    def validate_csrf_token(self, form, field):
+        if not validate_csrf_token(field.data):
+            raise ValidationError("El formulario venció, recargá la página e intentá de nuevo.")
+
+
+class PlayTimeForm(FlaskForm):
+    class Meta:
+        csrf_class = SignedCSRF
+
 
 # =========================================================
 # Formulario de Registro
 # =========================================================
-class RegisterForm(FlaskForm):
+class RegisterForm(PlayTimeForm):
     username = StringField(
         "Nombre de usuario",
         validators=[
@@ -93,7 +115,6 @@ class RegisterForm(FlaskForm):
             raise ValidationError("Debes tener al menos 18 años para registrarte.")
 
     def validate_username(self, field):
-        # 🚨 Ejemplo: podés integrar con Firebase o BD más adelante
-        prohibidos = ["admin", "root", "soporte"]
-        if field.data.lower() in prohibidos:
+        # Reservados ("admin*", "soporte*"...) e insultos: app/config/banned_terms.txt
+        if blocked_term(field.data, ignore=()):
             raise ValidationError("Ese nombre de usuario no está permitido.")
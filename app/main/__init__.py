@@ -17,7 +17,6 @@ from __future__ import annotations
 import os
 import json
 import logging
-import secrets
 import time
 from pathlib import Path
 from functools import wraps
@@ -28,27 +27,18 @@ from flask import (
     Blueprint,
     render_template,
     request,
-    session,
     jsonify,
 )
 from jinja2 import TemplateNotFound
 
+from app.utils.csrf import LazyCsrfToken, csrf_protect
+from app.utils.tracing import firestore_span, start_span
+
 # =========================================================
 # Logging
 # =========================================================
+# Sin handlers propios: propaga a la cadena única de app/utils/logging_config.py
 logger = logging.getLogger("PlayTimeUY.main")
-if not logger.handlers:
-    handler = logging.StreamHandler()
-    handler.setFormatter(
-        logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
-    )
-    logger.addHandler(handler)
-
-logger.setLevel(
-    logging.DEBUG
-    if str(os.getenv("FLASK_DEBUG", "0")).lower() in ("1", "true")
-    else logging.INFO
-)
 
 # =========================================================
 # Blueprint
@@ -91,9 +81,12 @@ VERIFIED_JSON_PATH = DATA_DIR / "verified_users.json"
 FIREBASE_DATABASE_URL = _env("FIREBASE_DATABASE_URL")
 FIREBASE_WEB_API_KEY = _env("FIREBASE_WEB_API_KEY", "FIREBASE_API_KEY", "VITE_FIREBASE_API_KEY")
 
-if not FIREBASE_DATABASE_URL:
+# Con DATA_BACKEND=sqlite la app corre sin Google: Firebase es opcional
+OFFLINE_BACKEND = (_env("DATA_BACKEND", default="firestore") or "").strip().lower() == "sqlite"
+
+if not FIREBASE_DATABASE_URL and not OFFLINE_BACKEND:
     raise RuntimeError("⚠️ Falta FIREBASE_DATABASE_URL en el entorno.")
-if not FIREBASE_WEB_API_KEY:
+if not FIREBASE_WEB_API_KEY and not OFFLINE_BACKEND:
     raise RuntimeError("⚠️ Falta la Web API Key de Firebase.")
 
 try:
@@ -161,8 +154,11 @@ try:
     firestore_db = firestore.client(_app)
 
 except Exception as e:
-    logger.exception("❌ No se pudo inicializar Firebase Admin")
-    raise RuntimeError(f"No se pudo inicializar Firebase Admin SDK: {e}") from e
+    if not OFFLINE_BACKEND:
+        logger.exception("❌ No se pudo inicializar Firebase Admin")
+        raise RuntimeError(f"No se pudo inicializar Firebase Admin SDK: {e}") from e
+    logger.warning("⚠️ Firebase Admin no disponible (DATA_BACKEND=sqlite): %s", e)
+    firestore_db = None
 
 FIREBASE_REST_SIGNIN_URL = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={FIREBASE_WEB_API_KEY}"
 
@@ -209,26 +205,7 @@ def save_verified_user(email: str) -> None:
 # =========================================================
 # Seguridad: CSRF + Rate Limiting
 # =========================================================
-def _get_csrf_token() -> str:
-    token = session.get("_csrf")
-    if not token:
-        token = secrets.token_urlsafe(32)
-        session["_csrf"] = token
-    return token
-
-
-def csrf_protect(fn):
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        if request.method in ("POST", "PUT", "PATCH", "DELETE"):
-            sent = request.headers.get("X-CSRF-Token") or request.form.get("_csrf") or ""
-            expected = session.get("_csrf") or ""
-            if not sent or not secrets.compare_digest(sent, expected):
-                logger.warning("CSRF inválido: %s %s", request.remote_addr, request.path)
-                return jsonify({"ok": False, "error": "CSRF inválido"}), 403
-        return fn(*args, **kwargs)
-    return wrapper
-
+# CSRF: tokens firmados sin estado, el mismo mecanismo que main_routes (app/utils/csrf.py)
 
 _RATE_BUCKETS: Dict[str, List[float]] = {}
 
@@ -255,9 +232,10 @@ def rate_limit(max_calls: int, per_seconds: int):
 # =========================================================
 def try_render(template: str, status: int = 200, **ctx):
     """Renderiza con fallback a errores amigables y añade datos comunes."""
-    ctx.setdefault("csrf_token", _get_csrf_token())
+    ctx.setdefault("csrf_token", LazyCsrfToken())
     try:
-        return render_template(template, **ctx), status
+        with start_span("template.render", template__name=template):
+            return render_template(template, **ctx), status
     except TemplateNotFound:
         logger.error("Template no encontrado: %s", template)
         return render_template("errors/404.html", missing_template=template), 404
@@ -271,9 +249,10 @@ def try_render(template: str, status: int = 200, **ctx):
 @main_bp.route("/healthz", methods=["GET"])
 def healthz():
     try:
-        firestore_db.collection("_healthz").document("ping").set(
-            {"ts": datetime.utcnow().isoformat() + "Z"}
-        )
+        with firestore_span("set", "_healthz"):
+            firestore_db.collection("_healthz").document("ping").set(
+                {"ts": datetime.utcnow().isoformat() + "Z"}
+            )
         return jsonify({"ok": True, "service": "PlayTimeUY.main", "firebase": "ok"}), 200
     except Exception as e:
         logger.warning("Healthz firestore fallo: %s", e)
@@ -15,7 +15,6 @@ from __future__ import annotations
 import os
 import json
 import logging
-import secrets
 import time
 from functools import wraps
 from typing import Any, Dict, Optional, Tuple, List
@@ -27,13 +26,13 @@ from jinja2 import TemplateNotFound
 import firebase_admin
 from firebase_admin import credentials, auth as admin_auth, firestore
 
+from app.utils.conditional import aggregate_validators, conditional_get, conditional_payload, snapshot_validators
+from app.utils.csrf import LazyCsrfToken, csrf_protect, generate_csrf_token, start_session
+from app.repositories import get_repositories
+from app.utils.tracing import start_span
+
 # ---------------- Logging ----------------
 logger = logging.getLogger("PlayTimeUY.main")
-if not logger.handlers:
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] %(name)s: %(message)s"))
-    logger.addHandler(handler)
-logger.setLevel(logging.INFO)
 
 # ---------------- Blueprint ----------------
 main_bp = Blueprint("main", __name__, template_folder="../../templates")
@@ -64,7 +63,10 @@ FIREBASE_DATABASE_URL = _env("FIREBASE_DATABASE_URL")
 FIREBASE_WEB_API_KEY = _env("FIREBASE_WEB_API_KEY", "FIREBASE_API_KEY", "VITE_FIREBASE_API_KEY")
 SERVICE_ACCOUNT_PATH = _env("FIREBASE_SERVICE_ACCOUNT", "GOOGLE_APPLICATION_CREDENTIALS")
 
-if not FIREBASE_DATABASE_URL or not FIREBASE_WEB_API_KEY:
+# Con DATA_BACKEND=sqlite la app corre sin Google: Firebase es opcional
+OFFLINE_BACKEND = (os.getenv("DATA_BACKEND") or "firestore").strip().lower() == "sqlite"
+
+if not OFFLINE_BACKEND and (not FIREBASE_DATABASE_URL or not FIREBASE_WEB_API_KEY):
     raise RuntimeError("⚠️ Falta configuración de Firebase en el entorno.")
 
 def _build_credentials() -> credentials.Base:
@@ -110,8 +112,11 @@ try:
     firestore_db = firestore.client(_app)
     logger.info("✅ Firebase Admin inicializado correctamente.")
 except Exception as exc:
-    logger.exception("❌ Error inicializando Firebase Admin: %s", exc)
-    raise
+    if not OFFLINE_BACKEND:
+        logger.exception("❌ Error inicializando Firebase Admin: %s", exc)
+        raise
+    logger.warning("⚠️ Firebase Admin no disponible (DATA_BACKEND=sqlite): %s", exc)
+    firestore_db = None
 
 FIREBASE_REST_SIGNIN_URL = f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={FIREBASE_WEB_API_KEY}"
 
@@ -119,9 +124,9 @@ FIREBASE_REST_SIGNIN_URL = f"https://identitytoolkit.googleapis.com/v1/accounts:
 def get_current_user() -> Optional[Dict[str, Any]]:
     return session.get("user")
 
-def set_current_user(user: Dict[str, Any]) -> None:
-    session.permanent = True
-    session["user"] = {
+def session_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Subconjunto del documento de usuario que vive en la sesión (compartido con app/asgi)."""
+    return {
         "uid": user.get("uid"),
         "email": (user.get("email") or "").lower(),
         "username": user.get("username"),
@@ -129,6 +134,11 @@ def set_current_user(user: Dict[str, Any]) -> None:
         "is_admin": bool(user.get("is_admin")),
     }
 
+def set_current_user(user: Dict[str, Any]) -> None:
+    session.permanent = True
+    session["user"] = session_user(user)
+    start_session(session)
+
 def clear_session() -> None:
     session.clear()
 
@@ -154,39 +164,25 @@ def role_required(*roles):
     return decorator
 
 # ---------------- CSRF y Rate Limiting ----------------
-def _get_csrf_token() -> str:
-    if "_csrf" not in session:
-        session["_csrf"] = secrets.token_urlsafe(32)
-    return session["_csrf"]
-
-def csrf_protect(fn):
-    @wraps(fn)
-    def wrapper(*args, **kwargs):
-        if request.method in ("POST", "PUT", "PATCH", "DELETE"):
-            sent = (
-                request.headers.get("X-CSRF-Token")
-                or request.form.get("_csrf")
-                or (request.headers.get("Authorization", "").removeprefix("Bearer ").strip())
-            )
-            if not sent or not secrets.compare_digest(sent, session.get("_csrf", "")):
-                logger.warning("❌ CSRF inválido: %s %s", request.remote_addr, request.path)
-                return jsonify({"ok": False, "error": "CSRF inválido"}), 403
-        return fn(*args, **kwargs)
-    return wrapper
-
+# CSRF: tokens firmados sin estado (app/utils/csrf.py), compartidos con app/main y app/asgi
 _RATE_BUCKETS: Dict[str, List[float]] = {}
+def rate_limited(key: str, max_calls: int, per_seconds: int) -> bool:
+    """Ventana deslizante en memoria del proceso; True si hay que rechazar."""
+    now = time.time()
+    _RATE_BUCKETS[key] = [t for t in _RATE_BUCKETS.get(key, []) if now - t < per_seconds]
+    if len(_RATE_BUCKETS[key]) >= max_calls:
+        return True
+    _RATE_BUCKETS[key].append(now)
+    return False
+
 def rate_limit(max_calls: int, per_seconds: int):
     def decorator(fn):
         @wraps(fn)
         def wrapper(*args, **kwargs):
             user = get_current_user()
             ip = (request.headers.get("X-Forwarded-For") or request.remote_addr or "anon").split(",")[0]
-            key = f"{user.get('uid') if user else ip}:{fn.__name__}"
-            now = time.time()
-            _RATE_BUCKETS[key] = [t for t in _RATE_BUCKETS.get(key, []) if now - t < per_seconds]
-            if len(_RATE_BUCKETS[key]) >= max_calls:
+            if rate_limited(f"{user.get('uid') if user else ip}:{fn.__name__}", max_calls, per_seconds):
                 return jsonify({"ok": False, "error": "Demasiadas solicitudes"}), 429
-            _RATE_BUCKETS[key].append(now)
             return fn(*args, **kwargs)
         return wrapper
     return decorator
@@ -228,13 +224,84 @@ def save_verified_user(email: str) -> None:
 
 # ---------------- Render helper ----------------
 def try_render(template: str, status: int = 200, **ctx):
-    ctx.setdefault("csrf_token", _get_csrf_token())
+    ctx.setdefault("csrf_token", LazyCsrfToken())
     ctx.setdefault("user", get_current_user())
     try:
-        return render_template(template, **ctx), status
+        with start_span("template.render", template__name=template):
+            return render_template(template, **ctx), status
     except TemplateNotFound:
         logger.error("❌ Template no encontrado: %s", template)
         return render_template("errors/404.html", missing_template=template), 404
     except Exception as e:
         logger.exception("❌ Error renderizando %s: %s", template, e)
         return render_template("errors/500.html", error=str(e)), 500
+
+# ---------------- Rutas: login / logout ----------------
+@main_bp.route("/login", methods=["GET", "POST"])
+@rate_limit(max_calls=10, per_seconds=60)
+@csrf_protect
+def login():
+    if request.method == "GET":
+        if request.accept_mimetypes.best == "application/json":  # clientes JSON: token CSRF del visitante antes del POST
+            return jsonify({"ok": True, "csrf_token": generate_csrf_token()})
+        return try_render("auth/login.html", form=None)
+
+    from app.main.payments import firebase_login_password
+
+    data = request.get_json(silent=True) if request.is_json else request.form
+    email = ((data or {}).get("email") or "").strip().lower()
+    password = (data or {}).get("password") or ""
+    user, error = firebase_login_password(email, password)
+
+    if request.is_json:
+        if error:
+            return jsonify({"ok": False, "error": error}), 401
+        set_current_user(user)
+        return jsonify({"ok": True, "user": get_current_user(), "csrf_token": generate_csrf_token()})
+
+    if error:
+        flash(error, "danger")
+        return redirect(url_for("main.login"))
+    set_current_user(user)
+    flash("Sesión iniciada correctamente", "success")
+    return redirect(url_for("user.profile"))
+
+@main_bp.route("/logout", methods=["POST"])
+@csrf_protect
+def logout():
+    clear_session()
+    flash("Sesión cerrada correctamente.", "info")
+    return redirect(url_for("main.login"))
+
+# ---------------- Rutas: explorar / perfil de creador ----------------
+def _explorar_validators():
+    # Cantidad + creadora editada más recientemente: dos lecturas chicas, sin traer el listado
+    return aggregate_validators(*get_repositories().users.creators_version())
+
+def _perfil_validators(user_id: str):
+    snap = get_repositories().users.get(user_id)
+    return snapshot_validators([snap]) if snap.exists else None
+
+def _as_card(doc: Dict[str, Any], uid: str) -> Dict[str, Any]:
+    card = dict(doc)
+    card.setdefault("uid", uid)
+    card.setdefault("nombre", doc.get("username"))
+    card.setdefault("usuario", doc.get("username"))
+    card.setdefault("foto_perfil_url", doc.get("avatar_url"))
+    return card
+
+@main_bp.route("/explorar", methods=["GET"])
+@conditional_get(_explorar_validators)
+def explorar():
+    snaps = get_repositories().users.list_creators()
+    creadoras = [_as_card(s.to_dict() or {}, s.id) for s in snaps]
+    return try_render("home/explorar.html", creadoras=creadoras)
+
+@main_bp.route("/perfil/<string:user_id>", methods=["GET"])
+@conditional_get(_perfil_validators)
+def perfil_creador(user_id: str):
+    payload = conditional_payload()
+    if payload is None:
+        return try_render("errors/404.html", status=404)
+    creator = _as_card(payload[0].to_dict() or {}, user_id)
+    return try_render("creators/profile.html", creator=creator, creator_username=creator.get("usuario"))
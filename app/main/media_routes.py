@@ -0,0 +1,175 @@
+# app/main/media_routes.py
+"""
+Blueprint 'media': entrega de los contenidos subidos por las creadoras.
+✅ GET / HEAD /media/<content_id> con Range / 206 para poder adelantar videos y audios
+✅ Control de acceso por contenido: público, la creadora, admins o suscriptores activos
+✅ Los archivos viven en MEDIA_ROOT (fuera de /static) y salen por sendfile (app/utils/media.py)
+✅ Contenido público cacheable por proxies; el resto solo en el navegador
+✅ GET /media/<content_id>/teaser → vista previa borrosa (app/utils/teasers.py), pública
+   aunque el contenido sea para suscriptores
+✅ GET /media/<content_id>/waveform → duración y picos del audio (app/utils/waveform.py),
+   públicos como el teaser: el reproductor los dibuja antes de bajar el archivo
+✅ Imágenes para suscriptores: cada comprador recibe una copia con su código de marca
+   de agua (app/utils/watermark.py), cacheada en disco y servida por sendfile
+
+Documento `contents/<id>`:
+    creator_uid, storage_path (relativo a MEDIA_ROOT o al bucket), content_type,
+    visibility ("public" | "subscribers"), status ("published" | "draft" | "deleted" | ...),
+    storage_backend ("local" | "firebase"; firebase → redirect a una URL firmada corta),
+    sha256 (blob compartido en app/utils/blobstore.py: un borrado solo suelta la referencia)
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Optional
+
+from flask import Blueprint, Response, current_app, jsonify, redirect
+from werkzeug.security import safe_join
+
+from app.main.main_routes import get_current_user
+from app.repositories import get_repositories
+from app.repositories.loader import get_loader
+from app.utils.media import send_media
+from app.utils.teasers import TEASER_CONTENT_TYPE, teaser_name
+from app.utils.watermark import WATERMARK_CONTENT_TYPE, wants_watermark
+from app.utils.waveform import wants_waveform
+
+logger = logging.getLogger("PlayTimeUY.media")
+
+media_bp = Blueprint("media", __name__, url_prefix="/media")
+
+PUBLISHED = "published"
+DELETED = "deleted"
+PUBLIC_CACHE = "public, max-age=86400, immutable"  # nombres únicos por subida: el archivo no cambia
+PRIVATE_CACHE = "private, max-age=3600"
+
+
+# =========================================================
+# Acceso
+# =========================================================
+def is_public(content: Dict[str, Any]) -> bool:
+    return content.get("visibility") == "public" and (content.get("status") or PUBLISHED) == PUBLISHED
+
+
+def can_view(user: Optional[Dict[str, Any]], content: Dict[str, Any]) -> bool:
+    if is_public(content):
+        return True
+    if not user:
+        return False
+    creator_uid = content.get("creator_uid")
+    if user.get("uid") == creator_uid or user.get("is_admin"):
+        return True
+    if (content.get("status") or PUBLISHED) != PUBLISHED:
+        return False
+    return get_repositories().subscriptions.is_active(user.get("uid"), creator_uid)
+
+
+def media_path(content: Dict[str, Any]) -> Optional[str]:
+    """Ruta absoluta dentro de MEDIA_ROOT (None si el documento apunta afuera)."""
+    relative = content.get("storage_path") or content.get("filename")
+    return safe_join(current_app.config["MEDIA_ROOT"], relative) if relative else None
+
+
+# =========================================================
+# Entrega
+# =========================================================
+@media_bp.route("/<string:content_id>", methods=["GET", "HEAD"])
+def content_media(content_id: str):
+    content = get_loader().load("contents", content_id).to_dict()
+    if not content or content.get("status") == DELETED:
+        return Response("Contenido no encontrado", 404, mimetype="text/plain")
+
+    user = get_current_user()
+    if not can_view(user, content):
+        if (content.get("status") or PUBLISHED) != PUBLISHED:
+            return Response("Contenido no encontrado", 404, mimetype="text/plain")
+        return Response("Contenido solo para suscriptores", 403 if user else 401, mimetype="text/plain")
+
+    watermarks = current_app.extensions.get("watermarks")
+    if watermarks is not None and wants_watermark(user, content, is_public(content)):
+        return _watermarked(watermarks, content_id, content, user["uid"])
+
+    if content.get("storage_backend") == "firebase":
+        uploads = current_app.extensions.get("uploads")
+        bucket = getattr(uploads, "bucket", None)
+        if not hasattr(bucket, "download_url"):
+            return Response("Contenido no disponible", 503, mimetype="text/plain")
+        # El archivo lo entrega GCS (Range incluido); la URL vence a los pocos minutos
+        response = redirect(bucket.download_url(content["storage_path"]))
+        response.headers["Cache-Control"] = "private, no-store"
+        return response
+
+    path = media_path(content)
+    if path is None:
+        logger.warning("⚠️ Contenido %s con ruta inválida: %r", content_id, content.get("storage_path"))
+        return Response("Contenido no encontrado", 404, mimetype="text/plain")
+
+    return send_media(path, content.get("content_type"), PUBLIC_CACHE if is_public(content) else PRIVATE_CACHE)
+
+
+def _watermarked(watermarks, content_id: str, content: Dict[str, Any], uid: str) -> Response:
+    """Copia con el código del comprador; si no se puede marcar, no se entrega el original."""
+    if content.get("storage_backend") == "firebase":
+        bucket = getattr(current_app.extensions.get("uploads"), "bucket", None)
+        if not hasattr(bucket, "open"):
+            return Response("Contenido no disponible", 503, mimetype="text/plain")
+        source = lambda: bucket.open(content["storage_path"])  # noqa: E731  (solo si no está en la caché)
+    else:
+        path = media_path(content)
+        if path is None:
+            logger.warning("⚠️ Contenido %s con ruta inválida: %r", content_id, content.get("storage_path"))
+            return Response("Contenido no encontrado", 404, mimetype="text/plain")
+        source = lambda: path  # noqa: E731
+    try:
+        marked = watermarks.deliver(content_id, content.get("sha256") or content["storage_path"], uid, source)
+    except FileNotFoundError:
+        return Response("Contenido no encontrado", 404, mimetype="text/plain")
+    except Exception as exc:
+        logger.error("❌ No se pudo marcar el contenido %s: %s", content_id, exc)
+        return Response("Contenido no disponible", 503, mimetype="text/plain")
+    return send_media(marked, WATERMARK_CONTENT_TYPE, PRIVATE_CACHE)
+
+
+@media_bp.route("/<string:content_id>/teaser", methods=["GET", "HEAD"])
+def content_teaser(content_id: str):
+    content = get_loader().load("contents", content_id).to_dict()
+    if not content or (content.get("status") or PUBLISHED) != PUBLISHED or not content.get("teaser"):
+        return Response("Teaser no disponible", 404, mimetype="text/plain")
+
+    name = teaser_name(content["storage_path"])
+    if content.get("storage_backend") == "firebase":
+        bucket = getattr(current_app.extensions.get("uploads"), "bucket", None)
+        if not hasattr(bucket, "download_url"):
+            return Response("Teaser no disponible", 503, mimetype="text/plain")
+        response = redirect(bucket.download_url(name))  # firmada localmente: sin llamada a GCS
+        response.headers["Cache-Control"] = "public, max-age=300"
+        return response
+
+    path = safe_join(current_app.config["MEDIA_ROOT"], name)
+    if path is None:
+        return Response("Teaser no disponible", 404, mimetype="text/plain")
+    return send_media(path, TEASER_CONTENT_TYPE, PUBLIC_CACHE)
+
+
+@media_bp.route("/<string:content_id>/waveform", methods=["GET"])
+def content_waveform(content_id: str):
+    content = get_loader().load("contents", content_id).to_dict()
+    if not content or (content.get("status") or PUBLISHED) != PUBLISHED or not wants_waveform(content):
+        return jsonify({"ok": False, "error": "Forma de onda no disponible"}), 404
+
+    status = content.get("waveform_status")
+    if status not in ("ready", "duration"):
+        # pendiente: el análisis corre en segundo plano después de la subida
+        return jsonify({"ok": False, "status": status or "pending", "duration": content.get("duration")}), \
+            (202 if status is None else 200)
+    response = jsonify({
+        "ok": True,
+        "status": status,
+        "duration": content.get("duration"),
+        "waveform": content.get("waveform") or [],  # vacío si solo hay duración (mp3 sin ffmpeg)
+        "sample_rate": content.get("sample_rate"),
+        "channels": content.get("channels"),
+    })
+    response.headers["Cache-Control"] = "public, max-age=300"
+    return response
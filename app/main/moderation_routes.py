@@ -0,0 +1,92 @@
+# app/main/moderation_routes.py
+"""
+Blueprint 'moderation' (solo admins): cola de revisión de contenidos.
+✅ GET  /admin/moderation/queue            → contenidos marcados al subir (review = "pending")
+✅ POST /admin/moderation/<id>/approve     → se publica (si estaba "flagged") y sale de la cola
+✅ POST /admin/moderation/<id>/remove      → "removed" + hash de la imagen como `banned`:
+                                             las re-subidas parecidas quedan "flagged" solas
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from flask import Blueprint, current_app, jsonify, request
+
+from app.main.main_routes import csrf_protect, get_current_user, logger
+from app.main.profiling_routes import admin_only
+from app.repositories import get_repositories
+from app.utils.image_index import FLAGGED, ImageIndex, is_image
+
+moderation_bp = Blueprint("moderation", __name__, url_prefix="/admin/moderation")
+
+QUEUE_LIMIT = 50
+MAX_QUEUE_LIMIT = 200
+
+
+def _images() -> ImageIndex:
+    return current_app.extensions["image_index"]
+
+
+def _summary(record: Any) -> Dict[str, Any]:
+    data = record.to_dict() or {}
+    return {
+        "content_id": record.id,
+        "creator_uid": data.get("creator_uid"),
+        "title": data.get("title"),
+        "status": data.get("status"),
+        "content_type": data.get("content_type"),
+        "flags": data.get("flags") or [],
+        "scores": data.get("moderation_scores"),
+    }
+
+
+@moderation_bp.route("/queue", methods=["GET"])
+@admin_only
+def queue():
+    limit = min(max(request.args.get("limit", QUEUE_LIMIT, type=int), 1), MAX_QUEUE_LIMIT)
+    records = get_repositories().contents.list_pending_review(limit)
+    return jsonify({"ok": True, "items": [_summary(r) for r in records]})
+
+
+def _not_found():
+    return jsonify({"ok": False, "error": "Contenido no encontrado"}), 404
+
+
+def _close_review(content_id: str, fields: Dict[str, Any]) -> None:
+    reviewer = (get_current_user() or {}).get("uid")
+    get_repositories().contents.update(content_id, {**fields, "review": "done", "reviewed_by": reviewer})
+
+
+@moderation_bp.route("/<string:content_id>/approve", methods=["POST"])
+@admin_only
+@csrf_protect
+def approve(content_id: str):
+    content = get_repositories().contents.get(content_id).to_dict()
+    if not content:
+        return _not_found()
+    status = "published" if content.get("status") == FLAGGED else content.get("status")
+    _close_review(content_id, {"status": status})
+    logger.info("✅ Contenido %s aprobado en moderación", content_id)
+    return jsonify({"ok": True, "content_id": content_id, "status": status})
+
+
+@moderation_bp.route("/<string:content_id>/remove", methods=["POST"])
+@admin_only
+@csrf_protect
+def remove(content_id: str):
+    content = get_repositories().contents.get(content_id).to_dict()
+    if not content:
+        return _not_found()
+    _close_review(content_id, {"status": "removed"})
+
+    banned = False
+    if is_image(content.get("content_type")) and content.get("storage_path"):
+        bucket = current_app.extensions["uploads"].bucket
+        try:
+            banned = _images().ban(get_repositories().image_hashes, content_id, content.get("creator_uid"),
+                                   lambda: bucket.open(content["storage_path"]))
+        except Exception as exc:
+            logger.warning("⚠️ Contenido %s removido sin hash bloqueado: %s", content_id, exc)
+    logger.info("🚫 Contenido %s removido en moderación (hash bloqueado: %s)", content_id, banned)
+    return jsonify({"ok": True, "content_id": content_id, "status": "removed", "banned": banned})
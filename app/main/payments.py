@@ -1,33 +1,42 @@
 """
 Blueprint 'mp_routes' de PlayTimeUY - Pagos y Webhook
 ✅ Creación de pagos con Mercado Pago (Checkout Pro)
-✅ Webhook seguro con HMAC-SHA256
+✅ /payment/webhook: alias del webhook de user_routes (HMAC-SHA256, un solo manejador)
 ✅ Historial de pagos en Firestore
 ✅ Login Firebase REST (fallback para routes.py)
 ✅ Logs estructurados + manejo de errores robusto
 """
 
 from __future__ import annotations
-import os, hmac, hashlib, logging
+import os, logging
 from typing import Any, Dict, Optional, Tuple
 import requests
 
 from flask import Blueprint, request, jsonify, session
-from google.cloud.firestore import Client as FirestoreClient
 import mercadopago
 
-from app.config.firebase import firestore_db  # Firestore inicializado en config
+from app.main.user_routes import payment_webhook
+from app.repositories import get_loader, get_repositories
+from app.utils.conditional import conditional_get, conditional_payload, snapshot_validators
+from app.utils.csrf import csrf_protect
+from app.utils.tracing import mercadopago_span, record_mp_response
 
 # =========================================================
 # Configuración
 # =========================================================
 MP_ACCESS_TOKEN = (os.getenv("MP_ACCESS_TOKEN") or "").strip()
-MP_WEBHOOK_SECRET = (os.getenv("MP_WEBHOOK_SECRET") or "").strip()
 FIREBASE_WEB_API_KEY = (os.getenv("FIREBASE_WEB_API_KEY") or "").strip()
 
+FIREBASE_AUTH_EMULATOR_HOST = (os.getenv("FIREBASE_AUTH_EMULATOR_HOST") or "").strip()
+
 MP = mercadopago.SDK(MP_ACCESS_TOKEN) if MP_ACCESS_TOKEN else None
+# Con FIREBASE_AUTH_EMULATOR_HOST (emulador oficial o stand-in de benchmarks) no se sale a Google
+_IDENTITY_TOOLKIT_BASE = (
+    f"http://{FIREBASE_AUTH_EMULATOR_HOST}/identitytoolkit.googleapis.com"
+    if FIREBASE_AUTH_EMULATOR_HOST else "https://identitytoolkit.googleapis.com"
+)
 FIREBASE_REST_SIGNIN_URL = (
-    f"https://identitytoolkit.googleapis.com/v1/accounts:signInWithPassword?key={FIREBASE_WEB_API_KEY}"
+    f"{_IDENTITY_TOOLKIT_BASE}/v1/accounts:signInWithPassword?key={FIREBASE_WEB_API_KEY}"
     if FIREBASE_WEB_API_KEY else None
 )
 
@@ -37,13 +46,6 @@ mp_routes = Blueprint("mp_routes", __name__)
 # Logger
 # =========================================================
 logger = logging.getLogger("PlayTimeUY.mp_routes")
-if not logger.handlers:
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter(
-        "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
-    ))
-    logger.addHandler(handler)
-logger.setLevel(logging.INFO)
 
 # =========================================================
 # Firebase Login (REST)
@@ -51,6 +53,16 @@ logger.setLevel(logging.INFO)
 def _valid_email(email: str) -> bool:
     return bool(email and "@" in email and "." in email.rsplit("@", 1)[-1])
 
+def minimal_user(uid: str, email: str, signin: Dict[str, Any]) -> Dict[str, Any]:
+    """Documento inicial de un usuario que entra por primera vez."""
+    return {
+        "uid": uid,
+        "email": email,
+        "username": signin.get("displayName") or email.split("@")[0],
+        "role": "buyer",
+        "is_admin": False,
+    }
+
 def firebase_login_password(
     email: str, password: str
 ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
@@ -76,20 +88,12 @@ def firebase_login_password(
             logger.error("Respuesta inválida de Firebase Auth: %s", data)
             return None, "Error autenticando usuario."
 
-        # Crear usuario mínimo en Firestore si no existe
-        user_ref = firestore_db.collection("users").document(uid)
-        snap = user_ref.get()
+        # Crear usuario mínimo si no existe
+        users = get_repositories().users
+        snap = users.get(uid)
         if not snap.exists:
-            minimal = {
-                "uid": uid,
-                "email": email,
-                "username": data.get("displayName") or email.split("@")[0],
-                "role": "buyer",
-                "is_admin": False,
-                "created_at": firestore_db.field_path.SERVER_TIMESTAMP,  # Marca temporal
-                "updated_at": firestore_db.field_path.SERVER_TIMESTAMP,
-            }
-            user_ref.set(minimal)
+            minimal = minimal_user(uid, email, data)
+            users.create(uid, minimal)  # created_at / updated_at los pone el repositorio
             return minimal, None
 
         return snap.to_dict(), None
@@ -105,6 +109,7 @@ def firebase_login_password(
 # Crear Pago (Checkout Pro)
 # =========================================================
 @mp_routes.route("/payment/create", methods=["POST"])
+@csrf_protect
 def create_payment():
     if not MP:
         return jsonify({"ok": False, "error": "Mercado Pago no configurado"}), 500
@@ -129,7 +134,9 @@ def create_payment():
     }
 
     try:
-        preference = MP.preference().create(preference_data)
+        with mercadopago_span("preference.create") as span:
+            preference = MP.preference().create(preference_data)
+            record_mp_response(span, preference)
         logger.info("Preferencia creada: %s", preference["response"].get("id"))
         return jsonify({"ok": True, "preference": preference["response"]})
     except Exception as e:
@@ -137,43 +144,24 @@ def create_payment():
         return jsonify({"ok": False, "error": "Error al generar el pago"}), 500
 
 # =========================================================
-# Webhook (HMAC-SHA256)
+# Webhook: URL histórica, mismo manejador que /user/payment/webhook
 # =========================================================
-@mp_routes.route("/payment/webhook", methods=["POST"])
-def mp_webhook():
-    if not MP_WEBHOOK_SECRET:
-        return "Webhook secret no configurado", 500
-
-    sig = request.headers.get("X-Hub-Signature") or ""
-    payload = request.data or b""
-
-    expected_sig = hmac.new(
-        MP_WEBHOOK_SECRET.encode(), payload, hashlib.sha256
-    ).hexdigest()
-
-    if not hmac.compare_digest(sig, expected_sig):
-        logger.warning("Webhook HMAC inválido")
-        return "Invalid signature", 403
-
-    try:
-        data = request.get_json(force=True)
-        logger.info("Webhook recibido: %s", data)
-
-        # Guardar en Firestore (colección 'webhooks')
-        firestore_db.collection("webhooks").add({
-            "data": data,
-            "received_at": firestore_db.field_path.SERVER_TIMESTAMP,
-        })
-
-        return "OK", 200
-    except Exception as e:
-        logger.exception("Error procesando webhook")
-        return "Error interno", 500
+mp_routes.add_url_rule("/payment/webhook", "mp_webhook", payment_webhook, methods=["POST"])
 
 # =========================================================
 # Historial de Pagos
 # =========================================================
+def _payment_history_validators():
+    user = session.get("user")
+    if not user:
+        return None
+    payments = get_repositories().payments.list_by_buyer(user.get("uid"))
+    creators = get_loader().load_many("users", [p.get("creator_uid") for p in payments])
+    return snapshot_validators([*payments, *creators.values()], payload=payments)
+
+
 @mp_routes.route("/payment/history", methods=["GET"])
+@conditional_get(_payment_history_validators)
 def payment_history():
     user = session.get("user")
     if not user:
@@ -181,8 +169,12 @@ def payment_history():
 
     uid = user.get("uid")
     try:
-        docs = firestore_db.collection("payments").where("uid", "==", uid).stream()
+        repos = get_repositories()
+        docs = conditional_payload()
+        if docs is None:
+            docs = repos.payments.list_by_buyer(uid)
         history = [doc.to_dict() for doc in docs]
+        get_loader().attach("users", history, "creator_uid", "creator", fields=repos.users.PUBLIC_FIELDS)
         return jsonify({"ok": True, "payments": history})
     except Exception:
         logger.exception("Error obteniendo historial de pagos")
@@ -0,0 +1,93 @@
+# app/main/profiling_routes.py
+"""
+Blueprint 'profiling' (solo admins): visor de requests lentos y memoria.
+✅ Top de endpoints / funciones más costosas (ring buffer del worker)
+✅ Detalle de cada captura (stacks muestreados o cProfile)
+✅ Snapshot / diff / stop de tracemalloc
+"""
+
+from __future__ import annotations
+
+import os
+from functools import wraps
+
+from flask import Blueprint, current_app, jsonify, request
+
+from app.main.main_routes import csrf_protect, try_render
+from app.utils.profiling import is_admin_session
+
+profiling_bp = Blueprint("profiling", __name__, url_prefix="/admin/profiling")
+
+
+def admin_only(fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not is_admin_session():
+            return jsonify({"ok": False, "error": "Solo administradores"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def _profiler():
+    return current_app.extensions["profiler"]
+
+
+# =========================================================
+# Visor
+# =========================================================
+@profiling_bp.route("/", methods=["GET"])
+@admin_only
+def index():
+    profiler = _profiler()
+    return try_render(
+        "admin/profiling.html",
+        pid=os.getpid(),
+        slow_ms=int(profiler.slow_s * 1000),
+        offenders=profiler.top_offenders(),
+        captures=list(reversed(profiler.list_captures())),
+    )
+
+
+@profiling_bp.route("/captures", methods=["GET"])
+@admin_only
+def captures():
+    profiler = _profiler()
+    return jsonify({
+        "ok": True,
+        "pid": os.getpid(),
+        "offenders": profiler.top_offenders(request.args.get("limit", 10, type=int)),
+        "captures": profiler.list_captures(),
+    })
+
+
+@profiling_bp.route("/captures/<int:capture_id>", methods=["GET"])
+@admin_only
+def capture_detail(capture_id: int):
+    capture = _profiler().get_capture(capture_id)
+    if capture is None:
+        return jsonify({"ok": False, "error": "Captura no encontrada en este worker", "pid": os.getpid()}), 404
+    return jsonify({"ok": True, "capture": capture})
+
+
+# =========================================================
+# Memoria (tracemalloc)
+# =========================================================
+@profiling_bp.route("/memory/snapshot", methods=["POST"])
+@admin_only
+@csrf_protect
+def memory_snapshot():
+    return jsonify({"ok": True, **_profiler().memory_snapshot()})
+
+
+@profiling_bp.route("/memory/diff", methods=["GET"])
+@admin_only
+def memory_diff():
+    return jsonify({"ok": True, **_profiler().memory_diff(request.args.get("limit", 20, type=int))})
+
+
+@profiling_bp.route("/memory/stop", methods=["POST"])
+@admin_only
+@csrf_protect
+def memory_stop():
+    _profiler().memory_stop()
+    return jsonify({"ok": True, "pid": os.getpid()})
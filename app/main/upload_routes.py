@@ -0,0 +1,378 @@
+# app/main/upload_routes.py
+"""
+Blueprint 'uploads': subidas directas al storage (app/utils/uploads.py).
+✅ POST /uploads/sessions            → ticket firmado + URL resumable (Firebase o bucket local)
+✅ PUT  /uploads/local/<ticket>      → bucket local (solo con UPLOAD_BACKEND=local)
+✅ POST /uploads/complete/<ticket>   → valida tamaño / tipo y registra avatar o contenido
+✅ POST /uploads/content             → formulario multipart clásico de las creadoras, en
+                                       streaming (app/utils/upload_stream.py)
+✅ DELETE /uploads/content/<id>      → baja del contenido (suelta la referencia al blob)
+✅ GET  /uploads/avatars/<uid>/<arch> → avatares del bucket local
+
+El worker nunca recibe el archivo cuando el bucket es Firebase: el navegador
+hace PUT directo a la URL de GCS y después confirma. Los contenidos terminan en
+el store por sha256 (app/utils/blobstore.py): el mismo archivo subido dos veces
+ocupa lugar una sola vez. Los avatares quedan fuera (se pisan por usuario).
+Las imágenes pasan por el índice perceptual (app/utils/image_index.py): parecidas
+a una removida → "flagged"; parecidas a la de otra creadora → revisión. Con
+clasificador (app/utils/classifier.py) se guardan sus puntajes y, por encima del
+umbral, también va a revisión. Las imágenes para suscriptores encolan su teaser
+borroso (app/utils/teasers.py) y los audios su forma de onda (app/utils/waveform.py).
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, BinaryIO, Callable, Dict, Optional, Tuple, Union
+
+from flask import Blueprint, current_app, jsonify, request, session, url_for
+from werkzeug.security import safe_join
+
+from app.main.main_routes import get_current_user, logger
+from app.repositories import SERVER_NOW, get_repositories
+from app.utils.blobstore import BlobStore
+from app.utils.classifier import ClassifierClient
+from app.utils.csrf import csrf_enabled, csrf_protect, sent_csrf_token, validate_csrf_token
+from app.utils.image_hash import ImageHashes, compute_hashes
+from app.utils.image_index import ImageIndex, is_image
+from app.utils.media import send_media
+from app.utils.teasers import TeaserGenerator, wants_teaser
+from app.utils.text_filter import blocked_term
+from app.utils.upload_stream import incoming_dir, parse_upload
+from app.utils.uploads import DirectUploads, FirebaseBucket, UploadError, local_put
+from app.utils.waveform import WaveformAnalyzer, wants_waveform
+
+uploads_bp = Blueprint("uploads", __name__, url_prefix="/uploads")
+
+VISIBILITIES = ("public", "subscribers")
+AVATAR_CACHE = "public, max-age=86400, immutable"
+
+
+def _uploads() -> DirectUploads:
+    return current_app.extensions["uploads"]
+
+
+def _blobs() -> BlobStore:
+    return current_app.extensions["blobs"]
+
+
+def _images() -> ImageIndex:
+    return current_app.extensions["image_index"]
+
+
+def _teasers() -> TeaserGenerator:
+    return current_app.extensions["teasers"]
+
+
+def _waveforms() -> WaveformAnalyzer:
+    return current_app.extensions["waveforms"]
+
+
+def _error(message: str, status: int):
+    return jsonify({"ok": False, "error": message}), status
+
+
+def _content_extra(form: Dict[str, Any], visibility: str) -> Dict[str, Any]:
+    title = (form.get("title") or "").strip()[:200] or None
+    if title and blocked_term(title):
+        raise UploadError("El título tiene palabras no permitidas")
+    return {"title": title, "visibility": visibility}
+
+
+def avatar_url(uploads: DirectUploads, name: str) -> str:
+    """URL pública del avatar `avatars/<uid>/<archivo>` según el bucket."""
+    if isinstance(uploads.bucket, FirebaseBucket):
+        return uploads.bucket.public_url(name)
+    _prefix, uid, filename = name.split("/", 2)
+    return url_for("uploads.avatar", uid=uid, filename=filename)
+
+
+# =========================================================
+# Sesión de subida
+# =========================================================
+@uploads_bp.route("/sessions", methods=["POST"])
+@csrf_protect
+def create_session():
+    user = get_current_user()
+    if not user:
+        return _error("Iniciá sesión para subir archivos", 401)
+    body: Dict[str, Any] = request.get_json(silent=True) or {}
+    kind = body.get("kind") or "content"
+    uploads = _uploads()
+    if not uploads.limit_for(kind, user):
+        return _error("Solo las creadoras pueden subir contenido", 403)
+    visibility = body.get("visibility") or "subscribers"
+    if visibility not in VISIBILITIES:
+        return _error("Visibilidad inválida", 400)
+
+    try:
+        extra = _content_extra(body, visibility) if kind == "content" else {}
+        ticket = uploads.issue(user["uid"], kind, body.get("content_type"), body.get("size"), **extra)
+        token = uploads.sign(ticket)
+        target = uploads.upload_target(
+            ticket, token, url_for("uploads.local_put_route", token=token), origin=request.headers.get("Origin")
+        )
+    except UploadError as exc:
+        return _error(str(exc), exc.status)
+    except Exception as exc:
+        logger.exception("❌ No se pudo crear la sesión de subida: %s", exc)
+        return _error("No se pudo iniciar la subida", 502)
+
+    return jsonify({
+        "ok": True,
+        "upload_id": ticket["id"],
+        "upload": target,
+        "complete_url": url_for("uploads.complete", token=token),
+        "expires_in": uploads.max_age,
+    }), 201
+
+
+@uploads_bp.route("/local/<token>", methods=["PUT"])
+def local_put_route(token: str):
+    status, headers, body = local_put(_uploads(), token, request.headers, request.stream)
+    return current_app.response_class(body, status, headers=headers, mimetype="text/plain")
+
+
+# =========================================================
+# Confirmación
+# =========================================================
+def _register_avatar(uploads: DirectUploads, ticket: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
+    url = avatar_url(uploads, ticket["name"])
+    get_repositories().users.update(user["uid"], {"avatar_url": url})
+    user["avatar_url"] = url
+    session["user"] = user
+    return {"avatar_url": url}
+
+
+def _content_result(content_id: str) -> Dict[str, Any]:
+    return {"content_id": content_id, "url": url_for("media.content_media", content_id=content_id)}
+
+
+def _merge_moderation(base: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+    flags = (base.get("flags") or []) + (extra.get("flags") or [])
+    merged = {**base, **extra}
+    if flags:
+        merged["flags"] = flags
+    if "status" in base:  # el índice decide si se publica; el clasificador solo manda a revisión
+        merged["status"] = base["status"]
+    return merged
+
+
+def _screen_image(content_type: str, uid: str, source: Callable[[], Union[str, BinaryIO]]
+                  ) -> Tuple[Optional[ImageHashes], Dict[str, Any]]:
+    """Hashes + campos de moderación; si algo falla la subida sigue sin revisión automática."""
+    if not is_image(content_type):
+        return None, {}
+    classifier: Optional[ClassifierClient] = current_app.extensions.get("classifier")
+    try:
+        handle = source()  # un solo open (una sola descarga del bucket) para hash y clasificador
+        try:
+            hashes = compute_hashes(handle)
+            moderation: Dict[str, Any] = {}
+            if hashes is not None:
+                moderation = _images().screen(get_repositories().image_hashes, uid, hashes)
+            if classifier is not None:
+                if hasattr(handle, "seek"):
+                    handle.seek(0)
+                moderation = _merge_moderation(moderation, classifier.screen(handle))
+        finally:
+            if hasattr(handle, "close"):
+                handle.close()
+        return hashes, moderation
+    except Exception as exc:
+        logger.warning("⚠️ Sin revisión automática de la imagen de %s: %s", uid, exc)
+        return None, {}
+
+
+def _register_content(uploads: DirectUploads, ticket: Dict[str, Any], content_type: str,
+                      name: str, sha256: str, hashes: Optional[ImageHashes] = None,
+                      moderation: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Documento del contenido apuntando al blob; si falla, se suelta la referencia tomada."""
+    repos = get_repositories()
+    content_id = ticket["id"]
+    moderation = moderation or {}
+    try:
+        repos.contents.create(content_id, {
+            "sha256": sha256,
+            "creator_uid": ticket["uid"],
+            "title": ticket.get("title") or "",
+            "storage_path": name,
+            "storage_backend": uploads.bucket.backend,
+            "content_type": content_type,
+            "size": ticket["size"],
+            "visibility": ticket.get("visibility") or "subscribers",
+            "status": "published",
+            **moderation,
+        })
+    except Exception:
+        _blobs().release(repos.blobs, sha256)
+        raise
+    if hashes is not None:
+        try:
+            _images().record(repos.image_hashes, content_id, ticket["uid"], hashes)
+        except Exception as exc:
+            logger.warning("⚠️ No se guardó el hash de la imagen %s: %s", content_id, exc)
+    result = _content_result(content_id)
+    if wants_teaser({"content_type": content_type, "visibility": ticket.get("visibility") or "subscribers",
+                     "storage_path": name}):
+        try:
+            _teasers().schedule(repos.contents, content_id, name)
+            result["teaser_url"] = url_for("media.content_teaser", content_id=content_id)
+        except Exception as exc:
+            logger.warning("⚠️ No se encoló el teaser de %s: %s", content_id, exc)
+    if wants_waveform({"content_type": content_type, "storage_path": name}):
+        try:
+            _waveforms().schedule(repos.contents, content_id, name, content_type)
+            result["waveform_url"] = url_for("media.content_waveform", content_id=content_id)
+        except Exception as exc:
+            logger.warning("⚠️ No se encoló la forma de onda de %s: %s", content_id, exc)
+    for field in ("status", "review"):
+        if field in moderation:
+            result[field] = moderation[field]
+    return result
+
+
+@uploads_bp.route("/complete/<token>", methods=["POST"])
+@csrf_protect
+def complete(token: str):
+    user = get_current_user()
+    if not user:
+        return _error("Iniciá sesión para subir archivos", 401)
+    uploads = _uploads()
+    try:
+        ticket = uploads.load(token)
+        if ticket["uid"] != user.get("uid"):
+            return _error("La subida es de otro usuario", 403)
+        if ticket["kind"] == "avatar":
+            uploads.verify(ticket)
+            result = _register_avatar(uploads, ticket, user)
+        elif get_repositories().contents.get(ticket["id"]).exists:  # confirmación repetida
+            result = _content_result(ticket["id"])
+        else:
+            content_type = uploads.verify(ticket)
+            sha256, name, dedup = _blobs().adopt(get_repositories().blobs, ticket["name"],
+                                                 content_type, ticket["size"])
+            hashes, moderation = _screen_image(content_type, user["uid"], lambda: uploads.bucket.open(name))
+            result = {**_register_content(uploads, ticket, content_type, name, sha256, hashes, moderation),
+                      "sha256": sha256, "deduplicated": dedup}
+    except UploadError as exc:
+        return _error(str(exc), exc.status)
+    except Exception as exc:
+        logger.exception("❌ No se pudo confirmar la subida: %s", exc)
+        return _error("No se pudo confirmar la subida", 502)
+
+    logger.info("📤 Subida %s (%s, %d bytes) de %s", ticket["id"], ticket["kind"], ticket["size"], user["uid"])
+    return jsonify({"ok": True, "upload_id": ticket["id"], **result})
+
+
+# =========================================================
+# Formulario multipart (sin JS): streaming al disco
+# =========================================================
+def require_csrf(fields: Dict[str, str]) -> None:
+    """before_file de parse_upload: el token se valida antes de aceptar bytes de archivo."""
+    if csrf_enabled() and not validate_csrf_token(sent_csrf_token(fields)):
+        raise UploadError("CSRF inválido", 403)
+
+
+@uploads_bp.route("/content", methods=["POST"])
+def content_form():
+    user = get_current_user()
+    if not user:
+        return _error("Iniciá sesión para subir archivos", 401)
+    uploads = _uploads()
+    limit = uploads.limit_for("content", user)
+    if not limit:
+        return _error("Solo las creadoras pueden subir contenido", 403)
+
+    files = []
+    try:
+        fields, files = parse_upload(
+            request.environ, limit, uploads.policies["content"].types,
+            incoming_dir(current_app.config["MEDIA_ROOT"]), before_file=require_csrf,
+        )
+        require_csrf(fields)
+        if not files:
+            return _error("Falta el archivo", 400)
+        visibility = fields.get("visibility") or "subscribers"
+        if visibility not in VISIBILITIES:
+            raise UploadError("Visibilidad inválida")
+        upload = files[0]
+        ticket = uploads.issue(user["uid"], "content", upload.content_type, upload.size,
+                               **_content_extra(fields, visibility))
+        hashes, moderation = _screen_image(upload.content_type, user["uid"], lambda: upload.path)
+        name, dedup = _blobs().put_file(get_repositories().blobs, upload.path, upload.sha256,
+                                        upload.content_type, upload.size)
+        result = _register_content(uploads, ticket, upload.content_type, name, upload.sha256,
+                                   hashes, moderation)
+    except UploadError as exc:
+        return _error(str(exc), exc.status)
+    except Exception as exc:
+        logger.exception("❌ No se pudo guardar la subida: %s", exc)
+        return _error("No se pudo guardar el archivo", 502)
+    finally:
+        for f in files:
+            f.discard()  # no-op si ya se movió al bucket
+
+    logger.info("📤 Subida %s (%s, %d bytes, sha256 %s…%s) de %s", ticket["id"], upload.content_type,
+                upload.size, upload.sha256[:12], ", repetida" if dedup else "", user["uid"])
+    return jsonify({"ok": True, "upload_id": ticket["id"], "sha256": upload.sha256,
+                    "deduplicated": dedup, **result}), 201
+
+
+# =========================================================
+# Baja de contenido
+# =========================================================
+@uploads_bp.route("/content/<string:content_id>", methods=["DELETE"])
+@csrf_protect
+def delete_content(content_id: str):
+    user = get_current_user()
+    if not user:
+        return _error("Iniciá sesión", 401)
+    repos = get_repositories()
+    content = repos.contents.get(content_id).to_dict()
+    if not content or content.get("status") == "deleted":
+        return _error("Contenido no encontrado", 404)
+    if content.get("creator_uid") != user.get("uid") and not user.get("is_admin"):
+        return _error("El contenido es de otra creadora", 403)
+
+    released = {"sha256": None}
+
+    def mark_deleted(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        released["sha256"] = None
+        if not doc or doc.get("status") == "deleted":
+            return doc  # otra baja ganó la carrera: la referencia ya se soltó
+        released["sha256"] = doc.get("sha256")
+        return {**doc, "status": "deleted", "deleted_by": user["uid"], "updated_at": SERVER_NOW}
+
+    try:
+        repos.contents.transact(content_id, mark_deleted)
+        if released["sha256"]:
+            refs = _blobs().release(repos.blobs, released["sha256"])
+            logger.info("🗑️ Contenido %s dado de baja por %s (blob %s…: %d refs)",
+                        content_id, user["uid"], released["sha256"][:12], refs)
+    except Exception as exc:
+        logger.exception("❌ No se pudo dar de baja el contenido %s: %s", content_id, exc)
+        return _error("No se pudo borrar el contenido", 502)
+    return jsonify({"ok": True, "content_id": content_id})
+
+
+# =========================================================
+# Avatares del bucket local
+# =========================================================
+@uploads_bp.route("/avatars/<uid>/<filename>", methods=["GET", "HEAD"])
+def avatar(uid: str, filename: str):
+    uploads = _uploads()
+    if isinstance(uploads.bucket, FirebaseBucket):
+        return _error("Avatar no encontrado", 404)
+    # Solo `avatars/<uid>/<archivo>`: sin `..`, el join es contra la carpeta de avatares
+    # (un join contra MEDIA_ROOT dejaba leer blobs pagos con /avatars/../blobs/...)
+    if any(part in ("", ".", "..") for part in (uid, filename)):
+        return _error("Avatar no encontrado", 404)
+    try:
+        avatars_dir = uploads.bucket.path_for("avatars")
+    except UploadError:
+        return _error("Avatar no encontrado", 404)
+    path = safe_join(avatars_dir, uid, filename)
+    if path is None or not os.path.realpath(path).startswith(os.path.realpath(avatars_dir) + os.sep):
+        return _error("Avatar no encontrado", 404)
+    return send_media(path, cache_control=AVATAR_CACHE)
@@ -4,11 +4,15 @@ from __future__ import annotations
 import os, hmac, hashlib, time
 from typing import Any
 
-from flask import Blueprint, request, jsonify, redirect, url_for, flash, session
+from flask import Blueprint, current_app, request, jsonify, redirect, url_for, flash, session
 from werkzeug.utils import secure_filename
-from google.cloud import firestore
-
-from app.config.firebase import firestore_db, firebase_storage
+from app.repositories import get_loader, get_repositories
+from app.utils.conditional import conditional_get, conditional_payload, snapshot_validators
+from app.utils.text_filter import blocked_term
+from app.utils.tracing import mercadopago_span, record_mp_response
+from app.utils.upload_stream import incoming_dir, parse_upload
+from app.utils.uploads import EXTENSIONS, UploadError
+from app.main.upload_routes import avatar_url, require_csrf
 from app.main.main_routes import (
     get_current_user,
     login_required,
@@ -37,25 +41,10 @@ user_bp = Blueprint("user", __name__, url_prefix="/user")
 # =========================================================
 # Configuración de Archivos / Avatares
 # =========================================================
-ALLOWED_EXTENSIONS: set[str] = {"png", "jpg", "jpeg", "gif"}
+# Límite del avatar (la política "avatar" de app/utils/uploads.py); el tipo se
+# valida por la firma del archivo, no por la extensión
 MAX_FILE_SIZE_MB: int = 5
-
-
-def allowed_file(filename: str) -> bool:
-    """Verifica que el archivo tenga una extensión válida."""
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
-
-
-def filesize_ok(stream) -> bool:
-    """Valida que el archivo no supere el tamaño máximo permitido (MB)."""
-    try:
-        pos = stream.tell()
-        stream.seek(0, 2)
-        size = stream.tell()
-        stream.seek(pos)
-        return size <= MAX_FILE_SIZE_MB * 1024 * 1024
-    except Exception:
-        return False
+MAX_BIO_LENGTH: int = 500
 
 
 # =========================================================
@@ -70,14 +59,39 @@ def profile():
 
 @user_bp.route("/profile/edit", methods=["GET", "POST"])
 @login_required
-@csrf_protect
 def profile_edit():
-    """Editar perfil del usuario (username + avatar)."""
+    """
+    Editar perfil del usuario (username + bio + avatar). Nombre y bio pasan por
+    el filtro de términos (app/utils/text_filter.py).
+    El avatar se lee en streaming (app/utils/upload_stream.py): se corta apenas
+    pasa MAX_FILE_SIZE_MB o no es una imagen. El CSRF se valida acá y no con
+    @csrf_protect, que leería request.form (el archivo entero) antes.
+    """
     user = get_current_user()
 
     if request.method == "POST":
-        username = (request.form.get("username") or "").strip()
-        file = request.files.get("avatar")
+        uploads = current_app.extensions["uploads"]
+        files = []
+        try:
+            fields, files = parse_upload(
+                request.environ, uploads.limit_for("avatar", user), uploads.policies["avatar"].types,
+                incoming_dir(current_app.config["MEDIA_ROOT"]), before_file=require_csrf,
+            )
+            if request.mimetype != "multipart/form-data":
+                fields = request.form.to_dict()
+            require_csrf(fields)
+        except UploadError as exc:
+            for f in files:
+                f.discard()
+            if exc.status == 403:
+                logger.warning("❌ CSRF inválido: %s %s", request.remote_addr, request.path)
+                return jsonify({"ok": False, "error": "CSRF inválido"}), 403
+            flash(f"{exc} ⚠️", "warning")
+            return redirect(url_for("user.profile_edit"))
+
+        username = (fields.get("username") or "").strip()
+        bio = fields.get("bio")
+        file = next((f for f in files if f.field == "avatar"), None)
         data: dict[str, Any] = {}
 
         if username:
@@ -85,35 +99,32 @@ def profile_edit():
             safe_username = secure_filename(username)
             if safe_username != username:
                 flash("El nombre contenía caracteres no válidos y fue saneado.", "info")
-            data["username"] = safe_username
-
-        if file and allowed_file(file.filename):
-            if not filesize_ok(file.stream):
-                flash(f"El archivo supera {MAX_FILE_SIZE_MB}MB.", "warning")
-                return redirect(url_for("user.profile_edit"))
-
-            filename = secure_filename(file.filename)
-            blob_path = f"avatars/{user['uid']}/{int(time.time())}_{filename}"
-            blob = firebase_storage.bucket().blob(blob_path)
-
+            if blocked_term(safe_username, ignore=()):
+                flash("Ese nombre de usuario no está permitido ⚠️", "warning")
+            else:
+                data["username"] = safe_username
+
+        if bio is not None:
+            bio = bio.strip()[:MAX_BIO_LENGTH]
+            if blocked_term(bio):
+                flash("La bio tiene palabras no permitidas ⚠️", "warning")
+            elif bio != (user.get("bio") or ""):
+                data["bio"] = bio
+
+        if file:
+            blob_path = f"avatars/{user['uid']}/{int(time.time())}{EXTENSIONS[file.content_type]}"
             try:
-                file.stream.seek(0)
-                blob.upload_from_file(file, content_type=file.content_type)
-
-                # Intentar URL pública, fallback con URL firmada (1 año)
-                try:
-                    blob.make_public()
-                    data["avatar_url"] = blob.public_url
-                except Exception:
-                    data["avatar_url"] = blob.generate_signed_url(expiration=31536000)
-
+                uploads.bucket.store_file(blob_path, file.path, file.content_type)
+                data["avatar_url"] = avatar_url(uploads, blob_path)
             except Exception as exc:
                 logger.exception("Error subiendo avatar: %s", exc)
                 flash("No se pudo subir el avatar 😢", "danger")
+            finally:
+                file.discard()  # no-op si ya se movió al bucket
 
         if data:
             try:
-                firestore_db.collection("users").document(user["uid"]).update(data)
+                get_repositories().users.update(user["uid"], data)
                 user.update(data)
                 session["user"] = user
                 flash("Perfil actualizado correctamente ✅", "success")
@@ -135,59 +146,57 @@ def profile_edit():
 @login_required
 def creator_subscriptions():
     user = get_current_user()
-    subs = (
-        firestore_db.collection("subscriptions")
-        .where("creator_uid", "==", user["uid"])
-        .stream()
-    )
-    return try_render(
-        "creators/subscriptions.html", subscriptions=[doc.to_dict() for doc in subs]
-    )
+    repos = get_repositories()
+    subs = [doc.to_dict() for doc in repos.subscriptions.list_by_creator(user["uid"])]
+    # Un solo lote para todos los suscriptores (antes: una lectura por fila)
+    get_loader().attach("users", subs, "subscriber_uid", "subscriber", fields=repos.users.PUBLIC_FIELDS)
+    return try_render("creators/subscriptions.html", subscriptions=subs)
 
 
 # =========================================================
 # Historial de Pagos
 # =========================================================
+def _payments_history_validators():
+    user = get_current_user()
+    payments = get_repositories().payments.list_by_buyer(user["uid"])
+    # Las creadoras entran en el ETag (si cambia su perfil cambia la página);
+    # quedan en el identity map del request y la vista no las vuelve a leer
+    creators = get_loader().load_many("users", [p.get("creator_uid") for p in payments])
+    return snapshot_validators([*payments, *creators.values()], payload=payments)
+
+
 @user_bp.route("/payments/history", methods=["GET"])
 @login_required
+@conditional_get(_payments_history_validators)
 def payments_history():
     user = get_current_user()
-    payments = (
-        firestore_db.collection("payments")
-        .where("buyer_uid", "==", user["uid"])
-        .stream()
-    )
-    return try_render(
-        "payments/history.html", payments=[doc.to_dict() for doc in payments]
-    )
+    repos = get_repositories()
+    payments = conditional_payload()
+    if payments is None:
+        payments = repos.payments.list_by_buyer(user["uid"])
+    rows = [doc.to_dict() for doc in payments]
+    get_loader().attach("users", rows, "creator_uid", "creator", fields=repos.users.PUBLIC_FIELDS)
+    return try_render("payments/history.html", payments=rows)
 
 
 # =========================================================
 # Crear Pago (Mercado Pago)
 # =========================================================
-@user_bp.route("/payment", methods=["POST"])
-@login_required
-@csrf_protect
-def payment_create():
-    """Crea una preferencia de pago en Mercado Pago."""
-    if MP is None:
-        return jsonify({"ok": False, "error": "Mercado Pago no configurado"}), 503
-
-    user = get_current_user()
-    data = request.get_json(silent=True) or {}
-
+# Helpers sin estado: los comparte la variante async (app/asgi/routes.py)
+def parse_payment_request(data: dict) -> tuple[float, str]:
     try:
         amount = float(data.get("amount") or 0)
     except (TypeError, ValueError):
         amount = 0.0
+    return amount, (data.get("creator_uid") or "").strip()
 
-    creator_uid = (data.get("creator_uid") or "").strip()
-    if amount <= 0 or not creator_uid:
-        return jsonify({"ok": False, "error": "Datos inválidos"}), 400
 
-    external_ref = f"playtimeuy_{user['uid']}_{int(time.time())}"
+def new_external_reference(user: dict) -> str:
+    return f"playtimeuy_{user['uid']}_{int(time.time())}"
+
 
-    preference_data = {
+def build_preference_data(user: dict, amount: float, external_ref: str) -> dict:
+    return {
         "items": [
             {
                 "title": "Contenido exclusivo",
@@ -206,22 +215,44 @@ def payment_create():
         "external_reference": external_ref,
     }
 
+
+def new_payment_doc(user: dict, creator_uid: str, amount: float, pref_id: str, external_ref: str) -> dict:
+    return {
+        "external_reference": external_ref,
+        "buyer_uid": user["uid"],
+        "creator_uid": creator_uid,
+        "amount": amount,
+        "status": "pending",
+        "preference_id": pref_id,
+    }
+
+
+@user_bp.route("/payment", methods=["POST"])
+@login_required
+@csrf_protect
+def payment_create():
+    """Crea una preferencia de pago en Mercado Pago."""
+    if MP is None:
+        return jsonify({"ok": False, "error": "Mercado Pago no configurado"}), 503
+
+    user = get_current_user()
+    amount, creator_uid = parse_payment_request(request.get_json(silent=True) or {})
+    if amount <= 0 or not creator_uid:
+        return jsonify({"ok": False, "error": "Datos inválidos"}), 400
+
+    external_ref = new_external_reference(user)
+    preference_data = build_preference_data(user, amount, external_ref)
+
     try:
-        mp_resp = MP.preference().create(preference_data)
+        with mercadopago_span("preference.create") as span:
+            mp_resp = MP.preference().create(preference_data)
+            record_mp_response(span, mp_resp)
         pref_id = mp_resp.get("response", {}).get("id")
         if not pref_id:
             raise ValueError("No se recibió preference_id de MP")
 
-        firestore_db.collection("payments").document(external_ref).set(
-            {
-                "external_reference": external_ref,
-                "buyer_uid": user["uid"],
-                "creator_uid": creator_uid,
-                "amount": amount,
-                "status": "pending",
-                "preference_id": pref_id,
-                "created_at": firestore.SERVER_TIMESTAMP,
-            }
+        get_repositories().payments.create(
+            external_ref, new_payment_doc(user, creator_uid, amount, pref_id, external_ref)
         )
         return jsonify({"ok": True, "preference_id": pref_id})
 
@@ -233,51 +264,55 @@ def payment_create():
 # =========================================================
 # Webhook de Mercado Pago
 # =========================================================
-@user_bp.route("/payment/webhook", methods=["POST"])
-def payment_webhook():
-    """Webhook de notificaciones de Mercado Pago."""
-    signature = (
-        request.headers.get("X-Hub-Signature")
-        or request.headers.get("x-signature")
-        or ""
-    )
-    raw_body = request.get_data()
-
+def valid_webhook_signature(raw_body: bytes, signature: str) -> bool:
     if not MP_WEBHOOK_SECRET or not signature:
         logger.warning("Webhook recibido sin secret o firma")
-        return jsonify({"ok": False}), 403
-
+        return False
     computed = hmac.new(
         MP_WEBHOOK_SECRET.encode(), raw_body, hashlib.sha256
     ).hexdigest()
-
     if not hmac.compare_digest(computed, signature):
         logger.warning("Webhook HMAC inválido")
+        return False
+    return True
+
+
+@user_bp.route("/payment/webhook", methods=["POST"])
+def payment_webhook():
+    """Webhook de notificaciones de Mercado Pago (también en /payment/webhook, ver payments.py)."""
+    signature = (
+        request.headers.get("X-Hub-Signature")
+        or request.headers.get("x-signature")
+        or ""
+    )
+    if not valid_webhook_signature(request.get_data(), signature):
         return jsonify({"ok": False}), 403
 
     data = request.get_json(silent=True) or {}
+    try:  # registro crudo de la notificación (colección 'webhooks'); no frena la actualización
+        get_repositories().webhooks.log(data)
+    except Exception as exc:
+        logger.warning("⚠️ No se registró el webhook: %s", exc)
     external_ref = data.get("external_reference")
     status = data.get("status")
 
     # Caso directo: MP envía referencia + estado
     if external_ref and status:
-        firestore_db.collection("payments").document(external_ref).update(
-            {"status": status, "updated_at": firestore.SERVER_TIMESTAMP}
-        )
+        get_repositories().payments.update(external_ref, {"status": status})
         return jsonify({"ok": True})
 
     # Caso fallback: buscar por payment_id
     payment_id = data.get("data", {}).get("id") or data.get("id")
     if payment_id and MP:
         try:
-            detail = MP.payment().get(payment_id)
+            with mercadopago_span("payment.get", mp__payment_id=str(payment_id)) as span:
+                detail = MP.payment().get(payment_id)
+                record_mp_response(span, detail)
             body = detail.get("response", {})
             external_ref = body.get("external_reference")
             status = body.get("status")
             if external_ref and status:
-                firestore_db.collection("payments").document(external_ref).update(
-                    {"status": status, "updated_at": firestore.SERVER_TIMESTAMP}
-                )
+                get_repositories().payments.update(external_ref, {"status": status})
                 return jsonify({"ok": True})
         except Exception as exc:
             logger.exception("Error consultando pago MP %s: %s", payment_id, exc)
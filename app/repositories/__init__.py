@@ -0,0 +1,75 @@
+"""
+Repositorios de PlayTimeUY
+--------------------------
+Las rutas no hablan con `firestore_db`: piden `get_repositories()` y usan
+`users` / `payments` / `subscriptions` / `contents` / `webhooks`.
+
+Backend por configuración (DATA_BACKEND):
+  - "firestore" (por defecto): mismas colecciones de siempre
+  - "sqlite": archivo local (SQLITE_PATH), la app corre sin Google
+
+Para documentos relacionados en listados usar `get_loader()` (un lote por
+colección y un identity map por request, ver loader.py).
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Optional
+
+from flask import current_app
+
+from app.repositories.base import (
+    SERVER_NOW,
+    NotFoundError,
+    LoaderStats,
+    QueryStats,
+    Record,
+    Repositories,
+)
+from app.repositories.loader import DocumentLoader, get_loader, report_loader
+
+logger = logging.getLogger("PlayTimeUY.repositories")
+
+BACKENDS = ("firestore", "sqlite")
+
+
+def build_repositories(backend: str = "firestore", sqlite_path: Optional[str] = None,
+                       firestore_client: Any = None) -> Repositories:
+    backend = (backend or "firestore").strip().lower()
+    if backend == "sqlite":
+        from app.repositories.sqlite import build_sqlite_repositories
+
+        return build_sqlite_repositories(sqlite_path)
+    if backend == "firestore":
+        from app.repositories.firestore import build_firestore_repositories
+
+        return build_firestore_repositories(firestore_client)
+    raise ValueError(f"DATA_BACKEND desconocido: {backend!r} (opciones: {', '.join(BACKENDS)})")
+
+
+def init_repositories(app, backend: str = "firestore", sqlite_path: Optional[str] = None,
+                      firestore_client: Any = None) -> Repositories:
+    repos = build_repositories(backend, sqlite_path, firestore_client)
+    app.extensions["repositories"] = repos
+    app.teardown_request(report_loader)
+    return repos
+
+
+def get_repositories() -> Repositories:
+    return current_app.extensions["repositories"]
+
+
+__all__ = [
+    "SERVER_NOW",
+    "NotFoundError",
+    "DocumentLoader",
+    "LoaderStats",
+    "QueryStats",
+    "Record",
+    "Repositories",
+    "build_repositories",
+    "init_repositories",
+    "get_repositories",
+    "get_loader",
+]
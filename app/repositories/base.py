@@ -0,0 +1,387 @@
+"""
+Capa de acceso a datos de PlayTimeUY
+------------------------------------
+✅ Repositorios de dominio (users, payments, subscriptions, contents, blobs, image_hashes)
+   independientes del backend
+✅ Interfaz mínima `DocumentStore` que implementa cada backend (Firestore / SQLite)
+✅ `Record`: misma forma que un DocumentSnapshot (id / exists / update_time / to_dict)
+✅ Estadísticas por consulta (cantidad, documentos, tiempo) para encontrar queries calientes
+✅ Totales del loader por request (lecturas / round-trips ahorrados)
+✅ Timestamps (created_at / updated_at) los pone el repositorio, no las rutas
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Marca "hora del servidor": Firestore la traduce a SERVER_TIMESTAMP, SQLite a ahora (UTC)
+SERVER_NOW = object()
+
+
+class NotFoundError(LookupError):
+    """update() sobre un documento inexistente (equivalente a NotFound de Firestore)."""
+
+
+# ===================== RECORD =====================
+class Record:
+    """Documento leído de cualquier backend (API compatible con DocumentSnapshot)."""
+
+    __slots__ = ("id", "exists", "create_time", "update_time", "_data")
+
+    def __init__(self, doc_id: str, data: Optional[Dict[str, Any]],
+                 create_time: Optional[datetime] = None, update_time: Optional[datetime] = None):
+        self.id = doc_id
+        self.exists = data is not None
+        self.create_time = create_time
+        self.update_time = update_time
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+    def __repr__(self) -> str:
+        return f"Record({self.id!r}, exists={self.exists})"
+
+
+# ===================== BACKEND =====================
+class DocumentStore(ABC):
+    """Operaciones que cada backend implementa sobre una colección / tabla."""
+
+    name: str
+
+    @abstractmethod
+    def get(self, doc_id: str) -> Record: ...
+
+    @abstractmethod
+    def get_many(self, doc_ids: List[str]) -> List[Record]:
+        """Lectura en lote; devuelve en el mismo orden que `doc_ids`."""
+
+    @abstractmethod
+    def find(self, filters: List[Tuple[str, Any]], order_by: Optional[str] = None,
+             descending: bool = False, limit: Optional[int] = None) -> List[Record]:
+        """Igualdades AND sobre campos (los indexados van por índice)."""
+
+    @abstractmethod
+    def count(self, filters: List[Tuple[str, Any]]) -> int:
+        """Cantidad de documentos que cumplen `filters` (agregación: no trae los datos)."""
+
+    @abstractmethod
+    def set(self, doc_id: str, data: Dict[str, Any], merge: bool = False) -> None: ...
+
+    @abstractmethod
+    def update(self, doc_id: str, data: Dict[str, Any]) -> None:
+        """Merge parcial; NotFoundError si el documento no existe."""
+
+    @abstractmethod
+    def add(self, data: Dict[str, Any]) -> str:
+        """Inserta con id autogenerado y lo devuelve."""
+
+    @abstractmethod
+    def transact(self, doc_id: str, fn: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+                 ) -> Optional[Dict[str, Any]]:
+        """
+        Lectura-modificación-escritura atómica (también entre procesos):
+        `fn(datos actuales o None)` → datos a guardar (None = borrar el documento).
+        `fn` puede correr más de una vez si hay contención: sin efectos laterales.
+        """
+
+
+# ===================== ESTADÍSTICAS =====================
+class QueryStats:
+    """Acumula llamadas / documentos / tiempo por (colección, operación)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[Tuple[str, str], List[float]] = {}
+
+    def record(self, collection: str, operation: str, documents: int, seconds: float) -> None:
+        with self._lock:
+            row = self._rows.setdefault((collection, operation), [0, 0, 0.0, 0.0])
+            row[0] += 1
+            row[1] += documents
+            row[2] += seconds
+            row[3] = max(row[3], seconds)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = [
+                {
+                    "collection": coll,
+                    "operation": op,
+                    "calls": int(r[0]),
+                    "documents": int(r[1]),
+                    "total_ms": round(r[2] * 1000, 3),
+                    "avg_ms": round(r[2] * 1000 / r[0], 3) if r[0] else 0.0,
+                    "max_ms": round(r[3] * 1000, 3),
+                }
+                for (coll, op), r in self._rows.items()
+            ]
+        rows.sort(key=lambda r: r["total_ms"], reverse=True)
+        return rows
+
+    def reset(self) -> None:
+        with self._lock:
+            self._rows.clear()
+
+
+class LoaderStats:
+    """Totales del proceso (suma de todos los requests) para benchmarks / admin."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.lookups = 0
+        self.hits = 0
+        self.fetched = 0
+        self.batches = 0
+
+    def add(self, loader: Any) -> None:
+        with self._lock:
+            self.requests += 1
+            self.lookups += loader.lookups
+            self.hits += loader.hits
+            self.fetched += loader.fetched
+            self.batches += loader.batches
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "fetched": self.fetched,
+                "batches": self.batches,
+                "reads_saved": self.lookups - self.fetched,
+                "round_trips_saved": self.lookups - self.batches,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = self.lookups = self.hits = self.fetched = self.batches = 0
+
+
+def _count(result: Any) -> int:
+    if isinstance(result, list):
+        return sum(1 for r in result if getattr(r, "exists", True))
+    if isinstance(result, Record):
+        return int(result.exists)
+    return 1
+
+
+def _to_epoch(value: Any) -> Optional[float]:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return _to_epoch(datetime.fromisoformat(value.replace("Z", "+00:00")))
+        except ValueError:
+            return None
+    return None
+
+
+def _newest_first(records: List[Any], limit: Optional[int] = None) -> List[Any]:
+    """Ordena por `created_at` (o la fecha de creación del documento si no lo tiene), más nuevos primero."""
+    def key(record: Any) -> float:
+        created = _to_epoch((record.to_dict() or {}).get("created_at"))
+        if created is None:
+            created = _to_epoch(getattr(record, "create_time", None))
+        return created or 0.0
+
+    ordered = sorted(records, key=key, reverse=True)
+    return ordered[:limit] if limit else ordered
+
+
+def _stamp(data: Dict[str, Any], *fields: str) -> Dict[str, Any]:
+    out = dict(data)
+    for field in fields:
+        out.setdefault(field, SERVER_NOW)
+    return out
+
+
+def _forget_cached(collection: str, doc_id: str) -> None:
+    # Import diferido: el loader depende de Flask y de este módulo
+    from app.repositories.loader import forget_cached
+
+    forget_cached(collection, doc_id)
+
+
+# ===================== REPOSITORIOS =====================
+class _Repository:
+    def __init__(self, store: DocumentStore, stats: QueryStats):
+        self.store = store
+        self.stats = stats
+
+    def _run(self, operation: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.stats.record(self.store.name, operation, _count(result), time.perf_counter() - t0)
+        return result
+
+    def get(self, doc_id: str) -> Record:
+        return self._run("get", self.store.get, doc_id)
+
+    def get_many(self, doc_ids: Iterable[str]) -> List[Record]:
+        ids = list(dict.fromkeys(i for i in doc_ids if i))
+        return self._run("get_many", self.store.get_many, ids) if ids else []
+
+    def create(self, doc_id: str, data: Dict[str, Any]) -> None:
+        self._run("set", self.store.set, doc_id, _stamp(data, "created_at", "updated_at"))
+        _forget_cached(self.store.name, doc_id)
+
+    def update(self, doc_id: str, data: Dict[str, Any]) -> None:
+        self._run("update", self.store.update, doc_id, {**data, "updated_at": SERVER_NOW})
+        _forget_cached(self.store.name, doc_id)
+
+    def transact(self, doc_id: str, fn: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+                 ) -> Optional[Dict[str, Any]]:
+        result = self._run("transact", self.store.transact, doc_id, fn)
+        _forget_cached(self.store.name, doc_id)
+        return result
+
+
+class UserRepository(_Repository):
+    # Campos que se pueden mostrar a otros usuarios (listados, historiales)
+    PUBLIC_FIELDS = ("uid", "username", "avatar_url", "role")
+
+    def list_creators(self, limit: Optional[int] = None) -> List[Record]:
+        return self._run("list_creators", self.store.find, [("role", "creator")], limit=limit)
+
+    def creators_version(self) -> Tuple[int, Optional[Record]]:
+        """
+        (cantidad de creadoras, la editada más recientemente): alcanza para validar
+        el listado con dos lecturas chicas en vez de traer todos los perfiles.
+        """
+        total = self._run("count_creators", self.store.count, [("role", "creator")])
+        newest = self._run("newest_creator", self.store.find, [("role", "creator")],
+                           order_by="updated_at", descending=True, limit=1)
+        return total, (newest[0] if newest else None)
+
+    def find_by_email(self, email: str) -> Optional[Record]:
+        found = self._run("find_by_email", self.store.find, [("email", (email or "").lower())], limit=1)
+        return found[0] if found else None
+
+
+class PaymentRepository(_Repository):
+    # Sin order_by en la query: Firestore deja afuera a los documentos que no tienen
+    # el campo (pagos anteriores a `created_at`). Los pagos de un usuario son pocos:
+    # se traen todos y se ordenan acá.
+    def list_by_buyer(self, buyer_uid: str, limit: Optional[int] = None) -> List[Record]:
+        found = self._run("list_by_buyer", self.store.find, [("buyer_uid", buyer_uid)])
+        return _newest_first(found, limit)
+
+    def list_by_creator(self, creator_uid: str, limit: Optional[int] = None) -> List[Record]:
+        found = self._run("list_by_creator", self.store.find, [("creator_uid", creator_uid)])
+        return _newest_first(found, limit)
+
+
+class SubscriptionRepository(_Repository):
+    # Sin `status` = suscripción creada antes de que existiera el campo (activa)
+    ACTIVE_STATES = ("active", "authorized", "approved")
+
+    def list_by_creator(self, creator_uid: str) -> List[Record]:
+        return self._run("list_by_creator", self.store.find, [("creator_uid", creator_uid)])
+
+    def list_by_subscriber(self, subscriber_uid: str) -> List[Record]:
+        return self._run("list_by_subscriber", self.store.find, [("subscriber_uid", subscriber_uid)])
+
+    def is_active(self, subscriber_uid: str, creator_uid: str) -> bool:
+        found = self._run("is_active", self.store.find,
+                          [("creator_uid", creator_uid), ("subscriber_uid", subscriber_uid)])
+        return any((r.get("status") or "active") in self.ACTIVE_STATES for r in found)
+
+
+class ContentRepository(_Repository):
+    def list_by_creator(self, creator_uid: str, limit: Optional[int] = None) -> List[Record]:
+        return self._run("list_by_creator", self.store.find, [("creator_uid", creator_uid)],
+                         order_by="created_at", descending=True, limit=limit)
+
+    def list_all(self) -> List[Record]:
+        return self._run("list_all", self.store.find, [])
+
+    def list_pending_review(self, limit: Optional[int] = None) -> List[Record]:
+        return self._run("list_pending_review", self.store.find, [("review", "pending")],
+                         order_by="created_at", descending=True, limit=limit)
+
+
+class BlobRepository(_Repository):
+    """Blobs direccionados por contenido: id = sha256, `refs` = contenidos que lo usan."""
+
+    def unreferenced(self, limit: Optional[int] = None) -> List[Record]:
+        return self._run("unreferenced", self.store.find, [("refs", 0)], limit=limit)
+
+
+class ImageHashRepository(_Repository):
+    """Hashes perceptuales de imágenes: id = content_id, `banned` = removida por moderación."""
+
+    def list_all(self) -> List[Record]:
+        return self._run("list_all", self.store.find, [])
+
+    def find_by_phash(self, phash: str) -> List[Record]:
+        return self._run("find_by_phash", self.store.find, [("phash", phash)])
+
+
+class WebhookRepository(_Repository):
+    def log(self, data: Dict[str, Any]) -> str:
+        return self._run("add", self.store.add, {"data": data, "received_at": SERVER_NOW})
+
+
+class Repositories:
+    """Punto único de acceso a datos (uno por app, en app.extensions["repositories"])."""
+
+    def __init__(self, backend: str, stores: Dict[str, DocumentStore], close: Optional[Callable[[], None]] = None,
+                 after_fork: Optional[Callable[[], None]] = None):
+        self.backend = backend
+        self.stats = QueryStats()
+        self.loader_stats = LoaderStats()
+        self.users = UserRepository(stores["users"], self.stats)
+        self.payments = PaymentRepository(stores["payments"], self.stats)
+        self.subscriptions = SubscriptionRepository(stores["subscriptions"], self.stats)
+        self.contents = ContentRepository(stores["contents"], self.stats)
+        self.blobs = BlobRepository(stores["blobs"], self.stats)
+        self.image_hashes = ImageHashRepository(stores["image_hashes"], self.stats)
+        self.webhooks = WebhookRepository(stores["webhooks"], self.stats)
+        self._close = close
+        self._after_fork = after_fork
+
+    def close(self) -> None:
+        if self._close is not None:
+            self._close()
+
+    def after_fork(self) -> None:
+        """Recrea el estado por proceso del backend (lo llama el hook post_fork de gunicorn)."""
+        if self._after_fork is not None:
+            self._after_fork()
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+__all__ = [
+    "SERVER_NOW",
+    "NotFoundError",
+    "Record",
+    "DocumentStore",
+    "QueryStats",
+    "LoaderStats",
+    "UserRepository",
+    "PaymentRepository",
+    "SubscriptionRepository",
+    "ContentRepository",
+    "BlobRepository",
+    "ImageHashRepository",
+    "WebhookRepository",
+    "Repositories",
+    "utcnow",
+]
@@ -0,0 +1,137 @@
+"""
+Backend Firestore de la capa de datos
+-------------------------------------
+✅ Una colección por repositorio, mismas colecciones que usaban las rutas
+✅ Lecturas en lote con `get_all` (un round-trip)
+✅ Spans / métricas de Firestore en un solo lugar
+✅ El cliente se resuelve al usarse (tests y benchmarks pueden reemplazarlo)
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from app.repositories.base import SERVER_NOW, DocumentStore, NotFoundError, Repositories
+from app.utils.tracing import firestore_span, traced_stream
+
+logger = logging.getLogger("PlayTimeUY.repositories")
+
+COLLECTIONS = {
+    "users": "users",
+    "payments": "payments",
+    "subscriptions": "subscriptions",
+    "contents": "contents",
+    "blobs": "blobs",
+    "image_hashes": "image_hashes",
+    "webhooks": "webhooks",
+}
+
+ClientSource = Union[Any, Callable[[], Any]]
+
+
+def _default_client() -> Any:
+    from app.config import firebase
+
+    return firebase.firestore_db
+
+
+def _server_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    from google.cloud.firestore import SERVER_TIMESTAMP
+
+    return {k: (SERVER_TIMESTAMP if v is SERVER_NOW else v) for k, v in data.items()}
+
+
+class FirestoreStore(DocumentStore):
+    def __init__(self, client: ClientSource, collection: str):
+        self._client = client
+        self.name = collection
+
+    @property
+    def client(self) -> Any:
+        client = self._client() if callable(self._client) else self._client
+        if client is None:
+            raise RuntimeError("Firestore no inicializado")
+        return client
+
+    def _col(self):
+        return self.client.collection(self.name)
+
+    def get(self, doc_id: str):
+        with firestore_span("get", self.name):
+            return self._col().document(doc_id).get()
+
+    def get_many(self, doc_ids: List[str]) -> List[Any]:
+        col = self._col()
+        with firestore_span("get_all", self.name, db__firestore__batch_size=len(doc_ids)):
+            by_id = {snap.id: snap for snap in self.client.get_all([col.document(i) for i in doc_ids])}
+        return [by_id[i] for i in doc_ids if i in by_id]
+
+    def find(self, filters: List[Tuple[str, Any]], order_by: Optional[str] = None,
+             descending: bool = False, limit: Optional[int] = None) -> List[Any]:
+        query = self._col()
+        for field, value in filters:
+            query = query.where(field, "==", value)
+        if order_by:
+            # Requiere índice compuesto (ver firestore.indexes.json)
+            query = query.order_by(order_by, direction="DESCENDING" if descending else "ASCENDING")
+        if limit:
+            query = query.limit(limit)
+        return traced_stream(query, self.name)
+
+    def count(self, filters: List[Tuple[str, Any]]) -> int:
+        query = self._col()
+        for field, value in filters:
+            query = query.where(field, "==", value)
+        # Agregación del lado del servidor: se cobra como una lectura cada 1000 documentos
+        with firestore_span("count", self.name):
+            result = query.count().get()
+        return int(result[0][0].value)
+
+    def set(self, doc_id: str, data: Dict[str, Any], merge: bool = False) -> None:
+        with firestore_span("set", self.name):
+            self._col().document(doc_id).set(_server_values(data), merge=merge)
+
+    def update(self, doc_id: str, data: Dict[str, Any]) -> None:
+        from google.api_core.exceptions import NotFound
+
+        try:
+            with firestore_span("update", self.name):
+                self._col().document(doc_id).update(_server_values(data))
+        except NotFound as exc:
+            raise NotFoundError(f"{self.name}/{doc_id}") from exc
+
+    def add(self, data: Dict[str, Any]) -> str:
+        with firestore_span("add", self.name):
+            _ts, ref = self._col().add(_server_values(data))
+        return ref.id
+
+    def transact(self, doc_id: str, fn: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+                 ) -> Optional[Dict[str, Any]]:
+        from google.cloud import firestore
+
+        ref = self._col().document(doc_id)
+
+        @firestore.transactional
+        def run(transaction) -> Optional[Dict[str, Any]]:
+            snap = ref.get(transaction=transaction)
+            data = fn(snap.to_dict() if snap.exists else None)
+            if data is None:
+                if snap.exists:
+                    transaction.delete(ref)
+            else:
+                transaction.set(ref, _server_values(data))
+            return data
+
+        with firestore_span("transaction", self.name):
+            return run(self.client.transaction())
+
+
+def build_firestore_repositories(client: ClientSource = None) -> Repositories:
+    source = client if client is not None else _default_client
+    stores = {key: FirestoreStore(source, name) for key, name in COLLECTIONS.items()}
+    logger.info("🔥 Repositorios sobre Firestore")
+    return Repositories("firestore", stores)
+
+
+__all__ = ["FirestoreStore", "build_firestore_repositories", "COLLECTIONS"]
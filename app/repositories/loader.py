@@ -0,0 +1,166 @@
+"""
+Loader de documentos por request (identity map + lotes)
+-------------------------------------------------------
+✅ Las vistas anotan qué documentos relacionados van a necesitar (`want`)
+✅ Se resuelven juntos con un solo `get_many` (Firestore: `get_all`) por lote
+✅ Cada documento se lee una sola vez por request (identity map en `g`)
+✅ Las escrituras del propio request invalidan la copia cacheada
+✅ Al cerrar el request reporta lecturas y round-trips ahorrados
+
+Uso típico (evita N+1 en listados):
+    rows = [p.to_dict() for p in payments]
+    get_loader().attach("users", rows, "creator_uid", "creator", fields=PUBLIC_FIELDS)
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import g, has_app_context
+
+from app.repositories.base import Record, Repositories
+from app.utils import metrics
+from app.utils.tracing import start_span
+
+logger = logging.getLogger("PlayTimeUY.repositories")
+
+# Firestore acepta lotes grandes en get_all, pero respuestas enormes bloquean el worker
+MAX_BATCH = 100
+
+_G_KEY = "doc_loader"
+
+
+class DocumentLoader:
+    """
+    Identity map de un request. Las claves son (colección, id); los pedidos
+    pendientes se agrupan por repositorio y se resuelven en el primer `load`.
+    """
+
+    def __init__(self, repos: Repositories):
+        self.repos = repos
+        self._cache: Dict[Tuple[str, str], Record] = {}
+        self._pending: Dict[str, List[str]] = {}
+        self.lookups = 0  # documentos pedidos por las vistas (con repetidos)
+        self.hits = 0  # resueltos desde el identity map
+        self.fetched = 0  # documentos efectivamente leídos del backend
+        self.batches = 0  # round-trips al backend
+
+    def _collection(self, name: str) -> str:
+        return getattr(self.repos, name).store.name
+
+    # ---------------- Registro ----------------
+    def want(self, name: str, doc_ids: Iterable[Optional[str]]) -> None:
+        """Anota ids para el próximo lote sin leer todavía."""
+        collection = self._collection(name)
+        pending = self._pending.setdefault(name, [])
+        for doc_id in doc_ids:
+            if doc_id and (collection, doc_id) not in self._cache and doc_id not in pending:
+                pending.append(doc_id)
+
+    def prime(self, name: str, records: Iterable[Record]) -> None:
+        """Guarda documentos que la vista ya leyó (p.ej. resultados de una query)."""
+        collection = self._collection(name)
+        for record in records:
+            self._cache[(collection, record.id)] = record
+
+    def forget(self, collection: str, doc_id: str) -> None:
+        self._cache.pop((collection, doc_id), None)
+
+    # ---------------- Resolución ----------------
+    def _flush(self, name: str) -> None:
+        pending = self._pending.pop(name, [])
+        if not pending:
+            return
+        collection = self._collection(name)
+        repo = getattr(self.repos, name)
+        for start in range(0, len(pending), MAX_BATCH):
+            chunk = pending[start:start + MAX_BATCH]
+            with start_span("loader.batch", db__collection=collection, loader__batch_size=len(chunk)):
+                records = repo.get_many(chunk)
+            self.batches += 1
+            self.fetched += len(chunk)
+            found = {r.id: r for r in records}
+            for doc_id in chunk:
+                self._cache[(collection, doc_id)] = found.get(doc_id) or Record(doc_id, None)
+
+    def load_many(self, name: str, doc_ids: Sequence[Optional[str]]) -> Dict[str, Record]:
+        """Devuelve {id: Record} (Record.exists=False si no existe) en un solo lote."""
+        ids = [i for i in doc_ids if i]
+        collection = self._collection(name)
+        self.lookups += len(ids)
+        missing = [i for i in ids if (collection, i) not in self._cache]
+        self.hits += len(ids) - len(missing)
+        if missing:
+            self.want(name, missing)
+            self._flush(name)
+        return {i: self._cache[(collection, i)] for i in ids}
+
+    def load(self, name: str, doc_id: str) -> Record:
+        """Un documento; también resuelve lo que estuviera pendiente en la misma colección."""
+        return self.load_many(name, [doc_id])[doc_id]
+
+    def attach(self, name: str, rows: List[Dict[str, Any]], key: str, as_: str,
+               fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Completa cada fila con el documento relacionado (`row[as_]`), leyendo
+        todos los ids de `row[key]` en un lote. `fields` limita lo que se expone.
+        """
+        docs = self.load_many(name, [row.get(key) for row in rows])
+        for row in rows:
+            record = docs.get(row.get(key))
+            data = record.to_dict() if record is not None and record.exists else None
+            if data is not None and fields is not None:
+                data = {f: data.get(f) for f in fields}
+            row[as_] = data
+        return rows
+
+    # ---------------- Reporte ----------------
+    @property
+    def reads_saved(self) -> int:
+        """Documentos que no hubo que leer (repetidos dentro del request)."""
+        return self.lookups - self.fetched
+
+    @property
+    def round_trips_saved(self) -> int:
+        """Comparado con leer uno por uno."""
+        return self.lookups - self.batches
+
+    def report(self) -> None:
+        if not self.lookups:
+            return
+        self.repos.loader_stats.add(self)
+        metrics.record_loader(self.reads_saved, self.round_trips_saved)
+        logger.debug(
+            "📦 Loader: %d pedidos, %d leídos en %d lotes (ahorro: %d lecturas, %d round-trips)",
+            self.lookups, self.fetched, self.batches, self.reads_saved, self.round_trips_saved,
+        )
+
+
+# ===================== ACCESO POR REQUEST =====================
+def get_loader() -> DocumentLoader:
+    loader = g.get(_G_KEY)
+    if loader is None:
+        from app.repositories import get_repositories
+
+        loader = DocumentLoader(get_repositories())
+        setattr(g, _G_KEY, loader)
+    return loader
+
+
+def forget_cached(collection: str, doc_id: str) -> None:
+    """Lo llaman los repositorios al escribir; no-op fuera de un request."""
+    if has_app_context():
+        loader = g.get(_G_KEY)
+        if loader is not None:
+            loader.forget(collection, doc_id)
+
+
+def report_loader(exc: Optional[BaseException] = None) -> None:
+    """Hook de teardown_request."""
+    loader = g.pop(_G_KEY, None)
+    if loader is not None:
+        loader.report()
+
+
+__all__ = ["DocumentLoader", "MAX_BATCH", "forget_cached", "get_loader", "report_loader"]
@@ -0,0 +1,272 @@
+"""
+Backend SQLite embebido de la capa de datos
+-------------------------------------------
+✅ Corre sin Google: un archivo .sqlite3 en el directorio de datos
+✅ Documento JSON + columnas indexadas para los campos que se consultan
+✅ Índices compuestos (campo, created_at) para historiales ordenados
+✅ WAL + una conexión por thread (y por proceso, seguro tras fork)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.repositories.base import SERVER_NOW, DocumentStore, NotFoundError, Record, Repositories, _to_epoch
+from app.utils.tracing import start_span
+
+logger = logging.getLogger("PlayTimeUY.repositories")
+
+# Tabla -> columnas indexadas (copiadas del documento en cada escritura)
+TABLES: Dict[str, Tuple[str, ...]] = {
+    "users": ("role", "email"),
+    "payments": ("buyer_uid", "creator_uid", "status"),
+    "subscriptions": ("creator_uid", "subscriber_uid"),
+    "contents": ("creator_uid", "status"),
+    "blobs": (),
+    "image_hashes": ("phash",),
+    "webhooks": (),
+}
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_users_role ON users(role)",
+    "CREATE INDEX IF NOT EXISTS ix_users_email ON users(email)",
+    "CREATE INDEX IF NOT EXISTS ix_payments_buyer ON payments(buyer_uid, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_payments_creator ON payments(creator_uid, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_subscriptions_creator ON subscriptions(creator_uid)",
+    "CREATE INDEX IF NOT EXISTS ix_subscriptions_subscriber ON subscriptions(subscriber_uid)",
+    "CREATE INDEX IF NOT EXISTS ix_contents_creator ON contents(creator_uid, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_image_hashes_phash ON image_hashes(phash)",
+)
+
+# Campos de orden mapeados a columnas (epoch float)
+ORDER_COLUMNS = {"created_at": "created_at", "updated_at": "update_time"}
+
+
+def default_sqlite_path() -> str:
+    base = os.getenv("PLAYTIMEUY_DATA_DIR") or str(Path.cwd() / "data")
+    return str(Path(base) / "playtimeuy.sqlite3")
+
+
+# ===================== CODIFICACIÓN =====================
+def _from_epoch(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _resolve(data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    return {k: (now if v is SERVER_NOW else v) for k, v in data.items()}
+
+
+# ===================== BASE DE DATOS =====================
+class SQLiteDatabase:
+    """Archivo SQLite compartido por todas las tablas; conexión por thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._create_schema()
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            if self.path == ":memory:":  # compartida entre threads (tests / benchmarks)
+                conn = sqlite3.connect(f"file:ptuy-{id(self)}?mode=memory&cache=shared", uri=True,
+                                       timeout=30, isolation_level=None, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _create_schema(self) -> None:
+        conn = self.connection()
+        for table, columns in TABLES.items():
+            extra = "".join(f", {col} TEXT" for col in columns)
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                f"id TEXT PRIMARY KEY, data TEXT NOT NULL, created_at REAL, "
+                f"create_time REAL NOT NULL, update_time REAL NOT NULL{extra})"
+            )
+        for ddl in INDEXES:
+            conn.execute(ddl)
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def after_fork(self) -> None:
+        """En el worker (post_fork): la conexión y el lock heredados son del master."""
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+
+class SQLiteStore(DocumentStore):
+    def __init__(self, db: SQLiteDatabase, table: str):
+        self.db = db
+        self.name = table
+        self.columns = TABLES[table]
+
+    def _span(self, operation: str):
+        return start_span(f"sqlite.{operation} {self.name}", kind="client",
+                          db__system="sqlite", db__operation=operation, db__sql__table=self.name)
+
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Record:
+        return Record(row["id"], json.loads(row["data"]),
+                      _from_epoch(row["create_time"]), _from_epoch(row["update_time"]))
+
+    def get(self, doc_id: str) -> Record:
+        with self._span("get"):
+            row = self.db.connection().execute(
+                f"SELECT id, data, create_time, update_time FROM {self.name} WHERE id = ?", (doc_id,)
+            ).fetchone()
+        return self._record(row) if row else Record(doc_id, None)
+
+    def get_many(self, doc_ids: List[str]) -> List[Record]:
+        if not doc_ids:
+            return []
+        marks = ",".join("?" * len(doc_ids))
+        with self._span("get_many"):
+            rows = self.db.connection().execute(
+                f"SELECT id, data, create_time, update_time FROM {self.name} WHERE id IN ({marks})", doc_ids
+            ).fetchall()
+        by_id = {row["id"]: self._record(row) for row in rows}
+        return [by_id.get(i) or Record(i, None) for i in doc_ids]
+
+    def _where(self, filters: List[Tuple[str, Any]]) -> Tuple[str, List[Any]]:
+        where, params = [], []
+        for field, value in filters:
+            if field in self.columns:
+                where.append(f"{field} = ?")
+            else:  # campo no indexado: recorre el JSON
+                where.append(f"json_extract(data, '$.{field}') = ?")
+            params.append(value)
+        return (" WHERE " + " AND ".join(where) if where else ""), params
+
+    def find(self, filters: List[Tuple[str, Any]], order_by: Optional[str] = None,
+             descending: bool = False, limit: Optional[int] = None) -> List[Record]:
+        where, params = self._where(filters)
+        sql = f"SELECT id, data, create_time, update_time FROM {self.name}" + where
+        if order_by:
+            column = ORDER_COLUMNS.get(order_by, f"json_extract(data, '$.{order_by}')")
+            sql += f" ORDER BY {column} {'DESC' if descending else 'ASC'}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._span("query") as span:
+            rows = self.db.connection().execute(sql, params).fetchall()
+            span.set_attribute("db.sqlite.result_count", len(rows))
+        return [self._record(row) for row in rows]
+
+    def count(self, filters: List[Tuple[str, Any]]) -> int:
+        where, params = self._where(filters)
+        with self._span("count"):
+            return self.db.connection().execute(f"SELECT COUNT(*) FROM {self.name}" + where, params).fetchone()[0]
+
+    def _upsert(self, conn: sqlite3.Connection, doc_id: str, resolved: Dict[str, Any],
+                created: float, ts: float) -> None:
+        values = [
+            doc_id,
+            json.dumps(resolved, ensure_ascii=False, default=_json_default),
+            _to_epoch(resolved.get("created_at")) or created,
+            created,
+            ts,
+            *[None if resolved.get(c) is None else str(resolved.get(c)) for c in self.columns],
+        ]
+        cols = ", ".join(("id", "data", "created_at", "create_time", "update_time") + self.columns)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {self.name} ({cols}) VALUES ({','.join('?' * len(values))})", values
+        )
+
+    def _write(self, doc_id: str, data: Dict[str, Any], merge: bool, must_exist: bool) -> None:
+        now = datetime.now(timezone.utc)
+        ts = now.timestamp()
+        conn = self.db.connection()
+        with self.db._write_lock:
+            # Igual que transact: el merge lee y escribe en la misma transacción, así
+            # otro worker no puede escribir el documento entre el SELECT y el INSERT
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT data, create_time FROM {self.name} WHERE id = ?", (doc_id,)
+                ).fetchone()
+                if row is None and must_exist:
+                    raise NotFoundError(f"{self.name}/{doc_id}")
+                resolved = _resolve(data, now)
+                if row is not None and merge:
+                    resolved = {**json.loads(row["data"]), **resolved}
+                self._upsert(conn, doc_id, resolved, row["create_time"] if row is not None else ts, ts)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def set(self, doc_id: str, data: Dict[str, Any], merge: bool = False) -> None:
+        with self._span("set"):
+            self._write(doc_id, data, merge=merge, must_exist=False)
+
+    def update(self, doc_id: str, data: Dict[str, Any]) -> None:
+        with self._span("update"):
+            self._write(doc_id, data, merge=True, must_exist=True)
+
+    def add(self, data: Dict[str, Any]) -> str:
+        doc_id = uuid.uuid4().hex[:20]
+        self.set(doc_id, data)
+        return doc_id
+
+    def transact(self, doc_id: str, fn: Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
+                 ) -> Optional[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        ts = now.timestamp()
+        conn = self.db.connection()
+        with self._span("transact"), self.db._write_lock:
+            # BEGIN IMMEDIATE: toma el lock de escritura del archivo (atómico entre workers)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT data, create_time FROM {self.name} WHERE id = ?", (doc_id,)
+                ).fetchone()
+                data = fn(json.loads(row["data"]) if row is not None else None)
+                if data is None:
+                    conn.execute(f"DELETE FROM {self.name} WHERE id = ?", (doc_id,))
+                else:
+                    data = _resolve(data, now)
+                    self._upsert(conn, doc_id, data, row["create_time"] if row is not None else ts, ts)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return data
+
+
+def build_sqlite_repositories(path: Optional[str] = None) -> Repositories:
+    t0 = time.perf_counter()
+    db = SQLiteDatabase(path or default_sqlite_path())
+    stores = {table: SQLiteStore(db, table) for table in TABLES}
+    logger.info("🗄️ Repositorios sobre SQLite: %s (%.1f ms)", db.path, (time.perf_counter() - t0) * 1000)
+    return Repositories("sqlite", stores, close=db.close, after_fork=db.after_fork)
+
+
+__all__ = ["SQLiteDatabase", "SQLiteStore", "build_sqlite_repositories", "default_sqlite_path", "TABLES"]
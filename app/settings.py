@@ -82,6 +82,8 @@ class Settings:
     SESSION_COOKIE_HTTPONLY: bool = _bool(os.getenv("SESSION_COOKIE_HTTPONLY"), True)
     PERMANENT_SESSION_LIFETIME: timedelta = timedelta(days=_int(os.getenv("SESSION_LIFETIME_DAYS"), 7))
     CSRF_ENABLED: bool = _bool(os.getenv("CSRF_ENABLED"), True)
+    SESSION_BACKEND: str = (os.getenv("SESSION_BACKEND") or "cookie").strip().lower()  # cookie | sqlite
+    SESSION_STORE_PATH: Optional[str] = os.getenv("SESSION_STORE_PATH")  # default: /dev/shm/playtimeuy-sessions.db
     SECURE_PROXY_SSL_HEADER = ("X-Forwarded-Proto", "https")
 
     # -----------------------
@@ -97,6 +99,9 @@ class Settings:
     LOG_LEVEL = getattr(logging, os.getenv("LOG_LEVEL", "DEBUG" if ENV == "development" else "INFO").upper(), logging.INFO)
     LOG_FORMAT = os.getenv("LOG_FORMAT", "[%(asctime)s] [%(levelname)s] %(name)s: %(message)s")
     LOG_DATEFMT = os.getenv("LOG_DATEFMT", "%Y-%m-%d %H:%M:%S")
+    LOG_JSON: bool = _bool(os.getenv("LOG_JSON"), False)
+    LOG_FILE: Optional[str] = os.getenv("LOG_FILE") if _bool(os.getenv("LOG_TO_FILE"), False) else None
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE") or 1.0)
 
     # -----------------------
     # Firebase Admin (backend)
@@ -154,6 +159,96 @@ class Settings:
     MAX_CONTENT_LENGTH: int = _int(os.getenv("MAX_CONTENT_LENGTH_MB"), 16) * 1024 * 1024
     RATE_LIMIT_ENABLED: bool = _bool(os.getenv("RATE_LIMIT_ENABLED"), True)
 
+    # -----------------------
+    # Subidas directas (el navegador sube al bucket, no a los workers)
+    # -----------------------
+    UPLOAD_BACKEND: Optional[str] = os.getenv("UPLOAD_BACKEND")  # firebase | local (default: firebase si hay bucket)
+    UPLOAD_LOCAL_URL: Optional[str] = os.getenv("UPLOAD_LOCAL_URL")  # bucket local en otro proceso
+    UPLOAD_TICKET_MAX_AGE: int = _int(os.getenv("UPLOAD_TICKET_MAX_AGE"), 6 * 3600)
+    UPLOAD_MAX_CONTENT_MB: int = _int(os.getenv("UPLOAD_MAX_CONTENT_MB"), 2048)
+
+    # Teasers borrosos de imágenes para suscriptores
+    TEASER_WORKERS: int = _int(os.getenv("TEASER_WORKERS"), 1)  # procesos por worker web (el backfill usa todos los núcleos)
+    TEASER_WIDTH: int = _int(os.getenv("TEASER_WIDTH"), 320)
+    TEASER_BLUR: float = float(os.getenv("TEASER_BLUR") or 6)
+
+    # Duración y forma de onda de los audios
+    WAVEFORM_POINTS: int = _int(os.getenv("WAVEFORM_POINTS"), 800)
+    WAVEFORM_FFMPEG: Optional[str] = os.getenv("WAVEFORM_FFMPEG")  # default: ffmpeg del PATH (sin él, solo WAV)
+
+    # Marca de agua por comprador (imágenes para suscriptores)
+    WATERMARK_ENABLED: bool = _bool(os.getenv("WATERMARK_ENABLED"), True)
+    WATERMARK_CACHE_MB: int = _int(os.getenv("WATERMARK_CACHE_MB"), 1024)  # en disco, compartida por los workers
+    WATERMARK_BASE_CACHE_MB: int = _int(os.getenv("WATERMARK_BASE_CACHE_MB"), 64)  # imágenes decodificadas, por worker
+    WATERMARK_MAX_SIDE: int = _int(os.getenv("WATERMARK_MAX_SIDE"), 2048)
+    WATERMARK_QUALITY: int = _int(os.getenv("WATERMARK_QUALITY"), 85)
+    WATERMARK_OPACITY: float = float(os.getenv("WATERMARK_OPACITY") or 0.22)
+
+    # -----------------------
+    # Moderación de imágenes (hash perceptual: reposts y contenido removido)
+    # -----------------------
+    IMAGE_MATCH_DISTANCE: int = _int(os.getenv("IMAGE_MATCH_DISTANCE"), 8)  # bits de pHash (de 64)
+    IMAGE_INDEX_REFRESH: int = _int(os.getenv("IMAGE_INDEX_REFRESH"), 300)  # s: recarga de lo que subieron otros workers
+
+    # Filtro de textos (usuarios, bios, títulos, mensajes)
+    TEXT_FILTER_TERMS: Optional[str] = os.getenv("TEXT_FILTER_TERMS")  # default: app/config/banned_terms.txt
+    TEXT_FILTER_REFRESH: int = _int(os.getenv("TEXT_FILTER_REFRESH"), 30)  # s: cada cuánto se mira si cambió el archivo
+
+    # Clasificador (proceso aparte con el modelo, se lanza al primer uso o desde el master de gunicorn;
+    # sin MODERATION_MODEL ni dirección, apagado)
+    MODERATION_MODEL: Optional[str] = os.getenv("MODERATION_MODEL")  # TorchScript .pt o torchvision:<arquitectura>
+    MODERATION_WEIGHTS: Optional[str] = os.getenv("MODERATION_WEIGHTS")  # state_dict para torchvision:<arquitectura>
+    MODERATION_SERVICE_ADDRESS: Optional[str] = os.getenv("MODERATION_SERVICE_ADDRESS")  # servicio ya corriendo
+    MODERATION_LABELS = [l.strip() for l in os.getenv("MODERATION_LABELS", "safe,nsfw").split(",") if l.strip()]
+    MODERATION_FLAG_LABELS = [l.strip() for l in os.getenv("MODERATION_FLAG_LABELS", "").split(",") if l.strip()] or None
+    MODERATION_FLAG_THRESHOLD: float = float(os.getenv("MODERATION_FLAG_THRESHOLD") or 0.8)
+    MODERATION_MAX_BATCH: int = _int(os.getenv("MODERATION_MAX_BATCH"), 16)
+    MODERATION_MAX_WAIT_MS: int = _int(os.getenv("MODERATION_MAX_WAIT_MS"), 10)  # espera máxima para llenar un lote
+    MODERATION_THREADS: int = _int(os.getenv("MODERATION_THREADS"), 2)  # threads intra-op de torch
+    MODERATION_TIMEOUT: float = float(os.getenv("MODERATION_TIMEOUT") or 2.0)  # s: después, la subida sigue sin puntaje
+
+    # -----------------------
+    # Compresión de respuestas
+    # -----------------------
+    COMPRESSION_ENABLED: bool = _bool(os.getenv("COMPRESSION_ENABLED"), True)
+    COMPRESSION_MIN_SIZE: int = _int(os.getenv("COMPRESSION_MIN_SIZE"), 500)
+    COMPRESSION_GZIP_LEVEL: int = _int(os.getenv("COMPRESSION_GZIP_LEVEL"), 6)
+    COMPRESSION_BROTLI_QUALITY: int = _int(os.getenv("COMPRESSION_BROTLI_QUALITY"), 4)
+
+    # -----------------------
+    # Métricas (Prometheus)
+    # -----------------------
+    METRICS_ENABLED: bool = _bool(os.getenv("METRICS_ENABLED"), False)  # opt-in
+    METRICS_TOKEN: Optional[str] = os.getenv("METRICS_TOKEN")  # Bearer exigido por /metrics
+
+    # -----------------------
+    # Trazas (OpenTelemetry; sampler y exporters por OTEL_*, ver tracing_config.py)
+    # -----------------------
+    TRACING_ENABLED: bool = _bool(os.getenv("TRACING_ENABLED"), True)
+
+    # -----------------------
+    # Profiling (requests lentos / tracemalloc)
+    # -----------------------
+    PROFILING_ENABLED: bool = _bool(os.getenv("PROFILING_ENABLED"), False)  # opt-in
+    PROFILING_SLOW_MS: int = _int(os.getenv("PROFILING_SLOW_MS"), 1000)
+    PROFILING_SAMPLE_MS: int = _int(os.getenv("PROFILING_SAMPLE_MS"), 10)
+    PROFILING_RING_SIZE: int = _int(os.getenv("PROFILING_RING_SIZE"), 50)
+
+    # -----------------------
+    # Capa de datos (repositorios)
+    # -----------------------
+    DATA_BACKEND: str = (os.getenv("DATA_BACKEND") or "firestore").strip().lower()  # firestore | sqlite
+    SQLITE_PATH: Optional[str] = os.getenv("SQLITE_PATH")  # default: <DATA_DIR>/playtimeuy.sqlite3
+
+    # -----------------------
+    # Captura de tráfico (replay para performance)
+    # -----------------------
+    CAPTURE_ENABLED: bool = _bool(os.getenv("CAPTURE_ENABLED"), False)
+    CAPTURE_PATH: Optional[str] = os.getenv("CAPTURE_PATH")  # default: <DATA_DIR>/capture/requests.jsonl
+    CAPTURE_MAX_BYTES: int = _int(os.getenv("CAPTURE_MAX_MB"), 50) * 1024 * 1024
+    CAPTURE_BACKUP_COUNT: int = _int(os.getenv("CAPTURE_BACKUP_COUNT"), 5)
+    CAPTURE_SAMPLE_RATE: float = float(os.getenv("CAPTURE_SAMPLE_RATE") or 1.0)
+
     # -----------------------
     # Comportamiento al import (controlable)
     # -----------------------
@@ -164,12 +259,15 @@ class Settings:
     # =======================
     @classmethod
     def init_logging(cls) -> None:
-        """Configura logging básico y reduce ruido en producción."""
-        logging.basicConfig(level=cls.LOG_LEVEL, format=cls.LOG_FORMAT, datefmt=cls.LOG_DATEFMT)
-        root = logging.getLogger()
-        # Evitar handlers duplicados
-        if not any(isinstance(h, logging.StreamHandler) for h in root.handlers):
-            root.addHandler(logging.StreamHandler())
+        """Configura logging no bloqueante (cola + listener) y reduce ruido en producción."""
+        from app.utils.logging_config import configure_logging
+
+        configure_logging(
+            level=cls.LOG_LEVEL,
+            json_output=cls.LOG_JSON,
+            log_file=cls.LOG_FILE,
+            debug_sample_rate=cls.LOG_DEBUG_SAMPLE_RATE,
+        )
         # Ajuste de werkzeug
         logging.getLogger("werkzeug").setLevel(logging.WARNING if cls.ENV == "production" else logging.INFO)
 
@@ -214,6 +312,7 @@ class Settings:
             "pwa_enabled": cls.PWA_ENABLED,
             "rate_limit_enabled": cls.RATE_LIMIT_ENABLED,
             "max_upload_mb": int(cls.MAX_CONTENT_LENGTH / (1024 * 1024)),
+            "compression_enabled": cls.COMPRESSION_ENABLED,
         }
         if include_secrets:
             out.update({
@@ -0,0 +1,170 @@
+"""
+Store de medios direccionado por contenido para PlayTimeUY
+----------------------------------------------------------
+✅ Cada archivo se guarda una sola vez, con el SHA-256 como nombre:
+   blobs/ab/cd/<sha256> (dos niveles de 256 carpetas: ningún directorio crece sin límite)
+✅ Documento `blobs/<sha256>`: refs (contenidos que lo usan), tamaño, tipo, ruta, backend
+✅ Re-subir o re-publicar el mismo archivo solo suma una referencia: no copia bytes
+✅ Mismo código para disco local y Firebase Storage (usa el bucket de app/utils/uploads.py)
+✅ Recolección de basura: blobs sin referencias desde hace más de `grace` segundos
+   y staging de subidas directas abandonadas (`flask blobs-gc`); el teaser del blob
+   (`<blob>.teaser.jpg`, app/utils/teasers.py) se va con él
+
+Carrera subida ↔ GC: el GC marca `deleting` en una transacción (solo si refs == 0),
+borra el objeto y después el documento; una subida que encuentra `deleting`
+espera a que termine y crea el blob de nuevo.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.repositories.base import SERVER_NOW, BlobRepository
+from app.utils.teasers import teaser_name
+from app.utils.uploads import DEFAULT_TICKET_MAX_AGE, UploadError
+
+logger = logging.getLogger("PlayTimeUY.blobs")
+
+PREFIX = "blobs"
+STAGING_PREFIX = "staging"
+GC_GRACE = 3600
+ACQUIRE_RETRIES = 20
+
+
+class BlobStore:
+    def __init__(self, bucket: Any, prefix: str = PREFIX):
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def name_for(self, sha256: str) -> str:
+        return f"{self.prefix}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    # ---------- referencias ----------
+    def _acquire(self, repo: BlobRepository, sha256: str, meta: Dict[str, Any]) -> bool:
+        """Suma una referencia; True si el objeto hay que guardarlo (blob nuevo)."""
+        for attempt in range(ACQUIRE_RETRIES):
+            state: Dict[str, bool] = {}
+
+            def add_ref(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+                state["wait"] = bool(doc and doc.get("deleting"))
+                state["new"] = doc is None
+                if state["wait"]:
+                    return doc
+                if doc is None:
+                    return {**meta, "refs": 1, "created_at": SERVER_NOW, "updated_at": SERVER_NOW}
+                return {**doc, "refs": int(doc.get("refs") or 0) + 1, "updated_at": SERVER_NOW}
+
+            repo.transact(sha256, add_ref)
+            if not state["wait"]:
+                return state["new"]
+            time.sleep(0.05 * (attempt + 1))  # el GC está borrando este blob
+        raise UploadError("El archivo se está liberando, reintentá en unos segundos", 503)
+
+    def release(self, repo: BlobRepository, sha256: str) -> int:
+        """Resta una referencia; devuelve las que quedan (en 0 lo levanta el GC)."""
+        state = {"refs": 0}
+
+        def drop_ref(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+            if doc is None:
+                return None
+            state["refs"] = max(0, int(doc.get("refs") or 0) - 1)
+            return {**doc, "refs": state["refs"], "updated_at": SERVER_NOW}
+
+        repo.transact(sha256, drop_ref)
+        return state["refs"]
+
+    # ---------- alta ----------
+    def _meta(self, sha256: str, content_type: str, size: int) -> Dict[str, Any]:
+        return {"sha256": sha256, "size": size, "content_type": content_type,
+                "storage_path": self.name_for(sha256), "storage_backend": self.bucket.backend}
+
+    def put_file(self, repo: BlobRepository, path: str, sha256: str, content_type: str,
+                 size: int) -> Tuple[str, bool]:
+        """Archivo local ya hasheado (subida en streaming) → (nombre, deduplicado)."""
+        name = self.name_for(sha256)
+        new = self._acquire(repo, sha256, self._meta(sha256, content_type, size))
+        if new or self.bucket.stat(name) is None:
+            try:
+                self.bucket.store_file(name, path, content_type)
+            except Exception:
+                self.release(repo, sha256)
+                raise
+            return name, False
+        return name, True
+
+    def adopt(self, repo: BlobRepository, staging: str, content_type: str, size: int) -> Tuple[str, str, bool]:
+        """Objeto ya subido al bucket (subida directa) → (sha256, nombre, deduplicado)."""
+        sha256 = self.bucket.sha256(staging)
+        name = self.name_for(sha256)
+        new = self._acquire(repo, sha256, self._meta(sha256, content_type, size))
+        if new or self.bucket.stat(name) is None:
+            try:
+                self.bucket.move(staging, name)
+            except Exception:
+                self.release(repo, sha256)
+                raise
+            return sha256, name, False
+        self.bucket.delete(staging)
+        return sha256, name, True
+
+    # ---------- GC ----------
+    def collect_garbage(self, repo: BlobRepository, grace: float = GC_GRACE,
+                        staging_max_age: float = DEFAULT_TICKET_MAX_AGE, limit: Optional[int] = None,
+                        now: Optional[float] = None) -> Dict[str, int]:
+        now = now if now is not None else time.time()
+        stats = {"blobs": 0, "bytes": 0, "staging": 0}
+        for record in repo.unreferenced(limit):
+            released = record.update_time.timestamp() if record.update_time else 0.0
+            if now - released < grace:
+                continue
+            marked = {"ok": False}
+
+            def mark(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+                marked["ok"] = bool(doc) and int(doc.get("refs") or 0) == 0
+                return {**doc, "deleting": True} if marked["ok"] else doc
+
+            repo.transact(record.id, mark)
+            if not marked["ok"]:
+                continue  # alguien lo volvió a usar
+            try:
+                self.bucket.delete(self.name_for(record.id))
+            except Exception as exc:  # ya no estaba (p. ej. NotFound de GCS)
+                logger.warning("⚠️ Blob %s sin objeto al borrarlo: %s", record.id[:12], exc)
+            try:
+                self.bucket.delete(teaser_name(self.name_for(record.id)))
+            except Exception:  # la mayoría no tiene teaser
+                pass
+            repo.transact(record.id, lambda doc: None)
+            stats["blobs"] += 1
+            stats["bytes"] += int(record.get("size") or 0)
+
+        # Subidas directas que nunca se confirmaron (el ticket ya venció)
+        for name, mtime in list(self.bucket.list(STAGING_PREFIX)):
+            if now - mtime > staging_max_age:
+                self.bucket.delete(name.removesuffix(".part"))
+                stats["staging"] += 1
+        if any(stats.values()):
+            logger.info("🧹 GC de blobs: %d blobs (%d bytes), %d subidas abandonadas",
+                        stats["blobs"], stats["bytes"], stats["staging"])
+        return stats
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_blobstore(app, bucket: Any) -> BlobStore:
+    blobs = BlobStore(bucket)
+    app.extensions["blobs"] = blobs
+
+    @app.cli.command("blobs-gc")
+    def blobs_gc() -> None:
+        """Borra blobs sin referencias y subidas directas abandonadas."""
+        import click
+
+        stats = blobs.collect_garbage(app.extensions["repositories"].blobs)
+        click.echo(f"🧹 {stats['blobs']} blobs ({stats['bytes']} bytes), {stats['staging']} subidas abandonadas")
+
+    return blobs
+
+
+__all__ = ["BlobStore", "GC_GRACE", "init_blobstore"]
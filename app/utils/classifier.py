@@ -0,0 +1,478 @@
+"""
+Clasificador de moderación de imágenes (CPU) para PlayTimeUY
+------------------------------------------------------------
+✅ Un proceso dedicado carga el modelo una sola vez (TorchScript o una arquitectura
+   de torchvision + pesos) y atiende a todos los workers de gunicorn por un socket
+   local (multiprocessing.connection, autenticado con una clave derivada de SECRET_KEY)
+✅ Micro-batching: junta imágenes de varios requests hasta MODERATION_MAX_BATCH o
+   MODERATION_MAX_WAIT_MS desde la primera del lote y hace un solo forward
+✅ Threads de torch fijos (MODERATION_THREADS intra-op, 1 inter-op): el modelo no
+   compite con los workers por todos los núcleos
+✅ El worker decodifica y recorta (Pillow → 224×224 RGB) y manda los bytes crudos;
+   el proceso del modelo solo arma el tensor (channels-last) e infiere
+✅ Timeout corto: si el servicio no está, arranca o tarda, la subida sigue sin puntaje
+✅ create_app no lanza el modelo (comandos de la CLI, scripts): arranca con el primer
+   `score()` o, con gunicorn + preload_app, desde el master (`when_ready`) para que
+   todos los workers compartan un solo proceso
+✅ Puntajes por etiqueta en el contenido; etiquetas de MODERATION_FLAG_LABELS por
+   encima de MODERATION_FLAG_THRESHOLD → a la cola de revisión
+
+El servicio es un programa aparte (no un fork del master): los workers heredan solo
+el número de proceso. También se puede correr suelto y apuntar la app con
+MODERATION_SERVICE_ADDRESS:
+
+    PTUY_CLASSIFIER_AUTHKEY=<hex> python app/utils/classifier.py \\
+        --address /tmp/ptuy-classifier.sock --model modelo.pt --labels safe,nsfw
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import hashlib
+import io
+import logging
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger("PlayTimeUY.classifier")
+
+INPUT_SIZE = 224
+MEAN = (0.485, 0.456, 0.406)  # normalización de ImageNet (la de los modelos de torchvision)
+STD = (0.229, 0.224, 0.225)
+DEFAULT_LABELS = ("safe", "nsfw")
+DEFAULT_MAX_BATCH = 16
+DEFAULT_MAX_WAIT_MS = 10
+DEFAULT_THREADS = 2
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_FLAG_THRESHOLD = 0.8
+AUTHKEY_ENV = "PTUY_CLASSIFIER_AUTHKEY"
+
+Predictor = Callable[[List[bytes]], List[List[float]]]
+
+
+def derive_authkey(secret: str) -> bytes:
+    return hashlib.sha256(f"PlayTimeUY.classifier:{secret}".encode()).digest()
+
+
+def default_address() -> str:
+    """Un servicio por app creada (con preload_app: uno por master)."""
+    name = f"playtimeuy-classifier-{os.getpid()}"
+    if os.name == "nt":
+        return rf"\\.\pipe\{name}"
+    return os.path.join(tempfile.gettempdir(), f"{name}.sock")
+
+
+def _address(value: str) -> Union[str, Tuple[str, int]]:
+    """"host:puerto" → TCP; cualquier otra cosa es un socket Unix / named pipe."""
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit() and "/" not in value and "\\" not in value:
+        return host, int(port)
+    return value
+
+
+# ===================== PREPROCESADO (en el worker) =====================
+def preprocess(source: Union[str, BinaryIO], size: int = INPUT_SIZE) -> bytes:
+    """Imagen → size×size RGB uint8 (HWC): lado corto a `size` y recorte central."""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        if image.format == "JPEG":
+            image.draft("RGB", (size * 2, size * 2))
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        width, height = image.size
+        side = min(width, height)
+        box = ((width - side) // 2, (height - side) // 2, (width + side) // 2, (height + side) // 2)
+        return image.resize((size, size), Image.Resampling.BILINEAR, box=box, reducing_gap=2.0).tobytes()
+
+
+# ===================== SERVIDOR (proceso del modelo) =====================
+@dataclass
+class _Job:
+    conn: Connection
+    lock: threading.Lock
+    req_id: int
+    payload: bytes
+
+
+class Batcher:
+    """Arma lotes de hasta max_batch trabajos esperando a lo sumo max_wait desde el primero."""
+
+    def __init__(self, predict: Predictor, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.predict = predict
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.jobs: "queue.Queue[_Job]" = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.infer_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "infer_ms_per_item": round(self.infer_seconds * 1000 / self.items, 3) if self.items else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    def _collect(self) -> List[_Job]:
+        batch = [self.jobs.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.jobs.get(timeout=remaining) if remaining > 0 else self.jobs.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def run_once(self) -> None:
+        batch = self._collect()
+        t0 = time.perf_counter()
+        try:
+            results: List[Any] = self.predict([job.payload for job in batch])
+            error = None
+        except Exception as exc:  # un lote roto no tumba el servicio
+            logger.exception("❌ Falló la inferencia de un lote de %d: %s", len(batch), exc)
+            results, error = [None] * len(batch), str(exc)
+        self.infer_seconds += time.perf_counter() - t0
+        self.batches += 1
+        self.items += len(batch)
+        for job, scores in zip(batch, results):
+            try:
+                with job.lock:
+                    job.conn.send((job.req_id, scores, error))
+            except (OSError, EOFError):
+                pass  # el worker se fue (timeout o reciclado)
+
+    def run_forever(self) -> None:
+        while True:
+            self.run_once()
+
+
+def _handle(conn: Connection, batcher: Batcher) -> None:
+    lock = threading.Lock()
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == "score":
+                batcher.jobs.put(_Job(conn, lock, message[1], message[2]))
+            elif message[0] == "stats":
+                with lock:
+                    conn.send((message[1], batcher.stats(), None))
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
+
+
+def serve(address: str, authkey: bytes, batcher: Batcher) -> None:
+    """Acepta workers en threads; el lote corre en el thread principal."""
+    target = _address(address)
+    if isinstance(target, str) and os.name != "nt" and os.path.exists(target):
+        os.remove(target)  # socket de una corrida anterior
+    listener = Listener(target, authkey=authkey)
+
+    def accept_loop() -> None:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as exc:  # cliente con clave inválida, etc.
+                logger.warning("⚠️ Conexión rechazada: %s", exc)
+                continue
+            threading.Thread(target=_handle, args=(conn, batcher), daemon=True).start()
+
+    threading.Thread(target=accept_loop, name="classifier-accept", daemon=True).start()
+    logger.info("🧠 Clasificador escuchando en %s (lote ≤ %d, espera ≤ %.0f ms)",
+                address, batcher.max_batch, batcher.max_wait * 1000)
+    batcher.run_forever()
+
+
+def torch_predictor(model_spec: str, labels: Sequence[str], weights: Optional[str] = None,
+                    threads: int = DEFAULT_THREADS, size: int = INPUT_SIZE, warmup_batch: int = 1) -> Predictor:
+    """Carga el modelo una vez y devuelve `predict(payloads) → probabilidades por etiqueta`."""
+    import torch
+
+    torch.set_num_threads(max(1, threads))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:  # ya se usó el pool inter-op
+        pass
+
+    if model_spec.startswith("torchvision:"):
+        import torchvision
+
+        model = getattr(torchvision.models, model_spec.split(":", 1)[1])(num_classes=len(labels))
+        if weights:
+            model.load_state_dict(torch.load(weights, map_location="cpu"))
+    else:
+        model = torch.jit.load(model_spec, map_location="cpu")
+    model = model.eval().to(memory_format=torch.channels_last)
+    mean = torch.tensor(MEAN).view(1, 3, 1, 1)
+    std = torch.tensor(STD).view(1, 3, 1, 1)
+
+    def predict(payloads: List[bytes]) -> List[List[float]]:
+        n = len(payloads)
+        with torch.inference_mode():
+            # HWC uint8 → NCHW con strides channels-last (sin copiar antes del float)
+            pixels = torch.frombuffer(bytearray(b"".join(payloads)), dtype=torch.uint8)
+            batch = pixels.view(n, size, size, 3).permute(0, 3, 1, 2).float().div_(255)
+            batch = (batch - mean) / std
+            logits = model(batch)
+            return torch.softmax(logits, dim=1).tolist()
+
+    t0 = time.perf_counter()
+    predict([bytes(size * size * 3)] * max(1, warmup_batch))
+    logger.info("🧠 Modelo %s listo (%d threads, warm-up %.0f ms)", model_spec, threads,
+                (time.perf_counter() - t0) * 1000)
+    return predict
+
+
+# ===================== CLIENTE (en cada worker) =====================
+class ClassifierClient:
+    """Una conexión por thread del worker (gthread): sin dispatcher ni ids cruzados."""
+
+    def __init__(self, address: str, authkey: bytes, labels: Sequence[str], timeout: float = DEFAULT_TIMEOUT,
+                 flag_labels: Optional[Sequence[str]] = None, threshold: float = DEFAULT_FLAG_THRESHOLD):
+        self.address = address
+        self.authkey = authkey
+        self.labels = tuple(labels)
+        self.timeout = timeout
+        self.flag_labels = tuple(flag_labels if flag_labels is not None else self.labels[1:])
+        self.threshold = threshold
+        self.service: Optional["ClassifierService"] = None
+        self._local = threading.local()
+        self._seq = 0
+        self._seq_lock = threading.Lock()
+
+    def _next_id(self) -> int:
+        with self._seq_lock:
+            self._seq += 1
+            return self._seq
+
+    def _conn(self) -> Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(_address(self.address), authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _drop(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _call(self, kind: str, payload: Any = None) -> Any:
+        req_id = self._next_id()
+        try:
+            conn = self._conn()
+            conn.send((kind, req_id, payload) if payload is not None else (kind, req_id))
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"sin respuesta en {self.timeout:.1f} s")
+            got_id, result, error = conn.recv()
+        except Exception:
+            self._drop()  # una respuesta tardía no debe leerse como la del próximo pedido
+            raise
+        if got_id != req_id or error:
+            raise RuntimeError(error or "respuesta cruzada")
+        return result
+
+    def score(self, source: Union[str, BinaryIO]) -> Optional[Dict[str, float]]:
+        """{etiqueta: probabilidad}; None si el servicio no está disponible."""
+        try:
+            payload = preprocess(source)
+        except (OSError, ValueError) as exc:
+            logger.warning("⚠️ No se pudo preparar la imagen para el clasificador: %s", exc)
+            return None
+        if self.service is not None:
+            self.service.ensure_started()
+        try:
+            scores = self._call("score", payload)
+        except Exception as exc:
+            logger.warning("⚠️ Clasificador no disponible: %s", exc)
+            return None
+        return {label: round(float(p), 4) for label, p in zip(self.labels, scores)}
+
+    def screen(self, source: Union[str, BinaryIO]) -> Dict[str, Any]:
+        """Campos para el contenido: puntajes y, si alguno pasa el umbral, revisión."""
+        scores = self.score(source)
+        if scores is None:
+            return {}
+        fields: Dict[str, Any] = {"moderation_scores": scores}
+        flags = [{"reason": "classifier", "label": label, "score": scores[label]}
+                 for label in self.flag_labels if scores.get(label, 0.0) >= self.threshold]
+        if flags:
+            fields.update({"review": "pending", "flags": flags})
+        return fields
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self._call("stats")
+        except Exception:
+            return None
+
+    def after_fork(self) -> None:
+        self._local = threading.local()
+
+    def close(self) -> None:
+        """Cierra la conexión; el servicio solo se termina desde el proceso que lo lanzó."""
+        self._drop()
+        if self.service is not None:
+            self.service.stop()
+
+
+class ClassifierService:
+    """
+    Lanza este archivo como programa y lo termina al salir el proceso que lo lanzó.
+    Se ejecuta por ruta y no con `-m app.utils.classifier`: así no importa el
+    paquete `app` (Firebase, blueprints) en el proceso del modelo.
+    """
+
+    def __init__(self, address: str, authkey: bytes, model: str, labels: Sequence[str],
+                 weights: Optional[str] = None, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, threads: int = DEFAULT_THREADS):
+        self.address = address
+        self.authkey = authkey
+        self.argv = [
+            sys.executable, os.path.abspath(__file__),
+            "--address", address, "--model", model, "--labels", ",".join(labels),
+            "--max-batch", str(max_batch), "--max-wait-ms", str(max_wait_ms), "--threads", str(threads),
+        ] + (["--weights", weights] if weights else [])
+        self.threads = threads
+        self.process: Optional[subprocess.Popen] = None
+        self.owner_pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def ensure_started(self) -> bool:
+        """
+        Lanza el servicio la primera vez que hace falta. Solo en el proceso que lo
+        configuró: un worker que heredó el objeto usa el del master, no lanza otro
+        (pisaría su socket).
+        """
+        if os.getpid() != self.owner_pid:
+            return False
+        with self._lock:
+            if self.process is None:
+                self.start()
+        return True
+
+    def start(self) -> None:
+        env = dict(os.environ)
+        env[AUTHKEY_ENV] = self.authkey.hex()
+        for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):  # antes de importar torch
+            env[var] = str(self.threads)
+        self.process = subprocess.Popen(self.argv, env=env)
+        atexit.register(self.stop)
+        logger.info("🧠 Servicio de clasificación lanzado (pid %s) en %s", self.process.pid, self.address)
+
+    def wait_ready(self, timeout: float = 120.0) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process is not None and self.process.poll() is not None:
+                return False
+            try:
+                Client(_address(self.address), authkey=self.authkey).close()
+                return True
+            except OSError:
+                time.sleep(0.1)
+        return False
+
+    def stop(self) -> None:
+        if self.process is None or os.getpid() != self.owner_pid:
+            return  # los workers heredan el objeto: solo lo termina quien lo lanzó
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_classifier(app, model: Optional[str] = None, labels: Sequence[str] = DEFAULT_LABELS,
+                    weights: Optional[str] = None, address: Optional[str] = None,
+                    max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                    threads: int = DEFAULT_THREADS, timeout: float = DEFAULT_TIMEOUT,
+                    flag_labels: Optional[Sequence[str]] = None,
+                    threshold: float = DEFAULT_FLAG_THRESHOLD) -> Optional[ClassifierClient]:
+    """
+    MODERATION_MODEL → prepara el servicio (se lanza al primer uso o con
+    `start_service`); MODERATION_SERVICE_ADDRESS → usa uno que ya corre.
+    Sin ninguno de los dos no hay clasificador (las subidas no cambian).
+    """
+    if not model and not address:
+        return None
+    authkey = derive_authkey(app.config["SECRET_KEY"])
+    client = ClassifierClient(address or default_address(), authkey, labels, timeout, flag_labels, threshold)
+    if model and not address:
+        client.service = ClassifierService(client.address, authkey, model, labels, weights,
+                                           max_batch, max_wait_ms, threads)
+    app.extensions["classifier"] = client
+    return client
+
+
+def start_service(app) -> bool:
+    """Lanza ya el servicio del modelo de la app (gunicorn: en el master, antes del fork)."""
+    client = (getattr(app, "extensions", None) or {}).get("classifier")
+    if client is None or client.service is None:
+        return False
+    return client.service.ensure_started()
+
+
+# ===================== PROGRAMA DEL SERVICIO =====================
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Servicio de clasificación de moderación (CPU, micro-batching)")
+    p.add_argument("--address", default=default_address(), help="Socket Unix / named pipe o host:puerto")
+    p.add_argument("--model", required=True, help="Archivo TorchScript o torchvision:<arquitectura>")
+    p.add_argument("--weights", help="state_dict para una arquitectura de torchvision")
+    p.add_argument("--labels", default=",".join(DEFAULT_LABELS))
+    p.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    p.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    p.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    args = p.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    authkey_hex = os.environ.get(AUTHKEY_ENV)
+    if not authkey_hex:
+        print(f"❌ Falta {AUTHKEY_ENV} (clave compartida con la app)", file=sys.stderr)
+        return 2
+    labels = [label.strip() for label in args.labels.split(",") if label.strip()]
+    predict = torch_predictor(args.model, labels, args.weights, args.threads, warmup_batch=args.max_batch)
+    try:
+        serve(args.address, bytes.fromhex(authkey_hex), Batcher(predict, args.max_batch, args.max_wait_ms))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+__all__ = [
+    "Batcher",
+    "ClassifierClient",
+    "ClassifierService",
+    "derive_authkey",
+    "init_classifier",
+    "preprocess",
+    "serve",
+    "start_service",
+    "torch_predictor",
+]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
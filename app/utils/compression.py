@@ -0,0 +1,359 @@
+"""
+Compresión de respuestas para PlayTimeUY
+----------------------------------------
+✅ Middleware WSGI con negociación gzip / brotli (Accept-Encoding + q-values)
+✅ Compresión incremental de respuestas en streaming (sin bufferizar todo el body)
+✅ Omite media ya comprimida, respuestas chicas, HEAD, 204/304
+✅ Estadísticas por ruta: ratio de compresión y costo de CPU (también en /metrics)
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.utils import metrics
+
+try:  # brotli es opcional: si no está instalado solo se negocia gzip
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+logger = logging.getLogger("PlayTimeUY.compression")
+
+# ===================== CONSTANTES =====================
+DEFAULT_MIN_SIZE = 500
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/xhtml+xml",
+    "application/manifest+json",
+    "image/svg+xml",
+)
+
+SKIP_STATUS = {"204", "206", "304"}
+
+
+# ===================== NEGOCIACIÓN =====================
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Devuelve {encoding: q} a partir del header Accept-Encoding."""
+    accepted: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def negotiate_encoding(header: str) -> Optional[str]:
+    """Elige 'br' o 'gzip' según preferencias del cliente (None si ninguno)."""
+    accepted = _parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = []
+    if brotli is not None:
+        candidates.append(("br", accepted.get("br", wildcard)))
+    candidates.append(("gzip", accepted.get("gzip", wildcard)))
+    # A igual q se prefiere brotli (primer candidato)
+    best, best_q = None, 0.0
+    for name, q in candidates:
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    ctype = (content_type or "").split(";", 1)[0].strip().lower()
+    return bool(ctype) and ctype.startswith(COMPRESSIBLE_TYPES)
+
+
+# ===================== COMPRESORES =====================
+class _GzipStream:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Z_SYNC_FLUSH: cada chunk del app llega al cliente sin esperar al final
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.process(data) + self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+# ===================== ESTADÍSTICAS =====================
+class CompressionStats:
+    """Acumula bytes y CPU por ruta (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, float]] = {}
+
+    def record(self, route: str, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float) -> None:
+        with self._lock:
+            row = self._routes.setdefault(
+                route, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0}
+            )
+            row["responses"] += 1
+            row["bytes_in"] += bytes_in
+            row["bytes_out"] += bytes_out
+            row["cpu_seconds"] += cpu_seconds
+            row[f"enc_{encoding}"] = row.get(f"enc_{encoding}", 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Copia de las estadísticas con ratio y CPU promedio por respuesta."""
+        with self._lock:
+            out = {}
+            for route, row in self._routes.items():
+                data = dict(row)
+                data["ratio"] = round(row["bytes_out"] / row["bytes_in"], 4) if row["bytes_in"] else None
+                data["cpu_ms_avg"] = round(row["cpu_seconds"] * 1000 / row["responses"], 3) if row["responses"] else 0.0
+                out[route] = data
+            return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+
+ROUTE_ENVIRON_KEY = "playtimeuy.route"
+
+
+def _route_of(environ: Dict[str, Any]) -> str:
+    """
+    Usa la regla de Flask (p.ej. /perfil/<string:user_id>) si está disponible.
+    Flask limpia `werkzeug.request` al cerrar el contexto, antes de que el
+    middleware itere la respuesta; por eso create_app deja la regla en
+    ROUTE_ENVIRON_KEY.
+    """
+    return environ.get(ROUTE_ENVIRON_KEY) or environ.get("PATH_INFO") or "/"
+
+
+# ===================== MIDDLEWARE =====================
+class CompressionMiddleware:
+    """
+    Envuelve una app WSGI y comprime las respuestas que lo justifican.
+
+    Las respuestas sin Content-Length se inspeccionan hasta juntar `min_size`
+    bytes; a partir de ahí cada chunk se comprime y se entrega al vuelo.
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        min_size: int = DEFAULT_MIN_SIZE,
+        gzip_level: int = DEFAULT_GZIP_LEVEL,
+        brotli_quality: int = DEFAULT_BROTLI_QUALITY,
+        stats: Optional[CompressionStats] = None,
+    ):
+        self.app = app
+        self.min_size = max(0, int(min_size))
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.stats = stats or CompressionStats()
+
+    def _compressor(self, encoding: str):
+        if encoding == "br":
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable):
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            return self.app(environ, start_response)
+        encoding = negotiate_encoding(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        if not encoding:
+            return self.app(environ, start_response)
+
+        state: Dict[str, Any] = {}
+        pending: List[bytes] = []
+
+        def _start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info is not None and state.get("started"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            state.update(status=status, headers=list(headers), exc_info=exc_info)
+            # write() legado: se encola y se emite antes del iterable
+            return pending.append
+
+        app_iter = self.app(environ, _start_response)
+        iterable = _CompressingIterable(self, environ, start_response, app_iter, state, pending, encoding)
+        # Sin nada que comprimir el iterable sale intacto (un wsgi.file_wrapper conserva el sendfile)
+        return app_iter if iterable.passthrough_now() else iterable
+
+
+class _CompressingIterable:
+    def __init__(self, mw: CompressionMiddleware, environ, start_response, app_iter, state, pending, encoding):
+        self._mw = mw
+        self._environ = environ
+        self._start_response = start_response
+        self._app_iter = app_iter
+        self._state = state
+        self._pending = pending
+        self._encoding = encoding
+
+    def close(self) -> None:
+        close = getattr(self._app_iter, "close", None)
+        if close is not None:
+            close()
+
+    def _should_compress(self, headers: List[Tuple[str, str]], status: str) -> Tuple[bool, Optional[int]]:
+        lowered = {k.lower(): v for k, v in headers}
+        if status.split(" ", 1)[0] in SKIP_STATUS:
+            return False, None
+        if "content-encoding" in lowered or "content-range" in lowered:
+            return False, None
+        if "no-transform" in lowered.get("cache-control", "").lower():
+            return False, None
+        if not is_compressible(lowered.get("content-type", "")):
+            return False, None
+        length = lowered.get("content-length")
+        if length is not None:
+            try:
+                return int(length) >= self._mw.min_size, int(length)
+            except ValueError:
+                return False, None
+        return True, None
+
+    def passthrough_now(self) -> bool:
+        """True (y ya llamó a start_response) si los headers se conocen y no hay que comprimir."""
+        if "status" not in self._state or self._pending:
+            return False
+        if self._should_compress(self._state["headers"], self._state["status"])[0]:
+            return False
+        self._start_response(self._state["status"], self._state["headers"], self._state.get("exc_info"))
+        self._state["started"] = True
+        return True
+
+    def _passthrough(self, head: List[bytes], rest: Iterator[bytes]) -> Iterator[bytes]:
+        self._start_response(self._state["status"], self._state["headers"], self._state.get("exc_info"))
+        self._state["started"] = True
+        for chunk in head:
+            if chunk:
+                yield chunk
+        for chunk in rest:
+            yield chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        iterator = iter(self._app_iter)
+        head: List[bytes] = list(self._pending)
+        self._pending.clear()
+
+        if "status" not in self._state:
+            # Apps que llaman start_response recién al producir el primer chunk
+            first = next(iterator, b"")
+            head.append(first)
+
+        status, headers = self._state["status"], self._state["headers"]
+        compress, length = self._should_compress(headers, status)
+        if not compress:
+            yield from self._passthrough(head, iterator)
+            return
+
+        if length is None:
+            # Sin Content-Length: juntar hasta min_size antes de decidir
+            size = sum(len(c) for c in head)
+            exhausted = False
+            while size < self._mw.min_size:
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    exhausted = True
+                    break
+                head.append(chunk)
+                size += len(chunk)
+            if exhausted and size < self._mw.min_size:
+                yield from self._passthrough(head, iter(()))
+                return
+
+        new_headers = [
+            (k, v) for k, v in headers if k.lower() not in ("content-length", "etag")
+        ]
+        etag = next((v for k, v in headers if k.lower() == "etag"), None)
+        if etag:
+            # El cuerpo cambia: el ETag pasa a ser débil para no romper validaciones
+            new_headers.append(("ETag", etag if etag.startswith("W/") else f"W/{etag}"))
+        new_headers.append(("Content-Encoding", self._encoding))
+        vary = next((v for k, v in headers if k.lower() == "vary"), None)
+        if vary is None:
+            new_headers.append(("Vary", "Accept-Encoding"))
+        elif "accept-encoding" not in vary.lower():
+            new_headers = [(k, v) for k, v in new_headers if k.lower() != "vary"]
+            new_headers.append(("Vary", f"{vary}, Accept-Encoding"))
+
+        self._start_response(status, new_headers, self._state.get("exc_info"))
+        self._state["started"] = True
+
+        compressor = self._mw._compressor(self._encoding)
+        bytes_in = bytes_out = 0
+        cpu = 0.0
+
+        def _feed(chunk: bytes) -> bytes:
+            nonlocal bytes_in, bytes_out, cpu
+            t0 = time.thread_time()
+            out = compressor.chunk(chunk)
+            cpu += time.thread_time() - t0
+            bytes_in += len(chunk)
+            bytes_out += len(out)
+            return out
+
+        for chunk in head:
+            if chunk:
+                out = _feed(chunk)
+                if out:
+                    yield out
+        for chunk in iterator:
+            if chunk:
+                out = _feed(chunk)
+                if out:
+                    yield out
+
+        t0 = time.thread_time()
+        tail = compressor.finish()
+        cpu += time.thread_time() - t0
+        bytes_out += len(tail)
+        if tail:
+            yield tail
+
+        route = _route_of(self._environ)
+        self._mw.stats.record(route, self._encoding, bytes_in, bytes_out, cpu)
+        # En Prometheus solo reglas de Flask: un path crudo por etiqueta no tiene cota
+        metrics.record_compression(self._environ.get(ROUTE_ENVIRON_KEY) or "<unmatched>", self._encoding,
+                                   bytes_in, bytes_out, cpu)
+        logger.debug(
+            "🗜️ %s %s: %d → %d bytes (ratio %.2f, cpu %.2f ms)",
+            self._encoding, route, bytes_in, bytes_out,
+            (bytes_out / bytes_in) if bytes_in else 0.0, cpu * 1000,
+        )
+
+
+__all__ = [
+    "CompressionMiddleware",
+    "CompressionStats",
+    "negotiate_encoding",
+    "is_compressible",
+]
@@ -0,0 +1,180 @@
+"""
+GET condicional (ETag / Last-Modified) para PlayTimeUY
+------------------------------------------------------
+✅ Decorador `conditional_get` para páginas y endpoints JSON de solo lectura
+✅ ETags débiles derivados de `update_time` de Firestore (o hash del contenido)
+✅ Listados validados con un agregado (cantidad + último editado), sin leerlos enteros
+✅ Responde 304 antes de renderizar cuando `If-None-Match` / `If-Modified-Since` coinciden
+✅ El ETag incluye la sesión (uid + token CSRF) para no mezclar páginas entre usuarios
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+
+from flask import g, make_response, request, session
+
+from app.utils.csrf import peek_csrf_token
+from app.utils.metrics import record_cache
+
+logger = logging.getLogger("PlayTimeUY.conditional")
+
+
+class Validators(NamedTuple):
+    """Resultado de un validador: ETag, fecha de modificación y datos ya leídos."""
+    etag: Optional[str]
+    last_modified: Optional[datetime]
+    payload: Any = None
+
+
+# ===================== HELPERS =====================
+def _as_utc(value: Any) -> Optional[datetime]:
+    """Normaliza Timestamp/DatetimeWithNanoseconds de Firestore a datetime UTC."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        to_dt = getattr(value, "ToDatetime", None)
+        if to_dt is None:
+            return None
+        value = to_dt()
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def _session_fingerprint() -> str:
+    # El token CSRF va embebido en la página: cambia con la sesión y con su ventana de emisión
+    user = session.get("user") or {}
+    uid = user.get("uid") if isinstance(user, dict) else str(user)
+    return f"{uid or '-'}:{peek_csrf_token()}"
+
+
+def snapshot_validators(snapshots: Iterable[Any], payload: Any = None) -> Validators:
+    """
+    Construye ETag + Last-Modified a partir de DocumentSnapshots de Firestore.
+    Usa (id, update_time) de cada documento; no toca los datos.
+    """
+    snaps = list(snapshots)
+    digest = hashlib.sha1()
+    newest: Optional[datetime] = None
+    for snap in snaps:
+        if not getattr(snap, "exists", True):
+            digest.update(f"{getattr(snap, 'id', '')}:missing|".encode())
+            continue
+        raw = getattr(snap, "update_time", None)
+        updated = _as_utc(raw)
+        # El ETag usa la marca exacta: dos ediciones en el mismo segundo deben cambiarlo
+        digest.update(f"{snap.id}:{raw if raw is not None else '-'}|".encode())
+        if updated and (newest is None or updated > newest):
+            newest = updated
+    digest.update(f"n={len(snaps)}".encode())
+    return Validators(digest.hexdigest(), newest, snaps if payload is None else payload)
+
+
+def aggregate_validators(total: int, newest: Any) -> Validators:
+    """
+    ETag + Last-Modified de un listado a partir de un agregado barato: la cantidad
+    de documentos y el modificado más recientemente (query con limit(1)).
+    Cambia si se agrega, quita o edita un documento sin leer el listado entero.
+    """
+    base = snapshot_validators([newest] if newest is not None else [])
+    digest = hashlib.sha1(f"{base.etag}|total={total}".encode()).hexdigest()
+    return Validators(digest, base.last_modified, None)
+
+
+def conditional_payload(default: Any = None) -> Any:
+    """Devuelve los datos que el validador ya leyó (evita leer dos veces)."""
+    validators = g.get("conditional")
+    return validators.payload if validators is not None else default
+
+
+def _not_modified(etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    if etag and request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since and not request.if_none_match:
+        return _as_utc(request.if_modified_since) >= last_modified
+    return False
+
+
+def _apply_headers(response, etag: Optional[str], last_modified: Optional[datetime], max_age: int, private: bool):
+    if etag:
+        response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = private or None
+    response.cache_control.public = (not private) or None
+    response.cache_control.max_age = max_age
+    if not max_age:
+        response.cache_control.no_cache = True
+    if private:
+        response.vary.add("Cookie")
+    return response
+
+
+# ===================== DECORADOR =====================
+def conditional_get(
+    validator: Optional[Callable[..., Optional[Validators]]] = None,
+    max_age: int = 0,
+    private: bool = True,
+):
+    """
+    Agrega ETag / Last-Modified y responde 304 cuando el cliente ya tiene la versión.
+
+    - Con `validator(*args, **kwargs)`: se calcula el ETag antes de ejecutar la vista
+      y, si coincide, se devuelve 304 sin renderizar. Lo leído queda disponible en
+      la vista vía `conditional_payload()`. Si el validador devuelve None la vista
+      se ejecuta normalmente (p.ej. para redirigir si el documento no existe).
+    - Sin validador: se usa un hash del contenido generado (ahorra transferencia).
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return fn(*args, **kwargs)
+
+            etag = last_modified = None
+            if validator is not None:
+                try:
+                    validators = validator(*args, **kwargs)
+                except Exception as exc:
+                    logger.warning("Validador condicional falló en %s: %s", request.path, exc)
+                    validators = None
+                if validators is not None:
+                    g.conditional = validators
+                    last_modified = validators.last_modified
+                    if validators.etag:
+                        scope = _session_fingerprint() if private else "public"
+                        etag = hashlib.sha1(f"{validators.etag}|{scope}".encode()).hexdigest()
+                    hit = _not_modified(etag, last_modified)
+                    record_cache("conditional_get", hit)
+                    if hit:
+                        response = make_response("", 304)
+                        return _apply_headers(response, etag, last_modified, max_age, private)
+
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            if etag is None and not response.is_streamed:
+                scope = _session_fingerprint() if private else "public"
+                body = response.get_data()
+                etag = hashlib.sha1(body + scope.encode()).hexdigest()
+            _apply_headers(response, etag, last_modified, max_age, private)
+            return response.make_conditional(request)
+
+        return wrapper
+
+    return decorator
+
+
+__all__ = [
+    "Validators",
+    "aggregate_validators",
+    "conditional_get",
+    "conditional_payload",
+    "snapshot_validators",
+]
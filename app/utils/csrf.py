@@ -0,0 +1,209 @@
+"""
+CSRF sin estado para PlayTimeUY
+-------------------------------
+✅ Un solo mecanismo (reemplaza a flask_wtf.CSRFProtect y a los tokens `_csrf` en sesión)
+✅ Token = `<emitido>.<firma>`: HMAC-SHA256 de (id de sesión, instante de emisión)
+   con una clave derivada de SECRET_KEY
+✅ Validar no escribe la sesión y generar solo la primera vez para un visitante
+   sin id (ver abajo): renderizar una página ya no fuerza un Set-Cookie ni
+   re-serializa la cookie
+✅ En templates el token es perezoso (`LazyCsrfToken`): solo las páginas que lo
+   imprimen (formularios) crean el id del visitante
+✅ Vencen a las CSRF_TOKEN_MAX_AGE (8 h); la emisión se redondea a ventanas de
+   CSRF_TOKEN_WINDOW (10 min), así el token de una página no cambia en cada request
+   y el ETag de conditional.py sigue siendo estable
+✅ Compartido con app/asgi y con los FlaskForm de app/forms.py (mismo token en todos lados)
+
+Id de sesión al que se ata el token (el primero que exista):
+  - `session.sid` (sesiones guardadas en el servidor, app/utils/sessions.py)
+  - `session["_sid"]`, aleatorio, escrito al iniciar sesión (`start_session`)
+  - uid del usuario (sesiones de antes de `_sid`)
+  - visitante sin nada de lo anterior: al emitirle un token se le escribe un
+    `_sid` aleatorio (por navegador); "anon" nunca valida, así un token de otro
+    visitante no sirve para el login ni para ningún POST
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from functools import wraps
+from typing import Any, Callable, Mapping, Optional
+
+from flask import current_app, jsonify, request, session
+
+logger = logging.getLogger("PlayTimeUY.csrf")
+
+DEFAULT_MAX_AGE = 8 * 3600
+DEFAULT_WINDOW = 600
+CLOCK_SKEW = 60  # tokens emitidos por otro worker con el reloj apenas adelantado
+UNSAFE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+SID_KEY = "_sid"
+ANONYMOUS = "anon"
+
+
+def session_binding(sess: Any) -> str:
+    """Id estable de la sesión; solo lee (no marca la sesión como modificada)."""
+    sid = getattr(sess, "sid", None)
+    if sid and getattr(sess, "new", False) and not sess:
+        sid = None  # sesión del servidor vacía y sin guardar: ese id no llega al navegador
+    sid = sid or sess.get(SID_KEY)
+    if sid:
+        return f"s:{sid}"
+    user = sess.get("user") or {}
+    uid = user.get("uid") if isinstance(user, dict) else None
+    return f"u:{uid}" if uid else ANONYMOUS
+
+
+def ensure_session_binding(sess: Any) -> str:
+    """Como session_binding, pero a un visitante sin id le escribe un `_sid` aleatorio."""
+    binding = session_binding(sess)
+    if binding == ANONYMOUS:
+        sess[SID_KEY] = secrets.token_urlsafe(16)
+        binding = session_binding(sess)
+    return binding
+
+
+def start_session(sess: Any) -> None:
+    """Al iniciar sesión: id nuevo, los tokens de la sesión anterior dejan de valer."""
+    regenerate = getattr(sess, "regenerate", None)
+    if regenerate is not None:  # sesión del servidor: el id de la cookie cambia
+        regenerate()
+    else:
+        sess[SID_KEY] = secrets.token_urlsafe(16)
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+class CsrfTokens:
+    """Emite y verifica tokens; lee SECRET_KEY del config en cada uso (run_new lo fija después de create_app)."""
+
+    def __init__(self, config: Mapping[str, Any], max_age: int = DEFAULT_MAX_AGE, window: int = DEFAULT_WINDOW,
+                 enabled: bool = True):
+        self.config = config
+        self.max_age = max_age
+        self.window = max(1, window)
+        self.enabled = enabled
+        self._secret: Any = None
+        self._key = b""
+
+    def _signing_key(self) -> bytes:
+        secret = self.config.get("SECRET_KEY")
+        if not secret:
+            raise RuntimeError("SECRET_KEY no configurada: no se pueden firmar tokens CSRF")
+        if secret != self._secret:
+            raw = secret if isinstance(secret, bytes) else str(secret).encode()
+            # Clave propia: una firma CSRF nunca sirve como firma de cookie ni al revés
+            self._key = hmac.new(raw, b"PlayTimeUY.csrf", hashlib.sha256).digest()
+            self._secret = secret
+        return self._key
+
+    def _sign(self, binding: str, issued: int) -> str:
+        msg = f"{binding}|{issued:x}".encode()
+        return _b64(hmac.new(self._signing_key(), msg, hashlib.sha256).digest())
+
+    def issue(self, binding: str, now: Optional[float] = None) -> str:
+        issued = int(now if now is not None else time.time())
+        issued -= issued % self.window
+        return f"{issued:x}.{self._sign(binding, issued)}"
+
+    def check(self, token: Optional[str], binding: str, now: Optional[float] = None) -> bool:
+        if not token or "." not in token or binding == ANONYMOUS:
+            return False
+        issued_hex, _, sig = token.partition(".")
+        try:
+            issued = int(issued_hex, 16)
+        except ValueError:
+            return False
+        age = (now if now is not None else time.time()) - issued
+        if age > self.max_age or age < -CLOCK_SKEW:
+            return False
+        return hmac.compare_digest(sig.encode(), self._sign(binding, issued).encode())
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_csrf(app, max_age: int = DEFAULT_MAX_AGE, window: int = DEFAULT_WINDOW, enabled: bool = True) -> CsrfTokens:
+    tokens = CsrfTokens(app.config, max_age=max_age, window=window, enabled=enabled)
+    app.extensions["csrf"] = tokens
+    return tokens
+
+
+def _tokens() -> CsrfTokens:
+    tokens = current_app.extensions.get("csrf")
+    if tokens is None:  # blueprint usado en una app sin init_csrf
+        tokens = current_app.extensions["csrf"] = CsrfTokens(current_app.config)
+    return tokens
+
+
+def generate_csrf_token() -> str:
+    return _tokens().issue(ensure_session_binding(session))
+
+
+def peek_csrf_token() -> str:
+    """El token que vería la sesión, sin crearle id (huellas para ETag)."""
+    return _tokens().issue(session_binding(session))
+
+
+class LazyCsrfToken:
+    """Token para templates: se emite recién al imprimirse (`{{ csrf_token }}`)."""
+
+    __slots__ = ()
+
+    def __str__(self) -> str:
+        return generate_csrf_token()
+
+    __html__ = __str__
+
+
+def validate_csrf_token(token: Optional[str]) -> bool:
+    return _tokens().check(token, session_binding(session))
+
+
+def csrf_enabled() -> bool:
+    return _tokens().enabled
+
+
+def sent_csrf_token(form: Optional[Mapping[str, str]] = None) -> str:
+    """
+    Header X-CSRF-Token, campo `_csrf` / `csrf_token` (FlaskForm) del formulario o `Authorization: Bearer`.
+    `form`: campos ya leídos (subidas en streaming, que no pasan por request.form).
+    """
+    form = request.form if form is None else form
+    return (
+        request.headers.get("X-CSRF-Token")
+        or form.get("_csrf")
+        or form.get("csrf_token")
+        or request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    )
+
+
+def csrf_protect(fn: Callable) -> Callable:
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if request.method in UNSAFE_METHODS and csrf_enabled() and not validate_csrf_token(sent_csrf_token()):
+            logger.warning("❌ CSRF inválido: %s %s", request.remote_addr, request.path)
+            return jsonify({"ok": False, "error": "CSRF inválido"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+__all__ = [
+    "CsrfTokens",
+    "LazyCsrfToken",
+    "csrf_enabled",
+    "csrf_protect",
+    "ensure_session_binding",
+    "generate_csrf_token",
+    "init_csrf",
+    "peek_csrf_token",
+    "sent_csrf_token",
+    "session_binding",
+    "start_session",
+    "validate_csrf_token",
+]
@@ -0,0 +1,236 @@
+"""
+Hashes perceptuales de imágenes para PlayTimeUY
+-----------------------------------------------
+✅ pHash (DCT 32×32 → 8×8 de bajas frecuencias, umbral por mediana) y dHash
+   (gradiente horizontal 9×8): 64 bits cada uno
+✅ Resisten re-compresión JPEG, cambios de tamaño, brillo y marcas de agua chicas;
+   la distancia de Hamming entre dos hashes mide qué tan parecidas son las imágenes
+✅ Pillow decodifica reducido (draft) las JPEG grandes: ~ms por imagen
+✅ NumPy opcional: si está, la DCT es una multiplicación de matrices; si no, Python puro
+✅ `HammingIndex`: multi-index hashing (los 64 bits en `chunks` tramos; si dos hashes
+   están a distancia ≤ r, algún tramo está a ≤ r // chunks) sobre tablas por conteo
+   en arrays (~45 MB por millón de hashes), búsqueda sub-milisegundo con millones
+   de hashes a ≤ 8 bits (ver benchmarks/image_hash.py)
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate, combinations
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple, Union
+
+from PIL import Image, ImageOps
+
+try:  # numpy es opcional: sin él la DCT se calcula en Python puro (~1 ms más)
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+logger = logging.getLogger("PlayTimeUY.image_hash")
+
+HASH_BITS = 64
+DCT_SIZE = 32
+LOW_FREQ = 8
+DEFAULT_CHUNKS = 4
+MIN_CHUNKS, MAX_CHUNKS = 3, 8  # 3 tramos de ~21 bits: tablas de 8 MB; más anchos ya no rinden
+
+
+@dataclass(frozen=True)
+class ImageHashes:
+    phash: int
+    dhash: int
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"phash": to_hex(self.phash), "dhash": to_hex(self.dhash)}
+
+
+def to_hex(value: int) -> str:
+    return f"{value:016x}"
+
+
+def from_hex(value: str) -> int:
+    return int(value, 16)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+# ===================== HASHES =====================
+@lru_cache(maxsize=1)
+def _dct_rows() -> List[List[float]]:
+    """Coeficientes DCT-II de las LOW_FREQ primeras frecuencias para DCT_SIZE muestras."""
+    n = DCT_SIZE
+    return [[math.cos(math.pi * (2 * x + 1) * u / (2 * n)) for x in range(n)] for u in range(LOW_FREQ)]
+
+
+def _low_freq_dct(pixels: List[float]) -> List[float]:
+    """DCT 2D separable de la imagen 32×32, solo el bloque 8×8 de bajas frecuencias."""
+    n = DCT_SIZE
+    rows = _dct_rows()
+    if np is not None:
+        basis = np.asarray(rows)
+        block = basis @ np.asarray(pixels, dtype=np.float64).reshape(n, n) @ basis.T
+        return block.ravel().tolist()
+    # filas: 32 filas × 8 frecuencias; columnas: 8 × 8 sobre ese resultado
+    partial = [[sum(c * p for c, p in zip(basis, pixels[y * n:(y + 1) * n])) for basis in rows] for y in range(n)]
+    return [sum(basis[y] * partial[y][u] for y in range(n)) for v, basis in enumerate(rows) for u in range(LOW_FREQ)]
+
+
+def _bits(values: Iterable[bool]) -> int:
+    out = 0
+    for bit in values:
+        out = (out << 1) | bool(bit)
+    return out
+
+
+def _prepare(image: Image.Image) -> Image.Image:
+    if image.format == "JPEG":
+        image.draft("L", (DCT_SIZE * 2, DCT_SIZE * 2))  # decodifica a 1/2…1/8 del tamaño
+    image = ImageOps.exif_transpose(image)
+    return image.convert("L")
+
+
+def phash(image: Image.Image) -> int:
+    small = image.resize((DCT_SIZE, DCT_SIZE), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    coeffs = _low_freq_dct([float(p) for p in small.getdata()])
+    ac = sorted(coeffs[1:])  # sin el término de continua (brillo medio)
+    median = (ac[len(ac) // 2 - 1] + ac[len(ac) // 2]) / 2
+    return _bits(c > median for c in coeffs)
+
+
+def dhash(image: Image.Image) -> int:
+    small = image.resize((9, 8), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    px = list(small.getdata())
+    return _bits(px[y * 9 + x] < px[y * 9 + x + 1] for y in range(8) for x in range(8))
+
+
+def compute_hashes(source: Union[str, BinaryIO]) -> Optional[ImageHashes]:
+    """Ruta o archivo abierto → hashes; None si Pillow no puede leer la imagen."""
+    try:
+        with Image.open(source) as image:
+            gray = _prepare(image)
+            return ImageHashes(phash(gray), dhash(gray))
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        logger.warning("⚠️ No se pudo calcular el hash de la imagen: %s", exc)
+        return None
+
+
+# ===================== ÍNDICE DE HAMMING =====================
+@lru_cache(maxsize=None)
+def _masks(width: int, radius: int) -> Tuple[int, ...]:
+    """Todas las máscaras de `width` bits con a lo sumo `radius` bits prendidos."""
+    out = [0]
+    for k in range(1, radius + 1):
+        out.extend(sum(1 << b for b in bits) for bits in combinations(range(width), k))
+    return tuple(out)
+
+
+class HammingIndex:
+    """
+    Multi-index hashing sobre hashes de 64 bits. Cada tramo es una tabla por
+    conteo: `offsets[k]:offsets[k + 1]` es el rango de `order` con las posiciones
+    cuyo tramo vale k (sin bisect, O(1) por sonda). Las altas nuevas van a un dict
+    hasta el próximo `build`. Solo guarda los hashes: quién es dueño de cada uno
+    lo resuelve quien llama.
+
+    Tramos: `chunks` fijo o, por defecto, ~64 / log2(n) al cargar (tramos de tantos
+    bits como el log2 de la cantidad de hashes: cada sonda trae ~1 candidato).
+    """
+
+    def __init__(self, chunks: Optional[int] = None, bits: int = HASH_BITS):
+        self.bits = bits
+        self.fixed_chunks = chunks
+        self.hashes = array("Q")
+        self._layout(chunks or DEFAULT_CHUNKS)
+        self._offsets: List[array] = [array("I", [0] * 2) for _ in self.layout]  # vacío: el tramo 0, sin nada
+        self._order: List[array] = [array("I") for _ in self.layout]
+
+    def _layout(self, chunks: int) -> None:
+        base, extra = divmod(self.bits, chunks)
+        self.layout: List[Tuple[int, int]] = []  # (ancho, desplazamiento)
+        shift = self.bits
+        for i in range(chunks):
+            width = base + (1 if i < extra else 0)
+            shift -= width
+            self.layout.append((width, shift))
+        self._pending: List[Dict[int, List[int]]] = [{} for _ in self.layout]
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    @staticmethod
+    def chunks_for(size: int, bits: int = HASH_BITS) -> int:
+        return max(MIN_CHUNKS, min(MAX_CHUNKS, round(bits / max(1.0, math.log2(max(size, 2))))))
+
+    def build(self, hashes: Iterable[int]) -> None:
+        """Carga masiva (reemplaza el contenido)."""
+        self.hashes = array("Q", hashes)
+        n = len(self.hashes)
+        self._layout(self.fixed_chunks or self.chunks_for(n))
+        self._offsets, self._order = [], []
+        for width, shift in self.layout:
+            mask = (1 << width) - 1
+            keys = [(h >> shift) & mask for h in self.hashes]
+            counts = array("I", bytes(4 * ((1 << width) + 1)))
+            for key in keys:
+                counts[key + 1] += 1
+            offsets = array("I", accumulate(counts))
+            cursor = offsets[:-1]
+            order = array("I", bytes(4 * n))
+            for i, key in enumerate(keys):
+                order[cursor[key]] = i
+                cursor[key] += 1
+            self._offsets.append(offsets)
+            self._order.append(order)
+
+    def add(self, value: int) -> None:
+        idx = len(self.hashes)
+        self.hashes.append(value)
+        for (width, shift), pending in zip(self.layout, self._pending):
+            pending.setdefault((value >> shift) & ((1 << width) - 1), []).append(idx)
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, int]]:
+        """[(hash, distancia)] distintos a distancia ≤ radius, del más cercano al más lejano."""
+        per_chunk = radius // len(self.layout)
+        candidates: set = set()
+        for (width, shift), offsets, order, pending in zip(self.layout, self._offsets, self._order, self._pending):
+            chunk = (value >> shift) & ((1 << width) - 1)
+            top = len(offsets) - 1
+            for mask in _masks(width, per_chunk):
+                key = chunk ^ mask
+                if key < top:
+                    start, end = offsets[key], offsets[key + 1]
+                    if start != end:
+                        candidates.update(order[start:end])
+                extra = pending.get(key)
+                if extra:
+                    candidates.update(extra)
+        hashes = self.hashes
+        found: Dict[int, int] = {}
+        for idx in candidates:
+            h = hashes[idx]
+            distance = (h ^ value).bit_count()
+            if distance <= radius:
+                found[h] = distance
+        return sorted(found.items(), key=lambda item: item[1])
+
+    def memory_bytes(self) -> int:
+        tables = sum(o.itemsize * len(o) for o in self._offsets) + sum(o.itemsize * len(o) for o in self._order)
+        return self.hashes.itemsize * len(self.hashes) + tables
+
+
+__all__ = [
+    "HammingIndex",
+    "ImageHashes",
+    "compute_hashes",
+    "dhash",
+    "from_hex",
+    "hamming",
+    "phash",
+    "to_hex",
+]
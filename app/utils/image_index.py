@@ -0,0 +1,171 @@
+"""
+Detección de imágenes repetidas o ya removidas al subir (PlayTimeUY)
+--------------------------------------------------------------------
+✅ Cada imagen publicada deja su pHash / dHash en `image_hashes/<content_id>`
+✅ Índice en memoria por worker (HammingIndex de app/utils/image_hash.py):
+   solo los pHash (~45 MB por millón de imágenes); se carga la primera vez que
+   se usa y se recarga en segundo plano cada IMAGE_INDEX_REFRESH segundos
+   (lo que suben otros workers aparece como mucho con ese atraso)
+✅ Candidatos a ≤ IMAGE_MATCH_DISTANCE bits de pHash → se leen sus documentos y
+   se confirma con dHash (menos falsos positivos entre fotos parecidas)
+✅ Parecida a una imagen removida por moderación → contenido "flagged" (no se publica)
+   Parecida a una imagen de otra creadora (y a ninguna propia) → se publica, pero
+   queda para revisión
+✅ Moderación: `review = "pending"` + `flags` en el contenido; el admin aprueba
+   o remueve (remover marca el hash como `banned` y frena las re-subidas)
+
+Con Firestore y millones de imágenes cada recarga lee toda la colección:
+subir IMAGE_INDEX_REFRESH o ponerlo en 0 (carga única por worker).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Union
+
+from app.repositories.base import ImageHashRepository
+from app.utils.image_hash import HammingIndex, ImageHashes, compute_hashes, from_hex, hamming, to_hex
+
+logger = logging.getLogger("PlayTimeUY.image_index")
+
+DEFAULT_MAX_DISTANCE = 8
+DEFAULT_REFRESH = 300
+DHASH_SLACK = 6  # el dHash es más sensible al recorte: un poco más de margen que el pHash
+MAX_CANDIDATES = 20
+MAX_FLAGS = 5
+FLAGGED = "flagged"
+
+
+@dataclass
+class ImageMatch:
+    content_id: str
+    creator_uid: Optional[str]
+    banned: bool
+    distance: int
+
+    def to_flag(self) -> Dict[str, Any]:
+        return {"reason": "known_bad" if self.banned else "repost", "content_id": self.content_id,
+                "creator_uid": self.creator_uid, "distance": self.distance}
+
+
+def is_image(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith("image/")
+
+
+class ImageIndex:
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE, refresh: int = DEFAULT_REFRESH,
+                 chunks: Optional[int] = None):
+        self.max_distance = max_distance
+        self.dhash_distance = max_distance + DHASH_SLACK
+        self.refresh = refresh
+        self.chunks = chunks
+        self.index = HammingIndex(chunks)
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._added_during_reload: List[int] = []
+
+    # ---------- carga ----------
+    def _build(self, repo: ImageHashRepository) -> HammingIndex:
+        t0 = time.perf_counter()
+        fresh = HammingIndex(self.chunks)
+        fresh.build(from_hex(r.get("phash")) for r in repo.list_all() if r.get("phash"))
+        logger.info("🖼️ Índice de imágenes: %d hashes en %.0f ms", len(fresh), (time.perf_counter() - t0) * 1000)
+        return fresh
+
+    def _reload(self, repo: ImageHashRepository) -> None:
+        try:
+            fresh = self._build(repo)
+            with self._lock:
+                for value in self._added_during_reload:  # altas que la lectura pudo no ver
+                    fresh.add(value)
+                self.index, self.loaded_at = fresh, time.time()
+        except Exception as exc:
+            logger.warning("⚠️ No se pudo recargar el índice de imágenes: %s", exc)
+        finally:
+            with self._lock:
+                self._reloading = False
+                self._added_during_reload = []
+
+    def ensure_loaded(self, repo: ImageHashRepository) -> None:
+        if self.loaded_at is None:
+            with self._lock:
+                if self.loaded_at is None:
+                    self.index, self.loaded_at = self._build(repo), time.time()
+            return
+        if self.refresh and time.time() - self.loaded_at > self.refresh:
+            with self._lock:
+                if self._reloading:
+                    return
+                self._reloading = True
+            threading.Thread(target=self._reload, args=(repo,), name="image-index-reload", daemon=True).start()
+
+    # ---------- consultas ----------
+    def find(self, repo: ImageHashRepository, hashes: ImageHashes) -> List[ImageMatch]:
+        """Imágenes parecidas: primero las removidas, después por distancia."""
+        self.ensure_loaded(repo)
+        matches: List[ImageMatch] = []
+        for value, distance in self.index.search(hashes.phash, self.max_distance)[:MAX_CANDIDATES]:
+            for record in repo.find_by_phash(to_hex(value)):
+                stored = record.get("dhash")
+                if stored and hamming(from_hex(stored), hashes.dhash) > self.dhash_distance:
+                    continue
+                matches.append(ImageMatch(record.id, record.get("creator_uid"), bool(record.get("banned")), distance))
+        matches.sort(key=lambda m: (not m.banned, m.distance))
+        return matches
+
+    def screen(self, repo: ImageHashRepository, creator_uid: str, hashes: ImageHashes) -> Dict[str, Any]:
+        """Campos extra para el documento del contenido según lo que encontró."""
+        found = self.find(repo, hashes)
+        if any(not m.banned and m.creator_uid == creator_uid for m in found):
+            found = [m for m in found if m.banned]  # tiene una propia: la original es suya
+        matches = [m for m in found if m.banned or m.creator_uid != creator_uid]
+        if not matches:
+            return {}
+        fields: Dict[str, Any] = {"review": "pending", "flags": [m.to_flag() for m in matches[:MAX_FLAGS]]}
+        if matches[0].banned:
+            fields["status"] = FLAGGED
+        logger.warning("🚩 Imagen de %s parecida a %s (%s, %d bits)", creator_uid, matches[0].content_id,
+                       fields["flags"][0]["reason"], matches[0].distance)
+        return fields
+
+    # ---------- altas / moderación ----------
+    def record(self, repo: ImageHashRepository, content_id: str, creator_uid: str, hashes: ImageHashes,
+               banned: bool = False) -> None:
+        repo.create(content_id, {**hashes.to_dict(), "creator_uid": creator_uid, "banned": banned})
+        with self._lock:
+            self.index.add(hashes.phash)
+            if self._reloading:
+                self._added_during_reload.append(hashes.phash)
+
+    def ban(self, repo: ImageHashRepository, content_id: str, creator_uid: str,
+            source: Optional[Callable[[], Union[str, BinaryIO]]] = None) -> bool:
+        """Marca la imagen como removida; si no tenía hash (subida vieja) lo calcula de `source`."""
+        if repo.get(content_id).exists:
+            repo.update(content_id, {"banned": True})
+            return True
+        if source is None:
+            return False
+        handle = source()
+        try:
+            hashes = compute_hashes(handle)
+        finally:
+            if hasattr(handle, "close"):
+                handle.close()
+        if hashes is None:
+            return False
+        self.record(repo, content_id, creator_uid, hashes, banned=True)
+        return True
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_image_index(app, max_distance: int = DEFAULT_MAX_DISTANCE, refresh: int = DEFAULT_REFRESH) -> ImageIndex:
+    index = ImageIndex(max_distance, refresh)
+    app.extensions["image_index"] = index
+    return index
+
+
+__all__ = ["FLAGGED", "ImageIndex", "ImageMatch", "init_image_index", "is_image"]
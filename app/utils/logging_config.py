@@ -0,0 +1,265 @@
+"""
+Logging no bloqueante para PlayTimeUY
+-------------------------------------
+✅ QueueHandler en el thread del request → QueueListener hace el I/O (consola / archivo rotativo)
+✅ Formato JSON real (json.dumps), sin interpolación de strings
+✅ Correlación por request id (header X-Request-ID o generado)
+✅ Muestreo de logs DEBUG ruidosos
+✅ Una sola cadena de handlers para todos los loggers `PlayTimeUY.*`
+"""
+
+from __future__ import annotations
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+logger = logging.getLogger("PlayTimeUY.logging")
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s [%(request_id)s]: %(message)s"
+DEFAULT_QUEUE_SIZE = 10_000
+
+# Atributos estándar de LogRecord: todo lo demás se emite como campo extra en JSON
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+# Request id de la ruta ASGI (no hay contexto Flask); cada task tiene su copia
+ASYNC_REQUEST_ID: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+_lock = threading.Lock()
+
+
+# ===================== FORMATTERS =====================
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro; escapa comillas, saltos de línea, unicode."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "name": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                payload[key] = value
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+# ===================== FILTERS =====================
+def current_request_id() -> str:
+    """Request id del request activo (Flask o ASGI); '-' fuera de contexto."""
+    try:
+        from flask import g, has_request_context
+    except ImportError:  # pragma: no cover
+        return ASYNC_REQUEST_ID.get() or "-"
+    if has_request_context():
+        return g.get("request_id") or "-"
+    return ASYNC_REQUEST_ID.get() or "-"
+
+
+class RequestIdFilter(logging.Filter):
+    """Se ejecuta en el thread del request (antes de encolar) para capturar el id."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = current_request_id()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Deja pasar solo una fracción `rate` de los registros DEBUG."""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, float(rate)))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+# ===================== QUEUE HANDLER =====================
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Nunca bloquea el request: si la cola está llena descarta y cuenta."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolver mensaje y traceback acá (el thread del request) y dejar el
+        # formato final (texto o JSON) al listener.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# ===================== CONFIGURACIÓN =====================
+def _level(value: Union[str, int, None], default: int = logging.INFO) -> int:
+    if isinstance(value, int):
+        return value
+    if value:
+        return getattr(logging, str(value).upper(), default)
+    return default
+
+
+def configure_logging(
+    level: Union[str, int, None] = None,
+    json_output: bool = False,
+    log_file: Optional[Union[str, Path]] = None,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    debug_sample_rate: float = 1.0,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    force: bool = False,
+) -> logging.Handler:
+    """
+    Instala la cadena QueueHandler → QueueListener en el root logger.
+    Idempotente: si ya está configurado devuelve el handler existente (salvo `force`).
+    """
+    global _listener, _queue_handler
+    with _lock:
+        if _queue_handler is not None and not force:
+            return _queue_handler
+        if _listener is not None:
+            _listener.stop()
+
+        formatter: logging.Formatter = JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT)
+        targets: List[logging.Handler] = []
+
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(formatter)
+        targets.append(console)
+
+        if log_file:
+            Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                str(log_file), maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+            )
+            file_handler.setFormatter(formatter)
+            targets.append(file_handler)
+
+        q: queue.Queue = queue.Queue(maxsize=queue_size)
+        handler = NonBlockingQueueHandler(q)
+        handler.addFilter(RequestIdFilter())
+        if debug_sample_rate < 1.0:
+            handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+
+        root = logging.getLogger()
+        for h in list(root.handlers):
+            root.removeHandler(h)
+        root.addHandler(handler)
+        root.setLevel(_level(level))
+
+        # Los loggers PlayTimeUY.* no llevan handlers propios: propagan al root
+        app_logger = logging.getLogger("PlayTimeUY")
+        for name, obj in list(logging.Logger.manager.loggerDict.items()):
+            if isinstance(obj, logging.Logger) and (name == "PlayTimeUY" or name.startswith("PlayTimeUY.")):
+                for h in list(obj.handlers):
+                    obj.removeHandler(h)
+                obj.propagate = True
+        app_logger.setLevel(_level(level))
+
+        _listener = logging.handlers.QueueListener(q, *targets, respect_handler_level=True)
+        _listener.start()
+        _queue_handler = handler
+        return handler
+
+
+def restart_listener() -> None:
+    """Re-crea el thread del listener (necesario tras fork en workers de gunicorn)."""
+    global _listener
+    with _lock:
+        if _listener is None or _queue_handler is None:
+            return
+        # Cola nueva: los locks de la anterior pueden haber quedado tomados en el fork
+        _queue_handler.queue = queue.Queue(maxsize=_queue_handler.queue.maxsize)
+        _listener = logging.handlers.QueueListener(
+            _queue_handler.queue, *_listener.handlers, respect_handler_level=True
+        )
+        _listener.start()
+
+
+def queue_depth() -> Optional[int]:
+    """Registros pendientes en la cola (None si el pipeline no está configurado)."""
+    if _queue_handler is None:
+        return None
+    return _queue_handler.queue.qsize()
+
+
+def flush_logging() -> None:
+    """Vacía la cola y detiene el listener (se llama al apagar el proceso)."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            try:
+                _listener.stop()
+            except Exception:  # pragma: no cover - listener ya detenido
+                pass
+            _listener = None
+        for h in logging.getLogger().handlers:
+            h.flush()
+
+
+atexit.register(flush_logging)
+
+
+def init_request_id(app) -> None:
+    """Asigna g.request_id a cada request y lo devuelve en X-Request-ID."""
+    from flask import g, request
+
+    @app.before_request
+    def _assign_request_id():
+        incoming = (request.headers.get("X-Request-ID") or "").strip()
+        g.request_id = incoming[:64] if incoming else uuid.uuid4().hex
+
+    @app.after_request
+    def _echo_request_id(response):
+        rid = g.get("request_id")
+        if rid:
+            response.headers.setdefault("X-Request-ID", rid)
+        return response
+
+
+__all__ = [
+    "ASYNC_REQUEST_ID",
+    "JsonFormatter",
+    "RequestIdFilter",
+    "DebugSamplingFilter",
+    "NonBlockingQueueHandler",
+    "configure_logging",
+    "restart_listener",
+    "flush_logging",
+    "queue_depth",
+    "init_request_id",
+    "current_request_id",
+]
@@ -0,0 +1,169 @@
+"""
+Entrega de archivos de medios (video / audio / imágenes) para PlayTimeUY
+------------------------------------------------------------------------
+✅ Range / 206 (un rango por request; varios rangos → 200 completo, como permite el RFC)
+✅ 416 con `Content-Range: bytes */<tamaño>` si el rango no entra en el archivo
+✅ If-None-Match / If-Modified-Since → 304, If-Range para reanudar descargas
+✅ Sin copias en Python: el archivo queda posicionado en el inicio del rango y se
+   devuelve tal cual en `wsgi.file_wrapper` → gunicorn hace sendfile(2) de
+   Content-Length bytes; Waitress también respeta posición y largo
+✅ Sin file_wrapper (servidor de desarrollo, test client): lectura por bloques acotada
+✅ Helpers para que los middlewares dejen pasar el file_wrapper sin envolverlo
+   (envolverlo obliga al servidor a iterarlo en Python)
+"""
+
+from __future__ import annotations
+
+import logging
+import mimetypes
+import os
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional
+
+from flask import Response, request
+from werkzeug.http import http_date, parse_range_header
+
+logger = logging.getLogger("PlayTimeUY.media")
+
+BLOCK_SIZE = 256 * 1024
+# Fuera de /static: lo que se sube solo se entrega por /media (con control de acceso)
+MEDIA_DIRNAME = "content_uploads"
+MEDIA_TYPES = {
+    ".mp4": "video/mp4",
+    ".mov": "video/quicktime",
+    ".avi": "video/x-msvideo",
+    ".mp3": "audio/mpeg",
+    ".wav": "audio/wav",
+}
+
+
+def default_media_root() -> str:
+    base = os.getenv("PLAYTIMEUY_DATA_DIR") or os.path.join(os.getcwd(), "data")
+    return os.path.join(base, MEDIA_DIRNAME)
+
+
+# ===================== FILE WRAPPER =====================
+def is_file_wrapper(environ: Dict[str, Any], app_iter: Any) -> bool:
+    """True si el iterable es el `wsgi.file_wrapper` del servidor (candidato a sendfile)."""
+    wrapper = environ.get("wsgi.file_wrapper")
+    return isinstance(wrapper, type) and isinstance(app_iter, wrapper)
+
+
+def call_on_close(app_iter: Any, fn: Callable[[], None]) -> Any:
+    """Encadena `fn` al close() del file_wrapper sin envolverlo (el servidor lo sigue reconociendo)."""
+    original = getattr(app_iter, "close", None)
+
+    def close() -> None:
+        try:
+            if original is not None:
+                original()
+        finally:
+            fn()
+
+    app_iter.close = close
+    return app_iter
+
+
+def _read_range(fh: BinaryIO, length: int) -> Iterator[bytes]:
+    try:
+        while length > 0:
+            chunk = fh.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        fh.close()
+
+
+# ===================== RESPUESTA =====================
+def guess_media_type(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    return MEDIA_TYPES.get(ext) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def _etag_for(stat: os.stat_result) -> str:
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+def _not_modified(etag: str, modified: datetime) -> bool:
+    if_none_match = request.if_none_match
+    if if_none_match:
+        return if_none_match.contains_weak(etag.strip('"'))
+    since = request.if_modified_since
+    return since is not None and modified.replace(microsecond=0) <= since
+
+
+def _range_applies(etag: str, modified: datetime) -> bool:
+    """If-Range: el rango vale solo si el archivo no cambió desde que el cliente lo pidió."""
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag.strip('"')
+    if if_range.date:
+        return modified.replace(microsecond=0) <= if_range.date
+    return True
+
+
+def send_media(path: str, content_type: Optional[str] = None, cache_control: str = "private, max-age=3600") -> Response:
+    """
+    Respuesta para `path` (ya validado por el llamador). El archivo se abre una
+    sola vez y nunca se lee acá cuando el servidor tiene file_wrapper.
+    """
+    try:
+        fh = open(path, "rb")
+    except OSError:
+        return Response("Archivo no encontrado", 404, mimetype="text/plain")
+    try:
+        stat = os.fstat(fh.fileno())
+        size = stat.st_size
+        etag = _etag_for(stat)
+        modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+        headers = {
+            "Accept-Ranges": "bytes",
+            "ETag": etag,
+            "Last-Modified": http_date(modified),
+            "Cache-Control": cache_control,
+        }
+
+        if _not_modified(etag, modified):
+            fh.close()
+            return Response(status=304, headers=headers)
+
+        status, start, length = 200, 0, size
+        ranges = parse_range_header(request.headers.get("Range"))
+        if ranges is not None and _range_applies(etag, modified):
+            bounds = ranges.range_for_length(size)
+            if bounds is None and len(ranges.ranges) == 1:
+                fh.close()
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status=416, headers=headers)
+            if bounds is not None:
+                start, stop = bounds
+                status, length = 206, stop - start
+                headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+        headers["Content-Length"] = str(length)
+
+        if request.method == "HEAD":
+            fh.close()
+            body: Any = ()
+        else:
+            fh.seek(start)
+            file_wrapper = request.environ.get("wsgi.file_wrapper")
+            # gunicorn / Waitress mandan Content-Length bytes desde la posición actual
+            body = file_wrapper(fh, BLOCK_SIZE) if file_wrapper is not None else _read_range(fh, length)
+    except Exception:
+        fh.close()
+        raise
+
+    return Response(body, status=status, headers=headers,
+                    content_type=content_type or guess_media_type(path), direct_passthrough=True)
+
+
+__all__ = [
+    "MEDIA_TYPES",
+    "call_on_close",
+    "default_media_root",
+    "guess_media_type",
+    "is_file_wrapper",
+    "send_media",
+]
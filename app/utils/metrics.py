@@ -0,0 +1,261 @@
+"""
+Métricas Prometheus para PlayTimeUY
+-----------------------------------
+✅ Latencia por endpoint (histograma), conteo por status, requests en vuelo
+✅ Lecturas / escrituras Firestore, latencia de Mercado Pago
+✅ Hits / misses de caches y profundidad de colas de trabajo
+✅ Lecturas ahorradas por el loader de documentos por request
+✅ Compresión por ruta: bytes antes / después y CPU (app/utils/compression.py)
+✅ Modo multiproceso (PROMETHEUS_MULTIPROC_DIR) para sumar los workers de gunicorn
+✅ No-op si prometheus_client no está instalado
+✅ Opt-in (METRICS_ENABLED=1); con METRICS_TOKEN el scraper manda `Authorization: Bearer <token>`
+
+En multiproceso el directorio debe existir y vaciarse antes de arrancar gunicorn;
+el hook `child_exit` debe llamar a `mark_worker_dead(worker.pid)`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import time
+from typing import Optional
+
+from flask import Response, abort, g, request
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        REGISTRY,
+        generate_latest,
+        multiprocess,
+    )
+except ImportError:  # pragma: no cover - depende del entorno
+    Counter = None
+
+logger = logging.getLogger("PlayTimeUY.metrics")
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+ENABLED = Counter is not None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# ===================== DEFINICIONES =====================
+if ENABLED:
+    HTTP_LATENCY = Histogram(
+        "playtimeuy_http_request_duration_seconds",
+        "Latencia de requests HTTP por endpoint",
+        ["endpoint", "method"],
+        buckets=LATENCY_BUCKETS,
+    )
+    HTTP_REQUESTS = Counter(
+        "playtimeuy_http_requests_total",
+        "Requests HTTP por endpoint y status",
+        ["endpoint", "method", "status"],
+    )
+    HTTP_IN_FLIGHT = Gauge(
+        "playtimeuy_http_requests_in_flight",
+        "Requests en curso",
+        multiprocess_mode="livesum",
+    )
+    FIRESTORE_OPS = Counter(
+        "playtimeuy_firestore_documents_total",
+        "Documentos leídos / escritos en Firestore",
+        ["kind", "collection"],
+    )
+    MP_LATENCY = Histogram(
+        "playtimeuy_mercadopago_request_duration_seconds",
+        "Latencia de llamadas al SDK de Mercado Pago",
+        ["operation", "outcome"],
+        buckets=LATENCY_BUCKETS,
+    )
+    CACHE_REQUESTS = Counter(
+        "playtimeuy_cache_requests_total",
+        "Consultas a caches (hit / miss)",
+        ["cache", "result"],
+    )
+    LOADER_SAVED = Counter(
+        "playtimeuy_loader_saved_total",
+        "Lecturas y round-trips evitados por el loader de documentos por request",
+        ["kind"],
+    )
+    QUEUE_DEPTH = Gauge(
+        "playtimeuy_job_queue_depth",
+        "Elementos pendientes en colas de trabajo",
+        ["queue"],
+        multiprocess_mode="livesum",
+    )
+    COMPRESSION_RESPONSES = Counter(
+        "playtimeuy_compression_responses_total",
+        "Respuestas comprimidas por endpoint y codificación",
+        ["endpoint", "encoding"],
+    )
+    COMPRESSION_BYTES = Counter(
+        "playtimeuy_compression_bytes_total",
+        "Bytes antes (in) y después (out) de comprimir",
+        ["endpoint", "encoding", "direction"],
+    )
+    COMPRESSION_CPU = Counter(
+        "playtimeuy_compression_cpu_seconds_total",
+        "CPU gastada comprimiendo respuestas",
+        ["endpoint", "encoding"],
+    )
+
+
+# ===================== API DE REGISTRO =====================
+_WRITE_OPS = {"set", "update", "add", "delete", "batch", "commit"}
+
+
+def record_firestore(operation: str, collection: str, documents: int = 1) -> None:
+    """Cuenta documentos leídos (get/query) o escritos (set/update/add/delete)."""
+    if not ENABLED or documents <= 0:
+        return
+    kind = "write" if operation in _WRITE_OPS else "read"
+    FIRESTORE_OPS.labels(kind, collection).inc(documents)
+
+
+def observe_mercadopago(operation: str, seconds: float, ok: bool = True) -> None:
+    if ENABLED:
+        MP_LATENCY.labels(operation, "ok" if ok else "error").observe(seconds)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    if ENABLED:
+        CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_loader(reads_saved: int, round_trips_saved: int) -> None:
+    if ENABLED:
+        LOADER_SAVED.labels("reads").inc(max(reads_saved, 0))
+        LOADER_SAVED.labels("round_trips").inc(max(round_trips_saved, 0))
+
+
+def set_queue_depth(queue: str, depth: int) -> None:
+    if ENABLED:
+        QUEUE_DEPTH.labels(queue).set(depth)
+
+
+def record_compression(endpoint: str, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float) -> None:
+    if ENABLED:
+        COMPRESSION_RESPONSES.labels(endpoint, encoding).inc()
+        COMPRESSION_BYTES.labels(endpoint, encoding, "in").inc(bytes_in)
+        COMPRESSION_BYTES.labels(endpoint, encoding, "out").inc(bytes_out)
+        COMPRESSION_CPU.labels(endpoint, encoding).inc(cpu_seconds)
+
+
+def mark_worker_dead(pid: int) -> None:
+    """Hook para gunicorn `child_exit`: libera los gauges live* del worker."""
+    if ENABLED and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+def observe_http(endpoint: str, method: str, status: int, seconds: float) -> None:
+    """Registro directo (lo usa la ruta ASGI, que no pasa por los hooks de Flask)."""
+    if ENABLED:
+        HTTP_LATENCY.labels(endpoint, method).observe(seconds)
+        HTTP_REQUESTS.labels(endpoint, method, str(status)).inc()
+
+
+def track_in_flight(delta: int) -> None:
+    if ENABLED:
+        HTTP_IN_FLIGHT.inc(delta)
+
+
+# ===================== HOOKS DE REQUEST =====================
+def _endpoint_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def before_request() -> None:
+    if not ENABLED:
+        return
+    g._metrics_start = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+
+def after_request(response):
+    if not ENABLED or "_metrics_start" not in g:
+        return response
+    observe_http(_endpoint_label(), request.method, response.status_code, time.perf_counter() - g._metrics_start)
+    g._metrics_recorded = True
+    _sample_log_queue()
+    return response
+
+
+def teardown_request(exc: Optional[BaseException] = None) -> None:
+    if not ENABLED or "_metrics_start" not in g:
+        return
+    HTTP_IN_FLIGHT.dec()
+    if not g.get("_metrics_recorded"):
+        # Excepción no manejada: after_request no corrió
+        observe_http(_endpoint_label(), request.method, 500, time.perf_counter() - g._metrics_start)
+
+
+def _sample_log_queue() -> None:
+    from app.utils.logging_config import queue_depth
+
+    depth = queue_depth()
+    if depth is not None:
+        set_queue_depth("logging", depth)
+
+
+# ===================== ENDPOINT =====================
+def _generate(registry) -> bytes:
+    # Multiproceso: el archivo de un worker que recién arranca puede estar vacío un instante
+    for attempt in range(3):
+        try:
+            return generate_latest(registry)
+        except struct.error:
+            if attempt == 2:
+                raise
+            time.sleep(0.01)
+
+
+def metrics_view():
+    """Exposición en formato texto de Prometheus (agregado entre workers si aplica)."""
+    if not ENABLED:
+        abort(404)
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("Authorization", "") != f"Bearer {token}":
+        abort(403)
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(_generate(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app, talisman=None) -> None:
+    """Registra /metrics (sin redirección HTTPS para que el scraper interno pueda leerlo)."""
+    if not ENABLED:
+        logger.warning("⚠️ prometheus_client no instalado: /metrics deshabilitado")
+        return
+    if not os.getenv("METRICS_TOKEN"):
+        logger.warning("⚠️ /metrics sin METRICS_TOKEN: lo lee cualquiera que llegue al puerto")
+    view = talisman(force_https=False)(metrics_view) if talisman is not None else metrics_view
+    app.add_url_rule("/metrics", "metrics", view, methods=["GET"])
+    logger.info("📈 Métricas Prometheus en /metrics (multiproceso=%s)", bool(MULTIPROC_DIR))
+
+
+__all__ = [
+    "record_firestore",
+    "observe_mercadopago",
+    "record_cache",
+    "record_loader",
+    "observe_http",
+    "track_in_flight",
+    "set_queue_depth",
+    "record_compression",
+    "mark_worker_dead",
+    "before_request",
+    "after_request",
+    "teardown_request",
+    "init_metrics",
+]
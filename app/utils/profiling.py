@@ -0,0 +1,297 @@
+"""
+Profiling bajo demanda para PlayTimeUY
+--------------------------------------
+✅ Captura automática de stacks de requests más lentos que N ms (muestreo por thread)
+✅ Profiling por request activado por header (X-Profile: sample | cprofile) solo para admins
+✅ Ring buffer en memoria por worker con los últimos requests capturados
+✅ Snapshots / diff de tracemalloc para seguir el crecimiento de memoria del worker
+✅ Opt-in: create_app lo registra solo con PROFILING_ENABLED=1 (config o entorno)
+
+El muestreo no instrumenta el código: un thread daemon mira `sys._current_frames()`
+de los requests que superaron el umbral, por lo que el costo en el camino normal
+es registrar inicio y fin del request.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from flask import g, request, session
+
+logger = logging.getLogger("PlayTimeUY.profiling")
+
+DEFAULT_SLOW_MS = 1000
+DEFAULT_SAMPLE_MS = 10
+DEFAULT_RING_SIZE = 50
+MAX_STACK_DEPTH = 40
+
+Stack = Tuple[str, ...]
+
+
+# ===================== HELPERS =====================
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}"
+
+
+def _stack_of(frame) -> Stack:
+    labels: List[str] = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()  # de la raíz a la hoja
+    return tuple(labels)
+
+
+def is_admin_session() -> bool:
+    user = session.get("user") or {}
+    return isinstance(user, dict) and (bool(user.get("is_admin")) or user.get("role") == "admin")
+
+
+# ===================== ESTADO POR REQUEST =====================
+class _ActiveRequest:
+    __slots__ = ("thread_id", "start", "forced", "samples", "lock")
+
+    def __init__(self, thread_id: int, forced: bool):
+        self.thread_id = thread_id
+        self.start = time.perf_counter()
+        self.forced = forced
+        self.samples: Counter = Counter()
+        self.lock = threading.Lock()
+
+    def add(self, stack: Stack) -> None:
+        with self.lock:
+            self.samples[stack] += 1
+
+
+class RequestProfiler:
+    """Sampler + ring buffer. Una instancia por proceso (worker)."""
+
+    def __init__(
+        self,
+        slow_ms: int = DEFAULT_SLOW_MS,
+        sample_ms: int = DEFAULT_SAMPLE_MS,
+        ring_size: int = DEFAULT_RING_SIZE,
+    ):
+        self.slow_s = max(0, slow_ms) / 1000.0
+        self.interval = max(1, sample_ms) / 1000.0
+        self.captures: Deque[Dict[str, Any]] = deque(maxlen=ring_size)
+        self._active: Dict[int, _ActiveRequest] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._seq = 0
+        self._mem_baseline: Optional[tracemalloc.Snapshot] = None
+
+    def after_fork(self) -> None:
+        """Estado limpio en el worker (post_fork): locks y requests del master no aplican."""
+        self._lock = threading.Lock()
+        self._active.clear()
+        self._thread = None
+        self._thread_pid = None
+
+    # ---------------- Sampler ----------------
+    def _ensure_thread(self) -> None:
+        # Tras un fork (gunicorn) el thread del padre no existe en el hijo
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="ptuy-profiler", daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            if not self._active:
+                continue
+            now = time.perf_counter()
+            frames = None
+            for active in list(self._active.values()):
+                if not active.forced and now - active.start < self.slow_s:
+                    continue
+                if frames is None:
+                    frames = sys._current_frames()
+                frame = frames.get(active.thread_id)
+                if frame is not None:
+                    active.add(_stack_of(frame))
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ---------------- Ciclo del request ----------------
+    def begin(self, forced: bool = False) -> _ActiveRequest:
+        self._ensure_thread()
+        active = _ActiveRequest(threading.get_ident(), forced)
+        self._active[active.thread_id] = active
+        return active
+
+    def end(self, active: _ActiveRequest, meta: Dict[str, Any], cprofile_stats: Optional[List[Dict[str, Any]]] = None) -> None:
+        self._active.pop(active.thread_id, None)
+        duration = time.perf_counter() - active.start
+        slow = duration >= self.slow_s
+        if not (slow or active.forced or cprofile_stats):
+            return
+        with active.lock:
+            samples = dict(active.samples)
+        leaf = Counter()
+        for stack, count in samples.items():
+            if stack:
+                leaf[stack[-1]] += count
+        top_stacks = sorted(samples.items(), key=lambda kv: kv[1], reverse=True)[:5]
+        with self._lock:
+            self._seq += 1
+            capture = {
+                "id": self._seq,
+                "pid": os.getpid(),
+                "captured_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "duration_ms": round(duration * 1000, 2),
+                "mode": "cprofile" if cprofile_stats else ("sampled" if active.forced else "slow"),
+                "samples": sum(samples.values()),
+                "top_functions": leaf.most_common(10),
+                "top_stacks": [{"count": c, "stack": list(s)} for s, c in top_stacks],
+                "cprofile": cprofile_stats or [],
+                **meta,
+            }
+            self.captures.append(capture)
+        if slow:
+            logger.warning(
+                "🐢 Request lento %s %s: %.0f ms (%d muestras)",
+                meta.get("method"), meta.get("path"), duration * 1000, capture["samples"],
+            )
+
+    # ---------------- Vistas ----------------
+    def list_captures(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.captures)
+
+    def get_capture(self, capture_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((c for c in self.captures if c["id"] == capture_id), None)
+
+    def top_offenders(self, limit: int = 10) -> Dict[str, Any]:
+        """Agrega el ring buffer por endpoint y por función hoja."""
+        by_endpoint: Dict[str, Dict[str, Any]] = {}
+        functions: Counter = Counter()
+        for cap in self.list_captures():
+            row = by_endpoint.setdefault(cap.get("endpoint") or cap.get("path"), {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            row["count"] += 1
+            row["total_ms"] += cap["duration_ms"]
+            row["max_ms"] = max(row["max_ms"], cap["duration_ms"])
+            for label, count in cap["top_functions"]:
+                functions[label] += count
+        endpoints = [
+            {"endpoint": ep, "count": r["count"], "avg_ms": round(r["total_ms"] / r["count"], 2), "max_ms": r["max_ms"]}
+            for ep, r in by_endpoint.items()
+        ]
+        endpoints.sort(key=lambda r: r["max_ms"], reverse=True)
+        return {"endpoints": endpoints[:limit], "functions": functions.most_common(limit)}
+
+    # ---------------- Memoria ----------------
+    def memory_snapshot(self, frames: int = 10) -> Dict[str, Any]:
+        """Toma un snapshot base (inicia tracemalloc si hace falta)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._mem_baseline = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        return {"pid": os.getpid(), "tracing": True, "current_kb": current // 1024, "peak_kb": peak // 1024}
+
+    def memory_diff(self, limit: int = 20) -> Dict[str, Any]:
+        """Top de crecimiento de memoria desde el snapshot base."""
+        if not tracemalloc.is_tracing() or self._mem_baseline is None:
+            return {"pid": os.getpid(), "tracing": tracemalloc.is_tracing(), "error": "Sin snapshot base"}
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>"))
+        )
+        stats = snapshot.compare_to(self._mem_baseline, "lineno")[:limit]
+        return {
+            "pid": os.getpid(),
+            "tracing": True,
+            "top": [
+                {"where": str(s.traceback), "size_diff_kb": round(s.size_diff / 1024, 1), "count_diff": s.count_diff}
+                for s in stats
+            ],
+        }
+
+    def memory_stop(self) -> None:
+        self._mem_baseline = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _cprofile_top(profile: cProfile.Profile, limit: int = 25) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = []
+    for (filename, line, func), (cc, nc, tt, ct, _callers) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line} {func}",
+            "calls": nc,
+            "tottime_ms": round(tt * 1000, 3),
+            "cumtime_ms": round(ct * 1000, 3),
+        })
+    rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+    return rows[:limit]
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_profiling(app, slow_ms: int = DEFAULT_SLOW_MS, sample_ms: int = DEFAULT_SAMPLE_MS,
+                   ring_size: int = DEFAULT_RING_SIZE) -> RequestProfiler:
+    """Registra hooks de request y el blueprint admin /admin/profiling."""
+    from app.main.profiling_routes import profiling_bp
+
+    profiler = RequestProfiler(slow_ms=slow_ms, sample_ms=sample_ms, ring_size=ring_size)
+    app.extensions["profiler"] = profiler
+
+    @app.before_request
+    def _profiling_begin():
+        mode = (request.headers.get("X-Profile") or "").strip().lower()
+        if mode and not is_admin_session():
+            mode = ""
+        g._profile_active = profiler.begin(forced=(mode == "sample"))
+        if mode == "cprofile":
+            g._cprofile = cProfile.Profile()
+            g._cprofile.enable()
+
+    @app.teardown_request
+    def _profiling_end(exc=None):
+        active = g.pop("_profile_active", None)
+        if active is None:
+            return
+        cprof = g.pop("_cprofile", None)
+        cstats = None
+        if cprof is not None:
+            cprof.disable()
+            cstats = _cprofile_top(cprof)
+        rule = request.url_rule
+        profiler.end(
+            active,
+            {
+                "method": request.method,
+                "path": request.path,
+                "endpoint": rule.rule if rule is not None else None,
+                "request_id": g.get("request_id"),
+                "error": repr(exc) if exc else None,
+            },
+            cstats,
+        )
+
+    app.register_blueprint(profiling_bp)
+    logger.info("🔬 Profiling activo (umbral %d ms, muestreo %d ms)", slow_ms, sample_ms)
+    return profiler
+
+
+__all__ = ["RequestProfiler", "init_profiling", "is_admin_session"]
@@ -0,0 +1,223 @@
+"""
+Sesiones del lado del servidor para PlayTimeUY (opcional)
+---------------------------------------------------------
+✅ La cookie solo lleva un id opaco (43 caracteres): el usuario, los flashes y
+   el resto de la sesión quedan en un store local
+✅ Store SQLite (WAL) compartido por todos los workers de gunicorn; por defecto
+   en /dev/shm (memoria compartida), o en el archivo de SESSION_STORE_PATH
+✅ TTL = PERMANENT_SESSION_LIFETIME; las vencidas se borran de a tandas
+✅ Set-Cookie solo cuando la sesión es nueva, cambia de id o pasó la mitad de
+   su vida (renovación deslizante); guardar datos no re-firma ni re-envía la cookie
+✅ Id nuevo al iniciar sesión (`regenerate`, lo llama csrf.start_session)
+✅ Mismo `session_interface` para las vistas Flask y las rutas de app/asgi
+
+Se activa con SESSION_BACKEND=sqlite (por defecto "cookie": la sesión firmada de Flask).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+logger = logging.getLogger("PlayTimeUY.sessions")
+
+PURGE_INTERVAL = 300.0
+SID_BYTES = 32
+
+
+def default_store_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "playtimeuy-sessions.db")
+
+
+# ===================== STORE =====================
+class SQLiteSessionStore:
+    """Tabla (sid, data, expires); conexión por thread, como app/repositories/sqlite.py."""
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self.connection().execute(
+            "CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # una sesión perdida en un corte de luz no es grave
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, sid: str, now: float) -> Optional[Tuple[str, float]]:
+        row = self.connection().execute(
+            "SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?", (sid, now)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, sid: str, data: str, expires: float) -> None:
+        self.connection().execute(
+            "INSERT INTO sessions (sid, data, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(sid) DO UPDATE SET data = excluded.data, expires = excluded.expires",
+            (sid, data, expires),
+        )
+
+    def touch(self, sid: str, expires: float) -> None:
+        self.connection().execute("UPDATE sessions SET expires = ? WHERE sid = ?", (expires, sid))
+
+    def delete(self, sid: str) -> None:
+        self.connection().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def purge(self, now: float, force: bool = False) -> int:
+        """Borra las vencidas; como mucho una vez cada PURGE_INTERVAL por proceso."""
+        if not force and now - self._last_purge < PURGE_INTERVAL:
+            return 0
+        self._last_purge = now
+        deleted = self.connection().execute("DELETE FROM sessions WHERE expires <= ?", (now,)).rowcount
+        if deleted:
+            logger.debug("🧹 %d sesiones vencidas borradas", deleted)
+        return deleted
+
+    def count(self) -> int:
+        return self.connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def after_fork(self) -> None:
+        """En el worker (post_fork): la conexión heredada es del master."""
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+
+# ===================== SESIÓN =====================
+class ServerSession(SecureCookieSession):
+    """Dict de sesión con id propio; `new` = todavía no está en el store."""
+
+    def __init__(self, initial: Any = None, sid: Optional[str] = None, expires: float = 0.0):
+        super().__init__(initial)
+        self.new = sid is None
+        self.sid = sid or secrets.token_urlsafe(SID_BYTES)
+        self.expires = expires
+        self.replaced: Optional[str] = None
+
+    def regenerate(self) -> None:
+        """Id nuevo conservando los datos (evita fijación de sesión al loguearse)."""
+        if not self.new and self.replaced is None:
+            self.replaced = self.sid
+        self.sid = secrets.token_urlsafe(SID_BYTES)
+        self.new = True
+        self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()  # el mismo de la cookie firmada (tuplas de flashes, Markup, fechas)
+    session_class = ServerSession
+
+    def __init__(self, store: SQLiteSessionStore):
+        self.store = store
+
+    def open_session(self, app, request) -> ServerSession:
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if not sid or len(sid) > 64:
+            return self.session_class()
+        if app.static_url_path and request.path.startswith(app.static_url_path + "/"):
+            # Archivos estáticos: no leen la sesión, no vale la pena ir al store
+            return self.session_class(sid=sid)
+        try:
+            found = self.store.get(sid, time.time())
+        except sqlite3.Error:
+            logger.exception("❌ No se pudo leer la sesión")
+            found = None
+        if found is None:
+            return self.session_class()
+        data, expires = found
+        return self.session_class(self.serializer.loads(data), sid=sid, expires=expires)
+
+    def save_session(self, app, session: ServerSession, response) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        now = time.time()
+        if session.replaced:
+            self.store.delete(session.replaced)
+
+        if not session:
+            # Sesión vaciada (logout): fuera del store y sin cookie
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        self.store.purge(now)
+        # El vencimiento del store acompaña al de la cookie: solo se extiende
+        # cuando la cookie se vuelve a mandar
+        renew = session.new or session.expires - now < lifetime / 2
+        expires = now + lifetime if renew else session.expires
+        if session.modified or session.new:
+            self.store.set(session.sid, self.serializer.dumps(dict(session)), expires)
+        elif renew:
+            self.store.touch(session.sid, expires)
+        if not renew:
+            return  # la cookie sigue vigente: cambiar datos no la re-envía
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite,
+        )
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_sessions(app, backend: str = "cookie", path: Optional[str] = None) -> Optional[SQLiteSessionStore]:
+    """Con backend "sqlite" reemplaza la sesión en cookie; con "cookie" no toca nada."""
+    backend = (backend or "cookie").strip().lower()
+    if backend == "cookie":
+        return None
+    if backend != "sqlite":
+        raise ValueError(f"SESSION_BACKEND desconocido: {backend!r} (cookie | sqlite)")
+    store = SQLiteSessionStore(path or default_store_path())
+    app.session_interface = ServerSessionInterface(store)
+    app.extensions["sessions"] = store
+    logger.info("🍪 Sesiones en el servidor: %s", store.path)
+    return store
+
+
+__all__ = [
+    "SQLiteSessionStore",
+    "ServerSession",
+    "ServerSessionInterface",
+    "default_store_path",
+    "init_sessions",
+]
@@ -0,0 +1,242 @@
+"""
+Apagado ordenado de PlayTimeUY
+------------------------------
+✅ Drenado: al recibir la señal se dejan de aceptar requests nuevos (503 + Retry-After)
+   y se espera a los que están en curso hasta un deadline
+✅ Flush: captura de tráfico, spans pendientes, conexiones SQLite / Firestore
+   y, al final, la cola de logging
+✅ Un solo coordinador por app (app.extensions["shutdown"]), idempotente
+
+Quién lo dispara:
+  - gunicorn: el worker ya drena solo (graceful_timeout); el hook `worker_exit`
+    de gunicorn.conf.py llama a `shutdown()` para los flush
+  - Waitress / servidor de desarrollo (run_new.py): `install_signal_handlers`
+  - ASGI (uvicorn): el shutdown del lifespan
+"""
+
+from __future__ import annotations
+
+import _thread
+import logging
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from werkzeug.wsgi import ClosingIterator
+
+from app.utils.media import call_on_close, is_file_wrapper
+
+logger = logging.getLogger("PlayTimeUY.shutdown")
+
+# Render manda SIGKILL 30 s después de SIGTERM: el drenado tiene que terminar antes
+DEFAULT_DRAIN_TIMEOUT = 25.0
+RETRY_AFTER_SECONDS = 1
+
+
+class ShutdownCoordinator:
+    """Cuenta requests en curso y ejecuta los pasos de flush una sola vez."""
+
+    def __init__(self, drain_timeout: float = DEFAULT_DRAIN_TIMEOUT):
+        self.drain_timeout = drain_timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self.draining = False
+        self.report: Optional[Dict[str, Any]] = None
+        self._cond = threading.Condition()
+        self._steps: List[Tuple[str, Callable[[], Any]]] = []
+
+    # ---------------- Pasos de flush ----------------
+    def add_step(self, name: str, fn: Callable[[], Any]) -> None:
+        """Se ejecutan en orden de registro; la cola de logging siempre va última."""
+        self._steps.append((name, fn))
+
+    # ---------------- Requests ----------------
+    def enter(self) -> bool:
+        with self._cond:
+            if self.draining:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if self.in_flight <= 0:
+                self._cond.notify_all()
+
+    def begin_drain(self, reason: str = "shutdown") -> None:
+        with self._cond:
+            if self.draining:
+                return
+            self.draining = True
+            pending = self.in_flight
+        logger.info("🛑 Apagado (%s): no se aceptan requests nuevos, %d en curso", reason, pending)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        deadline = time.monotonic() + (self.drain_timeout if timeout is None else timeout)
+        with self._cond:
+            while self.in_flight > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    # ---------------- Apagado ----------------
+    def shutdown(self, timeout: Optional[float] = None, reason: str = "shutdown") -> Dict[str, Any]:
+        """Drena, ejecuta los pasos de flush y devuelve un resumen. Llamadas repetidas no hacen nada."""
+        with self._cond:
+            if self.report is not None:
+                return self.report
+            self.report = {}
+
+        t0 = time.perf_counter()
+        self.begin_drain(reason)
+        drained = self.wait_idle(timeout)
+        if not drained:
+            logger.warning("⚠️ Deadline de drenado vencido con %d requests en curso", self.in_flight)
+
+        steps: Dict[str, str] = {}
+        for name, fn in self._steps:
+            try:
+                fn()
+                steps[name] = "ok"
+            except Exception as exc:
+                steps[name] = f"error: {exc}"
+                logger.exception("❌ Falló el paso de apagado %s", name)
+
+        self.report.update({
+            "drained": drained,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "steps": steps,
+            "seconds": round(time.perf_counter() - t0, 3),
+        })
+        logger.info("✅ Apagado ordenado en %.2f s: %s", self.report["seconds"], self.report)
+
+        from app.utils.logging_config import flush_logging
+
+        flush_logging()
+        return self.report
+
+    def install_signal_handlers(self, stop: Optional[Callable[[], None]] = None,
+                                signals: Tuple[int, ...] = (signal.SIGTERM, signal.SIGINT)) -> None:
+        """
+        Para servidores sin drenado propio (Waitress, dev server). La primera señal
+        empieza a drenar y, cuando no quedan requests (o vence el deadline), llama
+        a `stop` (por defecto un KeyboardInterrupt en el thread principal, que corta
+        el loop del servidor). Una segunda señal corta sin esperar.
+        """
+        interrupt = stop is None
+        stop = stop or _thread.interrupt_main
+        stopping = threading.Event()
+
+        def _handler(signum, frame):
+            if self.draining:
+                if not stopping.is_set():
+                    logger.warning("⏹️ Segunda señal (%s): apagado inmediato", signum)
+                if interrupt:  # también llega acá el interrupt_main del thread de drenado
+                    raise KeyboardInterrupt
+                stop()
+                return
+            self.begin_drain(f"señal {signum}")
+
+            def _drain_then_stop():
+                self.wait_idle()
+                stopping.set()
+                stop()
+
+            threading.Thread(target=_drain_then_stop, name="ptuy-drain", daemon=True).start()
+
+        for sig in signals:
+            signal.signal(sig, _handler)
+
+
+# ===================== MIDDLEWARE =====================
+class DrainMiddleware:
+    """Cuenta requests en curso (hasta cerrar el iterable) y rechaza los nuevos al drenar."""
+
+    def __init__(self, app: Callable, coordinator: ShutdownCoordinator):
+        self.app = app
+        self.coordinator = coordinator
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable):
+        if not self.coordinator.enter():
+            start_response("503 Service Unavailable", [
+                ("Content-Type", "text/plain; charset=utf-8"),
+                ("Retry-After", str(RETRY_AFTER_SECONDS)),
+            ])
+            return [b"Servidor reiniciando, reintentar"]
+        try:
+            app_iter = self.app(environ, start_response)
+        except BaseException:
+            self.coordinator.leave()
+            raise
+        if is_file_wrapper(environ, app_iter):  # envuelto perdería el sendfile del servidor
+            return call_on_close(app_iter, self.coordinator.leave)
+        return ClosingIterator(app_iter, self.coordinator.leave)
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def _close_tracing() -> None:
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, "shutdown"):  # SDK: vacía los BatchSpanProcessor
+        provider.shutdown()
+
+
+def init_shutdown(app, drain_timeout: float = DEFAULT_DRAIN_TIMEOUT) -> ShutdownCoordinator:
+    """Envuelve app.wsgi_app y registra los pasos de flush de lo que la app tenga activo."""
+    from app.utils.workers import close_firestore_clients
+
+    coordinator = ShutdownCoordinator(drain_timeout)
+    ext = app.extensions
+
+    capture = ext.get("traffic_capture")
+    if capture is not None:
+        coordinator.add_step("captura", capture.writer.close)
+    profiler = ext.get("profiler")
+    if profiler is not None:
+        coordinator.add_step("profiler", profiler.stop)
+    coordinator.add_step("tracing", _close_tracing)
+    repos = ext.get("repositories")
+    if repos is not None:
+        coordinator.add_step("repositorios", repos.close)
+    sessions = ext.get("sessions")
+    if sessions is not None:
+        coordinator.add_step("sesiones", sessions.close)
+    teasers = ext.get("teasers")
+    if teasers is not None:
+        coordinator.add_step("teasers", teasers.shutdown)
+    waveforms = ext.get("waveforms")
+    if waveforms is not None:
+        coordinator.add_step("formas de onda", waveforms.shutdown)
+    classifier = ext.get("classifier")
+    if classifier is not None:
+        coordinator.add_step("clasificador", classifier.close)
+    coordinator.add_step("firestore", close_firestore_clients)
+
+    app.wsgi_app = DrainMiddleware(app.wsgi_app, coordinator)
+    ext["shutdown"] = coordinator
+    return coordinator
+
+
+def shutdown_app(flask_app: Any, timeout: Optional[float] = None, reason: str = "shutdown") -> Optional[Dict[str, Any]]:
+    """Apagado ordenado de una app creada con create_app (no-op si no tiene coordinador)."""
+    extensions = getattr(flask_app, "extensions", None) or {}
+    coordinator = extensions.get("shutdown")
+    return coordinator.shutdown(timeout, reason) if coordinator is not None else None
+
+
+__all__ = [
+    "DEFAULT_DRAIN_TIMEOUT",
+    "DrainMiddleware",
+    "ShutdownCoordinator",
+    "init_shutdown",
+    "shutdown_app",
+]
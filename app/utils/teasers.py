@@ -0,0 +1,284 @@
+"""
+Teasers borrosos para imágenes de suscriptores (PlayTimeUY)
+-----------------------------------------------------------
+✅ Vista previa que no filtra el original: la imagen se reduce a TEASER_DETAIL px
+   de ancho (ahí ya no queda detalle), se vuelve a agrandar a TEASER_WIDTH y se
+   desenfoca; JPEG chico, sin EXIF
+✅ Pillow corre en un ProcessPoolExecutor (forkserver con este módulo precargado:
+   cada proceso nace de un servidor limpio, sin threads ni conexiones de gunicorn);
+   el worker web no bloquea el request ni compite por el GIL
+✅ Al subir: se encola y el documento queda con `teaser: true` cuando termina
+✅ Caché junto al original: `<storage_path>.teaser.jpg` en el mismo bucket; con el
+   store por sha256 el teaser también se comparte entre contenidos iguales y el GC
+   de blobs lo borra con el blob
+✅ `flask teasers-backfill`: recorre los contenidos existentes con todos los
+   núcleos, reporta imágenes / s, MB / s de originales y el tiempo estimado
+✅ GET /media/<id>/teaser (app/main/media_routes.py): público y cacheable
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from PIL import Image, ImageFilter, ImageOps
+
+logger = logging.getLogger("PlayTimeUY.teasers")
+
+TEASER_SUFFIX = ".teaser.jpg"
+TEASER_CONTENT_TYPE = "image/jpeg"
+DEFAULT_WIDTH = 320
+DEFAULT_DETAIL = 24  # px de ancho del paso intermedio: lo que se ve del original
+DEFAULT_BLUR = 6
+DEFAULT_QUALITY = 60
+DEFAULT_WORKERS = 1
+MAX_ASPECT = 2.0  # panorámicas / tiras muy altas: se recortan al centro
+MAX_TASKS_PER_CHILD = 500  # recicla procesos (memoria de Pillow con imágenes enormes)
+IN_FLIGHT_PER_WORKER = 4
+
+
+def teaser_name(storage_path: str) -> str:
+    return storage_path + TEASER_SUFFIX
+
+
+def wants_teaser(content: Dict[str, Any]) -> bool:
+    """Imágenes que no son públicas: las públicas se muestran enteras."""
+    return (content.get("content_type") or "").startswith("image/") and content.get("visibility") != "public" \
+        and content.get("status") != "deleted" and bool(content.get("storage_path"))
+
+
+# ===================== RENDER (en los procesos del pool) =====================
+def render_teaser(source: Union[str, bytes], width: int = DEFAULT_WIDTH, detail: int = DEFAULT_DETAIL,
+                  blur: float = DEFAULT_BLUR, quality: int = DEFAULT_QUALITY) -> bytes:
+    """Ruta o bytes del original → JPEG del teaser."""
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as image:
+        if image.format == "JPEG":
+            image.draft("RGB", (detail * 4, detail * 4))  # decodifica a 1/8 si alcanza
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        w, h = image.size
+        if max(w / h, h / w) > MAX_ASPECT:
+            image = ImageOps.fit(image, (int(min(w, h * MAX_ASPECT)), int(min(h, w * MAX_ASPECT))))
+            w, h = image.size
+        tiny = image.resize((detail, max(1, round(detail * h / w))), Image.Resampling.BOX, reducing_gap=3.0)
+    out = tiny.resize((width, max(1, round(width * h / w))), Image.Resampling.BICUBIC)
+    out = out.filter(ImageFilter.GaussianBlur(blur))
+    buf = io.BytesIO()
+    out.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def _context() -> Any:
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+# ===================== GENERADOR =====================
+class TeaserGenerator:
+    def __init__(self, bucket: Any, scratch_dir: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+                 width: int = DEFAULT_WIDTH, detail: int = DEFAULT_DETAIL, blur: float = DEFAULT_BLUR,
+                 quality: int = DEFAULT_QUALITY):
+        self.bucket = bucket
+        self.scratch_dir = scratch_dir
+        self.workers = max(1, workers)
+        self.options = {"width": width, "detail": detail, "blur": blur, "quality": quality}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    # ---------- pool ----------
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=_context(),
+                                                     max_tasks_per_child=MAX_TASKS_PER_CHILD)
+                self._pid = os.getpid()
+            return self._executor
+
+    def after_fork(self) -> None:
+        """El pool heredado es del padre: el worker arma el suyo al primer uso."""
+        self._executor, self._pid = None, None
+        self._lock = threading.Lock()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    # ---------- almacenamiento ----------
+    def exists(self, storage_path: str) -> bool:
+        return self.bucket.stat(teaser_name(storage_path)) is not None
+
+    def _source(self, storage_path: str) -> Union[str, bytes]:
+        """Bucket local: la ruta (el proceso lee el disco); remoto: los bytes."""
+        if hasattr(self.bucket, "path_for"):
+            return self.bucket.path_for(storage_path)
+        with self.bucket.open(storage_path) as fh:
+            return fh.read()
+
+    def _store(self, storage_path: str, data: bytes) -> None:
+        if self.scratch_dir:
+            os.makedirs(self.scratch_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(suffix=TEASER_SUFFIX, dir=self.scratch_dir)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            self.bucket.store_file(teaser_name(storage_path), tmp, TEASER_CONTENT_TYPE)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def submit(self, storage_path: str) -> Tuple[Future, int]:
+        """Encola el render; devuelve (future con el JPEG, bytes del original leídos)."""
+        source = self._source(storage_path)
+        size = os.path.getsize(source) if isinstance(source, str) else len(source)
+        return self.executor().submit(render_teaser, source, **self.options), size
+
+    # ---------- al subir ----------
+    def schedule(self, repo: Any, content_id: str, storage_path: str) -> Optional[Future]:
+        """Genera (o reusa) el teaser en segundo plano y marca el contenido al terminar."""
+        if self.exists(storage_path):  # mismo blob ya subido por otro contenido
+            repo.update(content_id, {"teaser": True})
+            return None
+        future, _size = self.submit(storage_path)
+
+        def done(fut: Future) -> None:
+            try:
+                self._store(storage_path, fut.result())
+                repo.update(content_id, {"teaser": True})
+            except Exception as exc:
+                logger.warning("⚠️ Sin teaser para %s: %s", content_id, exc)
+
+        future.add_done_callback(done)
+        return future
+
+    # ---------- backfill ----------
+    def backfill(self, repo: Any, limit: Optional[int] = None, force: bool = False,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None, every: float = 5.0) -> Dict[str, Any]:
+        """
+        Teasers de los contenidos existentes que no tienen. Con `progress` llama cada
+        `every` segundos (y al final) con los contadores, la velocidad y lo que falta.
+        """
+        pending = [r for r in repo.list_all() if wants_teaser(r.to_dict() or {}) and (force or not r.get("teaser"))]
+        if limit is not None:
+            pending = pending[:limit]
+        stats: Dict[str, Any] = {"pending": len(pending), "rendered": 0, "cached": 0, "failed": 0,
+                                 "bytes_in": 0, "bytes_out": 0, "workers": self.workers}
+        in_flight: Deque[Tuple[List[str], str, Future, int]] = deque()
+        started = last_report = time.perf_counter()
+        done_paths: Dict[str, bool] = {}  # blobs compartidos: un render por storage_path
+        queued: Dict[str, List[str]] = {}  # storage_path en el pool → contenidos que lo esperan
+
+        def report(final: bool = False) -> None:
+            elapsed = time.perf_counter() - started
+            finished = stats["rendered"] + stats["cached"] + stats["failed"]
+            stats.update({
+                "seconds": round(elapsed, 2),
+                "per_second": round(stats["rendered"] / elapsed, 2) if elapsed else 0.0,
+                "mb_per_second": round(stats["bytes_in"] / 2 ** 20 / elapsed, 2) if elapsed else 0.0,
+                "eta_seconds": round((stats["pending"] - finished) * elapsed / finished, 1) if finished and not final else 0.0,
+            })
+            if progress is not None:
+                progress(stats)
+
+        def collect(block: bool) -> None:
+            nonlocal last_report
+            while in_flight and (block or in_flight[0][2].done()):
+                content_ids, storage_path, future, size = in_flight.popleft()
+                queued.pop(storage_path, None)
+                try:
+                    data = future.result()
+                    self._store(storage_path, data)
+                    for content_id in content_ids:
+                        repo.update(content_id, {"teaser": True})
+                    stats["rendered"] += 1
+                    stats["cached"] += len(content_ids) - 1
+                    stats["bytes_in"] += size
+                    stats["bytes_out"] += len(data)
+                    done_paths[storage_path] = True
+                except Exception as exc:
+                    stats["failed"] += len(content_ids)
+                    logger.warning("⚠️ Sin teaser para %s: %s", ", ".join(content_ids), exc)
+                block = False
+            if progress is not None and time.perf_counter() - last_report >= every:
+                last_report = time.perf_counter()
+                report()
+
+        for record in pending:
+            path = record.get("storage_path")
+            if path in queued:  # el mismo blob ya está en el pool: se marca cuando termine
+                queued[path].append(record.id)
+                continue
+            if done_paths.get(path) or not force and self.exists(path):
+                repo.update(record.id, {"teaser": True})
+                stats["cached"] += 1
+                continue
+            if len(in_flight) >= self.workers * IN_FLIGHT_PER_WORKER:
+                collect(block=True)
+            try:
+                future, size = self.submit(path)
+            except Exception as exc:
+                stats["failed"] += 1
+                logger.warning("⚠️ No se pudo leer %s para el teaser: %s", record.id, exc)
+                continue
+            queued[path] = [record.id]
+            in_flight.append((queued[path], path, future, size))
+            collect(block=False)
+        while in_flight:
+            collect(block=True)
+        report(final=True)
+        logger.info("🖼️ Backfill de teasers: %d generados, %d ya estaban, %d fallaron (%.1f img/s, %d procesos)",
+                    stats["rendered"], stats["cached"], stats["failed"], stats["per_second"], self.workers)
+        return stats
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_teasers(app, bucket: Any, scratch_dir: Optional[str] = None, workers: int = DEFAULT_WORKERS,
+                 width: int = DEFAULT_WIDTH, blur: float = DEFAULT_BLUR) -> TeaserGenerator:
+    teasers = TeaserGenerator(bucket, scratch_dir, workers, width=width, blur=blur)
+    app.extensions["teasers"] = teasers
+
+    import click
+
+    @app.cli.command("teasers-backfill")
+    @click.option("--workers", type=int, default=None, help="Procesos (default: todos los núcleos)")
+    @click.option("--limit", type=int, default=None, help="Como mucho N contenidos (para medir)")
+    @click.option("--force", is_flag=True, help="Regenera aunque ya exista")
+    def teasers_backfill(workers: Optional[int], limit: Optional[int], force: bool) -> None:
+        """Genera los teasers que faltan y reporta la velocidad."""
+        runner = TeaserGenerator(bucket, scratch_dir, workers or os.cpu_count() or 1, width=width, blur=blur)
+
+        def progress(stats: Dict[str, Any]) -> None:
+            done = stats["rendered"] + stats["cached"] + stats["failed"]
+            click.echo(f"🖼️ {done}/{stats['pending']} · {stats['per_second']} img/s · "
+                       f"{stats['mb_per_second']} MB/s · faltan ~{stats['eta_seconds']:.0f} s")
+
+        try:
+            stats = runner.backfill(app.extensions["repositories"].contents, limit, force, progress)
+        finally:
+            runner.shutdown()
+        click.echo(f"✅ {stats['rendered']} generados, {stats['cached']} ya estaban, {stats['failed']} fallaron "
+                   f"en {stats['seconds']} s con {stats['workers']} procesos")
+
+    return teasers
+
+
+__all__ = [
+    "TEASER_SUFFIX",
+    "TeaserGenerator",
+    "init_teasers",
+    "render_teaser",
+    "teaser_name",
+    "wants_teaser",
+]
@@ -0,0 +1,405 @@
+"""
+Filtro de términos prohibidos para textos de usuarios (PlayTimeUY)
+-----------------------------------------------------------------
+✅ Miles de términos compilados en un autómata de Aho–Corasick (tabla de
+   transiciones completa en un array): una consulta por carácter, tiempo lineal
+   en el largo del texto sin importar cuántos términos haya
+✅ Normalización pensada para español, igual para términos y textos:
+   - minúsculas y sin tildes (á → a, ñ → n, ü → u)
+   - leet y sustituciones comunes: 0→o 1→i 3→e 4→a 5→s 7→t @→a $→s, k→c v→b z→s
+     y cirílicas con forma de latina (а, е, о, р, с…)
+   - letras repetidas colapsadas ("puuuta" → "puta") y separadores a un espacio;
+     la letra doble de un término se exige igual ("forro" no frena "foro" ni "Fora")
+   - letras sueltas deletreadas unidas ("p.u.t.a", "p u t a" → "puta")
+✅ Palabra completa por defecto (sin falsos positivos tipo "computadora");
+   `*` al principio o al final del término permite que siga o empiece la palabra
+✅ Categorías por secciones del archivo: `[reservado]` solo aplica a nombres de
+   usuario; el resto (insultos, etc.) a todo texto
+✅ Recarga en caliente: cada TEXT_FILTER_REFRESH segundos se mira la fecha del
+   archivo; si cambió se compila en segundo plano y se reemplaza sin cortar consultas
+✅ `censor()` tapa los términos en el texto original (para mensajes)
+
+Archivo (TEXT_FILTER_TERMS, por defecto app/config/banned_terms.txt):
+
+    # comentario
+    [reservado]
+    admin*
+    [insulto]
+    boludo
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("PlayTimeUY.text_filter")
+
+DEFAULT_TERMS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "banned_terms.txt")
+DEFAULT_REFRESH = 30
+DEFAULT_CATEGORY = "general"
+RESERVED = "reservado"
+WILDCARD = "*"
+
+SEPARATOR = " "
+OTHER = "\x01"  # letra fuera de a-z0-9 (cirílico, etc.): no corta la palabra, no es parte de ningún término
+_SUBSTITUTIONS = {
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s", "€": "e",
+    "k": "c", "v": "b", "z": "s",
+    # cirílicas que se ven iguales a las latinas
+    "а": "a", "е": "e", "о": "o", "р": "p", "с": "c", "у": "y", "х": "x", "і": "i",
+}
+_ALPHABET = SEPARATOR + "abcdefghijklmnopqrstuvwxyz0123456789" + OTHER
+_COLUMNS = {ord(ch): chr(i) for i, ch in enumerate(_ALPHABET)}
+WIDTH = len(_ALPHABET)
+
+
+# ===================== NORMALIZACIÓN =====================
+@lru_cache(maxsize=8192)
+def _fold(ch: str) -> str:
+    out = []
+    for c in unicodedata.normalize("NFKD", ch.casefold()):
+        if unicodedata.combining(c):
+            continue
+        c = _SUBSTITUTIONS.get(c, c)
+        if c.isascii() and c.isalnum():
+            out.append(c)
+        else:
+            out.append(OTHER if c.isalnum() else SEPARATOR)
+    return "".join(out)
+
+
+class _FoldTable(dict):
+    """Tabla para str.translate que se completa sola con `_fold` (un solo recorrido en C)."""
+
+    def __missing__(self, code: int) -> str:
+        value = self[code] = _fold(chr(code))
+        return value
+
+
+_FOLD_TABLE = _FoldTable()
+_REPEATS = re.compile(r"(.)\1+", re.DOTALL)
+_SPELLED = re.compile(r"(?<= )(?:[^ ] ){2,}[^ ](?= )")
+
+
+def normalized(text: str) -> str:
+    """Lo mismo que `normalize(text)[0]` sin las posiciones: el camino rápido de `find`."""
+    folded = _REPEATS.sub(r"\1", text.translate(_FOLD_TABLE))
+    if not folded.startswith(SEPARATOR):
+        folded = SEPARATOR + folded
+    if not folded.endswith(SEPARATOR):
+        folded += SEPARATOR
+    return _SPELLED.sub(lambda m: m.group(0).replace(SEPARATOR, ""), folded)
+
+
+def _join_spelled(chars: List[str], origin: List[int], runs: List[int]) -> Tuple[List[str], List[int], List[int]]:
+    """Saca los separadores entre 3 o más letras sueltas seguidas: "p u t a" → "puta"."""
+    n = len(chars)
+    drop = set()
+    i = 0
+    while i < n:
+        # chars[i] es una letra suelta si tiene separador (o borde) a ambos lados
+        run = []
+        j = i
+        while j < n and chars[j] != SEPARATOR and (j == 0 or chars[j - 1] == SEPARATOR) \
+                and (j + 1 == n or chars[j + 1] == SEPARATOR):
+            run.append(j)
+            j += 2
+        if len(run) >= 3:
+            drop.update(k + 1 for k in run[:-1])
+            i = run[-1] + 1
+        else:
+            i += 1
+    if not drop:
+        return chars, origin, runs
+    keep = [k for k in range(n) if k not in drop]
+    return [chars[k] for k in keep], [origin[k] for k in keep], [runs[k] for k in keep]
+
+
+def _normalize(text: str) -> Tuple[str, List[int], List[int]]:
+    """`normalize` más cuántas veces venía cada letra colapsada (1, o 2 si estaba repetida)."""
+    chars: List[str] = [SEPARATOR]
+    origin: List[int] = [0]
+    runs: List[int] = [1]
+    prev = SEPARATOR
+    for i, ch in enumerate(text):
+        for c in _fold(ch):
+            if c == prev:
+                if c != SEPARATOR:
+                    runs[-1] = 2
+                continue  # letras repetidas y corridas de separadores
+            chars.append(c)
+            origin.append(i)
+            runs.append(1)
+            prev = c
+    if prev != SEPARATOR:
+        chars.append(SEPARATOR)
+        origin.append(len(text))
+        runs.append(1)
+    chars, origin, runs = _join_spelled(chars, origin, runs)
+    return "".join(chars), origin, runs
+
+
+def normalize(text: str) -> Tuple[str, List[int]]:
+    """
+    Texto → (normalizado con un espacio a cada lado, posición original de cada carácter).
+    Los bordes permiten que " término " exija palabra completa también al principio y al final.
+    """
+    folded, origin, _runs = _normalize(text)
+    return folded, origin
+
+
+def _pattern(term: str) -> Optional[Tuple[str, Tuple[int, ...]]]:
+    """
+    Término del archivo → (patrón normalizado con espacios donde exige borde de palabra,
+    posiciones del patrón que en el término son letra doble).
+    """
+    term = term.strip()
+    prefix = term.startswith(WILDCARD)
+    suffix = term.endswith(WILDCARD)
+    folded, _origin, runs = _normalize(term.strip(WILDCARD))
+    core = folded.strip(SEPARATOR)
+    if not core:
+        return None
+    shift = 0 if prefix else 1  # folded[1] es la primera letra; en el patrón va en `shift`
+    doubles = tuple(i - 1 + shift for i in range(1, len(folded) - 1) if runs[i] > 1)
+    return ("" if prefix else SEPARATOR) + core + ("" if suffix else SEPARATOR), doubles
+
+
+# ===================== AUTÓMATA =====================
+class Automaton:
+    """
+    Aho–Corasick con la tabla de transiciones completa: `table[estado + columna]`
+    es el próximo estado (los estados ya vienen multiplicados por WIDTH), así que
+    recorrer el texto es una lectura de array por carácter, sin seguir enlaces de fallo.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        self.patterns = list(patterns)
+        goto: List[Dict[int, int]] = [{}]
+        ends: List[List[int]] = [[]]
+        for idx, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern.translate(_COLUMNS).encode("latin-1"):
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    ends.append([])
+                state = nxt
+            ends[state].append(idx)
+
+        states = len(goto)
+        table = array("I", bytes(4 * states * WIDTH))
+        fail = [0] * states
+        out: List[Tuple[int, ...]] = [()] * states
+        out[0] = tuple(ends[0])
+        for col, child in goto[0].items():
+            table[col] = child * WIDTH
+        pending = deque(goto[0].values())
+        for child in goto[0].values():
+            out[child] = tuple(ends[child])
+        while pending:
+            state = pending.popleft()
+            base, fail_base = state * WIDTH, fail[state] * WIDTH
+            for col in range(WIDTH):
+                child = goto[state].get(col)
+                if child is None:
+                    table[base + col] = table[fail_base + col]
+                    continue
+                table[base + col] = child * WIDTH
+                fail[child] = table[fail_base + col] // WIDTH
+                out[child] = tuple(ends[child]) + out[fail[child]]
+                pending.append(child)
+        self.table = table
+        self.out = out
+        self.states = states
+
+    def scan(self, normalized: str) -> Iterable[Tuple[int, int]]:
+        """(posición final, índice del patrón) de cada aparición, solapadas incluidas."""
+        table, out = self.table, self.out
+        state = 0
+        for pos, col in enumerate(normalized.translate(_COLUMNS).encode("latin-1")):
+            state = table[state + col]
+            found = out[state // WIDTH]
+            if found:
+                for idx in found:
+                    yield pos, idx
+
+    def memory_bytes(self) -> int:
+        return self.table.itemsize * len(self.table)
+
+
+# ===================== FILTRO =====================
+@dataclass(frozen=True)
+class TermMatch:
+    term: str
+    category: str
+    start: int  # posiciones en el texto original
+    end: int
+
+
+def parse_terms(lines: Iterable[str]) -> List[Tuple[str, str]]:
+    """Líneas del archivo → [(término, categoría)]."""
+    category = DEFAULT_CATEGORY
+    terms = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            category = line[1:-1].strip().lower() or DEFAULT_CATEGORY
+            continue
+        terms.append((line, category))
+    return terms
+
+
+class _Compiled:
+    """
+    El autómata busca con las letras repetidas colapsadas ("foro" y "forro" son el mismo
+    patrón); `doubles` guarda dónde el término lleva letra doble, que el texto también debe tener.
+    """
+
+    def __init__(self, terms: Sequence[Tuple[str, str]]):
+        entries: Dict[Tuple[str, Tuple[int, ...]], Tuple[str, str]] = {}
+        for term, category in terms:
+            key = _pattern(term)
+            if key and key not in entries:
+                entries[key] = (term, category)
+        self.patterns = [pattern for pattern, _doubles in entries]
+        self.doubles = [doubles for _pattern, doubles in entries]
+        self.entries = list(entries.values())
+        self.automaton = Automaton(self.patterns)
+
+
+class TextFilter:
+    def __init__(self, path: Optional[str] = None, refresh: int = DEFAULT_REFRESH,
+                 terms: Optional[Sequence[Tuple[str, str]]] = None):
+        self.path = path
+        self.refresh = refresh
+        self._compiled = _Compiled(terms or [])
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._reloading = False
+        self._lock = threading.Lock()
+        if path:
+            self.reload()
+
+    def __len__(self) -> int:
+        return len(self._compiled.patterns)
+
+    # ---------- carga ----------
+    def reload(self) -> bool:
+        """Lee y compila el archivo; el autómata viejo sigue atendiendo hasta el reemplazo."""
+        if not self.path:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime
+            t0 = time.perf_counter()
+            with open(self.path, encoding="utf-8") as fh:
+                compiled = _Compiled(parse_terms(fh))
+        except OSError as exc:
+            logger.warning("⚠️ No se pudo leer la lista de términos %s: %s", self.path, exc)
+            return False
+        self._compiled, self._mtime = compiled, mtime
+        logger.info("🧹 Filtro de texto: %d términos, %d estados en %.0f ms", len(compiled.patterns),
+                    compiled.automaton.states, (time.perf_counter() - t0) * 1000)
+        return True
+
+    def _reload_in_background(self) -> None:
+        try:
+            self.reload()
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def maybe_reload(self) -> None:
+        if not self.path or not self.refresh or time.monotonic() - self._checked_at < self.refresh:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            changed = os.stat(self.path).st_mtime != self._mtime
+        except OSError:
+            return
+        if changed:
+            with self._lock:
+                if self._reloading:
+                    return
+                self._reloading = True
+            threading.Thread(target=self._reload_in_background, name="text-filter-reload", daemon=True).start()
+
+    # ---------- consultas ----------
+    def find(self, text: str, ignore: Sequence[str] = ()) -> List[TermMatch]:
+        if not text:
+            return []
+        self.maybe_reload()
+        compiled = self._compiled
+        if not any(True for _ in compiled.automaton.scan(normalized(text))):
+            return []  # caso común: sin posiciones que calcular
+        folded, origin, runs = _normalize(text)
+        matches = []
+        for end, idx in compiled.automaton.scan(folded):
+            term, category = compiled.entries[idx]
+            if category in ignore:
+                continue
+            pattern = compiled.patterns[idx]
+            first = end - len(pattern) + 1
+            if any(runs[first + i] < 2 for i in compiled.doubles[idx]):
+                continue  # "foro" no es "forro"
+            start = first + (pattern[0] == SEPARATOR)
+            last = end - (pattern[-1] == SEPARATOR)
+            matches.append(TermMatch(term, category, origin[start], origin[last] + 1))
+        return matches
+
+    def first(self, text: str, ignore: Sequence[str] = ()) -> Optional[TermMatch]:
+        matches = self.find(text, ignore)
+        return matches[0] if matches else None
+
+    def censor(self, text: str, ignore: Sequence[str] = (), mask: str = "*") -> str:
+        hidden = [False] * len(text)
+        for match in self.find(text, ignore):
+            for i in range(match.start, min(match.end, len(text))):
+                hidden[i] = not text[i].isspace()
+        return "".join(mask if h else ch for ch, h in zip(text, hidden))
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_text_filter(app, path: Optional[str] = None, refresh: int = DEFAULT_REFRESH) -> TextFilter:
+    text_filter = TextFilter(path or DEFAULT_TERMS_PATH, refresh)
+    app.extensions["text_filter"] = text_filter
+    return text_filter
+
+
+def blocked_term(text: str, ignore: Sequence[str] = (RESERVED,)) -> Optional[TermMatch]:
+    """
+    Primer término prohibido del texto según el filtro de la app (None si no hay
+    ninguno o si la app no tiene filtro). Por defecto ignora los nombres reservados,
+    que solo cuentan para nombres de usuario (`ignore=()`).
+    """
+    from flask import current_app
+
+    text_filter: Optional[TextFilter] = current_app.extensions.get("text_filter")
+    return text_filter.first(text, ignore) if text_filter is not None else None
+
+
+__all__ = [
+    "Automaton",
+    "RESERVED",
+    "TermMatch",
+    "TextFilter",
+    "blocked_term",
+    "init_text_filter",
+    "normalize",
+    "normalized",
+    "parse_terms",
+]
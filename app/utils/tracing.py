@@ -0,0 +1,154 @@
+"""
+Spans explícitos (OpenTelemetry) para PlayTimeUY
+------------------------------------------------
+✅ Helpers para envolver consultas Firestore, llamadas a Mercado Pago,
+   subidas a Storage y renderizado de templates
+✅ No-op si opentelemetry no está instalado (la app funciona igual)
+✅ La configuración (sampler / exporters) vive en tracing_config.py
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace import Status, StatusCode
+except ImportError:  # pragma: no cover - depende del entorno
+    trace = None
+
+from app.utils import metrics
+
+logger = logging.getLogger("PlayTimeUY.tracing")
+
+TRACER_NAME = "playtimeuy"
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def is_recording(self) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _tracer():
+    return trace.get_tracer(TRACER_NAME) if trace is not None else None
+
+
+@contextmanager
+def start_span(name: str, kind: Optional[str] = None, **attributes: Any) -> Iterator[Any]:
+    """
+    Abre un span hijo del actual. Los atributos con valor None se omiten.
+    `kind` acepta "client" / "internal" (por defecto internal).
+    """
+    tracer = _tracer()
+    if tracer is None:
+        yield _NOOP_SPAN
+        return
+    span_kind = trace.SpanKind.CLIENT if kind == "client" else trace.SpanKind.INTERNAL
+    attrs = {k.replace("__", "."): v for k, v in attributes.items() if v is not None}
+    with tracer.start_as_current_span(name, kind=span_kind, attributes=attrs) as span:
+        try:
+            yield span
+        except Exception as exc:
+            span.record_exception(exc)
+            span.set_status(Status(StatusCode.ERROR, str(exc)))
+            raise
+
+
+# ===================== FIRESTORE =====================
+@contextmanager
+def firestore_span(operation: str, collection: str, **attributes: Any) -> Iterator[Any]:
+    """Span para una operación Firestore (query / get / set / update / add)."""
+    with start_span(
+        f"firestore.{operation} {collection}",
+        kind="client",
+        db__system="firestore",
+        db__operation=operation,
+        db__collection=collection,
+        **attributes,
+    ) as span:
+        yield span
+    if operation != "query":  # las queries cuentan documentos en traced_stream
+        metrics.record_firestore(operation, collection, attributes.get("db__firestore__batch_size", 1))
+
+
+def traced_stream(query: Any, collection: str, **attributes: Any) -> list:
+    """Ejecuta `query.stream()` dentro de un span y registra la cantidad de resultados."""
+    with firestore_span("query", collection, **attributes) as span:
+        docs = list(query.stream())
+        span.set_attribute("db.firestore.result_count", len(docs))
+    metrics.record_firestore("query", collection, len(docs))
+    return docs
+
+
+# ===================== MERCADO PAGO =====================
+@contextmanager
+def mercadopago_span(operation: str, **attributes: Any) -> Iterator[Any]:
+    """Span para una llamada al SDK de Mercado Pago (preference.create, payment.get, ...)."""
+    t0 = time.perf_counter()
+    ok = False
+    try:
+        with start_span(
+            f"mercadopago.{operation}", kind="client", peer__service="mercadopago", **attributes
+        ) as span:
+            yield span
+        ok = True
+    finally:
+        metrics.observe_mercadopago(operation, time.perf_counter() - t0, ok)
+
+
+def record_mp_response(span: Any, response: Optional[Dict[str, Any]]) -> None:
+    """Anota el status HTTP que devuelve el SDK (`{"status": ..., "response": ...}`)."""
+    if isinstance(response, dict) and response.get("status") is not None:
+        span.set_attribute("http.status_code", response.get("status"))
+
+
+# ===================== STORAGE / TEMPLATES =====================
+@contextmanager
+def storage_span(operation: str, blob_path: str, **attributes: Any) -> Iterator[Any]:
+    with start_span(
+        f"storage.{operation}", kind="client", storage__blob=blob_path, **attributes
+    ) as span:
+        yield span
+
+
+def traced(name: Optional[str] = None, **attributes: Any):
+    """Decorador: ejecuta la función dentro de un span."""
+
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with start_span(span_name, **attributes):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+__all__ = [
+    "start_span",
+    "firestore_span",
+    "traced_stream",
+    "mercadopago_span",
+    "record_mp_response",
+    "storage_span",
+    "traced",
+]
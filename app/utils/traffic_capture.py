@@ -0,0 +1,343 @@
+"""
+Captura de tráfico para PlayTimeUY (opt-in)
+-------------------------------------------
+✅ Middleware WSGI que registra un "sobre" saneado por request en JSONL rotativo
+✅ Subconjunto de headers (nunca Cookie / Authorization / firmas), query redactada
+✅ Body: solo hash SHA-256 + tamaño, salvo rutas de webhook (body completo, redactado)
+✅ Timing: timestamp, duración hasta el último byte, status y bytes de respuesta
+✅ Escritura fuera del request (cola + listener + RotatingFileHandler)
+
+El archivo lo consume `python -m benchmarks.replay` para reproducir la mezcla
+real de producción contra una instancia local.
+"""
+
+from __future__ import annotations
+
+import atexit
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from app.utils.compression import ROUTE_ENVIRON_KEY
+from app.utils.logging_config import NonBlockingQueueHandler
+from app.utils.media import call_on_close, is_file_wrapper
+
+logger = logging.getLogger("PlayTimeUY.capture")
+
+# ===================== CONSTANTES =====================
+CAPTURE_VERSION = 1
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_QUEUE_SIZE = 10000
+MAX_BODY_CAPTURE = 64 * 1024
+
+DEFAULT_BODY_PATHS = ("/payment/webhook", "/user/payment/webhook")
+
+# Headers que se guardan tal cual (el resto se descarta)
+HEADER_ALLOWLIST = (
+    "Content-Type",
+    "Accept",
+    "Accept-Encoding",
+    "Accept-Language",
+    "User-Agent",
+    "If-None-Match",
+    "If-Modified-Since",
+    "Range",
+    "X-Requested-With",
+    "X-Request-ID",
+    "X-CSRF-Token",
+)
+
+SENSITIVE_KEY = re.compile(r"pass|token|secret|key|sign|auth|code|email|card|cvv|dni|phone", re.I)
+REDACTED = "[redacted]"
+
+
+def default_capture_path() -> str:
+    base = os.getenv("PLAYTIMEUY_DATA_DIR") or str(Path.cwd() / "data")
+    return str(Path(base) / "capture" / "requests.jsonl")
+
+
+# ===================== SANEADO =====================
+def redact_query(query: str) -> str:
+    if not query:
+        return ""
+    pairs = parse_qsl(query, keep_blank_values=True)
+    return urlencode([(k, REDACTED if SENSITIVE_KEY.search(k) else v) for k, v in pairs])
+
+
+def redact_json(value: Any) -> Any:
+    """Redacta recursivamente claves sensibles de un JSON ya parseado."""
+    if isinstance(value, dict):
+        return {k: (REDACTED if SENSITIVE_KEY.search(str(k)) else redact_json(v)) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact_json(v) for v in value]
+    return value
+
+
+def _headers_subset(environ: Dict[str, Any]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+    for name in HEADER_ALLOWLIST:
+        key = "CONTENT_TYPE" if name == "Content-Type" else "HTTP_" + name.upper().replace("-", "_")
+        value = environ.get(key)
+        if value:
+            out[name] = REDACTED if name == "X-CSRF-Token" else value
+    return out
+
+
+# ===================== BODY (tee) =====================
+class _TeeInput:
+    """Envuelve wsgi.input: hashea lo que lee la app y guarda copia si se pide."""
+
+    def __init__(self, stream, keep: bool):
+        self._stream = stream
+        self._keep = keep
+        self.sha = hashlib.sha256()
+        self.size = 0
+        self.kept: List[bytes] = []
+        self._kept_size = 0
+
+    def _see(self, data: bytes) -> bytes:
+        if data:
+            self.sha.update(data)
+            self.size += len(data)
+            if self._keep and self._kept_size < MAX_BODY_CAPTURE:
+                self.kept.append(data[: MAX_BODY_CAPTURE - self._kept_size])
+                self._kept_size += len(self.kept[-1])
+        return data
+
+    def read(self, *args) -> bytes:
+        return self._see(self._stream.read(*args))
+
+    def readline(self, *args) -> bytes:
+        return self._see(self._stream.readline(*args))
+
+    def readlines(self, *args) -> List[bytes]:
+        return [self._see(line) for line in self._stream.readlines(*args)]
+
+    def __iter__(self):
+        for line in self._stream:
+            yield self._see(line)
+
+    def body(self) -> Optional[Any]:
+        if not self._keep or not self.kept:
+            return None
+        raw = b"".join(self.kept)
+        try:
+            return redact_json(json.loads(raw))
+        except (ValueError, UnicodeDecodeError):
+            return raw.decode("utf-8", "replace")
+
+
+# ===================== ESCRITOR =====================
+class CaptureWriter:
+    """JSONL rotativo escrito por un QueueListener (el request solo encola)."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backup_count: int = DEFAULT_BACKUP_COUNT, queue_size: int = DEFAULT_QUEUE_SIZE):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.queue_size = queue_size
+        self._file = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True,
+        )
+        self._file.setFormatter(logging.Formatter("%(message)s"))
+        self._logger = logging.Logger("PlayTimeUY.capture.writer")
+        self._logger.propagate = False
+        self._handler: Optional[NonBlockingQueueHandler] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self.restart()
+        atexit.register(self.close)
+
+    @property
+    def dropped(self) -> int:
+        return self._handler.dropped if self._handler else 0
+
+    def restart(self) -> None:
+        """Cola y listener nuevos (llamar en post_fork: los threads no sobreviven al fork)."""
+        q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        handler = NonBlockingQueueHandler(q)
+        listener = logging.handlers.QueueListener(q, self._file)
+        listener.start()
+        if self._handler is not None:
+            self._logger.removeHandler(self._handler)
+        self._logger.addHandler(handler)
+        self._handler, self._listener = handler, listener
+
+    def write(self, envelope: Dict[str, Any]) -> None:
+        self._logger.info(json.dumps(envelope, ensure_ascii=False, default=str, separators=(",", ":")))
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        self._file.close()
+
+
+# ===================== MIDDLEWARE =====================
+class TrafficCaptureMiddleware:
+    """
+    Envuelve la app WSGI y registra un sobre por request. El registro se emite
+    al cerrar el iterable de respuesta, así la duración incluye el streaming.
+    """
+
+    def __init__(
+        self,
+        app: Callable,
+        path: Optional[str] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+        sample_rate: float = 1.0,
+        body_paths: Iterable[str] = DEFAULT_BODY_PATHS,
+        exclude_paths: Iterable[str] = ("/static/", "/metrics", "/healthz", "/admin/profiling"),
+        writer: Optional[CaptureWriter] = None,
+    ):
+        self.app = app
+        self.writer = writer or CaptureWriter(path or default_capture_path(), max_bytes, backup_count)
+        self.sample_rate = max(0.0, min(1.0, float(sample_rate)))
+        self.body_paths = tuple(body_paths)
+        self.exclude_paths = tuple(exclude_paths)
+        self.captured = 0
+        self._lock = threading.Lock()
+
+    def _wanted(self, path: str) -> bool:
+        if path.startswith(self.exclude_paths):
+            return False
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def __call__(self, environ: Dict[str, Any], start_response: Callable):
+        path = environ.get("PATH_INFO") or "/"
+        if not self._wanted(path):
+            return self.app(environ, start_response)
+
+        tee = _TeeInput(environ["wsgi.input"], keep=path in self.body_paths)
+        environ["wsgi.input"] = tee
+        state: Dict[str, Any] = {"ts": time.time(), "start": time.perf_counter()}
+
+        def _start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            state["status"] = int(status.split(" ", 1)[0])
+            state["length"] = next((int(v) for k, v in headers if k.lower() == "content-length" and v.isdigit()), 0)
+            return start_response(status, headers, exc_info)
+
+        try:
+            app_iter = self.app(environ, _start_response)
+        except Exception:
+            state["status"] = 500
+            self._emit(environ, tee, state, 0)
+            raise
+        if is_file_wrapper(environ, app_iter):
+            # Archivos (sendfile): se registra el Content-Length sin iterar el cuerpo
+            return call_on_close(app_iter, lambda: self._emit_safely(environ, tee, state, state.get("length", 0)))
+        return _CapturingIterable(self, environ, tee, state, app_iter)
+
+    def _emit_safely(self, environ: Dict[str, Any], tee: _TeeInput, state: Dict[str, Any], response_bytes: int) -> None:
+        try:
+            self._emit(environ, tee, state, response_bytes)
+        except Exception:  # la captura nunca debe romper el request
+            logger.exception("❌ Error registrando captura de tráfico")
+
+    def _emit(self, environ: Dict[str, Any], tee: _TeeInput, state: Dict[str, Any], response_bytes: int) -> None:
+        try:
+            content_length = int(environ.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            content_length = 0
+        envelope = {
+            "v": CAPTURE_VERSION,
+            "ts": round(state["ts"], 6),
+            "method": environ.get("REQUEST_METHOD", "GET"),
+            "path": environ.get("PATH_INFO") or "/",
+            "query": redact_query(environ.get("QUERY_STRING", "")),
+            "endpoint": environ.get(ROUTE_ENVIRON_KEY),
+            "headers": _headers_subset(environ),
+            "authenticated": "HTTP_COOKIE" in environ or "HTTP_AUTHORIZATION" in environ,
+            "content_length": content_length,
+            "body_sha256": tee.sha.hexdigest() if tee.size else None,
+            "body_size": tee.size,
+            "status": state.get("status"),
+            "response_bytes": response_bytes,
+            "duration_ms": round((time.perf_counter() - state["start"]) * 1000, 3),
+            "request_id": environ.get("HTTP_X_REQUEST_ID"),
+        }
+        body = tee.body()
+        if body is not None:
+            envelope["body"] = body
+        self.writer.write(envelope)
+        with self._lock:
+            self.captured += 1
+
+
+class _CapturingIterable:
+    def __init__(self, mw: TrafficCaptureMiddleware, environ, tee: _TeeInput, state, app_iter):
+        self._mw = mw
+        self._environ = environ
+        self._tee = tee
+        self._state = state
+        self._app_iter = app_iter
+        self._bytes = 0
+        self._done = False
+
+    def __iter__(self):
+        for chunk in self._app_iter:
+            self._bytes += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            if hasattr(self._app_iter, "close"):
+                self._app_iter.close()
+        finally:
+            if not self._done:
+                self._done = True
+                self._mw._emit_safely(self._environ, self._tee, self._state, self._bytes)
+
+
+# ===================== LECTURA =====================
+def capture_files(path: str) -> List[str]:
+    """Archivo activo + rotados, del más viejo al más nuevo."""
+    base = Path(path)
+    rotated = sorted(
+        (p for p in base.parent.glob(base.name + ".*") if p.suffix.lstrip(".").isdigit()),
+        key=lambda p: int(p.suffix.lstrip(".")),
+        reverse=True,
+    )
+    files = [str(p) for p in rotated]
+    if base.exists():
+        files.append(str(base))
+    return files
+
+
+def read_capture(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """Lee uno o más JSONL y devuelve los sobres ordenados por timestamp."""
+    envelopes: List[Dict[str, Any]] = []
+    for path in paths:
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    envelopes.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("⚠️ Línea de captura inválida en %s", path)
+    envelopes.sort(key=lambda e: e.get("ts", 0))
+    return envelopes
+
+
+__all__ = [
+    "CaptureWriter",
+    "TrafficCaptureMiddleware",
+    "capture_files",
+    "default_capture_path",
+    "read_capture",
+    "redact_json",
+    "redact_query",
+]
@@ -0,0 +1,229 @@
+"""
+Subidas multipart en streaming para PlayTimeUY
+----------------------------------------------
+✅ El cuerpo se lee de a bloques de 64 KB directo de wsgi.input: cada tramo va a
+   un archivo temporal (junto al destino, así después es un rename)
+✅ SHA-256 incremental y tipo real por la firma de los primeros bytes, mientras llega
+✅ Corta apenas se pasa del límite (o antes de leer nada, si Content-Length ya lo
+   supera) y apenas la firma no es un formato permitido
+✅ Límite por rol/tipo de subida (DirectUploads.limit_for): avatares chicos,
+   creadoras con límite de video; la memoria del worker no depende del tamaño
+✅ No usa request.form / request.files (que bufferean todo antes de poder
+   validar nada) ni MAX_CONTENT_LENGTH: el límite lo pone quien llama
+✅ CSRF: el token del formulario se valida antes del primer byte de archivo
+   (`before_file`), por eso el campo `_csrf` tiene que ir antes del archivo
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from werkzeug.wsgi import get_input_stream
+
+from app.utils.uploads import SNIFF_BYTES, UploadError, sniff_type
+
+logger = logging.getLogger("PlayTimeUY.uploads")
+
+READ_SIZE = 64 * 1024
+MAX_FORM_BYTES = 64 * 1024  # campos de texto (título, username, token)
+INCOMING_DIRNAME = ".incoming"
+
+
+@dataclass
+class StreamedFile:
+    field: str
+    filename: str
+    client_type: Optional[str]
+    content_type: str  # el real (firma), no el que manda el navegador
+    size: int
+    sha256: str
+    path: str
+
+    def move_to(self, dest: str) -> None:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            os.replace(self.path, dest)
+        except OSError:  # otro filesystem
+            shutil.move(self.path, dest)
+        self.path = dest
+
+    def discard(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class _FileSink:
+    """Archivo temporal + hash + firma + límite, alimentado de a tramos."""
+
+    def __init__(self, part: File, tmp_dir: str, limit: int, allowed: FrozenSet[str]):
+        self.part = part
+        self.limit = limit
+        self.allowed = allowed
+        self.sha = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        self.content_type: Optional[str] = None
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix="upload-", suffix=".part", dir=tmp_dir)
+        self.fh = os.fdopen(fd, "wb")
+
+    def _sniff(self) -> None:
+        self.content_type = sniff_type(self.head)
+        if self.content_type not in self.allowed:
+            raise UploadError(f"Formato no permitido: {self.content_type or 'desconocido'}", 415)
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.limit:
+            raise UploadError(f"El archivo supera {self.limit // (1024 * 1024)}MB", 413)
+        if self.content_type is None and len(self.head) < SNIFF_BYTES:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self._sniff()
+        self.sha.update(data)
+        self.fh.write(data)
+
+    def finish(self) -> StreamedFile:
+        self.fh.close()
+        if self.content_type is None:
+            self._sniff()
+        return StreamedFile(
+            field=self.part.name,
+            filename=self.part.filename or "",
+            client_type=self.part.headers.get("Content-Type"),
+            content_type=self.content_type,
+            size=self.size,
+            sha256=self.sha.hexdigest(),
+            path=self.path,
+        )
+
+    def abort(self) -> None:
+        self.fh.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _chunks(stream, size: int = READ_SIZE) -> Iterator[Optional[bytes]]:
+    while True:
+        data = stream.read(size)
+        if not data:
+            break
+        yield data
+    yield None  # fin del cuerpo para el decoder
+
+
+def parse_upload(
+    environ: Dict[str, object],
+    limit: int,
+    allowed_types: FrozenSet[str],
+    tmp_dir: str,
+    max_files: int = 1,
+    max_form_bytes: int = MAX_FORM_BYTES,
+    before_file: Optional[Callable[[Dict[str, str]], None]] = None,
+) -> Tuple[Dict[str, str], List[StreamedFile]]:
+    """
+    Campos de texto + archivos ya escritos en `tmp_dir`. Quien llama mueve
+    (`move_to`) o descarta (`discard`) los archivos. Los errores son UploadError
+    con el status HTTP; los temporales se borran antes de propagarlos.
+    Cuerpos que no son multipart (formulario sin archivo) → sin archivos.
+    """
+    mimetype, options = parse_options_header(environ.get("CONTENT_TYPE") or "")
+    if mimetype != "multipart/form-data":
+        return {}, []
+    boundary = options.get("boundary", "").encode("latin-1")
+    if not boundary:
+        raise UploadError("multipart sin boundary")
+
+    body_limit = limit * max_files + max_form_bytes
+    content_length = int(environ.get("CONTENT_LENGTH") or 0)
+    if content_length > body_limit:
+        raise UploadError(f"El archivo supera {limit // (1024 * 1024)}MB", 413)
+
+    stream = get_input_stream(environ, max_content_length=body_limit)
+    # Sin max_form_memory_size en el decoder: mide su buffer + el bloque entrante, y
+    # con un tramo retenido (posible boundary) cortaría archivos válidos
+    decoder = MultipartDecoder(boundary, max_parts=max_files + 32)
+    fields: Dict[str, str] = {}
+    files: List[StreamedFile] = []
+    field_buf: List[bytes] = []
+    form_bytes = 0
+    current: Optional[Field] = None
+    sink: Optional[_FileSink] = None
+    try:
+        for chunk in _chunks(stream):
+            decoder.receive_data(chunk)
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File):
+                    if len(files) >= max_files:
+                        raise UploadError("Demasiados archivos en el formulario")
+                    if before_file is not None:
+                        before_file(fields)
+                    sink = _FileSink(event, tmp_dir, limit, allowed_types)
+                elif isinstance(event, Field):
+                    current, field_buf = event, []
+                elif isinstance(event, Data):
+                    if sink is not None:
+                        sink.write(event.data)
+                        if not event.more_data:
+                            if sink.size or sink.part.filename:
+                                files.append(sink.finish())
+                            else:  # <input type=file> vacío
+                                sink.abort()
+                            sink = None
+                    elif current is not None:
+                        form_bytes += len(event.data)
+                        if form_bytes > max_form_bytes:
+                            raise RequestEntityTooLarge()
+                        field_buf.append(event.data)
+                        if not event.more_data:
+                            fields[current.name] = b"".join(field_buf).decode("utf-8", "replace")
+                            current = None
+                event = decoder.next_event()
+    except RequestEntityTooLarge:
+        _cleanup(sink, files)
+        raise UploadError("Formulario demasiado grande", 413)
+    except ValueError as exc:  # UploadError o multipart mal formado
+        _cleanup(sink, files)
+        if isinstance(exc, UploadError):
+            raise
+        raise UploadError("Formulario multipart inválido")
+    except BaseException:
+        _cleanup(sink, files)
+        raise
+    if sink is not None:  # el cuerpo terminó a mitad de un archivo
+        _cleanup(sink, files)
+        raise UploadError("Subida incompleta")
+    return fields, files
+
+
+def _cleanup(sink: Optional[_FileSink], files: List[StreamedFile]) -> None:
+    if sink is not None:
+        sink.abort()
+    for f in files:
+        f.discard()
+
+
+def incoming_dir(media_root: str) -> str:
+    """Temporales dentro de MEDIA_ROOT: mover al destino final es un rename."""
+    return os.path.join(media_root, INCOMING_DIRNAME)
+
+
+__all__ = [
+    "StreamedFile",
+    "incoming_dir",
+    "parse_upload",
+]
@@ -0,0 +1,463 @@
+"""
+Subidas directas al storage para PlayTimeUY
+-------------------------------------------
+✅ El navegador sube el archivo directo al bucket: el worker solo atiende dos
+   requests cortos (crear la sesión de subida y confirmarla)
+✅ Firebase Storage: sesión resumable de GCS (URL firmada por Google, se puede
+   reanudar con `Content-Range` si se corta la conexión en el celular)
+✅ Bucket local (desarrollo / sin Firebase): mismo protocolo resumable sobre un
+   directorio (MEDIA_ROOT); lo sirve la app en /uploads/local/<ticket> o
+   `LocalBucketApp` en un proceso aparte
+✅ Ticket firmado (itsdangerous + SECRET_KEY): uid, tipo, ruta del objeto, tipo
+   y tamaño declarados; sin estado en el servidor
+✅ Al confirmar se valida tamaño y tipo real (firma de los primeros bytes, no
+   el Content-Type del cliente); si no cumple, el objeto se borra
+
+Protocolo del bucket local (el de GCS):
+    PUT <url>                                   cuerpo completo
+    PUT <url> Content-Range: bytes 0-1048575/N  un tramo → 308 + Range: bytes=0-1048575
+    PUT <url> Content-Range: bytes */N          consulta → 308 con lo recibido hasta ahora
+    → 200 cuando llegaron los N bytes
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import secrets
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, BinaryIO, Dict, FrozenSet, Iterable, Iterator, Optional, Tuple
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.security import safe_join
+from werkzeug.wrappers import Request, Response
+
+from app.utils.tracing import storage_span
+
+logger = logging.getLogger("PlayTimeUY.uploads")
+
+DEFAULT_TICKET_MAX_AGE = 6 * 3600
+CHUNK_SIZE = 256 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+SNIFF_BYTES = 64
+PART_SUFFIX = ".part"
+
+
+class UploadError(ValueError):
+    """Subida rechazada; `status` es el código HTTP para el cliente."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+# ===================== POLÍTICAS =====================
+@dataclass(frozen=True)
+class UploadPolicy:
+    kind: str
+    types: FrozenSet[str]
+    max_bytes: int
+    prefix: str  # carpeta del objeto; "{uid}" se reemplaza por el usuario
+    roles: Optional[FrozenSet[str]] = None  # None = cualquier usuario logueado (admins siempre)
+
+
+IMAGE_TYPES = frozenset({"image/png", "image/jpeg", "image/gif", "image/webp"})
+MEDIA_TYPES = frozenset({"video/mp4", "video/quicktime", "video/x-msvideo", "audio/mpeg", "audio/wav"})
+
+EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "video/mp4": ".mp4",
+    "video/quicktime": ".mov",
+    "video/x-msvideo": ".avi",
+    "audio/mpeg": ".mp3",
+    "audio/wav": ".wav",
+}
+
+
+def default_policies(avatar_mb: int = 5, content_mb: int = 2048) -> Dict[str, UploadPolicy]:
+    return {
+        "avatar": UploadPolicy("avatar", IMAGE_TYPES, avatar_mb * 1024 * 1024, "avatars/{uid}"),
+        # Staging: al confirmar pasa al store por sha256 (app/utils/blobstore.py)
+        "content": UploadPolicy("content", IMAGE_TYPES | MEDIA_TYPES, content_mb * 1024 * 1024, "staging/{uid}",
+                                roles=frozenset({"creator"})),
+    }
+
+
+def sniff_type(head: bytes) -> Optional[str]:
+    """Tipo real por la firma del archivo (los primeros bytes)."""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "video/x-msvideo"
+    if head[4:8] == b"ftyp":
+        return "video/quicktime" if head[8:10] == b"qt" else "video/mp4"
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "audio/mpeg"
+    return None
+
+
+# ===================== BUCKETS =====================
+class LocalBucket:
+    """Directorio como bucket: escribe `<objeto>.part` por tramos y lo renombra al completarse."""
+
+    backend = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def store_file(self, name: str, path: str, content_type: str) -> None:
+        """Archivo ya completo (subida en streaming): rename al destino."""
+        dest = self.path_for(name)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(path, dest)
+
+    def path_for(self, name: str) -> str:
+        path = safe_join(self.root, name)
+        if path is None:
+            raise UploadError("Ruta de objeto inválida")
+        return path
+
+    def received(self, name: str) -> int:
+        try:
+            return os.path.getsize(self.path_for(name) + PART_SUFFIX)
+        except OSError:
+            return 0
+
+    def write(self, name: str, stream: Any, start: int, length: int, total: int) -> int:
+        """Agrega un tramo; devuelve los bytes recibidos hasta ahora (nunca más allá de `total`)."""
+        if start < 0 or length < 0 or start + length > total:
+            raise UploadError("El tramo excede el tamaño declarado", 416)
+        path = self.path_for(name)
+        part = path + PART_SUFFIX
+        os.makedirs(os.path.dirname(part), exist_ok=True)
+        with open(part, "r+b" if start else "wb") as fh:
+            fh.seek(start)
+            fh.truncate()
+            remaining = length
+            while remaining > 0:
+                chunk = stream.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                fh.write(chunk)
+                remaining -= len(chunk)
+            received = fh.tell()
+        if received == total:
+            os.replace(part, path)
+        return received
+
+    def stat(self, name: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self.path_for(name))
+        except OSError:
+            return None
+
+    def head(self, name: str, size: int = SNIFF_BYTES) -> bytes:
+        with open(self.path_for(name), "rb") as fh:
+            return fh.read(size)
+
+    def delete(self, name: str) -> None:
+        for path in (self.path_for(name), self.path_for(name) + PART_SUFFIX):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def open(self, name: str) -> BinaryIO:
+        return open(self.path_for(name), "rb")
+
+    def sha256(self, name: str) -> str:
+        sha = hashlib.sha256()
+        with open(self.path_for(name), "rb") as fh:
+            for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def move(self, src: str, dst: str) -> None:
+        dest = self.path_for(dst)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(self.path_for(src), dest)
+
+    def list(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        """(nombre, mtime) de los objetos bajo `prefix` (incluye `.part` sin terminar)."""
+        base = self.path_for(prefix)
+        for dirpath, _dirs, files in os.walk(base):
+            for filename in files:
+                path = os.path.join(dirpath, filename)
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                yield os.path.relpath(path, self.root).replace(os.sep, "/"), mtime
+
+
+class FirebaseBucket:
+    """Firebase Storage (GCS): sesiones resumables y URLs firmadas v4."""
+
+    backend = "firebase"
+
+    def __init__(self, bucket: Any, download_ttl: int = 900):
+        self.bucket = bucket
+        self.download_ttl = download_ttl
+
+    def create_session(self, name: str, content_type: str, size: int, origin: Optional[str]) -> str:
+        with storage_span("create_resumable_session", name, content_type=content_type):
+            return self.bucket.blob(name).create_resumable_upload_session(
+                content_type=content_type, size=size, origin=origin
+            )
+
+    def store_file(self, name: str, path: str, content_type: str) -> None:
+        with storage_span("upload", name, content_type=content_type):
+            self.bucket.blob(name).upload_from_filename(path, content_type=content_type)
+        os.remove(path)
+
+    def stat(self, name: str) -> Optional[int]:
+        with storage_span("stat", name):
+            blob = self.bucket.get_blob(name)
+        return blob.size if blob is not None else None
+
+    def head(self, name: str, size: int = SNIFF_BYTES) -> bytes:
+        with storage_span("download_head", name):
+            return self.bucket.blob(name).download_as_bytes(start=0, end=size - 1)
+
+    def delete(self, name: str) -> None:
+        with storage_span("delete", name):
+            self.bucket.blob(name).delete()
+
+    def open(self, name: str) -> BinaryIO:
+        """Lectura en streaming (seekable) del objeto."""
+        return self.bucket.blob(name).open("rb", chunk_size=HASH_CHUNK_SIZE)
+
+    def sha256(self, name: str) -> str:
+        # GCS solo calcula md5 / crc32c: se lee el objeto (tráfico interno de Google, sin la espera del cliente)
+        sha = hashlib.sha256()
+        with storage_span("hash", name), self.bucket.blob(name).open("rb", chunk_size=HASH_CHUNK_SIZE) as fh:
+            for chunk in iter(lambda: fh.read(HASH_CHUNK_SIZE), b""):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def move(self, src: str, dst: str) -> None:
+        with storage_span("move", src, storage__destination=dst):
+            blob = self.bucket.blob(src)
+            self.bucket.copy_blob(blob, self.bucket, dst)  # copia del lado del servidor
+            blob.delete()
+
+    def list(self, prefix: str) -> Iterator[Tuple[str, float]]:
+        with storage_span("list", prefix):
+            blobs = list(self.bucket.list_blobs(prefix=prefix.rstrip("/") + "/"))
+        for blob in blobs:
+            yield blob.name, blob.updated.timestamp() if blob.updated else 0.0
+
+    def download_url(self, name: str) -> str:
+        with storage_span("sign_download", name):
+            return self.bucket.blob(name).generate_signed_url(
+                version="v4", expiration=timedelta(seconds=self.download_ttl), method="GET"
+            )
+
+    def public_url(self, name: str) -> str:
+        # Igual que profile_edit: pública si el bucket lo permite, si no firmada (1 año)
+        blob = self.bucket.blob(name)
+        try:
+            blob.make_public()
+            return blob.public_url
+        except Exception:
+            return blob.generate_signed_url(expiration=31536000)
+
+
+# ===================== SUBIDAS =====================
+class DirectUploads:
+    """Emite tickets, arma la URL de subida y valida el objeto al confirmar."""
+
+    def __init__(self, config: Any, bucket: Any, policies: Optional[Dict[str, UploadPolicy]] = None,
+                 max_age: int = DEFAULT_TICKET_MAX_AGE, local_url: Optional[str] = None):
+        self.config = config
+        self.bucket = bucket
+        self.policies = policies or default_policies()
+        self.max_age = max_age
+        self.local_url = (local_url or "").rstrip("/") or None  # LocalBucketApp en otro proceso
+
+    def _serializer(self) -> URLSafeTimedSerializer:
+        secret = self.config.get("SECRET_KEY")
+        if not secret:
+            raise RuntimeError("SECRET_KEY no configurada: no se pueden firmar tickets de subida")
+        return URLSafeTimedSerializer(secret, salt="PlayTimeUY.uploads")
+
+    def limit_for(self, kind: str, user: Dict[str, Any]) -> int:
+        """Bytes máximos de `kind` para el rol del usuario (0 = no puede subir ese tipo)."""
+        policy = self.policies.get(kind)
+        if policy is None:
+            return 0
+        if policy.roles is not None and user.get("role") not in policy.roles and not user.get("is_admin"):
+            return 0
+        return policy.max_bytes
+
+    # ---------- tickets ----------
+    def issue(self, uid: str, kind: str, content_type: str, size: int, **extra: Any) -> Dict[str, Any]:
+        policy = self.policies.get(kind)
+        if policy is None:
+            raise UploadError(f"Tipo de subida desconocido: {kind!r}")
+        content_type = (content_type or "").split(";")[0].strip().lower()
+        if content_type not in policy.types:
+            raise UploadError(f"Formato no permitido: {content_type or 'desconocido'}", 415)
+        if not isinstance(size, int) or size <= 0:
+            raise UploadError("Tamaño inválido")
+        if size > policy.max_bytes:
+            raise UploadError(f"El archivo supera {policy.max_bytes // (1024 * 1024)}MB", 413)
+        upload_id = secrets.token_urlsafe(16)
+        name = f"{policy.prefix.format(uid=uid)}/{upload_id}{EXTENSIONS[content_type]}"
+        ticket = {"id": upload_id, "uid": uid, "kind": kind, "name": name, "type": content_type, "size": size}
+        ticket.update({k: v for k, v in extra.items() if v is not None})
+        return ticket
+
+    def sign(self, ticket: Dict[str, Any]) -> str:
+        return self._serializer().dumps(ticket)
+
+    def load(self, token: str) -> Dict[str, Any]:
+        try:
+            return self._serializer().loads(token, max_age=self.max_age)
+        except SignatureExpired:
+            raise UploadError("La sesión de subida venció", 410)
+        except BadSignature:
+            raise UploadError("Ticket de subida inválido", 403)
+
+    def upload_target(self, ticket: Dict[str, Any], token: str, local_route: str,
+                      origin: Optional[str] = None) -> Dict[str, Any]:
+        """Adónde sube el navegador: URL resumable de GCS o el bucket local."""
+        headers = {"Content-Type": ticket["type"]}
+        if isinstance(self.bucket, FirebaseBucket):
+            url = self.bucket.create_session(ticket["name"], ticket["type"], ticket["size"], origin)
+        else:
+            url = f"{self.local_url}/{token}" if self.local_url else local_route
+        return {"url": url, "method": "PUT", "headers": headers, "resumable": True}
+
+    # ---------- confirmación ----------
+    def verify(self, ticket: Dict[str, Any]) -> str:
+        """Tamaño exacto y firma del archivo; devuelve el tipo real. Borra el objeto si no cumple."""
+        name = ticket["name"]
+        size = self.bucket.stat(name)
+        if size is None:
+            raise UploadError("La subida no terminó", 409)
+        problem = None
+        actual = sniff_type(self.bucket.head(name)) if size == ticket["size"] else None
+        if size != ticket["size"]:
+            problem = f"tamaño {size} ≠ {ticket['size']} declarado"
+        elif actual is None or actual not in self.policies[ticket["kind"]].types:
+            problem = f"el contenido no es un formato permitido ({actual or 'desconocido'})"
+        if problem:
+            logger.warning("⚠️ Subida %s rechazada: %s", ticket["id"], problem)
+            self.bucket.delete(name)
+            raise UploadError(f"Archivo rechazado: {problem}", 422)
+        return actual
+
+
+# ===================== BUCKET LOCAL (PUT resumable) =====================
+_CONTENT_RANGE = re.compile(r"bytes (?:(\d+)-(\d+)|\*)/(\d+)$")
+
+
+def parse_content_range(header: Optional[str], length: int, declared: int) -> Tuple[Optional[int], int]:
+    """(inicio del tramo o None si es una consulta, total); sin header = archivo completo."""
+    if not header:
+        return 0, declared
+    match = _CONTENT_RANGE.match(header.strip())
+    if not match:
+        raise UploadError("Content-Range inválido")
+    total = int(match.group(3))
+    if match.group(1) is None:
+        return None, total
+    start, end = int(match.group(1)), int(match.group(2))
+    if end < start or end - start + 1 != length:
+        raise UploadError("Content-Range no coincide con el cuerpo")
+    return start, total
+
+
+def local_put(uploads: DirectUploads, token: str, headers: Any, stream: Any) -> Tuple[int, Dict[str, str], str]:
+    """Un PUT al bucket local → (status, headers, cuerpo). Lo usan la ruta Flask y LocalBucketApp."""
+    try:
+        ticket = uploads.load(token)
+        bucket = uploads.bucket
+        if not isinstance(bucket, LocalBucket):
+            raise UploadError("El bucket local no está activo", 404)
+        length = int(headers.get("Content-Length") or 0)
+        start, total = parse_content_range(headers.get("Content-Range"), length, ticket["size"])
+        if total != ticket["size"]:
+            raise UploadError("El total no coincide con el tamaño declarado")
+        # El cliente elige inicio y largo: sin este control un ticket escribía bytes sin límite
+        if start is not None and start + length > total:
+            raise UploadError("El tramo excede el tamaño declarado", 416)
+        name = ticket["name"]
+        if bucket.stat(name) == total:
+            return 200, {}, "ok"  # ya completo (reintento del último tramo)
+        received = bucket.received(name)
+        if start is not None and start <= received:
+            received = bucket.write(name, stream, start, length, total)
+        # start > received: se perdió un tramo; el 308 le dice al cliente desde dónde seguir
+        if received == total:
+            return 200, {}, "ok"
+        range_headers = {"Range": f"bytes=0-{received - 1}"} if received else {}
+        return 308, range_headers, ""
+    except UploadError as exc:
+        return exc.status, {}, str(exc)
+
+
+class LocalBucketApp:
+    """WSGI mínimo del bucket local para correrlo fuera de los workers de la app (PUT /<ticket>)."""
+
+    def __init__(self, uploads: DirectUploads):
+        self.uploads = uploads
+
+    def __call__(self, environ: Dict[str, Any], start_response: Any) -> Iterable[bytes]:
+        request = Request(environ)
+        token = request.path.strip("/").rsplit("/", 1)[-1]
+        if request.method != "PUT" or not token:
+            response = Response("Método no permitido", 405, mimetype="text/plain")
+        else:
+            status, headers, body = local_put(self.uploads, token, request.headers, request.stream)
+            response = Response(body, status, headers=headers, mimetype="text/plain")
+        return response(environ, start_response)
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_uploads(app, backend: Optional[str] = None, local_root: Optional[str] = None,
+                 local_url: Optional[str] = None, max_age: int = DEFAULT_TICKET_MAX_AGE,
+                 avatar_mb: int = 5, content_mb: int = 2048, firebase_bucket: Any = None) -> DirectUploads:
+    """UPLOAD_BACKEND: firebase | local (por defecto firebase si hay bucket, si no local en MEDIA_ROOT)."""
+    backend = (backend or ("firebase" if firebase_bucket is not None else "local")).strip().lower()
+    if backend == "firebase":
+        if firebase_bucket is None:
+            raise ValueError("UPLOAD_BACKEND=firebase pero Firebase Storage no está disponible")
+        bucket: Any = FirebaseBucket(firebase_bucket)
+    elif backend == "local":
+        bucket = LocalBucket(local_root or app.config["MEDIA_ROOT"])
+    else:
+        raise ValueError(f"UPLOAD_BACKEND desconocido: {backend!r} (firebase | local)")
+    uploads = DirectUploads(app.config, bucket, default_policies(avatar_mb, content_mb), max_age, local_url)
+    app.extensions["uploads"] = uploads
+    logger.info("📤 Subidas directas: %s", backend)
+    return uploads
+
+
+__all__ = [
+    "DirectUploads",
+    "FirebaseBucket",
+    "LocalBucket",
+    "LocalBucketApp",
+    "UploadError",
+    "UploadPolicy",
+    "default_policies",
+    "init_uploads",
+    "local_put",
+    "sniff_type",
+]
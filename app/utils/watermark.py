@@ -0,0 +1,312 @@
+"""
+Marca de agua por comprador para imágenes pagas (PlayTimeUY)
+-----------------------------------------------------------
+✅ Cada suscriptor recibe su propia copia: texto en diagonal repetido en toda la
+   imagen con un código del comprador (HMAC del uid con SECRET_KEY, 8 caracteres);
+   una filtración se rastrea con `flask watermark-trace <código> --creator <uid>`
+✅ Composición en C con Pillow: máscara "L" armada con una baldosa de texto
+   (cacheada por código y tamaño), destino blanco/negro según la luminancia de
+   cada píxel (se lee sobre fondos claros y oscuros) e `Image.composite`
+✅ Imágenes de vista, no el archivo original: lado mayor ≤ WATERMARK_MAX_SIDE,
+   JPEG sin EXIF; las JPEG grandes se decodifican reducidas (draft)
+✅ Caché en disco por (contenido, comprador) dentro de MEDIA_ROOT/.watermarks,
+   compartida por los workers y servida con sendfile; tope WATERMARK_CACHE_MB con
+   desalojo de lo menos usado (atime, que se escribe en los aciertos) en segundo plano
+✅ Caché en memoria de la imagen base ya decodificada y achicada (por worker,
+   WATERMARK_BASE_CACHE_MB): el primer pedido de cada comprador de un contenido
+   popular solo compone y codifica
+✅ La creadora, los admins y el contenido público reciben el original
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import io
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+logger = logging.getLogger("PlayTimeUY.watermark")
+
+CACHE_DIRNAME = ".watermarks"
+DEFAULT_CACHE_MB = 1024
+DEFAULT_BASE_CACHE_MB = 64
+DEFAULT_MAX_SIDE = 2048
+DEFAULT_QUALITY = 85
+DEFAULT_OPACITY = 0.22
+CODE_LENGTH = 8
+LABEL = "PlayTimeUY"
+ANGLE = 30
+MAX_TILES = 256
+SWEEP_FRACTION = 0.1  # se barre el directorio cada vez que se agrega ~10 % del tope
+KEEP_FRACTION = 0.9  # el barrido deja la caché en 90 % del tope
+TOUCH_INTERVAL = 60  # s: un acierto reciente no vuelve a escribir el atime
+WATERMARK_CONTENT_TYPE = "image/jpeg"
+
+
+def buyer_code(secret: str, uid: str) -> str:
+    digest = hmac.new(secret.encode(), f"watermark:{uid}".encode(), hashlib.sha256).digest()
+    return base64.b32encode(digest).decode()[:CODE_LENGTH]
+
+
+def wants_watermark(user: Optional[Dict[str, Any]], content: Dict[str, Any], public: bool) -> bool:
+    if public or not user or not (content.get("content_type") or "").startswith("image/"):
+        return False
+    return user.get("uid") != content.get("creator_uid") and not user.get("is_admin")
+
+
+def _font(size: int) -> Any:
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1: solo la fuente bitmap
+        return ImageFont.load_default()
+
+
+# ===================== RENDER =====================
+class Watermarker:
+    """
+    `secret`: la clave o el config de la app; con el config, SECRET_KEY se lee en
+    cada uso (run_new la fija después de create_app).
+    """
+
+    def __init__(self, secret: Union[str, Mapping[str, Any]], cache_dir: str, cache_bytes: int = DEFAULT_CACHE_MB * 2 ** 20,
+                 base_cache_bytes: int = DEFAULT_BASE_CACHE_MB * 2 ** 20, max_side: int = DEFAULT_MAX_SIDE,
+                 quality: int = DEFAULT_QUALITY, opacity: float = DEFAULT_OPACITY):
+        self._secret = secret
+        self.cache_dir = cache_dir
+        self.cache_bytes = cache_bytes
+        self.base_cache_bytes = base_cache_bytes
+        self.max_side = max_side
+        self.quality = quality
+        self.opacity = opacity
+        # cambia si cambia el aspecto de la marca: las copias viejas no se reusan
+        self.variant = hashlib.sha1(f"{max_side}:{quality}:{opacity}:{ANGLE}:{LABEL}".encode()).hexdigest()[:8]
+        self._tiles: "OrderedDict[Tuple[str, int], Image.Image]" = OrderedDict()
+        self._bases: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self._base_bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Lock] = {}
+        self._added = 0
+        self._sweeping = False
+        self.stats = {"hits": 0, "renders": 0, "base_hits": 0, "evicted": 0}
+
+    @property
+    def secret(self) -> str:
+        if not isinstance(self._secret, Mapping):
+            return self._secret
+        secret = self._secret.get("SECRET_KEY")
+        if not secret:
+            raise RuntimeError("SECRET_KEY no configurada: no se pueden generar códigos de marca de agua")
+        return secret.decode() if isinstance(secret, bytes) else str(secret)
+
+    def code_for(self, uid: str) -> str:
+        return buyer_code(self.secret, uid)
+
+    def trace(self, code: str, uids: Iterable[str]) -> Optional[str]:
+        code = code.strip().upper()
+        return next((uid for uid in uids if hmac.compare_digest(self.code_for(uid), code)), None)
+
+    # ---------- piezas ----------
+    def _tile(self, code: str, font_size: int) -> Image.Image:
+        """Baldosa "L" con el texto rotado; se repite sobre toda la imagen."""
+        key = (code, font_size)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+        text = f"{LABEL} · {code}"
+        font = _font(font_size)
+        left, top, right, bottom = font.getbbox(text)
+        pad = font_size * 2
+        plain = Image.new("L", (right - left + pad * 2, (bottom - top) + pad * 2), 0)
+        ImageDraw.Draw(plain).text((pad - left, pad - top), text, fill=255, font=font)
+        tile = plain.rotate(ANGLE, resample=Image.Resampling.BILINEAR, expand=True)
+        tile = tile.point(lambda v: int(v * self.opacity))
+        with self._lock:
+            self._tiles[key] = tile
+            while len(self._tiles) > MAX_TILES:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def _mask(self, size: Tuple[int, int], code: str) -> Image.Image:
+        width, height = size
+        font_size = max(12, min(72, int(math.ceil(max(width, height) / 45 / 4)) * 4))  # de a 4 px: baldosas reusables
+        tile = self._tile(code, font_size)
+        tw, th = tile.size
+        mask = Image.new("L", size, 0)
+        for row, y in enumerate(range(-th // 2, height, th)):
+            offset = (tw // 2) * (row % 2) - tw // 2  # filas corridas: sin columnas de huecos
+            for x in range(offset, width, tw):
+                mask.paste(tile, (x, y))
+        return mask
+
+    def _base(self, key: str, source: Callable[[], Union[str, BinaryIO]]) -> Image.Image:
+        """Imagen decodificada, derecha y achicada a max_side (cacheada por contenido)."""
+        with self._lock:
+            base = self._bases.get(key)
+            if base is not None:
+                self._bases.move_to_end(key)
+                self.stats["base_hits"] += 1
+                return base
+        handle = source()
+        try:
+            with Image.open(handle) as image:
+                if image.format == "JPEG":
+                    image.draft("RGB", (self.max_side, self.max_side))
+                base = ImageOps.exif_transpose(image).convert("RGB")
+        finally:
+            if hasattr(handle, "close"):
+                handle.close()
+        base.thumbnail((self.max_side, self.max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        cost = base.width * base.height * 3
+        with self._lock:
+            if cost <= self.base_cache_bytes and key not in self._bases:
+                self._bases[key] = base
+                self._base_bytes += cost
+                while self._base_bytes > self.base_cache_bytes:
+                    _, old = self._bases.popitem(last=False)
+                    self._base_bytes -= old.width * old.height * 3
+        return base
+
+    def render(self, base: Image.Image, code: str) -> bytes:
+        mask = self._mask(base.size, code)
+        # blanco sobre lo oscuro, negro sobre lo claro
+        target = base.convert("L").point(lambda v: 0 if v > 127 else 255).convert("RGB")
+        marked = Image.composite(target, base, mask)
+        out = io.BytesIO()
+        marked.save(out, "JPEG", quality=self.quality)
+        return out.getvalue()
+
+    # ---------- caché en disco ----------
+    def path_for(self, content_id: str, version: str, code: str) -> str:
+        safe = "".join(ch for ch in content_id if ch.isalnum() or ch in "-_")
+        return os.path.join(self.cache_dir, safe[:2] or "__", safe,
+                            f"{code}-{hashlib.sha1(version.encode()).hexdigest()[:10]}-{self.variant}.jpg")
+
+    def deliver(self, content_id: str, version: str, uid: str,
+                source: Callable[[], Union[str, BinaryIO]]) -> str:
+        """Ruta del JPEG marcado para `uid` (lo genera si no está en la caché)."""
+        code = self.code_for(uid)
+        path = self.path_for(content_id, version, code)
+        if self._touch(path):
+            return path
+        with self._lock:
+            key_lock = self._inflight.setdefault(path, threading.Lock())
+        with key_lock:  # dos pedidos iguales a la vez: un solo render
+            try:
+                if self._touch(path):
+                    return path
+                data = self.render(self._base(f"{content_id}:{version}", source), code)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(data)
+                os.replace(tmp, path)
+                self.stats["renders"] += 1
+            finally:
+                with self._lock:
+                    self._inflight.pop(path, None)
+        self._note_added(len(data))
+        return path
+
+    def _touch(self, path: str) -> bool:
+        try:
+            st = os.stat(path)
+            now = time.time()
+            if now - st.st_atime > TOUCH_INTERVAL:
+                # atime = último uso (para el desalojo); el mtime queda: es parte del ETag de send_media
+                os.utime(path, (now, st.st_mtime))
+        except OSError:
+            return False
+        self.stats["hits"] += 1
+        return True
+
+    def _note_added(self, size: int) -> None:
+        with self._lock:
+            self._added += size
+            if self._sweeping or self._added < self.cache_bytes * SWEEP_FRACTION:
+                return
+            self._sweeping, self._added = True, 0
+        threading.Thread(target=self._sweep_in_background, name="watermark-sweep", daemon=True).start()
+
+    def _sweep_in_background(self) -> None:
+        try:
+            self.sweep()
+        except Exception as exc:
+            logger.warning("⚠️ No se pudo barrer la caché de marcas de agua: %s", exc)
+        finally:
+            with self._lock:
+                self._sweeping = False
+
+    def sweep(self) -> Dict[str, int]:
+        """Si la caché pasa el tope, borra lo usado hace más tiempo hasta quedar en KEEP_FRACTION."""
+        files = []
+        total = 0
+        for dirpath, _dirs, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_atime, st.st_size, path))
+                total += st.st_size
+        removed = freed = 0
+        if total > self.cache_bytes:
+            files.sort()
+            goal = total - int(self.cache_bytes * KEEP_FRACTION)
+            for _atime, size, path in files:
+                if freed >= goal:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                removed += 1
+                freed += size
+            self.stats["evicted"] += removed
+            logger.info("🧹 Caché de marcas de agua: %d archivos (%d MB) desalojados", removed, freed // 2 ** 20)
+        return {"files": len(files) - removed, "bytes": total - freed, "removed": removed, "freed": freed}
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_watermarks(app, cache_dir: Optional[str] = None, cache_mb: int = DEFAULT_CACHE_MB,
+                    base_cache_mb: int = DEFAULT_BASE_CACHE_MB, max_side: int = DEFAULT_MAX_SIDE,
+                    quality: int = DEFAULT_QUALITY, opacity: float = DEFAULT_OPACITY) -> Watermarker:
+    watermarks = Watermarker(
+        app.config, cache_dir or os.path.join(app.config["MEDIA_ROOT"], CACHE_DIRNAME),
+        cache_mb * 2 ** 20, base_cache_mb * 2 ** 20, max_side, quality, opacity,
+    )
+    app.extensions["watermarks"] = watermarks
+
+    import click
+
+    @app.cli.command("watermark-trace")
+    @click.argument("code")
+    @click.option("--creator", required=True, help="uid de la creadora dueña del contenido filtrado")
+    def watermark_trace(code: str, creator: str) -> None:
+        """Encuentra qué suscriptor de la creadora tiene ese código de marca de agua."""
+        subs = app.extensions["repositories"].subscriptions.list_by_creator(creator)
+        uid = watermarks.trace(code, {s.get("subscriber_uid") for s in subs if s.get("subscriber_uid")})
+        click.echo(f"🔎 {code} → {uid}" if uid else f"❌ Ningún suscriptor de {creator} tiene el código {code}")
+
+    return watermarks
+
+
+__all__ = [
+    "WATERMARK_CONTENT_TYPE",
+    "Watermarker",
+    "buyer_code",
+    "init_watermarks",
+    "wants_watermark",
+]
@@ -0,0 +1,362 @@
+"""
+Forma de onda y duración de los audios subidos (PlayTimeUY)
+-----------------------------------------------------------
+✅ Al subir un audio se encola el análisis en un thread del worker (lectura y
+   cálculo en bloques: nunca se carga el archivo entero) y el documento queda con
+   `duration` (s), `waveform` (picos 0–255, WAVEFORM_POINTS puntos como mucho),
+   `sample_rate`, `channels` y `waveform_status` ("ready" | "duration" | "unsupported");
+   el reproductor dibuja sin bajar el audio
+✅ WAV PCM (8/16/24/32 bits) con el módulo `wave` de la stdlib; picos por bloque
+   con NumPy (`maximum.reduceat`) o, sin NumPy, con el byte alto de cada muestra
+   (`bytes.translate` + búsquedas en C: ~100 MB/s sin iterar muestra por muestra)
+✅ Otros formatos (mp3, WAV float, ...) con ffmpeg si está en el PATH (o en
+   WAVEFORM_FFMPEG): PCM mono a 8 kHz por un pipe, sin archivos temporales
+✅ MP3 sin ffmpeg: al menos la duración, leyendo los encabezados de los frames
+   (cabecera Xing/Info si la tiene)
+✅ `flask waveforms-backfill` para los audios que ya estaban
+✅ GET /media/<id>/waveform (app/main/media_routes.py): duración y picos en JSON
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:  # numpy es opcional: sin él los picos salen del byte alto (resolución 1/128)
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+logger = logging.getLogger("PlayTimeUY.waveform")
+
+DEFAULT_POINTS = 800
+CHUNK_FRAMES = 1 << 16  # frames por lectura (redondeado a bloques enteros)
+DECODE_RATE = 8000  # Hz del PCM que entrega ffmpeg: alcanza para los picos
+DECODE_BUCKET = 80  # frames por pico fino al decodificar con ffmpeg (10 ms)
+DECODE_TIMEOUT = 300  # s
+FULL_SCALE = 32768
+WAV_TYPES = frozenset({"audio/wav", "audio/x-wav", "audio/wave"})
+MP3_TYPES = frozenset({"audio/mpeg", "audio/mp3"})
+_SIGN_FLIP = bytes(b ^ 0x80 for b in range(256))  # PCM de 8 bits (sin signo) → con signo
+_ABS_HIGH = bytes(b if b < 128 else 256 - b for b in range(256))  # byte alto con signo → |valor| (0–128)
+_LEVELS = [bytes((v,)) for v in range(128, 0, -1)]
+
+
+class AudioError(Exception):
+    """Audio que no se puede analizar (formato sin decodificador o archivo roto)."""
+
+
+def wants_waveform(content: Dict[str, Any]) -> bool:
+    return (content.get("content_type") or "").startswith("audio/") and content.get("status") != "deleted" \
+        and bool(content.get("storage_path"))
+
+
+# ===================== PICOS =====================
+def _high_peak(high: bytes) -> int:
+    """Mayor |byte alto| del bloque: búsquedas de memchr de 128 hacia abajo (C, sin iterar en Python)."""
+    for level in _LEVELS:
+        if level in high:
+            return level[0]
+    return 0
+
+
+def block_peaks(data: bytes, width: int, channels: int, block_frames: int) -> List[int]:
+    """
+    Pico absoluto (escala int16) de cada bloque de `block_frames` frames de PCM
+    little-endian de `width` bytes. Con NumPy es exacto; sin NumPy se mira solo el
+    byte alto de cada muestra (resolución de 1/128: sobra para dibujar 0–255).
+    """
+    step = block_frames * channels
+    if np is not None:
+        if width == 1:
+            samples = np.abs(np.frombuffer(data, np.uint8).astype(np.int32) - 128) << 8
+        else:
+            samples = np.frombuffer(data, np.uint8).reshape(-1, width)[:, -2:].copy().view("<i2")
+            samples = np.abs(samples.ravel().astype(np.int32))
+        if not len(samples):
+            return []
+        return np.minimum(np.maximum.reduceat(samples, np.arange(0, len(samples), step)), FULL_SCALE).tolist()
+    high = (data.translate(_SIGN_FLIP) if width == 1 else data[width - 1::width]).translate(_ABS_HIGH)
+    return [_high_peak(high[i:i + step]) << 8 for i in range(0, len(high), step)]
+
+
+def downsample(peaks: List[int], points: int) -> List[int]:
+    """Máximo por grupo hasta `points` valores, escalados a 0–255."""
+    if len(peaks) > points:
+        group = math.ceil(len(peaks) / points)
+        peaks = [max(peaks[i:i + group]) for i in range(0, len(peaks), group)]
+    return [min(255, round(p * 255 / FULL_SCALE)) for p in peaks]
+
+
+# ===================== DECODIFICADORES =====================
+def analyze_wav(fh: BinaryIO, points: int = DEFAULT_POINTS) -> Dict[str, Any]:
+    try:
+        reader = wave.open(fh, "rb")
+    except (wave.Error, EOFError) as exc:
+        raise AudioError(f"WAV no soportado: {exc}") from exc
+    with reader:
+        channels, width, rate, frames = (reader.getnchannels(), reader.getsampwidth(),
+                                         reader.getframerate(), reader.getnframes())
+        if not rate or width not in (1, 2, 3, 4):
+            raise AudioError(f"WAV con {width * 8} bits / {rate} Hz")
+        block = max(1, math.ceil(frames / points))
+        per_read = max(1, CHUNK_FRAMES // block) * block  # bloques enteros por lectura
+        peaks: List[int] = []
+        read = 0
+        while read < frames:
+            data = reader.readframes(per_read)
+            if not data:
+                break
+            read += len(data) // (width * channels)
+            peaks += block_peaks(data, width, channels, block)
+    return {"duration": round(read / rate, 3), "waveform": downsample(peaks, points),
+            "sample_rate": rate, "channels": channels}
+
+
+def _feed(fh: BinaryIO, pipe: BinaryIO) -> None:
+    try:
+        for chunk in iter(lambda: fh.read(1 << 16), b""):
+            pipe.write(chunk)
+    except (BrokenPipeError, ValueError):  # ffmpeg cortó (archivo roto): lo informa por stderr
+        pass
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+
+def analyze_ffmpeg(fh: BinaryIO, ffmpeg: str, points: int = DEFAULT_POINTS) -> Dict[str, Any]:
+    """Cualquier formato que entienda ffmpeg: PCM mono de 16 bits a DECODE_RATE por stdout."""
+    proc = subprocess.Popen(
+        [ffmpeg, "-nostdin", "-v", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(DECODE_RATE),
+         "pipe:1"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    feeder = threading.Thread(target=_feed, args=(fh, proc.stdin), name="waveform-feed", daemon=True)
+    feeder.start()
+    errors: List[bytes] = []
+    drain = threading.Thread(target=lambda: errors.append(proc.stderr.read()), daemon=True)
+    drain.start()
+    peaks: List[int] = []
+    frames = 0
+    size = DECODE_BUCKET * 2 * (CHUNK_FRAMES // DECODE_BUCKET)
+    deadline = time.monotonic() + DECODE_TIMEOUT
+    try:
+        for data in iter(lambda: proc.stdout.read(size), b""):
+            frames += len(data) // 2
+            peaks += block_peaks(data[: len(data) // 2 * 2], 2, 1, DECODE_BUCKET)
+            if time.monotonic() > deadline:
+                raise AudioError("ffmpeg tardó demasiado")
+    finally:
+        if proc.poll() is None and time.monotonic() > deadline:
+            proc.kill()
+        code = proc.wait()
+        feeder.join(5)
+        drain.join(5)
+    if code != 0 or not frames:
+        raise AudioError(f"ffmpeg no pudo decodificar: {b''.join(errors).decode(errors='replace').strip()[:200]}")
+    return {"duration": round(frames / DECODE_RATE, 3), "waveform": downsample(peaks, points),
+            "sample_rate": None, "channels": None}
+
+
+# --- MP3 sin decodificador: duración por los encabezados ---
+_MP3_BITRATES = {  # kbps, Layer III
+    1: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mp3_frame(header: bytes) -> Optional[Tuple[int, int, int, int]]:
+    """(bytes del frame, muestras, Hz, canales) o None si no es un encabezado Layer III válido."""
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version, layer = (header[1] >> 3) & 3, (header[1] >> 1) & 3
+    bitrate_index, rate_index = header[2] >> 4, (header[2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[1 if mpeg1 else 2][bitrate_index] * 1000
+    rate = _MP3_RATES[version][rate_index]
+    samples = 1152 if mpeg1 else 576
+    length = samples // 8 * bitrate // rate + ((header[2] >> 1) & 1)
+    return length, samples, rate, 1 if header[3] >> 6 == 3 else 2
+
+
+def mp3_duration(fh: BinaryIO) -> Dict[str, Any]:
+    head = fh.read(10)
+    start = 0
+    if head[:3] == b"ID3":
+        start = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]) + (10 if head[5] & 0x10 else 0)
+    fh.seek(start)
+    probe = fh.read(4096)
+    offset = next((i for i in range(len(probe) - 3) if _mp3_frame(probe[i:i + 4])), None)
+    if offset is None:
+        raise AudioError("no se encontró un frame MP3")
+    length, samples, rate, channels = _mp3_frame(probe[offset:offset + 4])
+    first = probe[offset:offset + length]
+    for tag in (b"Xing", b"Info"):  # VBR/CBR de LAME: cantidad de frames en el primero
+        at = first.find(tag)
+        if at != -1 and at + 12 <= len(first) and first[at + 7] & 1:
+            count = int.from_bytes(first[at + 8:at + 12], "big")
+            return {"duration": round(count * samples / rate, 3), "sample_rate": rate, "channels": channels}
+    frames = 0
+    position = start + offset
+    while True:
+        fh.seek(position)
+        info = _mp3_frame(fh.read(4))
+        if info is None:
+            break
+        frames += 1
+        position += info[0]
+    return {"duration": round(frames * samples / rate, 3), "sample_rate": rate, "channels": channels}
+
+
+def analyze(fh: BinaryIO, content_type: str, points: int = DEFAULT_POINTS,
+            ffmpeg: Optional[str] = None) -> Dict[str, Any]:
+    """Duración y picos del audio en `fh` (seekable); AudioError si no hay cómo leerlo."""
+    if content_type in WAV_TYPES:
+        try:
+            return analyze_wav(fh, points)
+        except AudioError:
+            if not ffmpeg:
+                raise
+            fh.seek(0)  # WAV float / extensible: que lo lea ffmpeg
+    if ffmpeg:
+        return analyze_ffmpeg(fh, ffmpeg, points)
+    if content_type in MP3_TYPES:
+        return mp3_duration(fh)
+    raise AudioError(f"sin decodificador para {content_type}")
+
+
+# ===================== ANALIZADOR =====================
+class WaveformAnalyzer:
+    def __init__(self, bucket: Any, points: int = DEFAULT_POINTS, ffmpeg: Optional[str] = None):
+        self.bucket = bucket
+        self.points = points
+        self.ffmpeg = ffmpeg
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="waveform")
+                self._pid = os.getpid()
+            return self._executor
+
+    def after_fork(self) -> None:
+        """El thread heredado no existe en el hijo: el worker arma el suyo al primer uso."""
+        self._executor, self._pid = None, None
+        self._lock = threading.Lock()
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def analyze(self, storage_path: str, content_type: str) -> Dict[str, Any]:
+        with self.bucket.open(storage_path) as fh:
+            return analyze(fh, content_type, self.points, self.ffmpeg)
+
+    def _apply(self, repo: Any, content_id: str, storage_path: str, content_type: str) -> Dict[str, Any]:
+        try:
+            result = self.analyze(storage_path, content_type)
+        except AudioError as exc:
+            logger.info("🎵 Sin forma de onda para %s: %s", content_id, exc)
+            repo.update(content_id, {"waveform_status": "unsupported"})
+            raise
+        status = "ready" if "waveform" in result else "duration"  # mp3 sin ffmpeg: solo la duración
+        repo.update(content_id, {**{k: v for k, v in result.items() if v is not None}, "waveform_status": status})
+        return result
+
+    def schedule(self, repo: Any, content_id: str, storage_path: str, content_type: str) -> Future:
+        """Analiza en segundo plano y guarda el resultado en el documento del contenido."""
+        future = self.executor().submit(self._apply, repo, content_id, storage_path, content_type)
+
+        def done(fut: Future) -> None:
+            exc = fut.exception()
+            if exc is not None and not isinstance(exc, AudioError):
+                logger.warning("⚠️ No se pudo analizar el audio %s: %s", content_id, exc)
+
+        future.add_done_callback(done)
+        return future
+
+    def pending(self, repo: Any, force: bool = False) -> Iterator[Any]:
+        for record in repo.list_all():
+            content = record.to_dict() or {}
+            if wants_waveform(content) and (force or not content.get("waveform_status")):
+                yield record
+
+    def backfill(self, repo: Any, limit: Optional[int] = None, force: bool = False,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None, every: float = 5.0) -> Dict[str, Any]:
+        """Analiza en este thread los audios sin forma de onda (el CLI; la app usa `schedule`)."""
+        records = list(self.pending(repo, force))[:limit]
+        stats: Dict[str, Any] = {"pending": len(records), "analyzed": 0, "unsupported": 0, "failed": 0,
+                                 "seconds_of_audio": 0.0}
+        started = last_report = time.perf_counter()
+        for record in records:
+            content = record.to_dict()
+            try:
+                result = self._apply(repo, record.id, content["storage_path"], content.get("content_type") or "")
+                stats["analyzed"] += 1
+                stats["seconds_of_audio"] += result.get("duration") or 0
+            except AudioError:
+                stats["unsupported"] += 1
+            except Exception as exc:
+                stats["failed"] += 1
+                logger.warning("⚠️ No se pudo analizar el audio %s: %s", record.id, exc)
+            if progress is not None and time.perf_counter() - last_report >= every:
+                last_report = time.perf_counter()
+                progress(stats)
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = round(elapsed, 2)
+        stats["realtime_factor"] = round(stats["seconds_of_audio"] / elapsed, 1) if elapsed else 0.0
+        logger.info("🎵 Backfill de formas de onda: %d analizados, %d sin decodificador, %d fallaron (%.0f× tiempo real)",
+                    stats["analyzed"], stats["unsupported"], stats["failed"], stats["realtime_factor"])
+        return stats
+
+
+# ===================== INTEGRACIÓN FLASK =====================
+def init_waveforms(app, bucket: Any, points: int = DEFAULT_POINTS, ffmpeg: Optional[str] = None) -> WaveformAnalyzer:
+    ffmpeg = ffmpeg or shutil.which("ffmpeg")
+    analyzer = WaveformAnalyzer(bucket, points, ffmpeg)
+    app.extensions["waveforms"] = analyzer
+    if not ffmpeg:
+        logger.info("🎵 Formas de onda: solo WAV (sin ffmpeg; los MP3 quedan con la duración)")
+
+    import click
+
+    @app.cli.command("waveforms-backfill")
+    @click.option("--limit", type=int, default=None, help="Como mucho N audios")
+    @click.option("--force", is_flag=True, help="Vuelve a analizar aunque ya tengan forma de onda")
+    def waveforms_backfill(limit: Optional[int], force: bool) -> None:
+        """Calcula duración y forma de onda de los audios existentes."""
+        def progress(stats: Dict[str, Any]) -> None:
+            done = stats["analyzed"] + stats["unsupported"] + stats["failed"]
+            click.echo(f"🎵 {done}/{stats['pending']} · {stats['seconds_of_audio'] / 60:.0f} min de audio")
+
+        stats = analyzer.backfill(app.extensions["repositories"].contents, limit, force, progress)
+        click.echo(f"✅ {stats['analyzed']} analizados, {stats['unsupported']} sin decodificador, "
+                   f"{stats['failed']} fallaron en {stats['seconds']} s ({stats['realtime_factor']}× tiempo real)")
+
+    return analyzer
+
+
+__all__ = [
+    "AudioError",
+    "WaveformAnalyzer",
+    "analyze",
+    "init_waveforms",
+    "wants_waveform",
+]
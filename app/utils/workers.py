@@ -0,0 +1,150 @@
+"""
+Ciclo de vida de los workers de gunicorn (preload_app)
+------------------------------------------------------
+✅ La app se importa una sola vez en el master; los workers la heredan por fork
+✅ when_ready: el master lanza los servicios compartidos (modelo de moderación)
+✅ post_fork: se recrea en cada worker lo que no sobrevive al fork
+   (listener de logging, escritor de captura, sampler del profiler,
+   clientes gRPC de Firestore y conexiones SQLite de datos y de sesiones)
+✅ worker_exit: apagado ordenado del worker (flush de colas y cierre de clientes)
+✅ child_exit: libera las métricas multiproceso del worker que terminó
+
+Lo usan los hooks de gunicorn.conf.py; fuera de gunicorn no hace falta llamarlo.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("PlayTimeUY.workers")
+
+# Módulos que guardan un `firestore_db` propio y el atributo con su app de firebase_admin
+FIRESTORE_HOLDERS = (
+    ("app.config.firebase", "firebase_app"),
+    ("app.main", "_app"),
+    ("app.main.main_routes", "_app"),
+)
+
+
+# ===================== FIRESTORE =====================
+def _new_firestore_client(fb_app: Any) -> Any:
+    from google.cloud import firestore as gcf
+
+    return gcf.Client(project=fb_app.project_id, credentials=fb_app.credential.get_credential())
+
+
+def reset_firestore_clients() -> List[str]:
+    """
+    Un cliente nuevo por app de firebase_admin: el canal gRPC del master no se
+    puede usar desde el hijo. Los repositorios resuelven el cliente al usarlo,
+    así que toman el nuevo sin más cambios.
+    """
+    fresh: Dict[str, Any] = {}
+    reset: List[str] = []
+    for module_name, app_attr in FIRESTORE_HOLDERS:
+        module = sys.modules.get(module_name)
+        fb_app = getattr(module, app_attr, None) if module is not None else None
+        if fb_app is None or getattr(module, "firestore_db", None) is None:
+            continue
+        if fb_app.name not in fresh:
+            fresh[fb_app.name] = _new_firestore_client(fb_app)
+        module.firestore_db = fresh[fb_app.name]
+        reset.append(module_name)
+    return reset
+
+
+def close_firestore_clients() -> int:
+    """Cierra los canales gRPC al apagar (un cliente compartido se cierra una vez)."""
+    closed = set()
+    for module_name, _app_attr in FIRESTORE_HOLDERS:
+        client = getattr(sys.modules.get(module_name), "firestore_db", None)
+        if client is None or id(client) in closed or not hasattr(client, "close"):
+            continue
+        client.close()
+        closed.add(id(client))
+    return len(closed)
+
+
+# ===================== HOOKS =====================
+def master_ready(flask_app: Optional[Any]) -> None:
+    """Hook when_ready (master, antes del primer fork): un servicio de modelo para todos los workers."""
+    if flask_app is None:
+        return
+    from app.utils.classifier import start_service
+
+    start_service(flask_app)
+
+
+def reinit_after_fork(flask_app: Optional[Any] = None) -> None:
+    """Hook post_fork: deja el worker con threads, locks y conexiones propios."""
+    from app.utils.logging_config import restart_listener
+
+    restart_listener()
+    done = ["logging"]
+
+    if flask_app is not None:
+        ext = flask_app.extensions
+        capture = ext.get("traffic_capture")
+        if capture is not None:
+            capture.writer.restart()
+            done.append("captura")
+        profiler = ext.get("profiler")
+        if profiler is not None:
+            profiler.after_fork()
+            done.append("profiler")
+        repos = ext.get("repositories")
+        if repos is not None:
+            repos.after_fork()
+            done.append(f"repositorios ({repos.backend})")
+        sessions = ext.get("sessions")
+        if sessions is not None:
+            sessions.after_fork()
+            done.append("sesiones")
+        teasers = ext.get("teasers")
+        if teasers is not None:
+            teasers.after_fork()
+            done.append("teasers")
+        waveforms = ext.get("waveforms")
+        if waveforms is not None:
+            waveforms.after_fork()
+            done.append("formas de onda")
+        classifier = ext.get("classifier")
+        if classifier is not None:
+            classifier.after_fork()
+            done.append("clasificador")
+
+    try:
+        if reset_firestore_clients():
+            done.append("firestore")
+    except Exception:
+        logger.exception("❌ No se pudo recrear el cliente Firestore en el worker %s", os.getpid())
+
+    logger.info("👷 Worker %s listo: %s", os.getpid(), ", ".join(done))
+
+
+def worker_exiting(flask_app: Optional[Any]) -> None:
+    """Hook worker_exit (corre en el worker, después de que gunicorn drenó sus requests)."""
+    from app.utils.shutdown import shutdown_app
+
+    if flask_app is not None:
+        shutdown_app(flask_app, reason=f"worker {os.getpid()}")
+
+
+def worker_exited(pid: int) -> None:
+    """Hook child_exit (corre en el master)."""
+    from app.utils.metrics import mark_worker_dead
+
+    mark_worker_dead(pid)
+
+
+__all__ = [
+    "close_firestore_clients",
+    "master_ready",
+    "reinit_after_fork",
+    "reset_firestore_clients",
+    "worker_exiting",
+    "worker_exited",
+]
@@ -0,0 +1,20 @@
+# asgi.py - Entrada ASGI de PlayTimeUY
+"""
+Misma app que run_new.py (config, seguridad, proxy) más las rutas async de
+login / pagos / webhooks. Lo que no tiene variante async lo atiende Flask.
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 2 --proxy-headers
+"""
+from __future__ import annotations
+
+import os
+
+from app.asgi import create_asgi_app
+from run_new import _env_bool, _env_int, app as flask_app
+
+app = create_asgi_app(
+    flask_app,
+    force_https=_env_bool("FORCE_HTTPS", True),
+    wsgi_threads=_env_int("ASGI_WSGI_THREADS", 8),
+    mp_base_url=os.getenv("MP_API_BASE"),
+)
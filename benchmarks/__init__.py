@@ -0,0 +1,10 @@
+"""
+Benchmarks offline de PlayTimeUY.
+
+Levantan `create_app()` contra stand-ins locales de Firestore, Identity Toolkit
+y Mercado Pago (sin credenciales ni red) y miden throughput y latencias
+p50/p95/p99 por endpoint:
+
+    python -m benchmarks.run --concurrency 8 --requests 200
+    python -m benchmarks.run --compare benchmarks/results/<anterior>.json
+"""
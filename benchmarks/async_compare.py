@@ -0,0 +1,254 @@
+"""
+Comparación sync (gthread) vs async (ASGI) por worker
+-----------------------------------------------------
+✅ Misma app, mismos datos y mismos stand-ins con latencia de red simulada
+✅ Sync: un worker WSGI con N threads (como `gunicorn --threads N`)
+✅ Async: un worker uvicorn (un event loop) con las rutas de app/asgi
+✅ Reporta req/s, p50/p95/p99 y requests ejecutándose a la vez dentro del worker
+
+Uso:
+    python -m benchmarks.async_compare --concurrency 32 --requests 600
+    python -m benchmarks.async_compare --threads 2 --auth-latency-ms 80 --mp-latency-ms 150
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.harness import BenchApp, build_bench_app, build_bench_asgi
+from benchmarks.run import DEFAULT_OUTPUT, git_label, print_comparison, print_report, run_load
+
+ASYNC_SCENARIOS = ("login", "payment", "webhook")
+
+
+# =========================================================
+# Concurrencia del lado del servidor
+# =========================================================
+class ActiveRequests:
+    """Promedio ponderado en el tiempo y máximo de requests ejecutándose a la vez."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self._area = 0.0
+        self._last = time.perf_counter()
+        self._start = self._last
+
+    def _move(self, delta: int) -> None:
+        with self._lock:
+            now = time.perf_counter()
+            self._area += self.active * (now - self._last)
+            self._last = now
+            self.active += delta
+            self.peak = max(self.peak, self.active)
+
+    def enter(self) -> None:
+        self._move(1)
+
+    def leave(self) -> None:
+        self._move(-1)
+
+    def snapshot(self) -> Dict[str, float]:
+        self._move(0)
+        elapsed = self._last - self._start
+        return {"avg": round(self._area / elapsed, 2) if elapsed else 0.0, "peak": self.peak}
+
+
+def count_wsgi(app: Callable, counter: ActiveRequests) -> Callable:
+    def wrapped(environ, start_response):
+        counter.enter()
+        try:
+            app_iter = app(environ, start_response)
+            try:
+                return list(app_iter)  # las respuestas medidas son chicas
+            finally:
+                if hasattr(app_iter, "close"):  # WSGI: sin close() el apagado ve requests eternamente en curso
+                    app_iter.close()
+        finally:
+            counter.leave()
+
+    return wrapped
+
+
+def count_asgi(app: Any, counter: ActiveRequests) -> Callable:
+    async def wrapped(scope, receive, send):
+        if scope["type"] != "http":
+            return await app(scope, receive, send)
+        counter.enter()
+        try:
+            await app(scope, receive, send)
+        finally:
+            counter.leave()
+
+    return wrapped
+
+
+# =========================================================
+# Servidores
+# =========================================================
+def serve_gthread(app: Callable, threads: int) -> Tuple[str, Callable[[], None]]:
+    """WSGI con un pool fijo de threads: las conexiones esperan turno como en gunicorn gthread."""
+    from werkzeug.serving import BaseWSGIServer
+
+    class PooledServer(BaseWSGIServer):
+        pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="gthread")
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._work, request, client_address)
+
+        def _work(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledServer("127.0.0.1", 0, app)
+    server.request_queue_size = 1024
+    thread = threading.Thread(target=server.serve_forever, name="bench-gthread", daemon=True)
+    thread.start()
+
+    def stop() -> None:
+        server.shutdown()
+        PooledServer.pool.shutdown(wait=False, cancel_futures=True)
+
+    return f"http://127.0.0.1:{server.server_port}", stop
+
+
+def serve_asgi(asgi_app: Any) -> Tuple[str, Callable[[], None]]:
+    """uvicorn en un thread propio (un event loop = un worker)."""
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(1024)
+    config = uvicorn.Config(asgi_app, lifespan="on", log_level="warning", access_log=False,
+                            loop="asyncio", http="h11", backlog=1024)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, name="bench-uvicorn", daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.02)
+
+    def stop() -> None:
+        server.should_exit = True
+        thread.join(timeout=10)
+        sock.close()
+
+    return f"http://127.0.0.1:{sock.getsockname()[1]}", stop
+
+
+# =========================================================
+# Ejecución
+# =========================================================
+def _run_mode(mode: str, bench: BenchApp, args: argparse.Namespace) -> Dict[str, Any]:
+    counter = ActiveRequests()
+    if mode == "sync":
+        base_url, stop = serve_gthread(count_wsgi(bench.app, counter), args.threads)
+    else:
+        base_url, stop = serve_asgi(count_asgi(build_bench_asgi(bench, wsgi_threads=args.threads), counter))
+    try:
+        summary = run_load(bench, base_url, args.scenarios, args.concurrency,
+                           args.duration, args.requests, seed=args.seed)
+    finally:
+        stop()
+    result = {
+        "label": f"{args.label}-{mode}",
+        "mode": mode,
+        "params": {
+            "concurrency": args.concurrency,
+            "threads": args.threads,
+            "scenarios": args.scenarios,
+            "backend": args.backend,
+            "firestore_latency_ms": args.latency_ms,
+            "auth_latency_ms": args.auth_latency_ms,
+            "mp_latency_ms": args.mp_latency_ms,
+        },
+        "server_concurrency": counter.snapshot(),
+        **summary,
+    }
+    print_report(result)
+    conc = result["server_concurrency"]
+    print(f"⚙️  Requests ejecutándose a la vez en el worker: promedio {conc['avg']}, pico {conc['peak']}")
+    return result
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Sync (gthread) vs async (ASGI) por worker")
+    p.add_argument("--concurrency", type=int, default=32, help="Usuarios virtuales simultáneos")
+    p.add_argument("--threads", type=int, default=2, help="Threads del worker sync (y del puente WSGI)")
+    p.add_argument("--duration", type=float, default=None)
+    p.add_argument("--requests", type=int, default=None)
+    p.add_argument("--scenarios", default=",".join(ASYNC_SCENARIOS))
+    p.add_argument("--modes", default="sync,async")
+    p.add_argument("--backend", choices=("firestore", "sqlite"), default="firestore")
+    p.add_argument("--latency-ms", type=float, default=15.0, help="Latencia por RPC de Firestore")
+    p.add_argument("--auth-latency-ms", type=float, default=80.0)
+    p.add_argument("--mp-latency-ms", type=float, default=120.0)
+    p.add_argument("--buyers", type=int, default=100)
+    p.add_argument("--creators", type=int, default=20)
+    p.add_argument("--seed", type=int, default=1234)
+    p.add_argument("--label", default=None)
+    p.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = p.parse_args(argv)
+    if args.duration is None and args.requests is None:
+        args.requests = 400
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    args.modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = set(args.modes) - {"sync", "async"}
+    if unknown:
+        p.error(f"Modos desconocidos: {', '.join(sorted(unknown))}")
+    args.label = args.label or git_label()
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.getLogger("PlayTimeUY").setLevel(logging.WARNING)
+
+    bench = build_bench_app(
+        firestore_latency_ms=args.latency_ms,
+        auth_latency_ms=args.auth_latency_ms,
+        mp_latency_ms=args.mp_latency_ms,
+        buyers=args.buyers,
+        creators=args.creators,
+        backend=args.backend,
+    )
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        for mode in args.modes:
+            results[mode] = _run_mode(mode, bench, args)
+    finally:
+        bench.close()
+
+    if "sync" in results and "async" in results:
+        sync, asyn = results["sync"], results["async"]
+        print_comparison(sync, asyn)
+        print(f"{'(concurrencia / worker)':32} {sync['server_concurrency']['avg']:>8} → "
+              f"{asyn['server_concurrency']['avg']} (pico {sync['server_concurrency']['peak']} → "
+              f"{asyn['server_concurrency']['peak']})")
+
+    os.makedirs(args.output, exist_ok=True)
+    out_path = os.path.join(args.output, f"{args.label}-async-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(out_path, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados guardados en {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,364 @@
+"""
+Store de medios por sha256 (app/utils/blobstore.py)
+---------------------------------------------------
+✅ Controles (test client, bucket local):
+     - dos creadoras suben el mismo archivo (streaming y subida directa) → un solo
+       objeto en blobs/ab/cd/<sha256>, refs = 3, las tres URLs de /media sirven lo mismo
+     - baja de contenido → refs baja, /media 404, baja repetida → 404, ajena → 403
+     - GC: respeta el período de gracia, borra objeto + documento y staging vencido;
+       re-subir después del GC vuelve a crear el blob
+✅ Concurrencia: varios procesos (como los workers de gunicorn) suman referencias
+   al mismo sha256 sobre el mismo SQLite → refs exacto y un solo objeto
+✅ Directorio plano vs fan-out ab/cd: stat / open de nombres al azar con --files archivos
+✅ Bytes ahorrados con un feed de --posts publicaciones donde --repost-pct son re-subidas
+
+Sale con código 1 si falla algún control.
+
+Uso:
+    python -m benchmarks.blob_store
+    python -m benchmarks.blob_store --files 100000 --posts 2000 --repost-pct 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.harness import ensure_importable
+from benchmarks.streaming_uploads import MP4_HEAD, multipart, post_body
+
+CREATORS = ("creator-blob-a", "creator-blob-b")
+BUYER = "buyer-blob"
+
+
+# =========================================================
+# App de prueba
+# =========================================================
+def create_bench_app(workdir: str):
+    ensure_importable()
+    from flask import jsonify
+
+    from app import create_app
+    from app.main.main_routes import set_current_user
+    from app.utils.csrf import generate_csrf_token
+
+    app = create_app({
+        "SECRET_KEY": "bench-secret",
+        "DATA_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "bench.sqlite"),
+        "MEDIA_ROOT": os.path.join(workdir, "media"),
+        "UPLOAD_BACKEND": "local",
+        "FORCE_HTTPS": False,
+        "DEBUG": False,
+        "PROFILING_ENABLED": False,
+        "METRICS_ENABLED": False,
+        "COMPRESSION_ENABLED": False,
+    })
+
+    def login(uid: str):
+        set_current_user({"uid": uid, "role": "buyer" if uid == BUYER else "creator"})
+        return jsonify({"ok": True, "csrf_token": generate_csrf_token()})
+
+    app.add_url_rule("/bench/login/<uid>", "bench_login", login, methods=["POST"])
+    return app
+
+
+def seed(app) -> None:
+    users = app.extensions["repositories"].users
+    for uid in (*CREATORS, BUYER):
+        role = "buyer" if uid == BUYER else "creator"
+        users.create(uid, {"uid": uid, "username": uid, "role": role, "email": f"{uid}@playtimeuy.test"})
+
+
+def _client(app, uid: str):
+    client = app.test_client()
+    token = client.post(f"/bench/login/{uid}").get_json()["csrf_token"]
+    client.environ_base["HTTP_X_CSRF_TOKEN"] = token
+    return client, token
+
+
+def _stream_upload(client, token: str, data: bytes) -> Dict[str, Any]:
+    body, ctype = multipart({"_csrf": token, "title": "Clip", "visibility": "public"}, "file", "clip.mp4", data)
+    r, _ = post_body(client, "/uploads/content", body, ctype)
+    return {"status": r.status_code, **(r.get_json() or {})}
+
+
+def _direct_upload(client, data: bytes) -> Dict[str, Any]:
+    r = client.post("/uploads/sessions", json={
+        "kind": "content", "content_type": "video/mp4", "size": len(data), "visibility": "public",
+    })
+    session = r.get_json()
+    client.put(session["upload"]["url"], data=data)
+    r = client.post(session["complete_url"])
+    return {"status": r.status_code, **(r.get_json() or {})}
+
+
+def _objects(root: str, prefix: str) -> List[str]:
+    found = []
+    for dirpath, _dirs, files in os.walk(os.path.join(root, prefix)):
+        found.extend(os.path.join(dirpath, f) for f in files)
+    return found
+
+
+# =========================================================
+# Controles
+# =========================================================
+def run_checks(app) -> List[str]:
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    repos = app.extensions["repositories"]
+    store = app.extensions["blobs"]
+    root = app.config["MEDIA_ROOT"]
+    (a, token_a), (b, token_b) = _client(app, CREATORS[0]), _client(app, CREATORS[1])
+    buyer, _ = _client(app, BUYER)
+    video = MP4_HEAD + random.Random(11).randbytes(1024 * 1024)
+    sha = hashlib.sha256(video).hexdigest()
+    name = store.name_for(sha)
+
+    first = _stream_upload(a, token_a, video)
+    second = _stream_upload(b, token_b, video)
+    third = _direct_upload(b, video)
+    expect("ruta con fan-out blobs/ab/cd/<sha256>", name == f"blobs/{sha[:2]}/{sha[2:4]}/{sha}"
+           and os.path.isfile(os.path.join(root, name)))
+    expect("primera subida guarda, las repetidas no copian", first["status"] == 201 and not first["deduplicated"]
+           and second["status"] == 201 and second["deduplicated"] and third["status"] == 200 and third["deduplicated"])
+    expect("un solo objeto en el store y sin staging colgado", _objects(root, "blobs") == [os.path.join(root, name)]
+           and not _objects(root, "staging"))
+    expect("refs = 3", repos.blobs.get(sha).get("refs") == 3)
+    urls = [first["url"], second["url"], third["url"]]
+    expect("las tres publicaciones se sirven por /media",
+           all(app.test_client().get(u).data == video for u in urls))
+
+    expect("baja ajena → 403", buyer.delete(f"/uploads/content/{first['content_id']}").status_code == 403)
+    expect("baja sin CSRF → 403", app.test_client().delete(f"/uploads/content/{first['content_id']}").status_code == 403)
+    r = a.delete(f"/uploads/content/{first['content_id']}")
+    expect("baja de la dueña → 200 y refs = 2", r.status_code == 200 and repos.blobs.get(sha).get("refs") == 2)
+    expect("contenido dado de baja → /media 404", app.test_client().get(first["url"]).status_code == 404)
+    expect("baja repetida → 404 sin soltar otra referencia",
+           a.delete(f"/uploads/content/{first['content_id']}").status_code == 404
+           and repos.blobs.get(sha).get("refs") == 2)
+    for content_id in (second["content_id"], third["content_id"]):
+        b.delete(f"/uploads/content/{content_id}")
+    expect("sin contenidos → refs = 0", repos.blobs.get(sha).get("refs") == 0)
+
+    # Subida directa abandonada: queda en staging/
+    abandoned = b.post("/uploads/sessions", json={"kind": "content", "content_type": "video/mp4",
+                                                   "size": len(video), "visibility": "public"}).get_json()
+    b.put(abandoned["upload"]["url"], data=video[:1000],
+          headers={"Content-Range": f"bytes 0-999/{len(video)}"})
+    stats = store.collect_garbage(repos.blobs)
+    expect("GC respeta el período de gracia", stats["blobs"] == 0 and repos.blobs.get(sha).exists
+           and os.path.isfile(os.path.join(root, name)) and stats["staging"] == 0)
+    stats = store.collect_garbage(repos.blobs, now=time.time() + 7 * 24 * 3600)
+    expect("GC borra objeto, documento y staging vencido", stats["blobs"] == 1 and stats["bytes"] == len(video)
+           and not repos.blobs.get(sha).exists and not _objects(root, "blobs")
+           and stats["staging"] == 1 and not _objects(root, "staging"))
+
+    again = _stream_upload(a, token_a, video)
+    expect("re-subir después del GC crea el blob de nuevo", again["status"] == 201 and not again["deduplicated"]
+           and repos.blobs.get(sha).get("refs") == 1 and app.test_client().get(again["url"]).data == video)
+
+    # Una subida suma la referencia entre la consulta del GC y su transacción: no se borra
+    repos.blobs.transact(sha, lambda doc: {**doc, "refs": 0})
+    unreferenced = repos.blobs.unreferenced
+
+    def racing(limit: Optional[int] = None) -> List[Any]:
+        found = unreferenced(limit)
+        for record in found:
+            store._acquire(repos.blobs, record.id, {})
+        return found
+
+    repos.blobs.unreferenced = racing
+    stats = store.collect_garbage(repos.blobs, now=time.time() + 7 * 24 * 3600)
+    repos.blobs.unreferenced = unreferenced
+    expect("GC no borra un blob que recuperó referencias", stats["blobs"] == 0
+           and repos.blobs.get(sha).get("refs") == 1 and os.path.isfile(os.path.join(root, name)))
+    return failures
+
+
+# =========================================================
+# Concurrencia entre procesos
+# =========================================================
+def _acquire_worker(args: Any) -> int:
+    sqlite_path, media_root, data_path, sha, rounds = args
+    ensure_importable()
+    from app.repositories.sqlite import build_sqlite_repositories
+    from app.utils.blobstore import BlobStore
+    from app.utils.uploads import LocalBucket
+
+    repos = build_sqlite_repositories(sqlite_path)
+    store = BlobStore(LocalBucket(media_root))
+    stored = 0
+    for _ in range(rounds):
+        tmp = os.path.join(media_root, ".incoming", f"w{os.getpid()}-{random.random()}")
+        os.makedirs(os.path.dirname(tmp), exist_ok=True)
+        shutil.copyfile(data_path, tmp)
+        _name, dedup = store.put_file(repos.blobs, tmp, sha, "video/mp4", os.path.getsize(tmp))
+        stored += not dedup
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    repos.close()
+    return stored
+
+
+def run_concurrency(workdir: str, processes: int, rounds: int) -> Dict[str, Any]:
+    ensure_importable()
+    from app.repositories.sqlite import build_sqlite_repositories
+
+    sqlite_path = os.path.join(workdir, "concurrency.sqlite")
+    media_root = os.path.join(workdir, "concurrency-media")
+    data = MP4_HEAD + random.Random(21).randbytes(256 * 1024)
+    data_path = os.path.join(workdir, "concurrency.mp4")
+    with open(data_path, "wb") as fh:
+        fh.write(data)
+    sha = hashlib.sha256(data).hexdigest()
+    build_sqlite_repositories(sqlite_path).close()  # crea las tablas antes de los workers
+
+    t0 = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes) as pool:
+        stored = sum(pool.map(_acquire_worker, [(sqlite_path, media_root, data_path, sha, rounds)] * processes))
+    elapsed = time.perf_counter() - t0
+
+    repos = build_sqlite_repositories(sqlite_path)
+    refs = repos.blobs.get(sha).get("refs")
+    repos.close()
+    return {"expected": processes * rounds, "refs": refs, "stored": stored,
+            "objects": len(_objects(media_root, "blobs")), "ms": round(elapsed * 1000)}
+
+
+# =========================================================
+# Plano vs fan-out
+# =========================================================
+def run_layout(workdir: str, files: int, probes: int) -> Dict[str, Dict[str, float]]:
+    rng = random.Random(5)
+    names = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(files)]
+    layouts = {
+        "plano (1 directorio)": ("flat", lambda n: os.path.join("flat", n)),
+        "fan-out ab/cd/": ("sharded", lambda n: os.path.join("sharded", n[:2], n[2:4], n)),
+    }
+    results: Dict[str, Dict[str, float]] = {}
+    for label, (top, path_of) in layouts.items():
+        t0 = time.perf_counter()
+        for n in names:
+            path = os.path.join(workdir, path_of(n))
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_WRONLY, 0o644)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd = os.open(path, os.O_CREAT | os.O_WRONLY, 0o644)
+            os.close(fd)
+        create = time.perf_counter() - t0
+
+        sample = [rng.choice(names) for _ in range(probes)]
+        t0 = time.perf_counter()
+        for n in sample:
+            os.stat(os.path.join(workdir, path_of(n)))
+        stat = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for n in sample:
+            with open(os.path.join(workdir, path_of(n)), "rb"):
+                pass
+        opened = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        largest = max(len(os.listdir(d)) for d, _sub, _f in os.walk(os.path.join(workdir, top)))
+        listing = time.perf_counter() - t0
+        results[label] = {
+            "create_us": create / files * 1e6,
+            "stat_us": stat / probes * 1e6,
+            "open_us": opened / probes * 1e6,
+            "max_entries": largest,
+            "walk_ms": listing * 1000,
+        }
+    return results
+
+
+# =========================================================
+# Bytes ahorrados
+# =========================================================
+def run_savings(app, posts: int, repost_pct: int, size_kb: int) -> Dict[str, Any]:
+    rng = random.Random(9)
+    client, token = _client(app, CREATORS[1])
+    root = app.config["MEDIA_ROOT"]
+    before = sum(os.path.getsize(p) for p in _objects(root, "blobs"))
+    originals: List[bytes] = []
+    uploaded = deduplicated = 0
+    t0 = time.perf_counter()
+    for _ in range(posts):
+        if originals and rng.randrange(100) < repost_pct:
+            data = rng.choice(originals)
+        else:
+            data = MP4_HEAD + rng.randbytes(size_kb * 1024)
+            originals.append(data)
+        result = _stream_upload(client, token, data)
+        uploaded += len(data)
+        deduplicated += bool(result.get("deduplicated"))
+    elapsed = time.perf_counter() - t0
+    stored = sum(os.path.getsize(p) for p in _objects(root, "blobs")) - before
+    return {"posts": posts, "deduplicated": deduplicated, "uploaded_mb": uploaded / 2**20,
+            "stored_mb": stored / 2**20, "saved_pct": 100 * (1 - stored / uploaded) if uploaded else 0.0,
+            "ms_per_post": elapsed * 1000 / posts}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Store de medios por sha256")
+    p.add_argument("--files", type=int, default=50_000, help="Archivos para comparar plano vs fan-out")
+    p.add_argument("--probes", type=int, default=5_000, help="stat / open al azar por layout")
+    p.add_argument("--processes", type=int, default=4, help="Procesos sumando referencias al mismo blob")
+    p.add_argument("--rounds", type=int, default=50, help="Subidas por proceso")
+    p.add_argument("--posts", type=int, default=400)
+    p.add_argument("--repost-pct", type=int, default=30)
+    p.add_argument("--size-kb", type=int, default=256)
+    args = p.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="ptuy-blobs-")
+    try:
+        app = create_bench_app(workdir)
+        seed(app)
+
+        print("🧬 Controles (test client)")
+        failures = run_checks(app)
+
+        c = run_concurrency(workdir, args.processes, args.rounds)
+        ok = c["refs"] == c["expected"] and c["stored"] == 1 and c["objects"] == 1
+        print(f"\n🔀 {args.processes} procesos × {args.rounds} subidas del mismo archivo: refs={c['refs']} "
+              f"(esperado {c['expected']}), guardado {c['stored']} vez, {c['objects']} objeto, {c['ms']} ms")
+        print(f"  {'✅' if ok else '❌'} referencias exactas entre procesos")
+        if not ok:
+            failures.append("referencias exactas entre procesos")
+
+        print(f"\n📁 {args.files} archivos, {args.probes} accesos al azar")
+        print(f"{'Layout':<24}{'crear µs':>10}{'stat µs':>10}{'open µs':>10}{'máx entradas':>14}{'walk ms':>10}")
+        for label, row in run_layout(os.path.join(workdir, "layout"), args.files, args.probes).items():
+            print(f"{label:<24}{row['create_us']:>10.1f}{row['stat_us']:>10.1f}{row['open_us']:>10.1f}"
+                  f"{row['max_entries']:>14}{row['walk_ms']:>10.1f}")
+
+        s = run_savings(app, args.posts, args.repost_pct, args.size_kb)
+        print(f"\n💾 {s['posts']} publicaciones ({args.repost_pct}% re-subidas): {s['deduplicated']} deduplicadas, "
+              f"subidos {s['uploaded_mb']:.1f} MB, guardados {s['stored_mb']:.1f} MB "
+              f"({s['saved_pct']:.0f}% menos), {s['ms_per_post']:.1f} ms por publicación")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        return 1
+    print("\n✅ Store por sha256 correcto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Costo por request del CSRF: token en sesión (antes) vs token firmado (ahora)
+---------------------------------------------------------------------------
+✅ Misma app (create_app sobre SQLite), mismas rutas de prueba; solo cambia
+   cómo se obtiene y verifica el token
+✅ "sesion": lo que hacían `_get_csrf_token` / `csrf_protect` (token aleatorio
+   guardado en la cookie de sesión)
+✅ "firmado": app/utils/csrf.py (HMAC del id de sesión; solo escribe la sesión
+   para darle un `_sid` propio al visitante que todavía no tiene)
+✅ Escenarios: primera visita (sin cookie), visita con sesión, POST validado
+✅ Reporta µs por request (p50 / p95), Set-Cookie por request y bytes de cookie
+
+Uso:
+    python -m benchmarks.csrf_overhead
+    python -m benchmarks.csrf_overhead --requests 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import secrets
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.harness import ensure_importable
+
+MODES = ("sesion", "firmado")
+PAGE = "<form method='post'><input type='hidden' name='_csrf' value='{{ csrf_token }}'></form>"
+
+
+# =========================================================
+# Implementación anterior (copia de la que reemplazó app/utils/csrf.py)
+# =========================================================
+def _session_token() -> str:
+    from flask import session
+
+    if "_csrf" not in session:
+        session["_csrf"] = secrets.token_urlsafe(32)
+    return session["_csrf"]
+
+
+def _session_check(sent: Optional[str]) -> bool:
+    from flask import session
+
+    return bool(sent) and secrets.compare_digest(sent, session.get("_csrf", ""))
+
+
+# =========================================================
+# App de prueba
+# =========================================================
+def create_bench_app(workdir: str):
+    ensure_importable()
+    from flask import jsonify, render_template_string, request, session
+
+    from app import create_app
+    from app.utils.csrf import generate_csrf_token, start_session, validate_csrf_token
+
+    app = create_app({
+        "SECRET_KEY": "bench-secret",
+        "DATA_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "csrf.db"),
+        "FORCE_HTTPS": False,
+        "DEBUG": False,
+        "PROFILING_ENABLED": False,
+        "METRICS_ENABLED": False,
+        "COMPRESSION_ENABLED": False,
+    })
+    issue: Dict[str, Callable[[], str]] = {"sesion": _session_token, "firmado": generate_csrf_token}
+    check: Dict[str, Callable[[Optional[str]], bool]] = {"sesion": _session_check, "firmado": validate_csrf_token}
+
+    def login(mode: str):
+        session["user"] = {"uid": "bench-user", "email": "bench@playtimeuy.test", "role": "fan"}
+        if mode == "firmado":
+            start_session(session)
+        return jsonify({"ok": True, "csrf_token": issue[mode]()})
+
+    def page(mode: str):
+        return render_template_string(PAGE, csrf_token=issue[mode]())
+
+    def submit(mode: str):
+        if not check[mode](request.headers.get("X-CSRF-Token")):
+            return jsonify({"ok": False, "error": "CSRF inválido"}), 403
+        return jsonify({"ok": True})
+
+    app.add_url_rule("/bench/csrf/<mode>/login", "bench_csrf_login", login, methods=["POST"])
+    app.add_url_rule("/bench/csrf/<mode>/page", "bench_csrf_page", page)
+    app.add_url_rule("/bench/csrf/<mode>/submit", "bench_csrf_submit", submit, methods=["POST"])
+    return app
+
+
+# =========================================================
+# Medición
+# =========================================================
+def _measure(call: Callable[[], Any], n: int) -> Dict[str, Any]:
+    times: List[float] = []
+    set_cookie = 0
+    statuses: Dict[int, int] = {}
+    for _ in range(n):
+        t0 = time.perf_counter()
+        resp = call()
+        times.append((time.perf_counter() - t0) * 1e6)
+        set_cookie += "Set-Cookie" in resp.headers
+        statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+    times.sort()
+    return {
+        "p50_us": round(statistics.median(times), 1),
+        "p95_us": round(times[int(len(times) * 0.95) - 1], 1),
+        "set_cookie": round(set_cookie / n, 3),
+        "status": statuses,
+    }
+
+
+def _cookie_bytes(client) -> int:
+    cookie = client.get_cookie("session")
+    return len(cookie.value) if cookie is not None else 0
+
+
+def run_mode(app, mode: str, n: int) -> Dict[str, Dict[str, Any]]:
+    base = f"/bench/csrf/{mode}"
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def first_visit():
+        # Cliente nuevo en cada request: visitante sin cookie o sesión recién limpiada
+        return app.test_client().get(f"{base}/page")
+
+    results["GET primera visita"] = _measure(first_visit, n)
+
+    client = app.test_client()
+    token = client.post(f"{base}/login").get_json()["csrf_token"]
+    cookie = _cookie_bytes(client)
+    results["GET con sesión"] = _measure(lambda: client.get(f"{base}/page"), n)
+    results["POST validado"] = _measure(
+        lambda: client.post(f"{base}/submit", headers={"X-CSRF-Token": token}), n)
+    results["POST token ajeno"] = _measure(
+        lambda: client.post(f"{base}/submit", headers={"X-CSRF-Token": "x" + token[1:]}), max(1, n // 10))
+    for row in results.values():
+        row["cookie_bytes"] = cookie
+    return results
+
+
+def micro(n: int) -> Dict[str, float]:
+    """Costo puro de emitir / verificar un token firmado (sin Flask)."""
+    from app.utils.csrf import CsrfTokens
+
+    tokens = CsrfTokens({"SECRET_KEY": "bench-secret"})
+    t0 = time.perf_counter()
+    for _ in range(n):
+        token = tokens.issue("s:bench")
+    issue_us = (time.perf_counter() - t0) / n * 1e6
+    t0 = time.perf_counter()
+    for _ in range(n):
+        tokens.check(token, "s:bench")
+    check_us = (time.perf_counter() - t0) / n * 1e6
+    return {"issue_us": round(issue_us, 2), "check_us": round(check_us, 2)}
+
+
+def print_table(results: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+    print(f"\n{'Escenario':<22}{'Modo':<10}{'p50 µs':>10}{'p95 µs':>10}{'Set-Cookie/req':>16}{'cookie B':>10}  status")
+    for scenario in results[MODES[0]]:
+        for mode in MODES:
+            row = results[mode][scenario]
+            print(f"{scenario:<22}{mode:<10}{row['p50_us']:>10}{row['p95_us']:>10}{row['set_cookie']:>16}"
+                  f"{row['cookie_bytes']:>10}  {row['status']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Overhead por request del CSRF (sesión vs firmado)")
+    p.add_argument("--requests", type=int, default=2000, help="Requests por escenario y modo")
+    args = p.parse_args(argv)
+
+    app = create_bench_app(tempfile.mkdtemp(prefix="ptuy-csrf-"))
+    for mode in MODES:  # calentamiento: templates compilados, imports perezosos
+        run_mode(app, mode, 50)
+    results = {mode: run_mode(app, mode, args.requests) for mode in MODES}
+    print_table(results)
+    print(f"\n🔐 Token firmado sin Flask: {micro(args.requests * 10)}")
+
+    signed = results["firmado"]
+    ok = (
+        signed["GET primera visita"]["set_cookie"] == 1  # el `_sid` del visitante, una sola vez
+        and signed["GET con sesión"]["set_cookie"] == 0
+        and signed["POST validado"]["status"] == {200: args.requests}
+        and set(signed["POST token ajeno"]["status"]) == {403}
+    )
+    print("✅ Sin Set-Cookie al renderizar con sesión y validación correcta" if ok else "❌ El modo firmado no cumple lo esperado")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
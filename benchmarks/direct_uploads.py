@@ -0,0 +1,344 @@
+"""
+Subidas directas al bucket vs subida a través del worker
+-------------------------------------------------------
+✅ Controles en proceso (bucket local): sesión → PUT por tramos (308 / Range) →
+   confirmación → el contenido se ve en /media; tipo falso, tamaño distinto,
+   subida incompleta, ticket ajeno o adulterado, avatar y límites
+✅ Con gunicorn real (1 worker, 2 threads como en producción chica): N clientes
+   lentos (celular) suben archivos mientras otro cliente pide una página liviana
+     - "worker": multipart a una vista que guarda request.files (como profile_edit)
+     - "directo": sesión + PUT al bucket local en otro proceso (LocalBucketApp,
+       el papel de GCS) + confirmación
+✅ Reporta la latencia de la página liviana (p50 / p95 / máx) en cada modo
+
+Sale con código 1 si falla algún control.
+
+Uso:
+    python -m benchmarks.direct_uploads
+    python -m benchmarks.direct_uploads --clients 8 --kbps 128
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from typing import Any, Dict, Iterator, List, Optional
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CREATOR = "creator-uploads"
+BUYER = "buyer-uploads"
+MP4_HEAD = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom"
+PNG_HEAD = b"\x89PNG\r\n\x1a\n"
+
+
+# =========================================================
+# App de prueba (la carga gunicorn)
+# =========================================================
+def create_bench_app():
+    from benchmarks.harness import ensure_importable
+
+    ensure_importable()
+    from flask import current_app, jsonify, request
+    from werkzeug.utils import secure_filename
+
+    from app import create_app
+    from app.main.main_routes import set_current_user
+    from app.utils.csrf import generate_csrf_token
+
+    workdir = os.environ["DU_WORKDIR"]
+    app = create_app({
+        "SECRET_KEY": "bench-secret",
+        "DATA_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "bench.sqlite"),
+        "MEDIA_ROOT": os.path.join(workdir, "media"),
+        "UPLOAD_BACKEND": "local",
+        "UPLOAD_LOCAL_URL": os.environ.get("DU_BUCKET_URL"),
+        "FORCE_HTTPS": False,
+        "DEBUG": False,
+        "PROFILING_ENABLED": False,
+        "METRICS_ENABLED": False,
+    })
+
+    def login(uid: str):
+        set_current_user({"uid": uid, "role": "creator" if uid == CREATOR else "buyer"})
+        return jsonify({"ok": True, "csrf_token": generate_csrf_token()})
+
+    def inline_upload():
+        # Lo que hace profile_edit: el archivo entero pasa por el thread del worker
+        file = request.files["file"]
+        path = os.path.join(current_app.config["MEDIA_ROOT"], "inline", secure_filename(file.filename))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file.save(path)
+        return jsonify({"ok": True})
+
+    def ping():
+        return jsonify({"ok": True})
+
+    app.add_url_rule("/bench/login/<uid>", "bench_login", login, methods=["POST"])
+    app.add_url_rule("/bench/upload/inline", "bench_inline_upload", inline_upload, methods=["POST"])
+    app.add_url_rule("/bench/ping", "bench_ping", ping)
+    return app
+
+
+def seed(app) -> None:
+    users = app.extensions["repositories"].users
+    for uid, role in ((CREATOR, "creator"), (BUYER, "buyer")):
+        users.create(uid, {"uid": uid, "username": uid, "role": role, "email": f"{uid}@playtimeuy.test"})
+
+
+# =========================================================
+# Controles en proceso
+# =========================================================
+def _client(app, uid: str):
+    client = app.test_client()
+    token = client.post(f"/bench/login/{uid}").get_json()["csrf_token"]
+    client.environ_base["HTTP_X_CSRF_TOKEN"] = token
+    return client
+
+
+def _start(client, kind: str, content_type: str, size: int) -> Any:
+    return client.post("/uploads/sessions", json={
+        "kind": kind, "content_type": content_type, "size": size, "title": "Prueba", "visibility": "public",
+    })
+
+
+def run_checks(app) -> List[str]:
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    creator, buyer = _client(app, CREATOR), _client(app, BUYER)
+    data = MP4_HEAD + random.Random(3).randbytes(700_000)
+    size = len(data)
+
+    r = _start(creator, "content", "video/mp4", size)
+    session = r.get_json()
+    expect("sesión creada (201) con URL PUT", r.status_code == 201 and session["upload"]["method"] == "PUT")
+    url, complete = session["upload"]["url"], session["complete_url"]
+
+    expect("confirmar antes de subir → 409", creator.post(complete).status_code == 409)
+    half = size // 2
+    r = creator.put(url, data=data[:half], headers={"Content-Range": f"bytes 0-{half - 1}/{size}"})
+    expect("primer tramo → 308 con Range", r.status_code == 308 and r.headers.get("Range") == f"bytes=0-{half - 1}")
+    r = creator.put(url, headers={"Content-Range": f"bytes */{size}"})
+    expect("consulta de estado → 308 con lo recibido", r.status_code == 308
+           and r.headers.get("Range") == f"bytes=0-{half - 1}")
+    r = creator.put(url, data=data[half:], headers={"Content-Range": f"bytes {half}-{size - 1}/{size}"})
+    expect("último tramo → 200", r.status_code == 200)
+    expect("ticket ajeno → 403", buyer.post(complete).status_code == 403)
+    tampered = complete[:-3] + ("AAA" if not complete.endswith("AAA") else "BBB")
+    expect("ticket adulterado → 403", creator.post(tampered).status_code == 403)
+    r = creator.post(complete)
+    body = r.get_json() or {}
+    expect("confirmación registra el contenido", r.status_code == 200 and body.get("content_id") == session["upload_id"])
+    expect("confirmación repetida es idempotente", creator.post(complete).status_code == 200)
+    media = app.test_client().get(body.get("url") or "/media/x")
+    expect("el contenido se entrega por /media", media.status_code == 200 and media.data == data)
+
+    fake = random.Random(4).randbytes(4096)
+    s = _start(creator, "content", "video/mp4", len(fake)).get_json()
+    creator.put(s["upload"]["url"], data=fake)
+    r = creator.post(s["complete_url"])
+    expect("bytes que no son video → 422 y objeto borrado", r.status_code == 422
+           and creator.post(s["complete_url"]).status_code == 409)
+
+    s = _start(creator, "content", "video/mp4", size).get_json()
+    r = creator.put(s["upload"]["url"], data=data[:1000], headers={"Content-Range": f"bytes 0-999/{size + 1}"})
+    expect("total distinto al declarado → 400", r.status_code == 400)
+
+    expect("comprador no sube contenido → 403", _start(buyer, "content", "video/mp4", size).status_code == 403)
+    expect("formato no permitido → 415", _start(creator, "content", "application/zip", size).status_code == 415)
+    expect("avatar de 6MB → 413", _start(buyer, "avatar", "image/png", 6 * 1024 * 1024).status_code == 413)
+    expect("sin CSRF → 403", app.test_client().post("/uploads/sessions", json={}).status_code == 403)
+
+    avatar = PNG_HEAD + random.Random(5).randbytes(2048)
+    s = _start(buyer, "avatar", "image/png", len(avatar)).get_json()
+    buyer.put(s["upload"]["url"], data=avatar)
+    r = buyer.post(s["complete_url"])
+    avatar_url = (r.get_json() or {}).get("avatar_url") or "/x"
+    stored = app.extensions["repositories"].users.get(BUYER).get("avatar_url")
+    expect("avatar guardado en el usuario y servido", r.status_code == 200 and stored == avatar_url
+           and app.test_client().get(avatar_url).data == avatar)
+    return failures
+
+
+# =========================================================
+# Carga con gunicorn
+# =========================================================
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _slow(body: bytes, kbps: int) -> Iterator[bytes]:
+    step = 16 * 1024
+    delay = step / (kbps * 1024)
+    for i in range(0, len(body), step):
+        time.sleep(delay)
+        yield body[i:i + step]
+
+
+def _multipart(name: str, data: bytes) -> tuple:
+    boundary = "ptuybench" + os.urandom(8).hex()
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{name}\"\r\n"
+        f"Content-Type: video/mp4\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _uploader(base: str, mode: str, index: int, data: bytes, kbps: int) -> bool:
+    with httpx.Client(base_url=base, timeout=120) as client:
+        token = client.post(f"/bench/login/{CREATOR}").json()["csrf_token"]
+        headers = {"X-CSRF-Token": token}
+        if mode == "worker":
+            body, ctype = _multipart(f"clip-{index}.mp4", data)
+            r = client.post("/bench/upload/inline", content=_slow(body, kbps),
+                            headers={**headers, "Content-Type": ctype, "Content-Length": str(len(body))})
+            return r.status_code == 200
+        session = client.post("/uploads/sessions", headers=headers, json={
+            "kind": "content", "content_type": "video/mp4", "size": len(data),
+        }).json()
+        r = httpx.put(session["upload"]["url"], content=_slow(data, kbps), timeout=120,
+                      headers={"Content-Type": "video/mp4", "Content-Length": str(len(data))})
+        if r.status_code != 200:
+            return False
+        return client.post(session["complete_url"], headers=headers).status_code == 200
+
+
+def _probe(base: str, stop: threading.Event) -> List[float]:
+    times: List[float] = []
+    with httpx.Client(base_url=base, timeout=120) as client:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            client.get("/bench/ping")
+            times.append((time.perf_counter() - t0) * 1000)
+            time.sleep(0.05)
+    return times
+
+
+def run_mode(base: str, mode: str, args: argparse.Namespace) -> Dict[str, Any]:
+    data = MP4_HEAD + random.Random(9).randbytes(args.size_kb * 1024)
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=args.clients + 1) as pool:
+        probe = pool.submit(_probe, base, stop)
+        time.sleep(0.3)
+        t0 = time.perf_counter()
+        uploads = [pool.submit(_uploader, base, mode, i, data, args.kbps) for i in range(args.clients)]
+        ok = sum(f.result() for f in uploads)
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        times = sorted(probe.result())
+    return {
+        "uploads_ok": f"{ok}/{args.clients}",
+        "seconds": round(elapsed, 1),
+        "ping_p50_ms": round(statistics.median(times), 1),
+        "ping_p95_ms": round(times[max(0, int(len(times) * 0.95) - 1)], 1),
+        "ping_max_ms": round(times[-1], 1),
+        "failed": ok != args.clients,
+    }
+
+
+def run_gunicorn(workdir: str, uploads: Any, args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    from app.utils.uploads import LocalBucketApp
+
+    bucket_port, port = _free_port(), _free_port()
+    bucket = make_server("127.0.0.1", bucket_port, LocalBucketApp(uploads),
+                         server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+    threading.Thread(target=bucket.serve_forever, daemon=True).start()
+
+    env = {k: v for k, v in os.environ.items() if k not in ("GOOGLE_APPLICATION_CREDENTIALS", "FIREBASE_SERVICE_ACCOUNT")}
+    env.update({
+        "PYTHONPATH": ROOT, "DU_WORKDIR": workdir, "DU_BUCKET_URL": f"http://127.0.0.1:{bucket_port}",
+        "DATA_BACKEND": "sqlite", "PORT": str(port), "WEB_CONCURRENCY": "1", "GUNICORN_THREADS": "2",
+        "GUNICORN_MAX_REQUESTS": "0", "GUNICORN_TIMEOUT": "120", "LOG_LEVEL": "WARNING",
+    })
+    base = f"http://127.0.0.1:{port}"
+    with open(os.path.join(workdir, "gunicorn.log"), "w", encoding="utf-8") as log_fh:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+             "benchmarks.direct_uploads:create_bench_app()"],
+            cwd=ROOT, env=env, stdout=log_fh, stderr=subprocess.STDOUT,
+        )
+    try:
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                if httpx.get(f"{base}/bench/ping").status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        return {mode: run_mode(base, mode, args) for mode in ("worker", "directo")}
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        bucket.shutdown()
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n{'Modo':<10}{'subidas':>9}{'seg':>7}{'ping p50':>10}{'ping p95':>10}{'ping máx':>10}")
+    for mode, row in results.items():
+        print(f"{mode:<10}{row['uploads_ok']:>9}{row['seconds']:>7}{row['ping_p50_ms']:>10}"
+              f"{row['ping_p95_ms']:>10}{row['ping_max_ms']:>10}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Subidas directas al bucket vs a través del worker")
+    p.add_argument("--clients", type=int, default=6, help="Clientes subiendo a la vez")
+    p.add_argument("--size-kb", type=int, default=1024, help="Tamaño de cada archivo")
+    p.add_argument("--kbps", type=int, default=256, help="Velocidad de subida de cada cliente (KB/s)")
+    p.add_argument("--skip-gunicorn", action="store_true", help="Solo los controles en proceso")
+    args = p.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="ptuy-uploads-")
+    os.environ["DU_WORKDIR"] = workdir
+    app = create_bench_app()
+    seed(app)
+
+    print("📤 Controles (test client, bucket local)")
+    failures = run_checks(app)
+
+    if not args.skip_gunicorn and os.name != "nt":
+        results = run_gunicorn(workdir, app.extensions["uploads"], args)
+        print_table(results)
+        failures += [f"{mode}: subidas fallidas" for mode, row in results.items() if row["failed"]]
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        return 1
+    print("\n✅ Subidas directas correctas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+Armado de la app para benchmarks
+--------------------------------
+✅ Variables de entorno y service account descartable (sin credenciales reales)
+✅ `create_app()` con Firestore / Identity Toolkit / Mercado Pago apuntando a stand-ins
+✅ Datos semilla: compradores, creadoras y pagos
+✅ Variante ASGI (rutas async) sobre la misma app y los mismos datos
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from benchmarks.standins import FakeAsyncFirestore, FakeFirestore, StandInMPHttpClient, StandInServer
+
+BENCH_PASSWORD = "bench-password"
+WEBHOOK_SECRET = "bench-webhook-secret"
+
+MP_MODULES = ("app.main.payments", "app.main.user_routes")
+
+
+def _service_account() -> Dict[str, Any]:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return {
+        "type": "service_account",
+        "project_id": "playtimeuy-bench",
+        "private_key_id": "bench",
+        "private_key": pem,
+        "client_email": "bench@playtimeuy-bench.iam.gserviceaccount.com",
+        "client_id": "0",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+
+
+@dataclass
+class BenchApp:
+    app: Any
+    db: Optional[FakeFirestore]
+    standins: StandInServer
+    backend: str = "firestore"
+    buyers: List[Dict[str, str]] = field(default_factory=list)
+    creators: List[str] = field(default_factory=list)
+    payment_refs: List[str] = field(default_factory=list)
+
+    def close(self) -> None:
+        self.standins.stop()
+
+
+def _firebase_env(workdir: str) -> Dict[str, str]:
+    sa = _service_account()
+    sa_path = os.path.join(workdir, "service-account.json")
+    with open(sa_path, "w", encoding="utf-8") as fh:
+        json.dump(sa, fh)
+    return {
+        "FIREBASE_DATABASE_URL": "https://playtimeuy-bench.firebaseio.com",
+        "FIREBASE_WEB_API_KEY": "bench-api-key",
+        "FIREBASE_SERVICE_ACCOUNT": sa_path,
+        "FIREBASE_CREDENTIALS_JSON": json.dumps(sa),
+    }
+
+
+def ensure_importable() -> None:
+    """
+    `import app` inicializa Firebase al importar; las herramientas que solo
+    usan helpers de app.utils (p.ej. replay contra --target) completan lo que
+    falte con valores descartables.
+    """
+    if os.getenv("FIREBASE_DATABASE_URL") and os.getenv("FIREBASE_WEB_API_KEY"):
+        return
+    for key, value in _firebase_env(tempfile.mkdtemp(prefix="ptuy-bench-")).items():
+        os.environ.setdefault(key, value)
+
+
+def _prepare_env(standins: StandInServer, workdir: str) -> None:
+    os.environ.update({
+        **_firebase_env(workdir),
+        "FIREBASE_AUTH_EMULATOR_HOST": standins.host,
+        "MP_API_BASE": f"http://{standins.host}/mp",
+        "MP_ACCESS_TOKEN": "TEST-bench-token",
+        "MP_WEBHOOK_SECRET": WEBHOOK_SECRET,
+        "PLAYTIMEUY_DATA_DIR": workdir,
+        "OTEL_TRACES_EXPORTER": os.getenv("OTEL_TRACES_EXPORTER", "none"),
+    })
+
+
+def _seed(bench: BenchApp, buyers: int, creators: int, payments_per_buyer: int) -> None:
+    """Carga datos a través de los repositorios (sirve para cualquier backend)."""
+    repos = bench.app.extensions["repositories"]
+    for i in range(creators):
+        uid = f"creator-{i:04d}"
+        repos.users.create(uid, {
+            "uid": uid,
+            "email": f"creadora{i}@bench.uy",
+            "username": f"creadora{i}",
+            "role": "creator",
+            "is_admin": False,
+            "bio": "Contenido de prueba " * 5,
+            "avatar_url": f"/static/img/avatar-{i % 10}.png",
+        })
+        bench.creators.append(uid)
+    for i in range(buyers):
+        uid = f"buyer-{i:04d}"
+        email = f"comprador{i}@bench.uy"
+        repos.users.create(uid, {
+            "uid": uid, "email": email, "username": f"comprador{i}", "role": "buyer", "is_admin": False,
+        })
+        bench.standins.add_user(email, BENCH_PASSWORD, uid)
+        bench.buyers.append({"uid": uid, "email": email, "password": BENCH_PASSWORD})
+        for j in range(payments_per_buyer):
+            ref = f"playtimeuy_{uid}_{j}"
+            creator = bench.creators[(i + j) % len(bench.creators)] if bench.creators else ""
+            data = {
+                "external_reference": ref, "buyer_uid": uid, "creator_uid": creator,
+                "amount": 100.0 + j, "status": "pending", "preference_id": f"pref-seed-{i}-{j}",
+            }
+            repos.payments.create(ref, data)
+            bench.standins.payments[f"{i}{j:03d}"] = {"external_reference": ref, "status": "approved"}
+            bench.payment_refs.append(ref)
+
+
+def build_bench_app(
+    firestore_latency_ms: float = 0.0,
+    auth_latency_ms: float = 0.0,
+    mp_latency_ms: float = 0.0,
+    buyers: int = 50,
+    creators: int = 30,
+    payments_per_buyer: int = 5,
+    config: Dict[str, Any] | None = None,
+    backend: str = "firestore",
+) -> BenchApp:
+    """
+    Crea la app real de PlayTimeUY cableada contra los stand-ins locales.
+    backend="firestore" usa el Firestore en memoria (con latencia simulada);
+    backend="sqlite" usa el backend SQLite real en un archivo temporal.
+    """
+    import sys
+
+    standins = StandInServer(auth_latency_ms=auth_latency_ms, mp_latency_ms=mp_latency_ms).start()
+    workdir = tempfile.mkdtemp(prefix="ptuy-bench-")
+    _prepare_env(standins, workdir)
+
+    import mercadopago
+    from app import create_app
+
+    db = FakeFirestore() if backend == "firestore" else None
+    app = create_app({
+        "DEBUG": False,
+        "SECRET_KEY": "playtimeuy-bench",
+        "FORCE_HTTPS": False,
+        "DATA_BACKEND": backend,
+        "SQLITE_PATH": os.path.join(workdir, "bench.sqlite3"),
+        "FIRESTORE_CLIENT": db,
+        **(config or {}),
+    })
+    app.testing = False
+
+    sdk = mercadopago.SDK(os.environ["MP_ACCESS_TOKEN"], http_client=StandInMPHttpClient(standins.host))
+    for name in MP_MODULES:
+        module = sys.modules[name]
+        module.MP = sdk
+        module.MP_WEBHOOK_SECRET = WEBHOOK_SECRET
+
+    # Los templates referencian endpoints que no existen en todas las ramas
+    app.url_build_error_handlers.append(lambda error, endpoint, values: "#")
+
+    bench = BenchApp(app=app, db=db, standins=standins, backend=backend)
+    _seed(bench, buyers, creators, payments_per_buyer)
+    # La latencia simulada y el conteo de RPCs arrancan después de la carga inicial
+    if db is not None:
+        db.latency_s = firestore_latency_ms / 1000.0
+        db.rpc_count = 0
+    app.extensions["repositories"].stats.reset()
+    app.extensions["repositories"].loader_stats.reset()
+    return bench
+
+
+def build_bench_asgi(bench: BenchApp, wsgi_threads: int = 8):
+    """Ruta ASGI sobre la misma app / datos (AsyncClient en memoria si el backend es Firestore)."""
+    from app.asgi import create_asgi_app
+
+    return create_asgi_app(
+        bench.app,
+        force_https=False,
+        wsgi_threads=wsgi_threads,
+        firestore_async_client=FakeAsyncFirestore(bench.db) if bench.db is not None else None,
+        mp_base_url=f"http://{bench.standins.host}/mp",
+    )
+
+
+__all__ = ["BenchApp", "build_bench_app", "build_bench_asgi", "ensure_importable", "BENCH_PASSWORD", "WEBHOOK_SECRET"]
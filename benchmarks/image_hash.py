@@ -0,0 +1,386 @@
+"""
+Hash perceptual e índice de Hamming (app/utils/image_hash.py, app/utils/image_index.py)
+--------------------------------------------------------------------------------------
+✅ Controles (test client): imagen de otra creadora re-comprimida → revisión por repost;
+   re-subida propia → sin marca; el admin remueve → la variante siguiente queda "flagged"
+   (no se publica); cola de moderación; aprobar; subida directa también pasa por el índice
+✅ Robustez: distancia de pHash / dHash entre cada imagen y sus variantes (achicada,
+   JPEG q=30, recorte 4 %, +20 % brillo, marca de agua) vs entre imágenes distintas
+✅ Costo de hashear (640×480 y 4000×3000 JPEG), con o sin NumPy
+✅ Índice con --hashes hashes: multi-index hashing vs BK-tree (--bk-hashes) vs recorrido
+   lineal; carga, memoria y latencia p50 / p99 de búsqueda a --radius bits
+
+Sale con código 1 si falla algún control.
+
+Uso:
+    python -m benchmarks.image_hash
+    python -m benchmarks.image_hash --hashes 2000000 --radius 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.harness import ensure_importable
+from benchmarks.streaming_uploads import multipart, post_body
+
+CREATORS = ("creator-img-a", "creator-img-b", "creator-img-c")
+ADMIN = "admin-img"
+
+
+# =========================================================
+# Imágenes sintéticas
+# =========================================================
+def make_image(seed: int, size: Tuple[int, int] = (640, 480)):
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(seed)
+    w, h = size
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randrange(6, 14)):
+        x0, y0 = rng.randrange(w), rng.randrange(h)
+        x1, y1 = x0 + rng.randrange(w // 8, w // 2), y0 + rng.randrange(h // 8, h // 2)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        (draw.ellipse if rng.random() < 0.5 else draw.rectangle)((x0, y0, x1, y1), fill=color)
+    return image.filter(ImageFilter.GaussianBlur(2))
+
+
+def jpeg(image, quality: int = 90) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def variants(image) -> Dict[str, Any]:
+    from PIL import ImageDraw, ImageEnhance
+
+    w, h = image.size
+    marked = image.copy()
+    ImageDraw.Draw(marked).text((w - 140, h - 30), "@repost_uy", fill=(255, 255, 255))
+    dx, dy = int(w * 0.04), int(h * 0.04)
+    return {
+        "achicada 50 %": image.resize((w // 2, h // 2)),
+        "JPEG q=30": _reopen(jpeg(image, 30)),
+        "recorte 4 %": image.crop((dx, dy, w - dx, h - dy)),
+        "+20 % brillo": ImageEnhance.Brightness(image).enhance(1.2),
+        "marca de agua": marked,
+    }
+
+
+def _reopen(data: bytes):
+    from PIL import Image
+
+    return Image.open(io.BytesIO(data))
+
+
+def hashes_of(image):
+    from app.utils.image_hash import compute_hashes
+
+    return compute_hashes(io.BytesIO(jpeg(image)))
+
+
+# =========================================================
+# App de prueba
+# =========================================================
+def create_bench_app(workdir: str):
+    ensure_importable()
+    from flask import jsonify
+
+    from app import create_app
+    from app.main.main_routes import set_current_user
+    from app.utils.csrf import generate_csrf_token
+
+    app = create_app({
+        "SECRET_KEY": "bench-secret",
+        "DATA_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "bench.sqlite"),
+        "MEDIA_ROOT": os.path.join(workdir, "media"),
+        "UPLOAD_BACKEND": "local",
+        "FORCE_HTTPS": False,
+        "DEBUG": False,
+        "PROFILING_ENABLED": False,
+        "METRICS_ENABLED": False,
+        "COMPRESSION_ENABLED": False,
+    })
+
+    def login(uid: str):
+        user = {"uid": uid, "role": "admin" if uid == ADMIN else "creator"}
+        if uid == ADMIN:
+            user["is_admin"] = True
+        set_current_user(user)
+        return jsonify({"ok": True, "csrf_token": generate_csrf_token()})
+
+    app.add_url_rule("/bench/login/<uid>", "bench_login", login, methods=["POST"])
+    return app
+
+
+def seed(app) -> None:
+    users = app.extensions["repositories"].users
+    for uid in (*CREATORS, ADMIN):
+        role = "admin" if uid == ADMIN else "creator"
+        users.create(uid, {"uid": uid, "username": uid, "role": role, "email": f"{uid}@playtimeuy.test"})
+
+
+def _client(app, uid: str):
+    client = app.test_client()
+    token = client.post(f"/bench/login/{uid}").get_json()["csrf_token"]
+    client.environ_base["HTTP_X_CSRF_TOKEN"] = token
+    return client, token
+
+
+def _upload(client, token: str, data: bytes) -> Dict[str, Any]:
+    body, ctype = multipart({"_csrf": token, "title": "Foto", "visibility": "public"}, "file", "foto.jpg", data)
+    r, _ = post_body(client, "/uploads/content", body, ctype)
+    return {**(r.get_json() or {}), "http": r.status_code}
+
+
+def _direct(client, data: bytes) -> Dict[str, Any]:
+    session = client.post("/uploads/sessions", json={
+        "kind": "content", "content_type": "image/jpeg", "size": len(data), "visibility": "public",
+    }).get_json()
+    client.put(session["upload"]["url"], data=data)
+    r = client.post(session["complete_url"])
+    return {**(r.get_json() or {}), "http": r.status_code}
+
+
+# =========================================================
+# Controles
+# =========================================================
+def run_checks(app) -> List[str]:
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    contents = app.extensions["repositories"].contents
+    (a, token_a), (b, token_b), (c, token_c) = (_client(app, uid) for uid in CREATORS)
+    admin, _ = _client(app, ADMIN)
+    original = make_image(1)
+
+    first = _upload(a, token_a, jpeg(original))
+    expect("imagen nueva → publicada sin marcas", first["http"] == 201 and "review" not in first)
+    other = _upload(b, token_b, jpeg(make_image(2)))
+    expect("imagen distinta de otra creadora → sin marcas", other["http"] == 201 and "review" not in other)
+
+    repost = _upload(b, token_b, jpeg(original.resize((320, 240)), 40))
+    doc = contents.get(repost.get("content_id") or "x").to_dict() or {}
+    flags = doc.get("flags") or [{}]
+    expect("repost re-comprimido de otra creadora → publicado, en revisión",
+           repost.get("review") == "pending" and doc.get("status") == "published"
+           and flags[0].get("reason") == "repost" and flags[0].get("content_id") == first["content_id"])
+    own = _upload(a, token_a, jpeg(original, 60))
+    expect("re-subida propia → sin marcas", own["http"] == 201 and "review" not in own)
+
+    queue = admin.get("/admin/moderation/queue").get_json() or {}
+    expect("cola de moderación con el repost", [i["content_id"] for i in queue.get("items", [])]
+           == [repost["content_id"]])
+    expect("cola solo para admins", a.get("/admin/moderation/queue").status_code == 403)
+
+    r = admin.post(f"/admin/moderation/{first['content_id']}/remove")
+    expect("admin remueve el original y bloquea el hash", r.status_code == 200 and (r.get_json() or {}).get("banned")
+           and contents.get(first["content_id"]).get("status") == "removed")
+    banned = _upload(c, token_c, jpeg(variants(original)["marca de agua"], 50))
+    expect("variante de una imagen removida → flagged y sin publicar",
+           banned.get("status") == "flagged" and app.test_client().get(banned.get("url") or "/x").status_code == 404)
+    direct = _direct(c, jpeg(variants(original)["+20 % brillo"]))
+    expect("subida directa también pasa por el índice", direct["http"] == 200 and direct.get("status") == "flagged")
+
+    r = admin.post(f"/admin/moderation/{banned['content_id']}/approve")
+    expect("aprobar publica y saca de la cola", r.status_code == 200
+           and contents.get(banned["content_id"]).get("status") == "published"
+           and banned["content_id"] not in [i["content_id"] for i in
+                                            (admin.get("/admin/moderation/queue").get_json() or {})["items"]])
+    expect("sin CSRF → 403", app.test_client().post(f"/admin/moderation/{repost['content_id']}/remove")
+           .status_code == 403)
+    return failures
+
+
+# =========================================================
+# Robustez y costo
+# =========================================================
+def run_robustness(images: int, threshold: int) -> Dict[str, Any]:
+    from app.utils.image_hash import hamming
+
+    originals = [make_image(100 + i) for i in range(images)]
+    base = [hashes_of(img) for img in originals]
+    per_variant: Dict[str, List[Tuple[int, int]]] = {}
+    for img, h in zip(originals, base):
+        for label, variant in variants(img).items():
+            v = hashes_of(variant)
+            per_variant.setdefault(label, []).append((hamming(h.phash, v.phash), hamming(h.dhash, v.dhash)))
+    unrelated = [hamming(x.phash, y.phash) for i, x in enumerate(base) for y in base[i + 1:]]
+    return {"variants": per_variant, "unrelated": unrelated,
+            "false_positive": sum(d <= threshold for d in unrelated)}
+
+
+def time_hashing(repeat: int) -> Dict[str, float]:
+    from app.utils.image_hash import compute_hashes
+
+    out = {}
+    for label, size in (("640×480", (640, 480)), ("4000×3000", (4000, 3000))):
+        data = jpeg(make_image(7, size))
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            compute_hashes(io.BytesIO(data))
+        out[label] = (time.perf_counter() - t0) / repeat * 1000
+    return out
+
+
+# =========================================================
+# Índices
+# =========================================================
+class BKTree:
+    """Árbol BK clásico (para comparar): nodo = [hash, {distancia: hijo}]."""
+
+    def __init__(self):
+        self.root: Optional[list] = None
+        self.visited = 0
+
+    def add(self, value: int) -> None:
+        if self.root is None:
+            self.root = [value, {}]
+            return
+        node = self.root
+        while True:
+            d = (node[0] ^ value).bit_count()
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = [value, {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, int]]:
+        found, stack = [], [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            self.visited += 1
+            d = (node[0] ^ value).bit_count()
+            if d <= radius:
+                found.append((node[0], d))
+            for dist, child in node[1].items():
+                if d - radius <= dist <= d + radius:
+                    stack.append(child)
+        return found
+
+
+def _near(rng: random.Random, value: int, bits: int) -> int:
+    for b in rng.sample(range(64), bits):
+        value ^= 1 << b
+    return value
+
+
+def _latency(search: Callable[[int], Any], queries: List[int]) -> Dict[str, float]:
+    times = []
+    for q in queries:
+        t0 = time.perf_counter()
+        search(q)
+        times.append((time.perf_counter() - t0) * 1e6)
+    times.sort()
+    return {"p50_us": statistics.median(times), "p99_us": times[min(len(times) - 1, int(len(times) * 0.99))]}
+
+
+def run_index(total: int, bk_total: int, radius: int, queries: int) -> List[Dict[str, Any]]:
+    from app.utils.image_hash import HammingIndex
+
+    rng = random.Random(17)
+    values = [rng.getrandbits(64) for _ in range(total)]
+    probe = [_near(rng, rng.choice(values), rng.randrange(radius + 1)) for _ in range(queries // 2)]
+    probe += [rng.getrandbits(64) for _ in range(queries - len(probe))]  # sin vecinos
+    rows: List[Dict[str, Any]] = []
+
+    for chunks in (None, 4):
+        index = HammingIndex(chunks)
+        t0 = time.perf_counter()
+        index.build(values)
+        build = time.perf_counter() - t0
+        for r in sorted({radius, radius + 2}):
+            hits = sum(bool(index.search(q, r)) for q in probe)
+            rows.append({"name": f"multi-index {len(index.layout)}×{index.layout[-1][0]}b ≤{r}", "n": total,
+                         "build_s": build, "mem_mb": index.memory_bytes() / 2**20, "hits": hits,
+                         **_latency(lambda q: index.search(q, r), probe)})
+
+    tree = BKTree()
+    t0 = time.perf_counter()
+    for v in values[:bk_total]:
+        tree.add(v)
+    build = time.perf_counter() - t0
+    tree.visited = 0
+    bk_probe = [_near(rng, rng.choice(values[:bk_total]), rng.randrange(radius + 1)) for _ in range(queries // 4)]
+    bk_probe += [rng.getrandbits(64) for _ in range(queries // 4)]
+    latency = _latency(lambda q: tree.search(q, radius), bk_probe)
+    rows.append({"name": "BK-tree", "n": bk_total, "build_s": build, "mem_mb": float("nan"),
+                 "hits": None, "visited_pct": 100 * tree.visited / len(bk_probe) / bk_total, **latency})
+
+    linear = values
+    rows.append({"name": "recorrido lineal", "n": total, "build_s": 0.0, "mem_mb": float("nan"), "hits": None,
+                 **_latency(lambda q: [v for v in linear if (v ^ q).bit_count() <= radius], probe[:5])})
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Hash perceptual e índice de Hamming")
+    p.add_argument("--hashes", type=int, default=1_000_000)
+    p.add_argument("--bk-hashes", type=int, default=200_000, help="El BK-tree en Python puro se arma lento")
+    p.add_argument("--radius", type=int, default=8, help="Bits de pHash (IMAGE_MATCH_DISTANCE)")
+    p.add_argument("--queries", type=int, default=400)
+    p.add_argument("--images", type=int, default=40, help="Imágenes para medir robustez")
+    args = p.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="ptuy-phash-")
+    try:
+        app = create_bench_app(workdir)
+        seed(app)
+        print("🖼️ Controles (test client)")
+        failures = run_checks(app)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    from app.utils import image_hash
+
+    r = run_robustness(args.images, args.radius)
+    print(f"\n🔍 Robustez ({args.images} imágenes, umbral {args.radius} bits de pHash)")
+    print(f"{'Variante':<18}{'pHash media':>12}{'pHash máx':>11}{'dHash media':>13}{'dentro':>9}")
+    missed = 0
+    for label, pairs in r["variants"].items():
+        ph = [x for x, _ in pairs]
+        inside = sum(x <= args.radius for x in ph)
+        missed += len(ph) - inside
+        print(f"{label:<18}{statistics.mean(ph):>12.1f}{max(ph):>11}{statistics.mean(d for _, d in pairs):>13.1f}"
+              f"{inside:>6}/{len(ph)}")
+    print(f"{'distintas':<18}{statistics.mean(r['unrelated']):>12.1f}{min(r['unrelated']):>11} (mín)"
+          f"   falsos positivos: {r['false_positive']}/{len(r['unrelated'])}")
+
+    t = time_hashing(20)
+    print(f"\n⏱️ Hash por imagen (NumPy: {'sí' if image_hash.np is not None else 'no'}): "
+          + ", ".join(f"{k} {v:.1f} ms" for k, v in t.items()))
+
+    print(f"\n🌲 Búsqueda a ≤ {args.radius} bits ({args.queries} consultas, mitad con vecino a ≤ {args.radius})")
+    print(f"{'Índice':<26}{'hashes':>10}{'carga s':>9}{'MB':>7}{'p50 µs':>10}{'p99 µs':>10}  notas")
+    for row in run_index(args.hashes, args.bk_hashes, args.radius, args.queries):
+        note = f"visita {row['visited_pct']:.0f}% del árbol" if "visited_pct" in row else (
+            f"{row['hits']} con vecino" if row["hits"] is not None else "5 consultas")
+        mem = "-" if row["mem_mb"] != row["mem_mb"] else f"{row['mem_mb']:.0f}"
+        print(f"{row['name']:<26}{row['n']:>10}{row['build_s']:>9.1f}{mem:>7}{row['p50_us']:>10.0f}"
+              f"{row['p99_us']:>10.0f}  {note}")
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        return 1
+    print("\n✅ Índice perceptual correcto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Entrega de medios: /media (Range + sendfile) vs servir el archivo como estático
+-----------------------------------------------------------------------------
+✅ Controles en proceso: 206 / 416 / 304 / HEAD, rango exacto byte a byte y
+   acceso (anónimo, suscriptor, usuario sin suscripción, creadora, borrador)
+✅ Con gunicorn real (gunicorn.conf.py, 1 worker): descargas completas y rangos
+   aleatorios de 1 MiB (lo que pide un reproductor al adelantar)
+✅ Compara contra `send_from_directory` (lo que hace /static): los rangos pasan
+   por un wrapper que lee en Python
+✅ Reporta MB/s y CPU del worker por MB entregado (sendfile ≈ sin CPU de Python)
+
+Sale con código 1 si falla algún control o algún rango llega con bytes distintos.
+
+Uso:
+    python -m benchmarks.media_delivery
+    python -m benchmarks.media_delivery --size-mb 64 --ranges 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CREATOR = "creator-media"
+SUBSCRIBER = "fan-subscribed"
+OUTSIDER = "fan-outsider"
+VIDEO_ID = "video-public"
+AUDIO_ID = "audio-subscribers"
+DRAFT_ID = "video-draft"
+RANGE_SIZE = 1024 * 1024
+
+
+# =========================================================
+# App de prueba (la carga gunicorn)
+# =========================================================
+def create_bench_app():
+    """create_app sobre SQLite + login de prueba + baseline estático (send_from_directory)."""
+    from benchmarks.harness import ensure_importable
+
+    ensure_importable()
+    from flask import current_app, jsonify, send_from_directory
+
+    from app import create_app
+    from app.main.main_routes import set_current_user
+
+    workdir = os.environ["MD_WORKDIR"]
+    app = create_app({
+        "SECRET_KEY": "bench-secret",
+        "DATA_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "bench.sqlite"),
+        "MEDIA_ROOT": os.path.join(workdir, "media"),
+        "FORCE_HTTPS": False,
+        "DEBUG": False,
+        "PROFILING_ENABLED": False,
+        "METRICS_ENABLED": False,
+    })
+
+    def login(uid: str):
+        set_current_user({"uid": uid, "role": "creator" if uid == CREATOR else "buyer"})
+        return jsonify({"ok": True})
+
+    def static_baseline(name: str):
+        return send_from_directory(current_app.config["MEDIA_ROOT"], name)
+
+    app.add_url_rule("/bench/login/<uid>", "bench_login", login, methods=["POST"])
+    app.add_url_rule("/bench/static/<path:name>", "bench_static", static_baseline)
+    return app
+
+
+def seed(app, size_mb: int) -> Dict[str, bytes]:
+    """Archivos en MEDIA_ROOT + documentos de contents / subscriptions."""
+    repos = app.extensions["repositories"]
+    root = app.config["MEDIA_ROOT"]
+    os.makedirs(os.path.join(root, CREATOR), exist_ok=True)
+    rng = random.Random(7)
+    files = {
+        VIDEO_ID: rng.randbytes(size_mb * 1024 * 1024),
+        AUDIO_ID: rng.randbytes(3 * 1024 * 1024 + 17),
+        DRAFT_ID: rng.randbytes(1024),
+    }
+    for content_id, data in files.items():
+        ext = "mp3" if content_id == AUDIO_ID else "mp4"
+        rel = f"{CREATOR}/{content_id}.{ext}"
+        with open(os.path.join(root, rel), "wb") as fh:
+            fh.write(data)
+        repos.contents.create(content_id, {
+            "creator_uid": CREATOR,
+            "storage_path": rel,
+            "visibility": "public" if content_id == VIDEO_ID else "subscribers",
+            "status": "draft" if content_id == DRAFT_ID else "published",
+        })
+    repos.subscriptions.create(f"{SUBSCRIBER}_{CREATOR}", {
+        "subscriber_uid": SUBSCRIBER, "creator_uid": CREATOR, "status": "active",
+    })
+    return files
+
+
+# =========================================================
+# Controles en proceso
+# =========================================================
+def run_checks(app, files: Dict[str, bytes]) -> List[str]:
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    video = files[VIDEO_ID]
+    anon = app.test_client()
+    r = anon.get(f"/media/{VIDEO_ID}", headers={"Range": "bytes=1000-1999"})
+    expect("206 con el rango exacto", r.status_code == 206 and r.data == video[1000:2000]
+           and r.headers.get("Content-Range") == f"bytes 1000-1999/{len(video)}")
+    r = anon.get(f"/media/{VIDEO_ID}", headers={"Range": "bytes=-500"})
+    expect("206 sufijo (últimos 500 bytes)", r.status_code == 206 and r.data == video[-500:])
+    r = anon.get(f"/media/{VIDEO_ID}", headers={"Range": f"bytes={len(video)}-"})
+    expect("416 fuera del archivo", r.status_code == 416 and r.headers.get("Content-Range") == f"bytes */{len(video)}")
+    full = anon.get(f"/media/{VIDEO_ID}")
+    expect("200 completo con Accept-Ranges y caché pública",
+           full.status_code == 200 and full.data == video and full.headers.get("Accept-Ranges") == "bytes"
+           and full.headers.get("Cache-Control", "").startswith("public"))
+    etag = full.headers.get("ETag")
+    expect("304 con If-None-Match", anon.get(f"/media/{VIDEO_ID}", headers={"If-None-Match": etag}).status_code == 304)
+    r = anon.get(f"/media/{VIDEO_ID}", headers={"Range": "bytes=0-9", "If-Range": '"otro"'})
+    expect("If-Range distinto → 200 completo", r.status_code == 200 and len(r.data) == len(video))
+    r = anon.head(f"/media/{VIDEO_ID}")
+    expect("HEAD sin cuerpo con Content-Length", r.status_code == 200 and not r.data
+           and r.headers.get("Content-Length") == str(len(video)))
+
+    expect("anónimo → 401 en contenido para suscriptores", anon.get(f"/media/{AUDIO_ID}").status_code == 401)
+    outsider = app.test_client()
+    outsider.post(f"/bench/login/{OUTSIDER}")
+    expect("sin suscripción → 403", outsider.get(f"/media/{AUDIO_ID}").status_code == 403)
+    expect("borrador ajeno → 404", outsider.get(f"/media/{DRAFT_ID}").status_code == 404)
+    fan = app.test_client()
+    fan.post(f"/bench/login/{SUBSCRIBER}")
+    r = fan.get(f"/media/{AUDIO_ID}", headers={"Range": "bytes=0-"})
+    expect("suscriptor → 206 audio/mpeg privado", r.status_code == 206 and r.data == files[AUDIO_ID]
+           and r.mimetype == "audio/mpeg" and r.headers.get("Cache-Control", "").startswith("private"))
+    creator = app.test_client()
+    creator.post(f"/bench/login/{CREATOR}")
+    expect("creadora ve su borrador", creator.get(f"/media/{DRAFT_ID}").status_code == 200)
+    expect("id inexistente → 404", anon.get("/media/no-existe").status_code == 404)
+    return failures
+
+
+# =========================================================
+# Carga con gunicorn
+# =========================================================
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _worker_cpu(master_pid: int) -> float:
+    """Segundos de CPU (user + sys) de los workers del master."""
+    total = 0.0
+    tick = os.sysconf("SC_CLK_TCK")
+    try:
+        with open(f"/proc/{master_pid}/task/{master_pid}/children") as fh:
+            children = [int(p) for p in fh.read().split()]
+    except OSError:
+        return 0.0
+    for pid in children:
+        try:
+            with open(f"/proc/{pid}/stat") as fh:
+                fields = fh.read().rsplit(")", 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / tick
+        except OSError:
+            pass
+    return total
+
+
+def _phase(client: httpx.Client, urls: List[Tuple[str, Dict[str, str], bytes]], master_pid: int,
+           concurrency: int) -> Dict[str, Any]:
+    cpu0, t0 = _worker_cpu(master_pid), time.perf_counter()
+    bad = 0
+    total = 0
+
+    def fetch(item: Tuple[str, Dict[str, str], bytes]) -> Tuple[int, bool]:
+        url, headers, expected = item
+        resp = client.get(url, headers=headers)
+        return len(resp.content), resp.content == expected and resp.status_code in (200, 206)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for size, ok in pool.map(fetch, urls):
+            total += size
+            bad += not ok
+    elapsed = time.perf_counter() - t0
+    cpu = _worker_cpu(master_pid) - cpu0
+    mb = total / (1024 * 1024)
+    return {
+        "requests": len(urls),
+        "mb": round(mb, 1),
+        "mb_s": round(mb / elapsed, 1) if elapsed else 0.0,
+        "cpu_ms_per_mb": round(cpu * 1000 / mb, 2) if mb else 0.0,
+        "bad": bad,
+    }
+
+
+def run_gunicorn(workdir: str, files: Dict[str, bytes], args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = {k: v for k, v in os.environ.items() if k not in ("GOOGLE_APPLICATION_CREDENTIALS", "FIREBASE_SERVICE_ACCOUNT")}
+    env.update({
+        "PYTHONPATH": ROOT, "MD_WORKDIR": workdir, "DATA_BACKEND": "sqlite", "PORT": str(port),
+        "WEB_CONCURRENCY": "1", "GUNICORN_THREADS": str(args.threads), "GUNICORN_MAX_REQUESTS": "0",
+        "LOG_LEVEL": "WARNING", "OTEL_TRACES_EXPORTER": "none",
+    })
+    with open(os.path.join(workdir, "gunicorn.log"), "w", encoding="utf-8") as log_fh:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+             "benchmarks.media_delivery:create_bench_app()"],
+            cwd=ROOT, env=env, stdout=log_fh, stderr=subprocess.STDOUT,
+        )
+    results: Dict[str, Dict[str, Any]] = {}
+    try:
+        with httpx.Client(timeout=60, limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            deadline = time.time() + 30
+            while time.time() < deadline:
+                try:
+                    if client.head(f"{base}/media/{VIDEO_ID}").status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    time.sleep(0.2)
+            video = files[VIDEO_ID]
+            rng = random.Random(11)
+            offsets = [rng.randrange(0, len(video) - RANGE_SIZE) for _ in range(args.ranges)]
+            paths = {"media": f"/media/{VIDEO_ID}", "estático": f"/bench/static/{CREATOR}/{VIDEO_ID}.mp4"}
+            for mode, path in paths.items():
+                full = [(base + path, {}, video)] * args.full
+                ranges = [(base + path, {"Range": f"bytes={o}-{o + RANGE_SIZE - 1}"}, video[o:o + RANGE_SIZE])
+                          for o in offsets]
+                _phase(client, ranges[:20], proc.pid, args.concurrency)  # calentamiento
+                results[f"{mode} · completo"] = _phase(client, full, proc.pid, args.concurrency)
+                results[f"{mode} · rangos 1 MiB"] = _phase(client, ranges, proc.pid, args.concurrency)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return results
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n{'Modo':<24}{'reqs':>6}{'MB':>9}{'MB/s':>9}{'CPU ms/MB':>11}{'mal':>5}")
+    for name, row in results.items():
+        print(f"{name:<24}{row['requests']:>6}{row['mb']:>9}{row['mb_s']:>9}{row['cpu_ms_per_mb']:>11}{row['bad']:>5}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Entrega de medios: Range + sendfile vs estático")
+    p.add_argument("--size-mb", type=int, default=32, help="Tamaño del video de prueba")
+    p.add_argument("--full", type=int, default=8, help="Descargas completas por modo")
+    p.add_argument("--ranges", type=int, default=300, help="Rangos de 1 MiB por modo")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--threads", type=int, default=4, help="Threads del worker gunicorn")
+    p.add_argument("--skip-gunicorn", action="store_true", help="Solo los controles en proceso")
+    args = p.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="ptuy-media-")
+    os.environ["MD_WORKDIR"] = workdir
+    app = create_bench_app()
+    files = seed(app, args.size_mb)
+
+    print("🎬 Controles (test client)")
+    failures = run_checks(app, files)
+
+    if not args.skip_gunicorn:
+        if os.name == "nt":
+            print("⚠️ gunicorn no corre en Windows: se omite la carga")
+        else:
+            results = run_gunicorn(workdir, files, args)
+            print_table(results)
+            failures += [f"{name}: {row['bad']} respuestas con bytes distintos"
+                         for name, row in results.items() if row["bad"]]
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        return 1
+    print("\n✅ Entrega de medios correcta")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
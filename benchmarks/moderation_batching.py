@@ -0,0 +1,214 @@
+"""
+Clasificador de moderación con micro-batching (app/utils/classifier.py)
+-----------------------------------------------------------------------
+✅ Modelo chico local: una CNN de 4 convoluciones (TorchScript, pesos al azar) o
+   `--model torchvision:mobilenet_v3_small` (sin descargar pesos): lo que se mide
+   es el costo de inferencia, no la calidad del modelo
+✅ Inferencia sola (en este proceso): imágenes / s por tamaño de lote (--batches)
+   con --threads threads intra-op
+✅ Servicio completo: proceso aparte + --clients threads que suben imágenes
+   (preprocesado con Pillow incluido) con MODERATION_MAX_BATCH = cada tamaño;
+   imágenes / s, latencia p50 / p99 y lote promedio que se formó
+✅ Controles: el servicio arranca, todas las imágenes reciben puntaje, las
+   probabilidades suman 1 y con varios clientes se forman lotes > 1
+
+Necesita torch (y torchvision para --model torchvision:...). Sale con código 1 si
+falla algún control y 2 si torch no está instalado.
+
+Uso:
+    python -m benchmarks.moderation_batching
+    python -m benchmarks.moderation_batching --batches 1,8,32 --threads 4 --clients 32
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.harness import ensure_importable
+
+LABELS = ("safe", "nsfw")
+
+
+def _small_model(path: str) -> str:
+    import torch
+    from torch import nn
+
+    model = nn.Sequential(
+        nn.Conv2d(3, 16, 3, stride=2, padding=1), nn.ReLU(),
+        nn.Conv2d(16, 32, 3, stride=2, padding=1), nn.ReLU(),
+        nn.Conv2d(32, 64, 3, stride=2, padding=1), nn.ReLU(),
+        nn.Conv2d(64, 128, 3, stride=2, padding=1), nn.ReLU(),
+        nn.AdaptiveAvgPool2d(1), nn.Flatten(), nn.Linear(128, len(LABELS)),
+    ).eval()
+    torch.jit.script(model).save(path)
+    return path
+
+
+def _jpegs(count: int, seed: int = 7) -> List[bytes]:
+    from PIL import Image, ImageDraw
+
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(count):
+        image = Image.new("RGB", (1280, 960), tuple(rnd.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(12):
+            x, y = rnd.randrange(1200), rnd.randrange(900)
+            draw.ellipse((x, y, x + rnd.randrange(40, 400), y + rnd.randrange(40, 400)),
+                         fill=tuple(rnd.randrange(256) for _ in range(3)))
+        buf = io.BytesIO()
+        image.save(buf, "JPEG", quality=85)
+        out.append(buf.getvalue())
+    return out
+
+
+def _pct(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+# =========================================================
+# Inferencia sola
+# =========================================================
+def bench_inference(classifier: Any, model: str, payloads: List[bytes], batches: List[int],
+                    threads: int, seconds: float) -> None:
+    predict = classifier.torch_predictor(model, LABELS, threads=threads, warmup_batch=max(batches))
+    print(f"\n== Inferencia sola ({threads} threads intra-op) ==")
+    print(f"{'lote':>6} {'img/s':>9} {'ms/lote':>9} {'ms/img':>8}")
+    for size in batches:
+        batch = [payloads[i % len(payloads)] for i in range(size)]
+        predict(batch)
+        done, t0 = 0, time.perf_counter()
+        while time.perf_counter() - t0 < seconds:
+            predict(batch)
+            done += 1
+        elapsed = time.perf_counter() - t0
+        print(f"{size:>6} {done * size / elapsed:>9.1f} {elapsed * 1000 / done:>9.2f} {elapsed * 1000 / (done * size):>8.2f}")
+
+
+# =========================================================
+# Servicio completo
+# =========================================================
+def bench_service(classifier: Any, model: str, jpegs: List[bytes], size: int, args: argparse.Namespace,
+                  check: Callable[[str, bool, str], None]) -> Dict[str, Any]:
+    authkey = os.urandom(32)
+    address = os.path.join(tempfile.gettempdir(), f"ptuy-bench-classifier-{os.getpid()}-{size}.sock")
+    service = classifier.ClassifierService(address, authkey, model, LABELS, max_batch=size,
+                                           max_wait_ms=args.max_wait_ms, threads=args.threads)
+    service.start()
+    try:
+        ready = service.wait_ready(120)
+        check(f"lote {size}: el servicio arranca", ready, address)
+        if not ready:
+            return {}
+        client = classifier.ClassifierClient(address, authkey, LABELS, timeout=30)
+        latencies: List[float] = []
+        results: List[Optional[Dict[str, float]]] = []
+        lock = threading.Lock()
+
+        def run(offset: int) -> None:
+            for i in range(args.per_client):
+                t0 = time.perf_counter()
+                scores = client.score(io.BytesIO(jpegs[(offset + i) % len(jpegs)]))
+                with lock:
+                    latencies.append(time.perf_counter() - t0)
+                    results.append(scores)
+            client.close()
+
+        workers = [threading.Thread(target=run, args=(n,)) for n in range(args.clients)]
+        t0 = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - t0
+        stats = client.stats() or {}
+        client.close()
+
+        scored = [r for r in results if r is not None]
+        check(f"lote {size}: todas con puntaje", len(scored) == len(results), f"{len(scored)}/{len(results)}")
+        check(f"lote {size}: probabilidades suman 1",
+              all(abs(sum(r.values()) - 1) < 0.01 for r in scored), "")
+        if size > 1 and args.clients > 1:
+            check(f"lote {size}: se forman lotes > 1", stats.get("avg_batch", 0) > 1, f"{stats.get('avg_batch')}")
+        return {
+            "size": size, "rate": len(results) / elapsed,
+            "p50": _pct(latencies, 0.5) * 1000, "p99": _pct(latencies, 0.99) * 1000,
+            "avg_batch": stats.get("avg_batch", 0.0), "infer": stats.get("infer_ms_per_item", 0.0),
+        }
+    finally:
+        service.stop()
+
+
+# =========================================================
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--model", help="TorchScript o torchvision:<arquitectura> (default: CNN chica)")
+    p.add_argument("--batches", default="1,2,4,8,16,32")
+    p.add_argument("--threads", type=int, default=2, help="threads intra-op de torch")
+    p.add_argument("--clients", type=int, default=16, help="threads subiendo imágenes a la vez")
+    p.add_argument("--per-client", type=int, default=25)
+    p.add_argument("--max-wait-ms", type=float, default=10)
+    p.add_argument("--seconds", type=float, default=2.0, help="duración por lote en la inferencia sola")
+    p.add_argument("--skip-service", action="store_true")
+    args = p.parse_args(argv)
+
+    try:
+        import torch  # noqa: F401
+    except ImportError:
+        print("❌ torch no está instalado (ver requirements.txt: torch / torchvision)")
+        return 2
+
+    ensure_importable()
+    from app.utils import classifier
+
+    batches = [int(b) for b in args.batches.split(",") if b.strip()]
+    workdir = tempfile.mkdtemp(prefix="ptuy-bench-clf-")
+    model = args.model or _small_model(os.path.join(workdir, "small_cnn.pt"))
+    jpegs = _jpegs(32)
+    payloads = [classifier.preprocess(io.BytesIO(j)) for j in jpegs[:8]]
+
+    failures: List[str] = []
+
+    def check(name: str, ok: bool, detail: str) -> None:
+        print(f"  {'✅' if ok else '❌'} {name} {detail}")
+        if not ok:
+            failures.append(name)
+
+    t0 = time.perf_counter()
+    for j in jpegs:
+        classifier.preprocess(io.BytesIO(j))
+    print(f"Modelo: {model} · preprocesado 1280×960 JPEG → 224×224: "
+          f"{(time.perf_counter() - t0) * 1000 / len(jpegs):.2f} ms/img")
+
+    bench_inference(classifier, model, payloads, batches, args.threads, args.seconds)
+
+    if not args.skip_service:
+        print(f"\n== Servicio ({args.clients} clientes × {args.per_client} imágenes, "
+              f"espera ≤ {args.max_wait_ms:.0f} ms, {args.threads} threads) ==")
+        rows = [bench_service(classifier, model, jpegs, size, args, check) for size in batches]
+        print(f"{'lote máx':>8} {'img/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'lote prom':>10} {'infer ms/img':>13}")
+        for row in filter(None, rows):
+            print(f"{row['size']:>8} {row['rate']:>9.1f} {row['p50']:>8.1f} {row['p99']:>8.1f} "
+                  f"{row['avg_batch']:>10.2f} {row['infer']:>13.2f}")
+        if rows and rows[0] and len(rows) > 1:
+            best = max(filter(None, rows), key=lambda r: r["rate"])
+            print(f"Mejor: lote {best['size']} → {best['rate'] / rows[0]['rate']:.1f}× lo de lote 1")
+
+    if failures:
+        print(f"\n❌ {len(failures)} control(es) fallaron: {', '.join(failures)}")
+        return 1
+    print("\n✅ Todos los controles pasaron")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""
+Replay de tráfico capturado
+---------------------------
+✅ Lee capturas JSONL de TrafficCaptureMiddleware (incluye archivos rotados)
+✅ Reproduce contra una instancia local: a 1×, N× o a máxima velocidad
+✅ Requests autenticados con sesión de prueba (login por thread) y CSRF propio
+✅ Webhooks re-firmados con el secret local (la firma original nunca se captura)
+✅ Reporte por endpoint: latencia original vs replay (p50/p95/p99) y status distintos
+
+Uso:
+    python -m benchmarks.replay data/capture/requests.jsonl                # app local con stand-ins
+    python -m benchmarks.replay captura.jsonl --speed 4 --target http://127.0.0.1:5000 \\
+        --login qa@playtimeuy.com:secreto --webhook-secret $MP_WEBHOOK_SECRET
+    python -m benchmarks.replay captura.jsonl --speed max --concurrency 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from benchmarks.run import DEFAULT_OUTPUT, git_label, percentile, serve
+
+SKIP_HEADERS = {"X-CSRF-Token", "X-Request-ID"}
+
+
+# =========================================================
+# Sesiones
+# =========================================================
+class SessionPool:
+    """Un requests.Session por thread; los autenticados hacen login una vez."""
+
+    def __init__(self, base_url: str, credentials: List[Tuple[str, str]]):
+        self.base = base_url
+        self.credentials = credentials
+        self._local = threading.local()
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def get(self, authenticated: bool) -> Tuple[requests.Session, Optional[str]]:
+        attr = "auth" if authenticated and self.credentials else "anon"
+        cached = getattr(self._local, attr, None)
+        if cached is not None:
+            return cached
+        http = requests.Session()
+        csrf = None
+        if attr == "auth":
+            with self._lock:
+                email, password = self.credentials[self._seq % len(self.credentials)]
+                self._seq += 1
+            http.headers["X-Forwarded-For"] = f"10.99.{self._seq // 250}.{self._seq % 250 + 1}"
+            token = http.get(self.base + "/login", headers={"Accept": "application/json"}, timeout=30)
+            visitor = token.json().get("csrf_token", "") if token.status_code == 200 else ""
+            resp = http.post(self.base + "/login", json={"email": email, "password": password},
+                             headers={"X-CSRF-Token": visitor}, timeout=30)
+            if resp.status_code == 200:
+                csrf = resp.json().get("csrf_token")
+            else:
+                logging.getLogger("PlayTimeUY.replay").warning("⚠️ Login de replay falló (%s)", resp.status_code)
+        setattr(self._local, attr, (http, csrf))
+        return http, csrf
+
+
+# =========================================================
+# Replay
+# =========================================================
+class Replayer:
+    def __init__(self, base_url: str, sessions: SessionPool, webhook_secret: Optional[str]):
+        self.base = base_url
+        self.sessions = sessions
+        self.webhook_secret = webhook_secret
+        self._lock = threading.Lock()
+        self.rows: Dict[str, Dict[str, List[Any]]] = defaultdict(lambda: {"orig": [], "replay": [], "lag": []})
+        self.status_diff: Dict[str, int] = defaultdict(int)
+        self.status: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.skipped: Dict[str, int] = defaultdict(int)
+
+    def prepare(self, env: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Arma kwargs de requests o None si el sobre no es reproducible."""
+        method = env.get("method", "GET")
+        body = env.get("body")
+        if env.get("body_size") and body is None:
+            self.skipped["body_not_captured"] += 1
+            return None
+        headers = {k: v for k, v in (env.get("headers") or {}).items() if k not in SKIP_HEADERS}
+        kwargs: Dict[str, Any] = {"method": method, "headers": headers}
+        if body is not None:
+            raw = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+            kwargs["data"] = raw
+            if self.webhook_secret:
+                headers["X-Hub-Signature"] = hmac.new(self.webhook_secret.encode(), raw, hashlib.sha256).hexdigest()
+        query = env.get("query")
+        kwargs["url"] = self.base + env.get("path", "/") + (f"?{query}" if query else "")
+        return kwargs
+
+    def send(self, env: Dict[str, Any], kwargs: Dict[str, Any], lag_ms: float = 0.0) -> None:
+        http, csrf = self.sessions.get(bool(env.get("authenticated")))
+        if csrf and kwargs["method"] not in ("GET", "HEAD", "OPTIONS"):
+            kwargs["headers"]["X-CSRF-Token"] = csrf
+        label = f"{kwargs['method']} {env.get('endpoint') or env.get('path')}"
+        start = time.perf_counter()
+        try:
+            resp = http.request(allow_redirects=False, timeout=30, **kwargs)
+            for _ in resp.iter_content(65536):  # medir hasta el último byte, como la captura
+                pass
+            status: Any = resp.status_code
+        except requests.RequestException as exc:
+            status = type(exc).__name__
+        elapsed = (time.perf_counter() - start) * 1000.0
+        with self._lock:
+            row = self.rows[label]
+            row["orig"].append(float(env.get("duration_ms") or 0.0))
+            row["replay"].append(elapsed)
+            row["lag"].append(lag_ms)
+            self.status[label][str(status)] += 1
+            if status != env.get("status"):
+                self.status_diff[label] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        endpoints = {}
+        for label, row in sorted(self.rows.items()):
+            orig, rep = sorted(row["orig"]), sorted(row["replay"])
+            entry: Dict[str, Any] = {"requests": len(rep), "status": dict(self.status[label]),
+                                     "status_mismatch": self.status_diff.get(label, 0)}
+            for pct in (50, 95, 99):
+                o, r = percentile(orig, pct), percentile(rep, pct)
+                entry[f"orig_p{pct}_ms"] = round(o, 2)
+                entry[f"replay_p{pct}_ms"] = round(r, 2)
+                entry[f"delta_p{pct}_ms"] = round(r - o, 2)
+            entry["max_schedule_lag_ms"] = round(max(row["lag"] or [0.0]), 2)
+            endpoints[label] = entry
+        return {"endpoints": endpoints, "skipped": dict(self.skipped)}
+
+
+def replay(replayer: Replayer, envelopes: List[Dict[str, Any]], speed: Optional[float], concurrency: int) -> float:
+    """speed=None → máxima velocidad; si no, respeta los intervalos originales / speed."""
+    prepared = [(env, replayer.prepare(env)) for env in envelopes]
+    prepared = [(env, kw) for env, kw in prepared if kw is not None]
+    if not prepared:
+        return 0.0
+    t0 = prepared[0][0].get("ts", 0.0)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="replay") as pool:
+        if speed is None:
+            list(pool.map(lambda item: replayer.send(*item), prepared))
+        else:
+            for env, kwargs in prepared:
+                due = start + (env.get("ts", t0) - t0) / speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(replayer.send, env, kwargs, max(0.0, -delay) * 1000.0)
+    return time.perf_counter() - start
+
+
+# =========================================================
+# Reporte
+# =========================================================
+def print_report(result: Dict[str, Any]) -> None:
+    speed = result["params"]["speed"]
+    print(f"\n== Replay {result['label']} · {result['requests']} requests a {speed} en {result['elapsed_s']} s ==")
+    print(f"{'endpoint':38} {'reqs':>5} {'p50 orig':>9} {'p50 rep':>9} {'Δp50':>8} {'p95 orig':>9} "
+          f"{'p95 rep':>9} {'Δp95':>8} {'≠status':>8}")
+    for name, row in result["endpoints"].items():
+        print(f"{name[:38]:38} {row['requests']:>5} {row['orig_p50_ms']:>9} {row['replay_p50_ms']:>9} "
+              f"{row['delta_p50_ms']:>+8.1f} {row['orig_p95_ms']:>9} {row['replay_p95_ms']:>9} "
+              f"{row['delta_p95_ms']:>+8.1f} {row['status_mismatch']:>8}")
+    if result["skipped"]:
+        print("Omitidos: " + ", ".join(f"{k}×{v}" for k, v in result["skipped"].items()))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Replay de capturas de tráfico de PlayTimeUY")
+    p.add_argument("capture", nargs="+", help="Archivo(s) JSONL; con uno solo se suman sus rotados (.1, .2, ...)")
+    p.add_argument("--speed", default="1", help="1, N (multiplicador) o 'max'")
+    p.add_argument("--concurrency", type=int, default=16, help="Threads de envío")
+    p.add_argument("--target", default=None, help="URL base; por defecto levanta la app con stand-ins locales")
+    p.add_argument("--login", action="append", default=[], metavar="EMAIL:PASSWORD",
+                   help="Credenciales para requests autenticados (repetible)")
+    p.add_argument("--webhook-secret", default=None, help="Secret para re-firmar webhooks")
+    p.add_argument("--limit", type=int, default=None, help="Reproducir solo los primeros N sobres")
+    p.add_argument("--latency-ms", type=float, default=5.0, help="Latencia de Firestore del stand-in")
+    p.add_argument("--label", default=None)
+    p.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = p.parse_args(argv)
+    if args.speed.lower() == "max":
+        args.speed_value = None
+    else:
+        try:
+            args.speed_value = float(args.speed.rstrip("x×"))
+        except ValueError:
+            p.error("--speed debe ser un número o 'max'")
+        if args.speed_value <= 0:
+            p.error("--speed debe ser > 0")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.getLogger("PlayTimeUY").setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    from benchmarks.harness import WEBHOOK_SECRET, build_bench_app, ensure_importable
+
+    bench = shutdown = None
+    base_url = (args.target or "").rstrip("/")
+    if not base_url:
+        bench = build_bench_app(firestore_latency_ms=args.latency_ms)
+    else:
+        ensure_importable()
+    from app.utils.traffic_capture import capture_files, read_capture
+
+    paths = capture_files(args.capture[0]) if len(args.capture) == 1 else args.capture
+    envelopes = read_capture(paths)
+    if args.limit:
+        envelopes = envelopes[: args.limit]
+    if not envelopes:
+        print(f"Sin sobres en {', '.join(args.capture)}")
+        if bench:
+            bench.close()
+        return 1
+
+    credentials = [tuple(c.split(":", 1)) for c in args.login if ":" in c]
+    webhook_secret = args.webhook_secret
+    if bench:
+        base_url, shutdown = serve(bench)
+        credentials = credentials or [(b["email"], b["password"]) for b in bench.buyers]
+        webhook_secret = webhook_secret or WEBHOOK_SECRET
+
+    replayer = Replayer(base_url, SessionPool(base_url, credentials), webhook_secret)
+    try:
+        elapsed = replay(replayer, envelopes, args.speed_value, args.concurrency)
+    finally:
+        if shutdown:
+            shutdown()
+        if bench:
+            bench.close()
+
+    summary = replayer.summary()
+    label = args.label or git_label()
+    result = {
+        "label": label,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "params": {"captures": paths, "speed": args.speed, "concurrency": args.concurrency,
+                   "target": args.target or "local-standins"},
+        "elapsed_s": round(elapsed, 3),
+        "requests": sum(r["requests"] for r in summary["endpoints"].values()),
+        **summary,
+    }
+    print_report(result)
+
+    os.makedirs(args.output, exist_ok=True)
+    out_path = os.path.join(args.output, f"replay-{label}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(out_path, "w", encoding="utf-8") as fh:
+        json.dump(result, fh, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados guardados en {out_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,359 @@
+"""
+Prueba de reinicio sin pérdida de requests
+------------------------------------------
+✅ Levanta gunicorn con gunicorn.conf.py real (preload, hooks, RecyclingThreadWorker)
+✅ Carga continua con keep-alive mientras ocurren: reload (HUP), SIGTERM a un worker
+   y reciclado por max_requests → todos los requests tienen que responder 200
+✅ SIGTERM al master con requests lentos en curso → todos terminan con 200
+✅ Cada request respondido dejó su línea de log (las colas se vaciaron al apagar)
+✅ Ruta sin gunicorn (run_new.py: Waitress / dev server): la señal drena en curso
+   y responde 503 a lo nuevo
+
+Sale con código 1 si se perdió algún request.
+
+Uso:
+    python -m benchmarks.rolling_restart
+    python -m benchmarks.rolling_restart --workers 3 --clients 24 --duration 12
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_LOGGER = "PlayTimeUY.bench"
+
+
+# =========================================================
+# App de prueba (la carga gunicorn / el subproceso dev)
+# =========================================================
+def create_bench_app():
+    """create_app sobre SQLite más /bench/slow (duerme `ms` y deja una línea de log)."""
+    from benchmarks.harness import ensure_importable
+
+    ensure_importable()
+    from flask import jsonify, request
+
+    from app import create_app
+
+    app = create_app({
+        "DATA_BACKEND": "sqlite",
+        "SQLITE_PATH": os.environ["RR_SQLITE_PATH"],
+        "FORCE_HTTPS": False,
+        "DEBUG": False,
+        "PROFILING_ENABLED": False,
+    })
+    log = logging.getLogger(BENCH_LOGGER)
+
+    def slow():
+        time.sleep(int(request.args.get("ms", "0")) / 1000.0)
+        log.info("bench-done %s", request.args.get("id", "-"))
+        return jsonify({"ok": True, "pid": os.getpid()})
+
+    app.add_url_rule("/bench/slow", "bench_slow", slow)
+    return app
+
+
+def _serve_dev(port: int) -> None:
+    """Mismo camino que run_new.run_server fuera de gunicorn (sin Waitress: werkzeug)."""
+    from werkzeug.serving import make_server
+
+    from app.utils.shutdown import shutdown_app
+
+    app = create_bench_app()
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    app.extensions["shutdown"].install_signal_handlers()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        shutdown_app(app)
+
+
+# =========================================================
+# Cliente
+# =========================================================
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_up(base: str, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base}/bench/slow", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"El servidor no respondió en {timeout:.0f} s")
+
+
+class LoadClients:
+    """Clientes keep-alive que piden /bench/slow hasta que se los detiene."""
+
+    def __init__(self, base: str, clients: int, slow_ms: int):
+        self.base = base
+        self.clients = clients
+        self.slow_ms = slow_ms
+        self.stop = threading.Event()
+        self.results: List[Tuple[str, Any]] = []
+        self.pids: Counter = Counter()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def _run(self) -> None:
+        with httpx.Client(base_url=self.base, timeout=30) as client:
+            while not self.stop.is_set():
+                rid = uuid.uuid4().hex[:12]
+                try:
+                    resp = client.get("/bench/slow", params={"ms": self.slow_ms, "id": rid})
+                    outcome: Any = resp.status_code
+                    if resp.status_code == 200:
+                        with self._lock:
+                            self.pids[resp.json()["pid"]] += 1
+                except httpx.HTTPError as exc:
+                    outcome = type(exc).__name__
+                with self._lock:
+                    self.results.append((rid, outcome))
+
+    def start(self) -> None:
+        for i in range(self.clients):
+            t = threading.Thread(target=self._run, name=f"rr-client-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def join(self) -> None:
+        self.stop.set()
+        for t in self._threads:
+            t.join(timeout=60)
+
+
+def _slow_batch(base: str, count: int, ms: int, send_signal) -> List[Tuple[str, Any]]:
+    """`count` requests lentos en paralelo; `send_signal` se llama cuando ya están en curso."""
+    def one(_i: int) -> Tuple[str, Any]:
+        rid = uuid.uuid4().hex[:12]
+        try:
+            return rid, httpx.get(f"{base}/bench/slow", params={"ms": ms, "id": rid}, timeout=60).status_code
+        except httpx.HTTPError as exc:
+            return rid, type(exc).__name__
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        futures = [pool.submit(one, i) for i in range(count)]
+        time.sleep(min(0.5, ms / 3000.0))
+        send_signal()
+        return [f.result() for f in futures]
+
+
+# =========================================================
+# Escenarios
+# =========================================================
+def _env(workdir: str, port: int, args: argparse.Namespace) -> Dict[str, str]:
+    # El directorio multiproceso de prometheus tiene que existir antes de importar la app
+    # (gunicorn.conf.py lo crea, el servidor dev no)
+    os.makedirs(os.path.join(workdir, "metrics"), exist_ok=True)
+    env = {k: v for k, v in os.environ.items() if k not in ("GOOGLE_APPLICATION_CREDENTIALS", "FIREBASE_SERVICE_ACCOUNT")}
+    env.update({
+        "PYTHONPATH": ROOT,
+        "PYTHONUNBUFFERED": "1",
+        "RR_SQLITE_PATH": os.path.join(workdir, "bench.sqlite"),
+        "DATA_BACKEND": "sqlite",
+        "PORT": str(port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "GUNICORN_THREADS": str(args.threads),
+        "GUNICORN_MAX_REQUESTS": str(args.max_requests),
+        "GUNICORN_GRACEFUL_TIMEOUT": "10",
+        "PROMETHEUS_MULTIPROC_DIR": os.path.join(workdir, "metrics"),
+        "LOG_LEVEL": "INFO",
+        "OTEL_TRACES_EXPORTER": "none",
+    })
+    return env
+
+
+def _logged_ids(log_path: str) -> set:
+    with open(log_path, encoding="utf-8", errors="replace") as fh:
+        return set(re.findall(r"bench-done ([0-9a-f]{12})", fh.read()))
+
+
+def run_gunicorn(args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(workdir, "gunicorn.log")
+    with open(log_path, "w", encoding="utf-8") as log_fh:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", os.path.join(ROOT, "gunicorn.conf.py"),
+             "benchmarks.rolling_restart:create_bench_app()"],
+            cwd=ROOT, env=_env(workdir, port, args), stdout=log_fh, stderr=subprocess.STDOUT,
+        )
+    try:
+        _wait_up(base)
+        load = LoadClients(base, args.clients, args.slow_ms)
+        load.start()
+        events: List[str] = []
+        step = args.duration / 4
+        time.sleep(step)
+        proc.send_signal(signal.SIGHUP)
+        events.append("HUP (reload de workers)")
+        time.sleep(step)
+        with load._lock:
+            victim = load.pids.most_common(1)[0][0] if load.pids else None
+        if victim:
+            try:
+                os.kill(victim, signal.SIGTERM)
+                events.append(f"SIGTERM worker {victim}")
+            except ProcessLookupError:
+                pass
+        time.sleep(step)
+        proc.send_signal(signal.SIGHUP)
+        events.append("HUP (reload de workers)")
+        time.sleep(step)
+        load.join()
+
+        final = _slow_batch(base, args.inflight, args.inflight_ms, lambda: proc.send_signal(signal.SIGTERM))
+        events.append(f"SIGTERM master con {args.inflight} requests de {args.inflight_ms} ms en curso")
+        t0 = time.time()
+        code = proc.wait(timeout=60)
+        exit_s = time.time() - t0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+
+    with open(log_path, encoding="utf-8", errors="replace") as fh:
+        log_text = fh.read()
+    ok_ids = {rid for rid, outcome in load.results + final if outcome == 200}
+    return {
+        "events": events,
+        "load": Counter(o for _r, o in load.results),
+        "final": Counter(o for _r, o in final),
+        "recycled": log_text.count("max_requests): deja de aceptar"),
+        "workers_booted": log_text.count("Booting worker"),
+        "orderly_exits": log_text.count("Apagado ordenado"),
+        "missing_logs": len(ok_ids - _logged_ids(log_path)),
+        "exit_code": code,
+        "exit_seconds": round(exit_s, 2),
+        "log": log_path,
+    }
+
+
+def run_dev(args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    log_path = os.path.join(workdir, "dev.log")
+    with open(log_path, "w", encoding="utf-8") as log_fh:
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.rolling_restart", "--serve-dev", str(port)],
+            cwd=ROOT, env=_env(workdir, port, args), stdout=log_fh, stderr=subprocess.STDOUT,
+        )
+    try:
+        _wait_up(base)
+        late: List[Any] = []
+
+        def _term_then_probe():
+            proc.send_signal(signal.SIGTERM)
+            time.sleep(0.1)
+            try:
+                late.append(httpx.get(f"{base}/bench/slow", timeout=5).status_code)
+            except httpx.HTTPError as exc:
+                late.append(type(exc).__name__)
+
+        final = _slow_batch(base, args.inflight, args.inflight_ms, _term_then_probe)
+        code = proc.wait(timeout=60)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+    ok_ids = {rid for rid, outcome in final if outcome == 200}
+    return {
+        "final": Counter(o for _r, o in final),
+        "late": Counter(late),
+        "missing_logs": len(ok_ids - _logged_ids(log_path)),
+        "exit_code": code,
+        "log": log_path,
+    }
+
+
+# =========================================================
+# Main
+# =========================================================
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Reinicios sin pérdida de requests")
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("--threads", type=int, default=4)
+    p.add_argument("--clients", type=int, default=16, help="Clientes keep-alive simultáneos")
+    p.add_argument("--slow-ms", type=int, default=40, help="Duración de cada request de la carga")
+    p.add_argument("--duration", type=float, default=8.0, help="Segundos de carga con reinicios")
+    p.add_argument("--max-requests", type=int, default=150, help="Reciclado de workers durante la carga")
+    p.add_argument("--inflight", type=int, default=8, help="Requests lentos en curso al apagar")
+    p.add_argument("--inflight-ms", type=int, default=1500)
+    p.add_argument("--skip-dev", action="store_true", help="Solo gunicorn")
+    p.add_argument("--serve-dev", type=int, default=None, help=argparse.SUPPRESS)
+    return p.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.serve_dev is not None:
+        _serve_dev(args.serve_dev)
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="ptuy-rolling-")
+    failures: List[str] = []
+
+    print("🔄 gunicorn: carga continua con reload, SIGTERM a un worker y reciclado")
+    g = run_gunicorn(args, workdir)
+    for event in g["events"]:
+        print(f"   • {event}")
+    print(f"   Carga:  {dict(g['load'])}  (workers arrancados {g['workers_booted']}, reciclados {g['recycled']})")
+    print(f"   Final:  {dict(g['final'])}  (master salió con {g['exit_code']} en {g['exit_seconds']} s)")
+    print(f"   Apagados ordenados: {g['orderly_exits']}, requests 200 sin línea de log: {g['missing_logs']}")
+    if set(g["load"]) != {200}:
+        failures.append(f"gunicorn: requests perdidos durante la carga {dict(g['load'])}")
+    if set(g["final"]) != {200}:
+        failures.append(f"gunicorn: requests en curso perdidos al apagar {dict(g['final'])}")
+    if g["missing_logs"]:
+        failures.append(f"gunicorn: {g['missing_logs']} líneas de log sin flush")
+    if g["exit_code"] != 0:
+        failures.append(f"gunicorn: el master salió con código {g['exit_code']}")
+
+    if not args.skip_dev:
+        print("\n🛠️ Sin gunicorn (run_new.py): SIGTERM con requests en curso")
+        d = run_dev(args, workdir)
+        print(f"   En curso: {dict(d['final'])}   Nuevos tras la señal: {dict(d['late'])}")
+        print(f"   Salida: {d['exit_code']}, requests 200 sin línea de log: {d['missing_logs']}")
+        if set(d["final"]) != {200}:
+            failures.append(f"dev: requests en curso perdidos {dict(d['final'])}")
+        if not set(d["late"]) <= {503, "ConnectError"}:
+            failures.append(f"dev: request nuevo durante el drenado respondió {dict(d['late'])}")
+        if d["missing_logs"]:
+            failures.append(f"dev: {d['missing_logs']} líneas de log sin flush")
+
+    print(f"\n📄 Logs en {workdir}")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return 1
+    print("✅ Ningún request perdido")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,328 @@
+"""
+CLI de load-test offline
+------------------------
+✅ Levanta la app real (create_app) en un servidor WSGI local con threads
+✅ Escenarios: login, explore, profile, payment, history, webhook
+✅ Concurrencia configurable, por duración o cantidad de requests
+✅ Throughput y latencias p50/p95/p99 por endpoint + conteo de status
+✅ Resultados en JSON (etiquetados con el commit) y comparación contra una corrida previa
+
+Uso:
+    python -m benchmarks.run --concurrency 8 --duration 20
+    python -m benchmarks.run --scenarios explore,profile --latency-ms 15
+    python -m benchmarks.run --compare benchmarks/results/<anterior>.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from benchmarks.harness import BenchApp, WEBHOOK_SECRET, build_bench_app
+
+SCENARIOS = ("login", "explore", "profile", "payment", "history", "webhook")
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), "results")
+
+
+# =========================================================
+# Estadística
+# =========================================================
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, endpoint: str, status: Any, seconds: float) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(seconds * 1000.0)
+            self.statuses[endpoint][str(status)] += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        total = 0
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            total += len(values)
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+                "p99_ms": round(percentile(values, 99), 2),
+                "max_ms": round(values[-1], 2) if values else 0.0,
+                "status": dict(self.statuses[endpoint]),
+            }
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+# =========================================================
+# Cliente virtual
+# =========================================================
+class VirtualUser:
+    """Un `requests.Session` con cookie de sesión y token CSRF propios."""
+
+    def __init__(self, base_url: str, bench: BenchApp, recorder: Recorder, rng: random.Random):
+        self.base = base_url
+        self.bench = bench
+        self.rec = recorder
+        self.rng = rng
+        self.http = requests.Session()
+        self.csrf: Optional[str] = None
+        self.buyer = rng.choice(bench.buyers)
+
+    def _call(self, endpoint: str, method: str, path: str, **kwargs) -> Optional[requests.Response]:
+        start = time.perf_counter()
+        try:
+            resp = self.http.request(method, self.base + path, allow_redirects=False, timeout=30, **kwargs)
+            self.rec.add(endpoint, resp.status_code, time.perf_counter() - start)
+            return resp
+        except requests.RequestException as exc:
+            self.rec.add(endpoint, type(exc).__name__, time.perf_counter() - start)
+            return None
+
+    def login(self) -> None:
+        # Cada login simula un cliente nuevo (cookie e IP propias) para no medir el rate limit
+        self.http.cookies.clear()
+        self.http.headers["X-Forwarded-For"] = f"10.{self.rng.randrange(256)}.{self.rng.randrange(256)}.{self.rng.randrange(1, 255)}"
+        token = self._call("GET /login", "GET", "/login", headers={"Accept": "application/json"})
+        visitor = token.json().get("csrf_token", "") if token is not None and token.status_code == 200 else ""
+        resp = self._call("POST /login", "POST", "/login", headers={"X-CSRF-Token": visitor}, json={
+            "email": self.buyer["email"], "password": self.buyer["password"],
+        })
+        if resp is not None and resp.status_code == 200:
+            self.csrf = resp.json().get("csrf_token")
+
+    def explore(self) -> None:
+        self._call("GET /explorar", "GET", "/explorar")
+
+    def profile(self) -> None:
+        self._call("GET /perfil/<user_id>", "GET", f"/perfil/{self.rng.choice(self.bench.creators)}")
+
+    def payment(self) -> None:
+        if not self.csrf:
+            self.login()
+        self._call("POST /user/payment", "POST", "/user/payment",
+                   headers={"X-CSRF-Token": self.csrf or ""},
+                   json={"amount": self.rng.choice([150, 300, 450]), "creator_uid": self.rng.choice(self.bench.creators)})
+
+    def history(self) -> None:
+        if not self.csrf:
+            self.login()
+        self._call("GET /payment/history", "GET", "/payment/history")
+
+    def webhook(self) -> None:
+        # Mitad con referencia directa, mitad por payment_id (consulta al stand-in de MP)
+        if self.rng.random() < 0.5:
+            payload = {"external_reference": self.rng.choice(self.bench.payment_refs), "status": "approved"}
+        else:
+            payload = {"type": "payment", "data": {"id": self.rng.choice(list(self.bench.standins.payments))}}
+        body = json.dumps(payload).encode()
+        signature = hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        self._call("POST /user/payment/webhook", "POST", "/user/payment/webhook", data=body,
+                   headers={"Content-Type": "application/json", "X-Hub-Signature": signature})
+
+
+# =========================================================
+# Servidor + ejecución
+# =========================================================
+def serve(bench: BenchApp) -> Tuple[str, Callable[[], None]]:
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, bench.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name="bench-wsgi", daemon=True)
+    thread.start()
+    return f"http://127.0.0.1:{server.server_port}", server.shutdown
+
+
+def run_load(
+    bench: BenchApp,
+    base_url: str,
+    scenarios: List[str],
+    concurrency: int,
+    duration: Optional[float],
+    total_requests: Optional[int],
+    seed: int = 1234,
+) -> Dict[str, Any]:
+    recorder = Recorder()
+    counter = iter(range(total_requests)) if total_requests else None
+    counter_lock = threading.Lock()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def keep_going() -> bool:
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        if counter is not None:
+            with counter_lock:
+                return next(counter, None) is not None
+        return True
+
+    def worker(idx: int) -> None:
+        user = VirtualUser(base_url, bench, recorder, random.Random(seed + idx))
+        if {"login", "payment", "history"} & set(scenarios):
+            user.login()
+        while keep_going():
+            getattr(user, user.rng.choice(scenarios))()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-user") as pool:
+        list(pool.map(worker, range(concurrency)))
+    return recorder.summary(time.perf_counter() - start)
+
+
+def git_label() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# =========================================================
+# Reportes
+# =========================================================
+def print_report(result: Dict[str, Any]) -> None:
+    print(f"\n== {result['label']} · {result['requests']} requests en {result['elapsed_s']} s "
+          f"({result['rps']} req/s, concurrencia {result['params']['concurrency']}) ==")
+    print(f"{'endpoint':32} {'reqs':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}  status")
+    for name, row in result["endpoints"].items():
+        status = ", ".join(f"{k}×{v}" for k, v in sorted(row["status"].items()))
+        print(f"{name:32} {row['requests']:>6} {row['rps']:>8} {row['p50_ms']:>8} "
+              f"{row['p95_ms']:>8} {row['p99_ms']:>8}  {status}")
+    loader = result.get("loader") or {}
+    if loader.get("lookups"):
+        print(f"📦 Loader: {loader['lookups']} documentos pedidos, {loader['fetched']} leídos en "
+              f"{loader['batches']} lotes (ahorro: {loader['reads_saved']} lecturas, "
+              f"{loader['round_trips_saved']} round-trips)")
+
+
+def print_comparison(before: Dict[str, Any], after: Dict[str, Any]) -> None:
+    def delta(old: float, new: float) -> str:
+        if not old:
+            return "   n/a"
+        return f"{(new - old) / old * 100:+6.1f}%"
+
+    print(f"\n== Comparación {before.get('label')} → {after.get('label')} ==")
+    print(f"{'endpoint':32} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    print(f"{'(total)':32} {delta(before['rps'], after['rps']):>8}")
+    for name, row in after["endpoints"].items():
+        old = before.get("endpoints", {}).get(name)
+        if not old:
+            continue
+        print(f"{name:32} {delta(old['rps'], row['rps']):>8} {delta(old['p50_ms'], row['p50_ms']):>8} "
+              f"{delta(old['p95_ms'], row['p95_ms']):>8} {delta(old['p99_ms'], row['p99_ms']):>8}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Load-test offline de PlayTimeUY")
+    p.add_argument("--concurrency", type=int, default=8)
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--duration", type=float, help="Segundos de carga")
+    group.add_argument("--requests", type=int, help="Cantidad total de requests")
+    p.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Lista separada por comas de {SCENARIOS}")
+    p.add_argument("--latency-ms", type=float, default=5.0, help="Latencia simulada por RPC de Firestore")
+    p.add_argument("--auth-latency-ms", type=float, default=30.0)
+    p.add_argument("--mp-latency-ms", type=float, default=60.0)
+    p.add_argument("--backend", choices=("firestore", "sqlite"), default="firestore",
+                   help="firestore = stand-in en memoria con latencia; sqlite = backend SQLite real")
+    p.add_argument("--buyers", type=int, default=50)
+    p.add_argument("--creators", type=int, default=30)
+    p.add_argument("--label", default=None, help="Etiqueta del resultado (por defecto el commit actual)")
+    p.add_argument("--output", default=DEFAULT_OUTPUT, help="Directorio para el JSON de resultados")
+    p.add_argument("--compare", default=None, help="JSON de una corrida anterior para comparar")
+    p.add_argument("--seed", type=int, default=1234)
+    args = p.parse_args(argv)
+    if args.duration is None and args.requests is None:
+        args.duration = 10.0
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        p.error(f"Escenarios desconocidos: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.getLogger("PlayTimeUY").setLevel(logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    bench = build_bench_app(
+        firestore_latency_ms=args.latency_ms,
+        auth_latency_ms=args.auth_latency_ms,
+        mp_latency_ms=args.mp_latency_ms,
+        buyers=args.buyers,
+        creators=args.creators,
+        backend=args.backend,
+    )
+    base_url, shutdown = serve(bench)
+    try:
+        summary = run_load(bench, base_url, args.scenarios, args.concurrency,
+                           args.duration, args.requests, seed=args.seed)
+    finally:
+        shutdown()
+        bench.close()
+
+    label = args.label or git_label()
+    result = {
+        "label": label,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "params": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "scenarios": args.scenarios,
+            "backend": args.backend,
+            "firestore_latency_ms": args.latency_ms,
+            "auth_latency_ms": args.auth_latency_ms,
+            "mp_latency_ms": args.mp_latency_ms,
+        },
+        "firestore_rpcs": bench.db.rpc_count if bench.db is not None else None,
+        "queries": bench.app.extensions["repositories"].stats.snapshot(),
+        "loader": bench.app.extensions["repositories"].loader_stats.snapshot(),
+        **summary,
+    }
+    print_report(result)
+
+    os.makedirs(args.output, exist_ok=True)
+    out_path = os.path.join(args.output, f"{label}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(out_path, "w", encoding="utf-8") as fh:
+        json.dump(result, fh, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados guardados en {out_path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            print_comparison(json.load(fh), result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
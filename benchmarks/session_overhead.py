@@ -0,0 +1,184 @@
+"""
+Sesión en cookie firmada vs sesión en el servidor
+-------------------------------------------------
+✅ Misma app (create_app sobre SQLite) con SESSION_BACKEND=cookie y =sqlite
+✅ Escenarios de un usuario logueado: página que lee la sesión, archivo
+   estático, edición de perfil (reescribe session["user"]) y login
+✅ Reporta µs por request (p50 / p95), bytes de Cookie que manda el navegador
+   y Set-Cookie por request
+✅ Dos apps sobre el mismo store (= dos workers): la sesión iniciada en una
+   sirve en la otra y el logout la invalida en ambas
+
+Uso:
+    python -m benchmarks.session_overhead
+    python -m benchmarks.session_overhead --requests 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.harness import ensure_importable
+
+BACKENDS = ("cookie", "sqlite")
+STATIC_PATH = "/static/favicon.png"
+BENCH_USER = {
+    "uid": "bench-user-0001",
+    "email": "bench.user@playtimeuy.test",
+    "username": "bench_user",
+    "role": "creator",
+    "is_admin": False,
+}
+
+
+# =========================================================
+# App de prueba
+# =========================================================
+def create_bench_app(workdir: str, backend: str, store_path: Optional[str] = None):
+    ensure_importable()
+    from flask import flash, get_flashed_messages, jsonify, session
+
+    from app import create_app
+    from app.main.main_routes import get_current_user, set_current_user
+    from app.utils.csrf import generate_csrf_token
+
+    app = create_app({
+        "SECRET_KEY": "bench-secret",
+        "DATA_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, f"data-{backend}.db"),
+        "SESSION_BACKEND": backend,
+        "SESSION_STORE_PATH": store_path or os.path.join(workdir, "sessions.db"),
+        "FORCE_HTTPS": False,
+        "DEBUG": False,
+        "PROFILING_ENABLED": False,
+        "METRICS_ENABLED": False,
+        "COMPRESSION_ENABLED": False,
+    })
+
+    def login():
+        set_current_user(BENCH_USER)
+        flash("Sesión iniciada correctamente", "success")
+        return jsonify({"ok": True, "csrf_token": generate_csrf_token()})
+
+    def me():
+        get_flashed_messages()
+        return jsonify({"user": get_current_user(), "csrf_token": generate_csrf_token()})
+
+    def update():
+        # Lo mismo que profile_edit: el dict completo vuelve a la sesión
+        user = dict(get_current_user() or {})
+        user["avatar_url"] = f"https://storage.playtimeuy.test/avatars/{user.get('uid')}/{time.time_ns()}.png"
+        session["user"] = user
+        return jsonify({"ok": True})
+
+    def logout():
+        session.clear()
+        return jsonify({"ok": True})
+
+    app.add_url_rule("/bench/session/login", "bench_session_login", login, methods=["POST"])
+    app.add_url_rule("/bench/session/me", "bench_session_me", me)
+    app.add_url_rule("/bench/session/update", "bench_session_update", update, methods=["POST"])
+    app.add_url_rule("/bench/session/logout", "bench_session_logout", logout, methods=["POST"])
+    return app
+
+
+# =========================================================
+# Medición
+# =========================================================
+def _cookie_header(client) -> int:
+    cookie = client.get_cookie("session")
+    return len(f"session={cookie.value}") if cookie is not None else 0
+
+
+def _measure(client, call: Callable[[], Any], n: int) -> Dict[str, Any]:
+    times: List[float] = []
+    set_cookie = 0
+    cookie_bytes = 0
+    statuses: Dict[int, int] = {}
+    for _ in range(n):
+        cookie_bytes += _cookie_header(client)
+        t0 = time.perf_counter()
+        resp = call()
+        times.append((time.perf_counter() - t0) * 1e6)
+        set_cookie += "Set-Cookie" in resp.headers
+        statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+        resp.close()
+    times.sort()
+    return {
+        "p50_us": round(statistics.median(times), 1),
+        "p95_us": round(times[int(len(times) * 0.95) - 1], 1),
+        "cookie_bytes": round(cookie_bytes / n),
+        "set_cookie": round(set_cookie / n, 3),
+        "status": statuses,
+    }
+
+
+def run_backend(app, n: int) -> Dict[str, Dict[str, Any]]:
+    client = app.test_client()
+    client.post("/bench/session/login")
+    client.get("/bench/session/me")  # consume el flash del login
+    results = {
+        "GET página (lee sesión)": _measure(client, lambda: client.get("/bench/session/me"), n),
+        "GET estático": _measure(client, lambda: client.get(STATIC_PATH), n),
+        "POST editar perfil": _measure(client, lambda: client.post("/bench/session/update"), n),
+    }
+
+    def fresh_login():
+        c = app.test_client()
+        return c.post("/bench/session/login")
+
+    results["POST login"] = _measure(client, fresh_login, max(1, n // 4))
+    return results
+
+
+def check_shared_store(workdir: str) -> bool:
+    """Login en un 'worker', lectura en otro, logout en el primero."""
+    store = os.path.join(workdir, "shared-sessions.db")
+    app_a = create_bench_app(workdir, "sqlite", store)
+    app_b = create_bench_app(workdir, "sqlite", store)
+    a, b = app_a.test_client(), app_b.test_client()
+    a.post("/bench/session/login")
+    b.set_cookie("session", a.get_cookie("session").value)
+    seen = (b.get("/bench/session/me").get_json() or {}).get("user") or {}
+    a.post("/bench/session/logout")
+    after = (b.get("/bench/session/me").get_json() or {}).get("user")
+    return seen.get("uid") == BENCH_USER["uid"] and after is None
+
+
+def print_table(results: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+    print(f"\n{'Escenario':<26}{'Sesión':<8}{'p50 µs':>10}{'p95 µs':>10}{'Cookie B':>10}{'Set-Cookie/req':>16}  status")
+    for scenario in results[BACKENDS[0]]:
+        for backend in BACKENDS:
+            row = results[backend][scenario]
+            print(f"{scenario:<26}{backend:<8}{row['p50_us']:>10}{row['p95_us']:>10}{row['cookie_bytes']:>10}"
+                  f"{row['set_cookie']:>16}  {row['status']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Sesión en cookie vs sesión en el servidor")
+    p.add_argument("--requests", type=int, default=2000, help="Requests por escenario y backend")
+    args = p.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="ptuy-sessions-")
+    apps = {backend: create_bench_app(workdir, backend) for backend in BACKENDS}
+    for app in apps.values():  # calentamiento
+        run_backend(app, 50)
+    results = {backend: run_backend(app, args.requests) for backend, app in apps.items()}
+    print_table(results)
+
+    shared = check_shared_store(workdir)
+    print(f"\n{'✅' if shared else '❌'} Store compartido entre workers (login, lectura y logout)")
+    server = results["sqlite"]
+    ok = shared and all(set(row["status"]) == {200} for row in server.values()) \
+        and server["POST editar perfil"]["set_cookie"] == 0
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+"""
+Stand-ins locales para benchmarks
+---------------------------------
+✅ FakeFirestore: subset en memoria de la API de google-cloud-firestore
+   (collection / document / where / stream / get / set / update / add / get_all)
+✅ FakeAsyncFirestore: variante AsyncClient sobre los mismos datos (asyncio.sleep)
+✅ Servidor HTTP local que emula Identity Toolkit (signInWithPassword)
+   y la API REST de Mercado Pago (preferences / payments)
+✅ HttpClient para el SDK de Mercado Pago que apunta al servidor local
+✅ Latencia simulada configurable por servicio
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from google.api_core.exceptions import NotFound
+from google.cloud.firestore import SERVER_TIMESTAMP
+from mercadopago.http.http_client import HttpClient
+
+MP_API_BASE = "https://api.mercadopago.com"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _resolve(data: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    return {k: (now if v is SERVER_TIMESTAMP else v) for k, v in data.items()}
+
+
+# =========================================================
+# Firestore
+# =========================================================
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocumentRef", data: Optional[Dict[str, Any]],
+                 create_time: Optional[datetime] = None, update_time: Optional[datetime] = None):
+        self.reference = reference
+        self.id = reference.id
+        self._data = dict(data) if data is not None else None
+        self.exists = data is not None
+        self.create_time = create_time
+        self.update_time = update_time
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return (self._data or {}).get(field)
+
+
+class FakeDocumentRef:
+    def __init__(self, db: "FakeFirestore", collection: str, doc_id: str):
+        self._db = db
+        self.id = doc_id
+        self.path = f"{collection}/{doc_id}"
+        self._collection = collection
+
+    def get(self, field_paths=None, **_kwargs) -> FakeSnapshot:
+        self._db._rpc()
+        return self._db._snapshot(self._collection, self.id)
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self._db._rpc()
+        self._db._write(self._collection, self.id, data, merge=merge)
+
+    def update(self, data: Dict[str, Any]) -> None:
+        self._db._rpc()
+        self._db._write(self._collection, self.id, data, merge=True, must_exist=True)
+
+    def delete(self) -> None:
+        self._db._rpc()
+        with self._db._lock:
+            self._db._docs.get(self._collection, {}).pop(self.id, None)
+
+    def collection(self, name: str) -> "FakeQuery":
+        return FakeQuery(self._db, f"{self.path}/{name}")
+
+
+_OPS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeFirestore", collection: str,
+                 filters: Tuple = (), order: Tuple = (), limit_n: Optional[int] = None):
+        self._db = db
+        self.id = collection.rsplit("/", 1)[-1]
+        self._collection = collection
+        self._filters = filters
+        self._order = order
+        self._limit = limit_n
+
+    # Referencias de colección
+    def document(self, doc_id: Optional[str] = None) -> FakeDocumentRef:
+        return FakeDocumentRef(self._db, self._collection, doc_id or uuid.uuid4().hex[:20])
+
+    def add(self, data: Dict[str, Any]) -> Tuple[datetime, FakeDocumentRef]:
+        ref = self.document()
+        ref.set(data)
+        return _now(), ref
+
+    # Encadenado de queries
+    def where(self, field: Optional[str] = None, op: Optional[str] = None, value: Any = None, *, filter=None) -> "FakeQuery":
+        if filter is not None:
+            field, op, value = filter.field_path, filter.op_string, filter.value
+        return FakeQuery(self._db, self._collection, self._filters + ((field, op, value),), self._order, self._limit)
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return FakeQuery(self._db, self._collection, self._filters, self._order + ((field, direction),), self._limit)
+
+    def limit(self, n: int) -> "FakeQuery":
+        return FakeQuery(self._db, self._collection, self._filters, self._order, n)
+
+    def select(self, _fields: Iterable[str]) -> "FakeQuery":
+        return self
+
+    def stream(self, **_kwargs):
+        self._db._rpc()
+        with self._db._lock:
+            rows = list(self._db._docs.get(self._collection, {}).items())
+        out = []
+        for doc_id, (data, created, updated) in rows:
+            # Como Firestore: order_by deja afuera a los documentos que no tienen el campo
+            if (all(_OPS[op](data.get(f), v) for f, op, v in self._filters)
+                    and all(f in data for f, _d in self._order)):
+                out.append(FakeSnapshot(FakeDocumentRef(self._db, self._collection, doc_id), data, created, updated))
+        for field, direction in reversed(self._order):
+            out.sort(key=lambda s: (s.get(field) is None, s.get(field)), reverse=str(direction).upper().startswith("DESC"))
+        if self._limit is not None:
+            out = out[: self._limit]
+        return iter(out)
+
+    def get(self, **kwargs) -> List[FakeSnapshot]:
+        return list(self.stream(**kwargs))
+
+    def count(self) -> "FakeAggregation":
+        return FakeAggregation(self)
+
+
+class FakeAggregation:
+    """`query.count()`: una sola RPC, devuelve [[AggregationResult]] como el SDK."""
+
+    def __init__(self, query: FakeQuery):
+        self._query = query
+
+    def get(self, **_kwargs) -> List[List[Any]]:
+        total = sum(1 for _ in self._query.stream())  # stream ya cuenta la RPC
+        return [[SimpleNamespace(alias="count", value=total)]]
+
+
+class FakeFirestore:
+    """Firestore en memoria, thread-safe, con latencia por RPC configurable."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_s = latency_ms / 1000.0
+        self._docs: Dict[str, Dict[str, Tuple[Dict[str, Any], datetime, datetime]]] = {}
+        self._lock = threading.Lock()
+        self.rpc_count = 0
+
+    def _rpc(self) -> None:
+        with self._lock:
+            self.rpc_count += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def _snapshot(self, collection: str, doc_id: str) -> FakeSnapshot:
+        ref = FakeDocumentRef(self, collection, doc_id)
+        with self._lock:
+            row = self._docs.get(collection, {}).get(doc_id)
+        if row is None:
+            return FakeSnapshot(ref, None)
+        data, created, updated = row
+        return FakeSnapshot(ref, data, created, updated)
+
+    def _write(self, collection: str, doc_id: str, data: Dict[str, Any], merge: bool, must_exist: bool = False) -> None:
+        now = _now()
+        with self._lock:
+            docs = self._docs.setdefault(collection, {})
+            current = docs.get(doc_id)
+            if must_exist and current is None:
+                raise NotFound(f"No document to update: {collection}/{doc_id}")
+            resolved = _resolve(data, now)
+            if merge and current is not None:
+                merged = {**current[0], **resolved}
+                docs[doc_id] = (merged, current[1], now)
+            else:
+                docs[doc_id] = (resolved, current[1] if current else now, now)
+
+    # API pública tipo google.cloud.firestore.Client
+    def collection(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def document(self, path: str) -> FakeDocumentRef:
+        collection, _, doc_id = path.rpartition("/")
+        return FakeDocumentRef(self, collection, doc_id)
+
+    def get_all(self, references: Iterable[FakeDocumentRef], field_paths=None, **_kwargs):
+        refs = list(references)
+        self._rpc()  # un solo round-trip por batch
+        for ref in refs:
+            yield self._snapshot(ref._collection, ref.id)
+
+    def seed(self, collection: str, doc_id: str, data: Dict[str, Any]) -> None:
+        """Carga datos sin latencia ni conteo de RPC."""
+        now = _now()
+        with self._lock:
+            self._docs.setdefault(collection, {})[doc_id] = (_resolve(data, now), now, now)
+
+
+class FakeAsyncDocumentRef:
+    def __init__(self, db: "FakeAsyncFirestore", collection: str, doc_id: str):
+        self._db = db
+        self._sync = FakeDocumentRef(db.sync, collection, doc_id)
+        self.id = doc_id
+        self._collection = collection
+
+    async def get(self, field_paths=None, **_kwargs) -> FakeSnapshot:
+        await self._db._rpc()
+        return self._db.sync._snapshot(self._collection, self.id)
+
+    async def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        await self._db._rpc()
+        self._db.sync._write(self._collection, self.id, data, merge=merge)
+
+    async def update(self, data: Dict[str, Any]) -> None:
+        await self._db._rpc()
+        self._db.sync._write(self._collection, self.id, data, merge=True, must_exist=True)
+
+
+class FakeAsyncCollection:
+    def __init__(self, db: "FakeAsyncFirestore", collection: str):
+        self._db = db
+        self._collection = collection
+
+    def document(self, doc_id: Optional[str] = None) -> FakeAsyncDocumentRef:
+        return FakeAsyncDocumentRef(self._db, self._collection, doc_id or uuid.uuid4().hex[:20])
+
+    async def add(self, data: Dict[str, Any]) -> Tuple[datetime, FakeAsyncDocumentRef]:
+        ref = self.document()
+        await ref.set(data)
+        return _now(), ref
+
+
+class FakeAsyncFirestore:
+    """AsyncClient en memoria: mismos datos y contador que el FakeFirestore sync."""
+
+    def __init__(self, sync: FakeFirestore):
+        self.sync = sync
+
+    async def _rpc(self) -> None:
+        with self.sync._lock:
+            self.sync.rpc_count += 1
+        if self.sync.latency_s:
+            await asyncio.sleep(self.sync.latency_s)
+
+    def collection(self, name: str) -> FakeAsyncCollection:
+        return FakeAsyncCollection(self, name)
+
+    async def get_all(self, references: Iterable[FakeAsyncDocumentRef], field_paths=None, **_kwargs):
+        refs = list(references)
+        await self._rpc()
+        for ref in refs:
+            yield self.sync._snapshot(ref._collection, ref.id)
+
+
+# =========================================================
+# Identity Toolkit + Mercado Pago (HTTP local)
+# =========================================================
+class StandInServer:
+    """
+    Servidor HTTP en 127.0.0.1 con rutas:
+      POST /identitytoolkit.googleapis.com/v1/accounts:signInWithPassword
+      POST /mp/checkout/preferences
+      GET  /mp/v1/payments/<id>
+    """
+
+    def __init__(self, auth_latency_ms: float = 0.0, mp_latency_ms: float = 0.0):
+        self.auth_latency_s = auth_latency_ms / 1000.0
+        self.mp_latency_s = mp_latency_ms / 1000.0
+        self.users: Dict[str, Tuple[str, str]] = {}  # email -> (password, uid)
+        self.payments: Dict[str, Dict[str, Any]] = {}
+        self._seq = itertools.count(1)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="standin-http", daemon=True)
+
+    @property
+    def host(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"{host}:{port}"
+
+    def start(self) -> "StandInServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def add_user(self, email: str, password: str, uid: str) -> None:
+        self.users[email.lower()] = (password, uid)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_args):  # silencio
+                pass
+
+            def _send(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                try:
+                    return json.loads(raw or b"{}")
+                except json.JSONDecodeError:
+                    return {}
+
+            def do_POST(self):
+                path = urlparse(self.path).path
+                data = self._body()
+                if path.endswith("/accounts:signInWithPassword"):
+                    time.sleep(server.auth_latency_s)
+                    email = (data.get("email") or "").lower()
+                    stored = server.users.get(email)
+                    if not stored or stored[0] != data.get("password"):
+                        return self._send(400, {"error": {"code": 400, "message": "INVALID_LOGIN_CREDENTIALS"}})
+                    return self._send(200, {
+                        "localId": stored[1], "email": email, "idToken": uuid.uuid4().hex,
+                        "refreshToken": uuid.uuid4().hex, "expiresIn": "3600", "registered": True,
+                    })
+                if path == "/mp/checkout/preferences":
+                    time.sleep(server.mp_latency_s)
+                    pref_id = f"pref-{next(server._seq)}"
+                    return self._send(201, {
+                        "id": pref_id,
+                        "init_point": f"http://{server.host}/mp/checkout/{pref_id}",
+                        "external_reference": data.get("external_reference"),
+                        "items": data.get("items", []),
+                    })
+                return self._send(404, {"error": "not_found"})
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path.startswith("/mp/v1/payments/"):
+                    time.sleep(server.mp_latency_s)
+                    payment_id = path.rsplit("/", 1)[-1]
+                    payment = server.payments.get(payment_id)
+                    if payment is None:
+                        return self._send(404, {"message": "Payment not found"})
+                    return self._send(200, {"id": payment_id, **payment})
+                return self._send(404, {"error": "not_found"})
+
+        return Handler
+
+
+class StandInMPHttpClient(HttpClient):
+    """HttpClient del SDK de Mercado Pago que redirige api.mercadopago.com al stand-in."""
+
+    def __init__(self, host: str):
+        self._base = f"http://{host}/mp"
+
+    def request(self, method, url, maxretries=None, **kwargs):
+        import requests
+
+        if url.startswith(MP_API_BASE):
+            url = self._base + url[len(MP_API_BASE):]
+        kwargs.pop("maxretries", None)
+        resp = requests.request(method, url, **kwargs)
+        return {"status": resp.status_code, "response": resp.json()}
+
+
+__all__ = [
+    "FakeAsyncFirestore",
+    "FakeFirestore",
+    "FakeSnapshot",
+    "StandInServer",
+    "StandInMPHttpClient",
+]
@@ -0,0 +1,278 @@
+"""
+Subida multipart en streaming vs request.files
+----------------------------------------------
+✅ Controles (test client): subida de creadora con sha256 y contenido servido
+   por /media, tipo falso → 415, límite por Content-Length y sin Content-Length
+   (chunked) → 413, CSRF faltante antes del archivo → 403, comprador → 403,
+   avatar en /user/profile/edit (ok y demasiado grande); sin temporales colgados
+✅ Carga: archivo de --size-mb contra un límite de --limit-mb
+     - "request.files": lo que hacía profile_edit (werkzeug parsea todo el cuerpo,
+       después se mide el tamaño, se lee la firma y se hashea en otra pasada)
+     - "streaming": parse_upload (app/utils/upload_stream.py)
+✅ Reporta bytes leídos de wsgi.input antes de responder, ms y pico de memoria
+   Python (tracemalloc) para: archivo válido, demasiado grande y tipo falso
+
+Sale con código 1 si falla algún control.
+
+Uso:
+    python -m benchmarks.streaming_uploads
+    python -m benchmarks.streaming_uploads --size-mb 256 --limit-mb 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.harness import ensure_importable
+
+CREATOR = "creator-stream"
+BUYER = "buyer-stream"
+MP4_HEAD = b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom"
+PNG_HEAD = b"\x89PNG\r\n\x1a\n"
+
+
+class CountingStream(io.RawIOBase):
+    """wsgi.input que cuenta lo que la app realmente lee."""
+
+    def __init__(self, data: bytes):
+        self.buf = io.BytesIO(data)
+        self.consumed = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        n = self.buf.readinto(b)
+        self.consumed += n
+        return n
+
+
+# =========================================================
+# App de prueba
+# =========================================================
+def create_bench_app(workdir: str, content_mb: int):
+    ensure_importable()
+    from flask import current_app, jsonify, request
+
+    from app import create_app
+    from app.main.main_routes import set_current_user
+    from app.utils.csrf import generate_csrf_token
+    from app.utils.uploads import sniff_type
+
+    app = create_app({
+        "SECRET_KEY": "bench-secret",
+        "DATA_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "bench.sqlite"),
+        "MEDIA_ROOT": os.path.join(workdir, "media"),
+        "UPLOAD_BACKEND": "local",
+        "UPLOAD_MAX_CONTENT_MB": content_mb,
+        "FORCE_HTTPS": False,
+        "DEBUG": False,
+        "PROFILING_ENABLED": False,
+        "METRICS_ENABLED": False,
+        "COMPRESSION_ENABLED": False,
+    })
+
+    def login(uid: str):
+        set_current_user({"uid": uid, "role": "creator" if uid == CREATOR else "buyer"})
+        return jsonify({"ok": True, "csrf_token": generate_csrf_token()})
+
+    def spooled():
+        # Como el profile_edit anterior: request.files completo, tamaño con seek, después firma y hash
+        file = request.files["file"]
+        stream = file.stream
+        stream.seek(0, 2)
+        size = stream.tell()
+        stream.seek(0)
+        limit = current_app.extensions["uploads"].limit_for("content", {"role": "creator"})
+        if size > limit:
+            return jsonify({"ok": False}), 413
+        if sniff_type(stream.read(64)) is None:
+            return jsonify({"ok": False}), 415
+        stream.seek(0)
+        sha = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(64 * 1024), b""):
+            sha.update(chunk)
+        stream.seek(0)
+        file.save(os.path.join(current_app.config["MEDIA_ROOT"], ".incoming-spooled"))
+        return jsonify({"ok": True, "sha256": sha.hexdigest()}), 201
+
+    app.add_url_rule("/bench/login/<uid>", "bench_login", login, methods=["POST"])
+    app.add_url_rule("/bench/upload/spooled", "bench_spooled", spooled, methods=["POST"])
+    return app
+
+
+def seed(app) -> None:
+    users = app.extensions["repositories"].users
+    for uid, role in ((CREATOR, "creator"), (BUYER, "buyer")):
+        users.create(uid, {"uid": uid, "username": uid, "role": role, "email": f"{uid}@playtimeuy.test"})
+
+
+def _client(app, uid: str) -> Tuple[Any, str]:
+    client = app.test_client()
+    return client, client.post(f"/bench/login/{uid}").get_json()["csrf_token"]
+
+
+def multipart(fields: Dict[str, str], file_field: str, filename: str, data: bytes,
+              content_type: str = "application/octet-stream") -> Tuple[bytes, str]:
+    boundary = "ptuy" + os.urandom(8).hex()
+    parts = [
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{k}\"\r\n\r\n{v}\r\n".encode()
+        for k, v in fields.items()
+    ]
+    parts.append(
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"{file_field}\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: {content_type}\r\n\r\n".encode() + data + b"\r\n"
+    )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def post_body(client, path: str, body: bytes, ctype: str, chunked: bool = False) -> Tuple[Any, int]:
+    stream = CountingStream(body)
+    environ: Dict[str, Any] = {"wsgi.input": stream, "CONTENT_TYPE": ctype}
+    if chunked:
+        environ["wsgi.input_terminated"] = True
+    else:
+        environ["CONTENT_LENGTH"] = str(len(body))
+    resp = client.post(path, environ_overrides=environ)
+    return resp, stream.consumed
+
+
+# =========================================================
+# Controles
+# =========================================================
+def run_checks(app, workdir: str, limit_mb: int) -> List[str]:
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    creator, token = _client(app, CREATOR)
+    buyer, buyer_token = _client(app, BUYER)
+    incoming = os.path.join(app.config["MEDIA_ROOT"], ".incoming")
+    video = MP4_HEAD + random.Random(1).randbytes(3 * 1024 * 1024)
+
+    body, ctype = multipart({"_csrf": token, "title": "Clip", "visibility": "public"}, "file", "clip.mp4", video)
+    r, _ = post_body(creator, "/uploads/content", body, ctype)
+    data = r.get_json() or {}
+    doc = app.extensions["repositories"].contents.get(data.get("content_id") or "x").to_dict() or {}
+    expect("creadora sube (201) con sha256 correcto", r.status_code == 201
+           and data.get("sha256") == hashlib.sha256(video).hexdigest() == doc.get("sha256"))
+    expect("tipo real guardado y servido por /media", doc.get("content_type") == "video/mp4"
+           and app.test_client().get(data.get("url") or "/x").data == video)
+
+    fake = random.Random(2).randbytes(512 * 1024)
+    body, ctype = multipart({"_csrf": token}, "file", "clip.mp4", fake, "video/mp4")
+    r, consumed = post_body(creator, "/uploads/content", body, ctype)
+    expect(f"bytes que no son video → 415 (leyó {consumed // 1024} KB de {len(body) // 1024})",
+           r.status_code == 415 and consumed < len(body))
+
+    limit = limit_mb * 1024 * 1024
+    big = MP4_HEAD + bytes(2 * limit)
+    body, ctype = multipart({"_csrf": token}, "file", "big.mp4", big)
+    r, consumed = post_body(creator, "/uploads/content", body, ctype)
+    expect("Content-Length mayor al límite → 413 sin leer el cuerpo", r.status_code == 413 and consumed == 0)
+    r, consumed = post_body(creator, "/uploads/content", body, ctype, chunked=True)
+    expect(f"sin Content-Length (chunked) → 413 al pasar el límite ({consumed // (1024 * 1024)} MB leídos)",
+           r.status_code == 413 and consumed <= limit + 128 * 1024)
+
+    body, ctype = multipart({}, "file", "clip.mp4", video)
+    r, consumed = post_body(creator, "/uploads/content", body, ctype)
+    expect("sin CSRF → 403 antes de aceptar el archivo", r.status_code == 403 and consumed < len(body))
+    body, ctype = multipart({"_csrf": buyer_token}, "file", "clip.mp4", video)
+    expect("comprador → 403", post_body(buyer, "/uploads/content", body, ctype)[0].status_code == 403)
+
+    avatar = PNG_HEAD + random.Random(3).randbytes(4096)
+    body, ctype = multipart({"_csrf": buyer_token, "username": "buyer_new"}, "avatar", "me.png", avatar)
+    r, _ = post_body(buyer, "/user/profile/edit", body, ctype)
+    user = app.extensions["repositories"].users.get(BUYER).to_dict() or {}
+    expect("avatar por /user/profile/edit guardado y servido", r.status_code == 302
+           and user.get("username") == "buyer_new"
+           and app.test_client().get(user.get("avatar_url") or "/x").data == avatar)
+    huge = PNG_HEAD + bytes(6 * 1024 * 1024)
+    body, ctype = multipart({"_csrf": buyer_token}, "avatar", "me.png", huge)
+    r, consumed = post_body(buyer, "/user/profile/edit", body, ctype)
+    after = app.extensions["repositories"].users.get(BUYER).get("avatar_url")
+    expect("avatar de 6MB rechazado sin leer el cuerpo", r.status_code == 302 and consumed == 0
+           and after == user.get("avatar_url"))
+    leftovers = os.listdir(incoming) if os.path.isdir(incoming) else []
+    expect("sin temporales colgados en .incoming", not leftovers)
+    return failures
+
+
+# =========================================================
+# Carga
+# =========================================================
+def measure(client, path: str, body: bytes, ctype: str) -> Dict[str, Any]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resp, consumed = post_body(client, path, body, ctype)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "status": resp.status_code,
+        "read_mb": round(consumed / (1024 * 1024), 1),
+        "ms": round(elapsed * 1000, 1),
+        "peak_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def run_load(app, size_mb: int, limit_mb: int) -> Dict[str, Dict[str, Any]]:
+    creator, token = _client(app, CREATOR)
+    rng = random.Random(5)
+    payload = rng.randbytes(min(size_mb, limit_mb - 1) * 1024 * 1024)
+    cases = {
+        "válido": MP4_HEAD + payload,
+        "demasiado grande": MP4_HEAD + payload + bytes((size_mb + limit_mb) * 1024 * 1024 - len(payload)),
+        "tipo falso": b"\x00" * 64 + payload,
+    }
+    results: Dict[str, Dict[str, Any]] = {}
+    for case, data in cases.items():
+        body, ctype = multipart({"_csrf": token, "visibility": "public"}, "file", "clip.mp4", data)
+        for mode, path in (("request.files", "/bench/upload/spooled"), ("streaming", "/uploads/content")):
+            results[f"{case} · {mode}"] = measure(creator, path, body, ctype)
+    return results
+
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    print(f"\n{'Caso':<34}{'status':>7}{'MB leídos':>11}{'ms':>9}{'pico MB':>9}")
+    for name, row in results.items():
+        print(f"{name:<34}{row['status']:>7}{row['read_mb']:>11}{row['ms']:>9}{row['peak_mb']:>9}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description="Subida multipart en streaming vs request.files")
+    p.add_argument("--size-mb", type=int, default=64, help="Tamaño del archivo válido")
+    p.add_argument("--limit-mb", type=int, default=96, help="Límite de las creadoras (UPLOAD_MAX_CONTENT_MB)")
+    args = p.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="ptuy-stream-")
+    app = create_bench_app(workdir, args.limit_mb)
+    seed(app)
+
+    print("📤 Controles (test client)")
+    failures = run_checks(app, workdir, args.limit_mb)
+    print_table(run_load(app, args.size_mb, args.limit_mb))
+
+    if failures:
+        print("\n❌ " + "\n❌ ".join(failures))
+        return 1
+    print("\n✅ Subidas en streaming correctas")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
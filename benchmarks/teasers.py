@@ -0,0 +1,253 @@
+"""
+Teasers borrosos (app/utils/teasers.py)
+--------------------------------------
+✅ Controles del render: JPEG de TEASER_WIDTH px, sin EXIF, chico, y sin detalle
+   (energía de bordes muy por debajo del original achicado al mismo tamaño)
+✅ Integración (test client): imagen para suscriptores → teaser_url, el teaser se
+   sirve sin sesión mientras el original da 401; imagen pública → sin teaser; el
+   mismo archivo otra vez reusa el teaser; el GC de blobs lo borra con el blob
+✅ Backfill con --images imágenes de --size px: serie en este proceso vs pool con
+   1, 2, … --workers procesos; imágenes / s, MB / s de originales y tiempo estimado
+   para --plan imágenes (para dimensionar backfills grandes)
+
+Sale con código 1 si falla algún control.
+
+Uso:
+    python -m benchmarks.teasers
+    python -m benchmarks.teasers --images 400 --size 4000x3000 --workers 8 --plan 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.harness import ensure_importable
+from benchmarks.image_hash import CREATORS, _client, create_bench_app, jpeg, make_image, seed
+from benchmarks.streaming_uploads import multipart, post_body
+
+
+def _edge_energy(image) -> float:
+    from PIL import ImageFilter, ImageStat
+
+    return ImageStat.Stat(image.convert("L").filter(ImageFilter.FIND_EDGES)).mean[0]
+
+
+def _detailed_image(seed_value: int, size: Tuple[int, int]):
+    """Formas + texto: si el teaser dejara ver algo, sería esto."""
+    from PIL import ImageDraw
+
+    image = make_image(seed_value, size)
+    draw = ImageDraw.Draw(image)
+    for y in range(0, size[1], 40):
+        draw.text((10, y), "PlayTimeUY contenido exclusivo " * 6, fill=(255, 255, 255))
+    return image
+
+
+# =========================================================
+# Controles
+# =========================================================
+def run_checks(workdir: str) -> List[str]:
+    from PIL import Image
+
+    from app.utils.teasers import DEFAULT_WIDTH, render_teaser
+
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    print("== Render ==")
+    original = _detailed_image(1, (2000, 1500))
+    exif = Image.Exif()
+    exif[0x010F] = "CamaraSecreta"  # Make
+    buf = io.BytesIO()
+    original.save(buf, "JPEG", quality=90, exif=exif)
+    data = buf.getvalue()
+    t0 = time.perf_counter()
+    teaser = render_teaser(data)
+    took = (time.perf_counter() - t0) * 1000
+    out = Image.open(io.BytesIO(teaser))
+    reference = original.resize(out.size)
+    ratio = _edge_energy(out) / _edge_energy(reference)
+    print(f"  original {len(data) // 1024} KB → teaser {out.size[0]}×{out.size[1]}, {len(teaser) // 1024} KB "
+          f"en {took:.1f} ms · bordes {ratio:.1%} del original")
+    expect(f"JPEG de {DEFAULT_WIDTH} px de ancho", out.format == "JPEG" and out.size[0] == DEFAULT_WIDTH)
+    expect("sin EXIF", not out.getexif())
+    expect("chico (< 20 KB)", len(teaser) < 20 * 1024)
+    expect("sin detalle (bordes < 10 % del original achicado)", ratio < 0.10)
+    tall = io.BytesIO()
+    make_image(2, (300, 3000)).save(tall, "PNG")
+    out_tall = Image.open(io.BytesIO(render_teaser(tall.getvalue())))
+    expect("tira muy alta recortada a 1:2", out_tall.size[1] <= DEFAULT_WIDTH * 2)
+    return failures
+
+
+def _wait_teaser(client, url: str, timeout: float = 30.0) -> Any:
+    deadline = time.time() + timeout
+    while True:
+        r = client.get(url)
+        if r.status_code == 200 or time.time() > deadline:
+            return r
+        time.sleep(0.1)
+
+
+def run_app_checks(workdir: str) -> List[str]:
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    print("\n== Integración ==")
+    app = create_bench_app(workdir)
+    seed(app)
+    creator, token = _client(app, CREATORS[0])
+    anonymous = app.test_client()
+    data = jpeg(_detailed_image(3, (1600, 1200)))
+
+    def upload(visibility: str, payload: bytes) -> Dict[str, Any]:
+        body, ctype = multipart({"_csrf": token, "title": "Foto", "visibility": visibility}, "file", "f.jpg", payload)
+        r, _ = post_body(creator, "/uploads/content", body, ctype)
+        return {**(r.get_json() or {}), "http": r.status_code}
+
+    private = upload("subscribers", data)
+    expect("imagen para suscriptores → teaser_url", private["http"] == 201 and "teaser_url" in private)
+    r = _wait_teaser(anonymous, private.get("teaser_url", "/media/x/teaser"))
+    expect("teaser servido sin sesión", r.status_code == 200 and r.mimetype == "image/jpeg")
+    expect("teaser cacheable (público)", "public" in (r.headers.get("Cache-Control") or ""))
+    expect("el original sigue cerrado (401)", anonymous.get(private.get("url", "/media/x")).status_code == 401)
+    r.close()
+
+    public = upload("public", jpeg(make_image(4)))
+    expect("imagen pública → sin teaser", public["http"] == 201 and "teaser_url" not in public)
+
+    again = upload("subscribers", data)
+    contents = app.extensions["repositories"].contents
+    expect("mismo archivo → reusa el teaser al instante",
+           again["http"] == 201 and bool(contents.get(again["content_id"]).to_dict().get("teaser")))
+
+    bucket = app.extensions["uploads"].bucket
+    from app.utils.teasers import teaser_name
+
+    name = teaser_name(contents.get(private["content_id"]).to_dict()["storage_path"])
+    for content_id in (private["content_id"], again["content_id"]):
+        creator.delete(f"/uploads/content/{content_id}")
+    app.extensions["blobs"].collect_garbage(app.extensions["repositories"].blobs, grace=0)
+    expect("GC de blobs borra el teaser con el blob", bucket.stat(name) is None)
+    app.extensions["teasers"].shutdown()
+    return failures
+
+
+# =========================================================
+# Backfill
+# =========================================================
+def run_backfill(args: argparse.Namespace, workdir: str) -> List[str]:
+    from app.repositories import init_repositories  # noqa: F401  (mismo backend que la app)
+    from app.utils.teasers import TeaserGenerator, render_teaser
+
+    failures: List[str] = []
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    app = create_bench_app(os.path.join(workdir, "backfill"))
+    contents = app.extensions["repositories"].contents
+    bucket = app.extensions["uploads"].bucket
+
+    print(f"\n== Backfill: {args.images} imágenes de {width}×{height} ==")
+    samples = [jpeg(_detailed_image(100 + i, (width, height)), 85) for i in range(min(args.images, 16))]
+    total_bytes = 0
+    for i in range(args.images):
+        name = f"legacy/{i:06d}.jpg"
+        path = bucket.path_for(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = samples[i % len(samples)] + i.to_bytes(4, "big")  # bytes distintos por archivo
+        with open(path, "wb") as fh:
+            fh.write(payload)
+        total_bytes += len(payload)
+        contents.create(f"legacy-{i:06d}", {"creator_uid": CREATORS[0], "storage_path": name,
+                                            "storage_backend": "local", "content_type": "image/jpeg",
+                                            "visibility": "subscribers", "status": "published"})
+    print(f"  {total_bytes / 2 ** 20:.1f} MB de originales · {os.cpu_count()} núcleos")
+
+    t0 = time.perf_counter()
+    for i in range(min(args.images, 50)):
+        render_teaser(bucket.path_for(f"legacy/{i:06d}.jpg"))
+    serial = min(args.images, 50) / (time.perf_counter() - t0)
+
+    print(f"{'procesos':>9} {'img/s':>8} {'MB/s':>7} {'×serie':>7} {'plan':>12}")
+    print(f"{'serie':>9} {serial:>8.1f} {serial * total_bytes / args.images / 2 ** 20:>7.1f} {1.0:>7.2f} "
+          f"{_eta(args.plan, serial):>12}")
+    counts = sorted({1, 2, args.workers} | ({os.cpu_count() or 1} if (os.cpu_count() or 1) <= args.workers else set()))
+    rates: Dict[int, float] = {}
+    for workers in counts:
+        runner = TeaserGenerator(bucket, workers=workers)
+        runner.executor().submit(int).result()  # arranque del pool fuera de la medición
+        try:
+            stats = runner.backfill(contents, force=True)
+        finally:
+            runner.shutdown()
+        rates[workers] = stats["per_second"]
+        ok = stats["rendered"] == args.images and not stats["failed"]
+        print(f"{workers:>9} {stats['per_second']:>8.1f} {stats['mb_per_second']:>7.1f} "
+              f"{stats['per_second'] / serial:>7.2f} {_eta(args.plan, stats['per_second']):>12}"
+              + ("" if ok else f"  ❌ {stats['rendered']} generados, {stats['failed']} fallaron"))
+        if not ok:
+            failures.append(f"backfill con {workers} procesos")
+
+    pending = [r for r in contents.list_all() if not r.get("teaser")]
+    print(f"  {'✅' if not pending else '❌'} todos los contenidos quedaron con teaser")
+    if pending:
+        failures.append("contenidos sin teaser")
+    if (os.cpu_count() or 1) >= 2 and 2 in rates and 1 in rates:
+        ok = rates[2] > rates[1] * 1.4
+        print(f"  {'✅' if ok else '❌'} 2 procesos → {rates[2] / rates[1]:.2f}× de 1 proceso")
+        if not ok:
+            failures.append("el pool escala con los núcleos")
+    else:
+        print("  ℹ️ un solo núcleo: sin control de escala (el pool no puede ir más rápido que la serie)")
+    return failures
+
+
+def _eta(images: int, rate: float) -> str:
+    if not rate:
+        return "-"
+    seconds = images / rate
+    return f"{seconds / 3600:.1f} h" if seconds >= 3600 else f"{seconds / 60:.1f} min"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--images", type=int, default=120)
+    p.add_argument("--size", default="2000x1500")
+    p.add_argument("--workers", type=int, default=max(2, os.cpu_count() or 1))
+    p.add_argument("--plan", type=int, default=100_000, help="imágenes del backfill a dimensionar")
+    p.add_argument("--skip-app", action="store_true")
+    args = p.parse_args(argv)
+
+    ensure_importable()
+    workdir = tempfile.mkdtemp(prefix="ptuy-bench-teasers-")
+    try:
+        failures = run_checks(workdir)
+        if not args.skip_app:
+            failures += run_app_checks(os.path.join(workdir, "app"))
+        failures += run_backfill(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f"\n❌ {len(failures)} control(es) fallaron: {', '.join(failures)}")
+        return 1
+    print("\n✅ Todos los controles pasaron")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Filtro de términos prohibidos (app/utils/text_filter.py)
+-------------------------------------------------------
+✅ Controles de normalización: tildes, mayúsculas, leet, letras repetidas,
+   deletreado ("p.u.t.a"), cirílicas; sin falsos positivos por subcadena
+   ("computadora", "disputa"); `*` para prefijos; reservados solo en usuarios
+✅ Recarga en caliente: se cambia el archivo y el filtro toma la lista nueva
+   sin dejar de responder
+✅ Integración (test client): nombre reservado en /user/profile/edit, bio con
+   insulto, título de contenido en /uploads/sessions, RegisterForm
+✅ Escala con --terms términos sintéticos: compilación, estados y memoria; MB/s
+   de Aho–Corasick vs una regex con todos los términos vs `in` término por término,
+   y tiempo por bio limpia (500 caracteres) con 40× más términos (casi no cambia)
+
+Sale con código 1 si falla algún control.
+
+Uso:
+    python -m benchmarks.text_filter
+    python -m benchmarks.text_filter --terms 20000 --text-kb 512
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+from benchmarks.harness import ensure_importable
+
+SYLLABLES = ("ma", "pe", "lo", "ti", "ra", "cu", "so", "ne", "ga", "bi", "do", "fa", "che", "llo", "quin", "tro")
+
+
+def _words(rng: random.Random, count: int, lo: int = 2, hi: int = 4) -> List[str]:
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(lo, hi))) for _ in range(count)]
+
+
+def _synthetic_terms(count: int, seed: int = 3) -> List[str]:
+    rng = random.Random(seed)
+    terms = set()
+    while len(terms) < count:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(3, 5)))
+        terms.add(word if rng.random() < 0.8 else f"{word} {rng.choice(SYLLABLES)}{rng.choice(SYLLABLES)}")
+    return sorted(terms)
+
+
+def _term_regex(term: str) -> str:
+    """Término sintético (minúsculas ascii) → regex con la regla del filtro: letra doble exige doble."""
+    return "".join(re.escape(m.group(1)) * min(len(m.group(0)), 2) + "+" for m in re.finditer(r"(.)\1*", term))
+
+
+def _write_terms(path: str, terms: List[str], category: str = "insulto") -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(f"[{category}]\n" + "\n".join(terms) + "\n")
+
+
+# =========================================================
+# Controles
+# =========================================================
+def run_checks(workdir: str) -> List[str]:
+    from app.utils.text_filter import DEFAULT_TERMS_PATH, RESERVED, TextFilter, normalize, normalized
+
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    f = TextFilter(DEFAULT_TERMS_PATH, refresh=0)
+    print(f"\n== Normalización (lista de la app: {len(f)} términos) ==")
+    hits = {
+        "mayúsculas y tildes": "Sos un PUTÁ",
+        "leet": "h1jo de put@",
+        "letras repetidas": "puuuuutoooo",
+        "deletreado con puntos": "sos un p.u.t.o",
+        "deletreado con espacios": "p u t a madre",
+        "cirílicas": "рutа",  # р y а cirílicas
+        "frase de varias palabras": "te pago   por-fuera",
+        "v/b y z/s": "fuera de la plataforma zudaca",
+    }
+    for name, text in hits.items():
+        expect(f"detecta ({name}): {text!r}", bool(f.find(text)))
+    clean = ["computadora", "disputa", "Ana Clara, fotógrafa", "transferencia de archivos", "forrado en dólares",
+             "concha de mar", "1 2 3 4"]
+    for text in clean:
+        expect(f"sin falso positivo: {text!r}", not f.find(text))
+    expect("`admin*` frena 'Administrador_uy' como usuario", bool(f.find("Administrador_uy")))
+    expect("reservados ignorados en bios", not f.find("Soy la admin de mi casa", ignore=(RESERVED,)))
+    expect("censura conserva el resto del texto", f.censor("hola puta, qué tal") == "hola ****, qué tal")
+    rng = random.Random(5)
+    alphabet = "abc puta.-_!ÁÉñ0134@ \tßﬁ́р"
+    samples = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))) for _ in range(3000)]
+    expect("camino rápido == normalización con posiciones (3000 textos al azar)",
+           all(normalized(t) == normalize(t)[0] for t in samples))
+
+    print("\n== Recarga en caliente ==")
+    path = os.path.join(workdir, "terms.txt")
+    _write_terms(path, ["palabrota"])
+    hot = TextFilter(path, refresh=1)
+    expect("lista inicial cargada", bool(hot.find("qué palabrota")) and not hot.find("otrapalabra fea"))
+    _write_terms(path, ["palabrota", "otrapalabra"])
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    stop = threading.Event()
+    served: List[int] = []
+
+    def keep_querying() -> None:  # la recarga no corta consultas
+        while not stop.is_set():
+            served.append(len(hot.find("qué palabrota")))
+
+    reader = threading.Thread(target=keep_querying)
+    reader.start()
+    time.sleep(1.1)
+    deadline = time.time() + 5
+    while time.time() < deadline and not hot.find("otrapalabra fea"):
+        time.sleep(0.05)
+    stop.set()
+    reader.join()
+    expect("toma el término nuevo sin reiniciar", bool(hot.find("otrapalabra fea")))
+    expect(f"siguió respondiendo durante la recarga ({len(served)} consultas)",
+           bool(served) and all(n == 1 for n in served))
+    return failures
+
+
+def run_app_checks(workdir: str) -> List[str]:
+    from app.forms import RegisterForm
+    from benchmarks.image_hash import create_bench_app, seed, _client
+
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    print("\n== Integración ==")
+    app = create_bench_app(workdir)
+    seed(app)
+    users = app.extensions["repositories"].users
+    client, token = _client(app, "creator-img-a")
+
+    def edit(**fields: str) -> None:
+        client.post("/user/profile/edit", data={"_csrf": token, **fields})
+
+    edit(username="Adm1n_oficial")
+    expect("perfil: nombre reservado rechazado", users.get("creator-img-a").to_dict().get("username") == "creator-img-a")
+    edit(username="luna_uy")
+    expect("perfil: nombre normal aceptado", users.get("creator-img-a").to_dict().get("username") == "luna_uy")
+    edit(bio="Soy una pelotuda, escribime")
+    expect("perfil: bio con insulto rechazada", not users.get("creator-img-a").to_dict().get("bio"))
+    edit(bio="Fotógrafa en Montevideo, administro mi propio estudio")
+    expect("perfil: bio normal guardada", bool(users.get("creator-img-a").to_dict().get("bio")))
+
+    def session(title: str) -> int:
+        return client.post("/uploads/sessions", json={
+            "kind": "content", "content_type": "image/jpeg", "size": 1000, "visibility": "public", "title": title,
+        }).status_code
+
+    expect("título con insulto → 400", session("Para el hdp que me copió") == 400)
+    expect("título normal → sesión creada", session("Atardecer en la rambla") in (200, 201))
+
+    with app.test_request_context(method="POST"):
+        form = RegisterForm(meta={"csrf": False}, data={"username": "soporte_playtime"})
+        form.validate()
+        expect("RegisterForm rechaza 'soporte_playtime'", "username" in form.errors)
+        form = RegisterForm(meta={"csrf": False}, data={"username": "sol_uy"})
+        form.validate()
+        expect("RegisterForm acepta 'sol_uy'", "username" not in form.errors)
+    return failures
+
+
+# =========================================================
+# Escala
+# =========================================================
+def _rate(fn: Callable[[], Any], size: int, seconds: float = 1.0) -> float:
+    fn()
+    runs, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        fn()
+        runs += 1
+    return size * runs / (time.perf_counter() - t0)
+
+
+def run_scale(args: argparse.Namespace, workdir: str) -> List[str]:
+    from app.utils.text_filter import TextFilter, normalize, normalized
+
+    failures: List[str] = []
+    rng = random.Random(11)
+    terms = _synthetic_terms(args.terms)
+    words = _words(rng, args.text_kb * 1024 // 8)
+    for i in range(200, len(words), 400):  # algún término plantado (la bio del principio queda limpia)
+        words[i] = rng.choice(terms)
+    text = " ".join(words)[: args.text_kb * 1024]
+    bio = text[:500]
+
+    print(f"\n== Escala: {len(terms)} términos, texto de {len(text) // 1024} KB ==")
+    path = os.path.join(workdir, "scale.txt")
+    _write_terms(path, terms)
+    t0 = time.perf_counter()
+    f = TextFilter(path, refresh=0)
+    automaton = f._compiled.automaton
+    print(f"compilación {(time.perf_counter() - t0) * 1000:.0f} ms · {automaton.states} estados · "
+          f"tabla {automaton.memory_bytes() / 2 ** 20:.1f} MB")
+
+    folded = normalize(text)[0]
+    alternation = re.compile(r"\b(?:" + "|".join(_term_regex(t) for t in terms) + r")\b")
+    ac_rate = _rate(lambda: f.find(text), len(text))
+    norm_rate = _rate(lambda: normalized(text), len(text))
+    pos_rate = _rate(lambda: normalize(text), len(text))
+    scan_rate = _rate(lambda: sum(1 for _ in automaton.scan(folded)), len(text))
+    re_rate = _rate(lambda: alternation.findall(text), len(text))
+    naive_rate = _rate(lambda: [t for t in terms if normalize(t)[0] in folded], len(text), 0.5)
+    print(f"{'método':<38} {'MB/s':>8}")
+    for name, rate in (("Aho–Corasick (normalizar + buscar)", ac_rate), ("  solo normalizar", norm_rate),
+                       ("  normalizar con posiciones", pos_rate),
+                       ("  solo autómata", scan_rate), ("regex con todos los términos", re_rate),
+                       ("`in` término por término", naive_rate)):
+        print(f"{name:<38} {rate / 2 ** 20:>8.2f}")
+
+    matches = f.find(text)
+    found_ac = {m.term for m in matches}
+    by_folded: dict = {}
+    for t in terms:
+        by_folded.setdefault(normalize(t)[0], []).append(t)
+    found_re = {t for hit in set(alternation.findall(text)) for t in by_folded.get(normalize(hit)[0], ())
+                if re.fullmatch(_term_regex(t), hit)}
+    # La regex no da solapados que empiezan igual ("a b" y "a"): alcanza con que no encuentre
+    # nada que se le escape al autómata y que cada aparición del autómata sea del término
+    ok = found_re <= found_ac and all(re.fullmatch(_term_regex(m.term), text[m.start:m.end]) for m in matches)
+    print(f"  {'✅' if ok else '❌'} mismos términos que la regex ({len(found_ac)})")
+    if not ok:
+        failures.append("Aho–Corasick y regex coinciden")
+
+    per_bio = {}
+    for count in (max(1, args.terms // 10), args.terms, args.terms * 4):
+        _write_terms(path, _synthetic_terms(count))
+        sized = TextFilter(path, refresh=0)
+        per_bio[count] = 1e6 / _rate(lambda: sized.find(bio), 1, 0.5)
+        print(f"bio de 500 caracteres con {count:>6} términos: {per_bio[count]:.0f} µs")
+    low, high = per_bio[max(1, args.terms // 10)], per_bio[args.terms * 4]
+    ok = high < low * 2
+    print(f"  {'✅' if ok else '❌'} 40× términos → {high / low:.2f}× tiempo por bio (lineal en el texto)")
+    if not ok:
+        failures.append("tiempo independiente de la cantidad de términos")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--terms", type=int, default=5000)
+    p.add_argument("--text-kb", type=int, default=256)
+    p.add_argument("--skip-app", action="store_true")
+    args = p.parse_args(argv)
+
+    ensure_importable()
+    workdir = tempfile.mkdtemp(prefix="ptuy-bench-text-")
+    try:
+        failures = run_checks(workdir)
+        if not args.skip_app:
+            failures += run_app_checks(workdir)
+        failures += run_scale(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f"\n❌ {len(failures)} control(es) fallaron: {', '.join(failures)}")
+        return 1
+    print("\n✅ Todos los controles pasaron")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
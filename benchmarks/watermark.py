@@ -0,0 +1,257 @@
+"""
+Marca de agua por comprador (app/utils/watermark.py)
+---------------------------------------------------
+✅ Controles del render: una copia distinta por comprador, el código se rastrea
+   (también con `flask watermark-trace`), la marca se ve pero no arruina la foto
+   (PSNR), lado mayor ≤ WATERMARK_MAX_SIDE y sin EXIF
+✅ Caché: el segundo pedido no vuelve a renderizar, pedidos simultáneos del mismo
+   (contenido, comprador) hacen un solo render, y con un tope chico el barrido deja
+   la caché debajo del tope conservando lo usado hace poco
+✅ Integración (test client): el suscriptor recibe su copia marcada (304 con el
+   ETag), otro suscriptor una distinta, la creadora y los admins el original,
+   sin sesión 401
+✅ Latencia por imagen en resoluciones comunes (--sizes): primer pedido (decodificar
+   + marcar + escribir), otro comprador del mismo contenido (base en memoria) y
+   acierto de caché; p50 / p99 en ms
+
+Sale con código 1 si falla algún control.
+
+Uso:
+    python -m benchmarks.watermark
+    python -m benchmarks.watermark --sizes 1280x720,4000x3000 --repeat 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.harness import ensure_importable
+from benchmarks.image_hash import ADMIN, CREATORS, _client, create_bench_app, jpeg, make_image, seed
+from benchmarks.streaming_uploads import multipart, post_body
+
+SUBSCRIBERS = ("fan-wm-a", "fan-wm-b")
+
+
+def _psnr(a, b) -> float:
+    from PIL import ImageChops, ImageStat
+
+    mse = sum(ImageStat.Stat(ImageChops.difference(a, b).convert("L").point(lambda v: v * v // 255)).mean) * 255
+    return 99.0 if not mse else 10 * math.log10(255 ** 2 / mse)
+
+
+# =========================================================
+# Controles
+# =========================================================
+def run_checks(workdir: str) -> List[str]:
+    from PIL import Image, ImageChops
+
+    from app.utils.watermark import DEFAULT_MAX_SIDE, Watermarker
+
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    print("== Render ==")
+    original = make_image(1, (3000, 2000))
+    exif = Image.Exif()
+    exif[0x010F] = "CamaraSecreta"  # Make
+    source = os.path.join(workdir, "original.jpg")
+    original.save(source, "JPEG", quality=90, exif=exif)
+    wm = Watermarker("bench-secret", os.path.join(workdir, "cache"))
+    uids = [f"fan-{i:04d}" for i in range(500)]
+    a = Image.open(wm.deliver("foto1", "v1", uids[0], lambda: source))
+    b = Image.open(wm.deliver("foto1", "v1", uids[1], lambda: source))
+    reference = original.resize(a.size)
+    quality = _psnr(a.convert("RGB"), reference)
+    print(f"  {original.size[0]}×{original.size[1]} → {a.size[0]}×{a.size[1]} · PSNR vs original {quality:.1f} dB")
+    expect("una copia distinta por comprador", ImageChops.difference(a, b).getbbox() is not None)
+    expect("código rastreable entre 500 suscriptores", wm.trace(wm.code_for(uids[1]).lower(), uids) == uids[1])
+    expect("código desconocido → nadie", wm.trace("AAAAAAAA", uids) is None)
+    expect("marca visible pero la foto se conserva (20 dB < PSNR < 40 dB)", 20 < quality < 40)
+    expect(f"lado mayor ≤ {DEFAULT_MAX_SIDE}", max(a.size) <= DEFAULT_MAX_SIDE)
+    expect("sin EXIF", not a.getexif())
+
+    print("\n== Caché ==")
+    renders = wm.stats["renders"]
+    wm.deliver("foto1", "v1", uids[0], lambda: source)
+    expect("segundo pedido → sin render", wm.stats["renders"] == renders)
+    expect("otra versión del contenido → copia nueva",
+           wm.path_for("foto1", "v2", wm.code_for(uids[0])) != wm.path_for("foto1", "v1", wm.code_for(uids[0])))
+    threads = [threading.Thread(target=wm.deliver, args=("foto1", "v1", uids[2], lambda: source)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    expect("8 pedidos simultáneos → 1 render", wm.stats["renders"] == renders + 1)
+
+    budget = 2 * 2 ** 20
+    small = Watermarker("bench-secret", os.path.join(workdir, "small"), cache_bytes=budget)
+    photo = os.path.join(workdir, "photo.jpg")
+    make_image(2, (1280, 720)).save(photo, "JPEG", quality=90)
+    keep = small.deliver("foto2", "v1", "fan-keep", lambda: photo)
+    for i, uid in enumerate(uids[:60]):
+        small.deliver("foto2", "v1", uid, lambda: photo)
+        if i % 10 == 0:
+            os.utime(keep, (time.time() - 3600, os.stat(keep).st_mtime))  # como si hubiera pasado una hora
+            small.deliver("foto2", "v1", "fan-keep", lambda: photo)  # el acierto lo vuelve reciente
+    deadline = time.time() + 5
+    while small._sweeping and time.time() < deadline:
+        time.sleep(0.05)
+    state = small.sweep()
+    print(f"  tope {budget // 1024} KB · quedan {state['files']} archivos, {state['bytes'] // 1024} KB · "
+          f"{small.stats['evicted']} desalojados")
+    expect("la caché queda debajo del tope", state["bytes"] <= budget)
+    expect("hubo desalojo", small.stats["evicted"] > 0)
+    expect("lo usado hace poco sobrevive", os.path.exists(keep))
+    return failures
+
+
+def run_app_checks(workdir: str) -> List[str]:
+    from PIL import Image
+
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    print("\n== Integración ==")
+    app = create_bench_app(workdir)
+    seed(app)
+    repos = app.extensions["repositories"]
+    for uid in SUBSCRIBERS:
+        repos.users.create(uid, {"uid": uid, "username": uid, "role": "user", "email": f"{uid}@playtimeuy.test"})
+        repos.subscriptions.create(f"{uid}_{CREATORS[0]}", {
+            "subscriber_uid": uid, "creator_uid": CREATORS[0], "status": "active",
+        })
+    creator, token = _client(app, CREATORS[0])
+    data = jpeg(make_image(3, (1600, 1200)))
+    body, ctype = multipart({"_csrf": token, "title": "Foto", "visibility": "subscribers"}, "file", "f.jpg", data)
+    r, _ = post_body(creator, "/uploads/content", body, ctype)
+    url = (r.get_json() or {}).get("url", "/media/x")
+    expect("imagen para suscriptores subida", r.status_code == 201)
+
+    fan_a, _ = _client(app, SUBSCRIBERS[0])
+    fan_b, _ = _client(app, SUBSCRIBERS[1])
+    ra, rb = fan_a.get(url), fan_b.get(url)
+    a, b = ra.get_data(), rb.get_data()
+    expect("suscriptor → copia marcada (JPEG ≠ original)",
+           ra.status_code == 200 and ra.mimetype == "image/jpeg" and a != data
+           and Image.open(io.BytesIO(a)).size == (1600, 1200))
+    expect("otro suscriptor → otra copia", rb.status_code == 200 and a != b)
+    expect("copia solo en el navegador (private)", "private" in (ra.headers.get("Cache-Control") or ""))
+    again = fan_a.get(url, headers={"If-None-Match": ra.headers.get("ETag", "")})
+    expect("mismo suscriptor con ETag → 304", again.status_code == 304)
+    expect("creadora → original", creator.get(url).get_data() == data)
+    admin, _ = _client(app, ADMIN)
+    expect("admin → original", admin.get(url).get_data() == data)
+    expect("sin sesión → 401", app.test_client().get(url).status_code == 401)
+
+    code = app.extensions["watermarks"].code_for(SUBSCRIBERS[1])
+    out = app.test_cli_runner().invoke(args=["watermark-trace", code, "--creator", CREATORS[0]]).output
+    expect(f"`flask watermark-trace {code}` → {SUBSCRIBERS[1]}", SUBSCRIBERS[1] in out)
+    for r in (ra, rb, again):
+        r.close()
+    app.extensions["teasers"].shutdown()
+    return failures
+
+
+# =========================================================
+# Latencia
+# =========================================================
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {"p50": statistics.median(ordered), "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]}
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def run_latency(args: argparse.Namespace, workdir: str) -> List[str]:
+    from app.utils.watermark import Watermarker
+
+    failures: List[str] = []
+    print(f"\n== Latencia por imagen ({args.repeat} pedidos por caso, {os.cpu_count()} núcleos) ==")
+    print(f"{'tamaño':>10} {'KB':>6} {'salida':>10} {'primero p50/p99':>16} {'otro comprador':>16} {'acierto':>14}")
+    rows = {}
+    for n, size in enumerate(args.sizes.split(",")):
+        width, height = (int(v) for v in size.lower().split("x"))
+        source = os.path.join(workdir, f"lat-{size}.jpg")
+        with open(source, "wb") as fh:
+            fh.write(jpeg(make_image(10 + n, (width, height)), 88))
+        wm = Watermarker("bench-secret", os.path.join(workdir, f"lat-{size}"))
+        cold = [_timed(lambda i=i: wm.deliver(f"c{i}", "v1", f"fan-{i}", lambda: source)) for i in range(args.repeat)]
+        wm.deliver("warm", "v1", "fan-x", lambda: source)
+        warm = [_timed(lambda i=i: wm.deliver("warm", "v1", f"fan-{i}", lambda: source)) for i in range(args.repeat)]
+        hit = [_timed(lambda: wm.deliver("warm", "v1", "fan-0", lambda: source)) for _ in range(args.repeat)]
+        out = _output_size(wm.deliver("warm", "v1", "fan-0", lambda: source))
+        rows[size] = {"cold": _percentiles(cold), "warm": _percentiles(warm), "hit": _percentiles(hit)}
+        r = rows[size]
+        print(f"{size:>10} {os.path.getsize(source) // 1024:>6} {out:>10} "
+              f"{r['cold']['p50']:>7.1f}/{r['cold']['p99']:<8.1f} {r['warm']['p50']:>7.1f}/{r['warm']['p99']:<8.1f} "
+              f"{r['hit']['p50'] * 1000:>6.0f}/{r['hit']['p99'] * 1000:<4.0f}µs")
+
+    for size, r in rows.items():
+        ok = r["hit"]["p50"] < 1.0
+        print(f"  {'✅' if ok else '❌'} {size}: acierto de caché < 1 ms")
+        if not ok:
+            failures.append(f"acierto {size}")
+    if "1920x1080" in rows:
+        ok = rows["1920x1080"]["warm"]["p50"] < args.budget_ms
+        print(f"  {'✅' if ok else '❌'} 1920×1080: otro comprador p50 < {args.budget_ms:.0f} ms (apto para servir en línea)")
+        if not ok:
+            failures.append("latencia 1080p")
+    return failures
+
+
+def _output_size(path: str) -> str:
+    from PIL import Image
+
+    with Image.open(path) as image:
+        return f"{image.size[0]}×{image.size[1]}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--sizes", default="640x480,1280x720,1920x1080,4000x3000")
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--budget-ms", type=float, default=150.0, help="tope de p50 para otro comprador a 1080p")
+    p.add_argument("--skip-app", action="store_true")
+    args = p.parse_args(argv)
+
+    ensure_importable()
+    workdir = tempfile.mkdtemp(prefix="ptuy-bench-watermark-")
+    try:
+        failures = run_checks(workdir)
+        if not args.skip_app:
+            failures += run_app_checks(os.path.join(workdir, "app"))
+        failures += run_latency(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f"\n❌ {len(failures)} control(es) fallaron: {', '.join(failures)}")
+        return 1
+    print("\n✅ Todos los controles pasaron")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
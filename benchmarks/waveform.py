@@ -0,0 +1,254 @@
+"""
+Forma de onda y duración de audios (app/utils/waveform.py)
+---------------------------------------------------------
+✅ Controles con WAV sintéticos (8/16/24/32 bits, mono y estéreo): duración
+   exacta, cantidad de puntos, picos fieles a la envolvente (0.5 y después 0.1
+   de escala completa), silencio → ceros; WAV roto → AudioError
+✅ MP3 sin decodificador: duración por encabezados (con ID3, con y sin Xing)
+✅ ffmpeg (si está en el PATH): el mismo WAV por el pipe da la misma envolvente
+✅ Integración (test client): subir un WAV → waveform_url; el JSON queda listo
+   en segundo plano, se ve sin sesión y el audio sigue cerrado (401)
+✅ Escala con un WAV de --minutes minutos: MB/s, veces tiempo real y memoria
+   pico (tracemalloc): el análisis en bloques no carga el archivo
+
+Sale con código 1 si falla algún control.
+
+Uso:
+    python -m benchmarks.waveform
+    python -m benchmarks.waveform --minutes 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import math
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from typing import Any, List, Optional
+
+from benchmarks.harness import ensure_importable
+from benchmarks.image_hash import CREATORS, _client, create_bench_app, seed
+from benchmarks.streaming_uploads import multipart, post_body
+
+RATE = 44100
+MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413  # MPEG-1 Layer III, 128 kbps, 44.1 kHz: 417 bytes
+
+
+def _tone(frames: int, amplitude: float, width: int, channels: int, phase: int = 0) -> bytes:
+    """Senoidal de 440 Hz en PCM little-endian de `width` bytes."""
+    full = (1 << (8 * width - 1)) - 1
+    step = 2 * math.pi * 440 / RATE
+    out = bytearray()
+    for i in range(frames):
+        value = int(round(amplitude * full * math.sin((phase + i) * step)))
+        sample = (value + 128).to_bytes(1, "little") if width == 1 else value.to_bytes(width, "little", signed=True)
+        out += sample * channels
+    return bytes(out)
+
+
+def write_wav(path_or_file: Any, seconds: float, width: int = 2, channels: int = 1,
+              envelope: tuple = (0.5, 0.1)) -> None:
+    """Primera mitad a envelope[0] de escala completa, segunda a envelope[1]."""
+    half = int(seconds * RATE / 2)
+    with wave.open(path_or_file, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(RATE)
+        w.writeframes(_tone(half, envelope[0], width, channels))
+        w.writeframes(_tone(half, envelope[1], width, channels, half))
+
+
+def _big_wav(path: str, minutes: float) -> None:
+    period = _tone(RATE // 10, 0.8, 2, 2)  # 100 ms, se repite
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        for _ in range(int(minutes * 600)):
+            w.writeframes(period)
+
+
+def _mp3(frames: int, xing: bool = False) -> bytes:
+    id3 = b"ID3\x03\x00\x00" + bytes((0, 0, 2, 0)) + b"\x00" * 256  # etiqueta de 256 bytes
+    body = MP3_FRAME * frames
+    if xing:  # primer frame con cabecera Xing (flag de cantidad de frames)
+        tag = b"Xing" + struct.pack(">I", 1) + struct.pack(">I", frames)
+        first = MP3_FRAME[:4 + 32] + tag + MP3_FRAME[4 + 32 + len(tag):]
+        body = first + MP3_FRAME[:10]  # archivo cortado: solo vale la cabecera
+    return id3 + body
+
+
+# =========================================================
+# Controles
+# =========================================================
+def run_checks(workdir: str) -> List[str]:
+    from app.utils.waveform import DEFAULT_POINTS, AudioError, analyze, analyze_ffmpeg, np
+
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    print(f"== WAV ({'NumPy' if np is not None else 'sin NumPy: byte alto de cada muestra'}) ==")
+    for width in (1, 2, 3, 4):
+        for channels in (1, 2):
+            buf = io.BytesIO()
+            write_wav(buf, 6.0, width, channels)
+            buf.seek(0)
+            result = analyze(buf, "audio/wav")
+            wf = result["waveform"]
+            first, second = wf[: len(wf) // 2 - 2], wf[len(wf) // 2 + 2:]
+            ok = (result["duration"] == 6.0 and len(wf) <= DEFAULT_POINTS and len(wf) >= DEFAULT_POINTS * 0.9
+                  and all(abs(p - 127) <= 3 for p in first) and all(abs(p - 25) <= 3 for p in second))
+            expect(f"{width * 8} bits, {channels} canal(es): 6.0 s, {len(wf)} puntos, "
+                   f"picos {min(first)}–{max(first)} / {min(second)}–{max(second)}", ok)
+    buf = io.BytesIO()
+    write_wav(buf, 1.0, envelope=(0.0, 0.0))
+    buf.seek(0)
+    expect("silencio → ceros", set(analyze(buf, "audio/wav")["waveform"]) == {0})
+    buf = io.BytesIO()
+    write_wav(buf, 0.01)
+    buf.seek(0)
+    short = analyze(buf, "audio/wav")
+    expect(f"audio más corto que los puntos → {len(short['waveform'])} puntos", 0 < len(short["waveform"]) <= 441)
+    try:
+        analyze(io.BytesIO(b"RIFF\x00\x00\x00\x00WAVEbasura"), "audio/wav")
+        expect("WAV roto → AudioError", False)
+    except AudioError:
+        expect("WAV roto → AudioError", True)
+
+    print("\n== MP3 sin decodificador (solo duración) ==")
+    expected = round(1000 * 1152 / RATE, 3)
+    walked = analyze(io.BytesIO(_mp3(1000)), "audio/mpeg")
+    expect(f"1000 frames tras ID3 → {walked['duration']} s (esperado {expected})", walked["duration"] == expected)
+    xing = analyze(io.BytesIO(_mp3(1000, xing=True)), "audio/mpeg")
+    expect(f"cabecera Xing → {xing['duration']} s sin recorrer el archivo", xing["duration"] == expected)
+    expect("sin forma de onda (no hay decodificador)", "waveform" not in walked)
+
+    ffmpeg = shutil.which("ffmpeg")
+    print("\n== ffmpeg ==")
+    if not ffmpeg:
+        print("  ℹ️ ffmpeg no está en el PATH: sin control del decodificador externo")
+    else:
+        buf = io.BytesIO()
+        write_wav(buf, 6.0, 2, 2)
+        buf.seek(0)
+        result = analyze_ffmpeg(buf, ffmpeg)
+        wf = result["waveform"]
+        first, second = wf[: len(wf) // 2 - 4], wf[len(wf) // 2 + 4:]
+        expect(f"WAV por ffmpeg: {result['duration']} s, picos {max(first)} / {max(second)}",
+               abs(result["duration"] - 6.0) < 0.05 and abs(max(first) - 127) <= 6 and abs(max(second) - 25) <= 6)
+    return failures
+
+
+def run_app_checks(workdir: str) -> List[str]:
+    failures: List[str] = []
+
+    def expect(name: str, cond: bool) -> None:
+        print(f"  {'✅' if cond else '❌'} {name}")
+        if not cond:
+            failures.append(name)
+
+    print("\n== Integración ==")
+    app = create_bench_app(workdir)
+    seed(app)
+    creator, token = _client(app, CREATORS[0])
+    anonymous = app.test_client()
+    buf = io.BytesIO()
+    write_wav(buf, 4.0, 2, 2)
+    body, ctype = multipart({"_csrf": token, "title": "Audio", "visibility": "subscribers"}, "file", "a.wav",
+                            buf.getvalue())
+    r, _ = post_body(creator, "/uploads/content", body, ctype)
+    result = r.get_json() or {}
+    expect("WAV subido → waveform_url", r.status_code == 201 and "waveform_url" in result)
+    url = result.get("waveform_url", "/media/x/waveform")
+    deadline = time.time() + 10
+    while True:
+        r = anonymous.get(url)
+        if r.status_code != 202 or time.time() > deadline:
+            break
+        time.sleep(0.05)
+    data = r.get_json() or {}
+    expect(f"forma de onda lista sin sesión ({len(data.get('waveform') or [])} puntos, {data.get('duration')} s)",
+           r.status_code == 200 and data.get("status") == "ready" and data.get("duration") == 4.0)
+    expect("cacheable (público)", "public" in (r.headers.get("Cache-Control") or ""))
+    expect("el audio sigue cerrado (401)", anonymous.get(result.get("url", "/media/x")).status_code == 401)
+    body, ctype = multipart({"_csrf": token, "title": "Podcast", "visibility": "public"}, "file", "a.mp3", _mp3(400))
+    r, _ = post_body(creator, "/uploads/content", body, ctype)
+    mp3 = r.get_json() or {}
+    if r.status_code == 201:
+        app.extensions["waveforms"].shutdown()  # espera lo encolado
+        doc = app.extensions["repositories"].contents.get(mp3["content_id"]).to_dict()
+        expected = "ready" if app.extensions["waveforms"].ffmpeg else "duration"
+        expect(f"MP3 → waveform_status {doc.get('waveform_status')!r}, {doc.get('duration')} s",
+               doc.get("waveform_status") in (expected, "unsupported"))
+    else:
+        print(f"  ℹ️ MP3 sintético rechazado por la subida ({r.status_code}): sin control")
+    app.extensions["teasers"].shutdown()
+    return failures
+
+
+# =========================================================
+# Escala
+# =========================================================
+def run_scale(args: argparse.Namespace, workdir: str) -> List[str]:
+    from app.utils.waveform import analyze
+
+    failures: List[str] = []
+    path = os.path.join(workdir, "largo.wav")
+    _big_wav(path, args.minutes)
+    size = os.path.getsize(path)
+    print(f"\n== Escala: WAV de {args.minutes:g} min, 44.1 kHz estéreo 16 bits ({size / 2 ** 20:.0f} MB) ==")
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with open(path, "rb") as fh:
+        result = analyze(fh, "audio/wav")
+    took = time.perf_counter() - t0
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {took:.2f} s · {size / 2 ** 20 / took:.0f} MB/s · {result['duration'] / took:.0f}× tiempo real · "
+          f"memoria pico {peak / 2 ** 20:.1f} MB")
+    for name, ok in ((f"duración {result['duration']} s", abs(result["duration"] - args.minutes * 60) < 0.01),
+                     ("memoria pico < 5 % del archivo (en bloques)", peak < size * 0.05),
+                     (f"más rápido que {args.min_realtime:g}× tiempo real", result["duration"] / took > args.min_realtime)):
+        print(f"  {'✅' if ok else '❌'} {name}")
+        if not ok:
+            failures.append(name)
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--minutes", type=float, default=10)
+    p.add_argument("--min-realtime", type=float, default=100, help="veces tiempo real mínimas")
+    p.add_argument("--skip-app", action="store_true")
+    args = p.parse_args(argv)
+
+    ensure_importable()
+    workdir = tempfile.mkdtemp(prefix="ptuy-bench-waveform-")
+    try:
+        failures = run_checks(workdir)
+        if not args.skip_app:
+            failures += run_app_checks(os.path.join(workdir, "app"))
+        failures += run_scale(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print(f"\n❌ {len(failures)} control(es) fallaron: {', '.join(failures)}")
+        return 1
+    print("\n✅ Todos los controles pasaron")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
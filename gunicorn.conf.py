@@ -0,0 +1,259 @@
+# gunicorn.conf.py - Servidor de producción de PlayTimeUY
+"""
+Configuración única de gunicorn (la usan Procfile, render.yaml y run_new.py):
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+✅ Workers / threads según CPUs disponibles (afinidad y cuota de cgroup) y perfil
+✅ Perfil "io" (por defecto): threads, las vistas pasan casi todo el tiempo esperando
+   a Firestore / Firebase Auth / Mercado Pago → pocos procesos, varios threads
+✅ Perfil "cpu": workers sync, un proceso por núcleo (+1)
+✅ preload_app: la app se importa una vez y se comparte copy-on-write;
+   post_fork recrea lo que no sobrevive al fork (app/utils/workers.py)
+✅ Reciclado con max_requests + jitter (los workers no mueren todos a la vez)
+   sin cortar conexiones ya aceptadas (RecyclingThreadWorker)
+✅ Métricas Prometheus multiproceso cuando hay más de un worker
+
+Variables de entorno:
+    PORT                           puerto (5000)
+    GUNICORN_PROFILE               io | cpu (io)
+    WEB_CONCURRENCY                workers (calculado si no se define)
+    GUNICORN_MAX_WORKERS           tope para el cálculo automático (8)
+    GUNICORN_THREADS               threads por worker (io: 4, cpu: 1)
+    GUNICORN_WORKER_CLASS          clase de worker (por defecto: gthread con reciclado propio
+                                   si hay más de un thread, sync si no)
+    GUNICORN_PRELOAD               1 | 0 (1)
+    GUNICORN_MAX_REQUESTS          requests antes de reciclar el worker (1000, 0 = nunca)
+    GUNICORN_MAX_REQUESTS_JITTER   aleatorio sumado a max_requests (10 %)
+    GUNICORN_TIMEOUT               segundos sin respuesta antes de matar el worker (30)
+    GUNICORN_GRACEFUL_TIMEOUT      segundos para terminar requests al reiniciar (25)
+    GUNICORN_KEEPALIVE             segundos de keep-alive (5)
+    GUNICORN_ACCESS_LOG            destino del access log ("-" = stdout; apagado por defecto)
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from gunicorn.workers.gthread import ThreadWorker
+
+PROFILES = {
+    # perfil: (workers por CPU, workers extra, threads)
+    "io": (2, 1, 4),
+    "cpu": (1, 1, 1),
+}
+
+
+# ============================================================
+# FUNCIONES DE ENV (mismo criterio que run_new.py, sin importar la app)
+# ============================================================
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name) or default)
+    except ValueError:
+        print(f"[GUNICORN] ⚠️ Variable {name} inválida, usando {default}")
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    val = os.getenv(name)
+    return str(val).strip().lower() in {"1", "true", "yes", "on"} if val else default
+
+
+# ============================================================
+# DIMENSIONAMIENTO
+# ============================================================
+def _cgroup_cpus() -> float | None:
+    """CPUs permitidas por la cuota del contenedor (cgroup v2 / v1), si hay cuota."""
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS / Windows
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_cpus()
+    if quota is not None:
+        cpus = min(cpus, max(1, round(quota)))
+    return max(1, cpus)
+
+
+PROFILE = (os.getenv("GUNICORN_PROFILE") or "io").strip().lower()
+if PROFILE not in PROFILES:
+    print(f"[GUNICORN] ⚠️ GUNICORN_PROFILE={PROFILE!r} desconocido, usando 'io'")
+    PROFILE = "io"
+_per_cpu, _extra, _threads = PROFILES[PROFILE]
+CPUS = available_cpus()
+
+
+# ============================================================
+# WORKER gthread CON RECICLADO SIN CORTES
+# ============================================================
+# Vive acá y no en app/: importar el paquete `app` antes que run_new.py leería
+# las variables de entorno antes de cargar el .env.
+class RecyclingThreadWorker(ThreadWorker):
+    """
+    gthread que se recicla sin perder conexiones.
+
+    El ThreadWorker de gunicorn pone `alive = False` al llegar a max_requests y
+    sale del loop: las conexiones que ya aceptó y todavía no mandaron el request
+    se cierran sin respuesta (el cliente ve un reset). Lo mismo pasa con SIGTERM
+    (reload con HUP, deploy). Este worker deja de aceptar, corta el keep-alive y
+    sale cuando no le queda ninguna conexión (gunicorn lo mata si pasa
+    graceful_timeout). Si sale por señal, antes de irse atiende una vez lo que
+    quedó en la cola del socket: con el master apagándose no hay otro worker
+    que lo tome y el kernel resetearía esas conexiones.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retire_after = self.max_requests  # ya incluye el jitter
+        self.max_requests = sys.maxsize  # el reciclado lo decide este worker
+        self.retiring = False
+        self.exit_requested = False
+        self.backlog_drained = False
+
+    def handle_exit(self, sig, frame):
+        # Corre dentro del loop principal (que puede tener tomado self._lock):
+        # solo marca, el drenado empieza en la próxima vuelta
+        self.exit_requested = True
+
+    def _retire(self) -> None:
+        self.retiring = True
+        self.max_keepalived = 0  # cada respuesta cierra su conexión
+        with self._lock:
+            for sock in self.sockets:
+                try:
+                    self.poller.unregister(sock)
+                except (KeyError, ValueError):
+                    pass
+        self.log.info("♻️ Worker %s (%d requests, %s): deja de aceptar conexiones y drena", self.pid, self.nr,
+                      "señal" if self.exit_requested else "max_requests")
+
+    def _accept_backlog(self) -> int:
+        accepted = 0
+        for sock in self.sockets:
+            try:
+                server = sock.getsockname()
+            except OSError:
+                continue
+            while self.nr_conns < self.worker_connections:
+                before = self.nr_conns
+                self.accept(server, sock)  # socket no bloqueante: sin pendientes no hace nada
+                if self.nr_conns == before:
+                    break
+                accepted += 1
+        if accepted:
+            self.log.info("♻️ Worker %s: atiende %d conexiones que quedaron en cola antes de salir", self.pid, accepted)
+        return accepted
+
+    def murder_keepalived(self):
+        # Corre en cada vuelta del loop principal, después de aceptar / despachar
+        super().murder_keepalived()
+        if not self.retiring and (self.exit_requested or self.nr + self.nr_conns >= self.retire_after):
+            self._retire()
+        if self.retiring and self.nr_conns <= 0 and self.alive:
+            if self.exit_requested and not self.backlog_drained:
+                self.backlog_drained = True  # una sola pasada: con carga sostenida no saldría nunca
+                if self._accept_backlog():
+                    return
+            self.alive = False
+
+
+# ============================================================
+# SETTINGS DE GUNICORN
+# ============================================================
+wsgi_app = "wsgi:app"
+proc_name = "playtimeuy"
+bind = f"0.0.0.0:{_env_int('PORT', 5000)}"
+
+workers = _env_int("WEB_CONCURRENCY", min(CPUS * _per_cpu + _extra, _env_int("GUNICORN_MAX_WORKERS", 8)))
+threads = max(1, _env_int("GUNICORN_THREADS", _threads))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS") or (RecyclingThreadWorker if threads > 1 else "sync")
+preload_app = _env_bool("GUNICORN_PRELOAD", True)
+
+max_requests = max(0, _env_int("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max(0, _env_int("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+timeout = _env_int("GUNICORN_TIMEOUT", 30)
+# Render manda SIGKILL 30 s después de SIGTERM: el drenado debe terminar antes
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 25)
+keepalive = _env_int("GUNICORN_KEEPALIVE", 5)
+
+# Heartbeat de los workers en memoria (evita bloqueos por disco lento en contenedores)
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+loglevel = (os.getenv("LOG_LEVEL") or "info").lower()
+errorlog = "-"
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+
+# ============================================================
+# MÉTRICAS MULTIPROCESO
+# ============================================================
+# Con varios workers cada proceso tiene sus contadores: prometheus_client los
+# suma desde un directorio compartido. Se prepara antes de importar la app
+# (app/utils/metrics.py lee la variable al importarse) y solo la primera vez:
+# un reload (HUP) no debe borrar los archivos de los workers vivos.
+if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR") and not os.getenv("prometheus_multiproc_dir"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(tempfile.gettempdir(), "playtimeuy-metrics")
+if os.getenv("PROMETHEUS_MULTIPROC_DIR") and not os.getenv("PTUY_METRICS_DIR_READY"):
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    os.environ["PTUY_METRICS_DIR_READY"] = "1"
+
+
+# ============================================================
+# HOOKS
+# ============================================================
+def when_ready(server):
+    server.log.info(
+        "🚀 PlayTimeUY: perfil %s, %d CPU(s) → %d workers %s × %d threads, preload=%s, "
+        "max_requests=%d±%d",
+        PROFILE, CPUS, server.cfg.workers, getattr(server.cfg.worker_class, "__name__", "?"), server.cfg.threads,
+        server.cfg.preload_app, server.cfg.max_requests, server.cfg.max_requests_jitter,
+    )
+    # Con preload la app ya está en el master: lanza acá lo que comparten los workers
+    # (sin preload cada worker lo lanza al primer uso)
+    if server.cfg.preload_app:
+        from app.utils.workers import master_ready
+
+        master_ready(getattr(server.app, "callable", None))
+
+
+def post_fork(server, worker):
+    # Sin preload la app se importa dentro del worker: no hay nada heredado
+    if not server.cfg.preload_app:
+        return
+    from app.utils.workers import reinit_after_fork
+
+    reinit_after_fork(getattr(server.app, "callable", None))
+
+
+def worker_exit(server, worker):
+    # gunicorn ya esperó a los requests del worker: quedan los flush (logs, captura, spans, pools)
+    from app.utils.workers import worker_exiting
+
+    worker_exiting(getattr(worker, "wsgi", None))
+
+
+def child_exit(server, worker):
+    from app.utils.workers import worker_exited
+
+    worker_exited(worker.pid)
@@ -1,10 +1,9 @@
 # run_new.py - PlayTimeUY Ultra Profesional v3.2
 from __future__ import annotations
+import importlib.util
 import os
 import sys
-import signal
 import logging
-import logging.config
 from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
@@ -44,6 +43,9 @@ def _env_str(name: str, default: str | None = None) -> str:
     val = os.getenv(name)
     return (val.strip() if val else default) or default
 
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
 # ============================================================
 # LOGGING AVANZADO
 # ============================================================
@@ -51,43 +53,18 @@ LOG_LEVEL = _env_str("LOG_LEVEL", "INFO").upper()
 LOG_TO_FILE = _env_bool("LOG_TO_FILE", True)
 LOG_JSON = _env_bool("LOG_JSON", False)
 LOG_FILE = Path(_env_str("LOG_FILE", BASE_DIR / "playtimeuy.log"))
-LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
-
-formatter = {"format": '{"time":"%(asctime)s","level":"%(levelname)s","name":"%(name)s","msg":"%(message)s"}'} if LOG_JSON else {"format": LOG_FORMAT}
-
-logging_config = {
-    "version": 1,
-    "disable_existing_loggers": False,
-    "formatters": {
-        "default": formatter,
-        "colored": {
-            "format": "\033[1;32m%(asctime)s\033[0m [\033[1;34m%(levelname)s\033[0m] %(name)s: %(message)s"
-        },
-    },
-    "handlers": {
-        "console": {
-            "class": "logging.StreamHandler",
-            "level": LOG_LEVEL,
-            "formatter": "colored",
-            "stream": sys.stdout,
-        },
-    },
-    "root": {"level": LOG_LEVEL, "handlers": ["console"]},
-}
-
-if LOG_TO_FILE:
-    logging_config["handlers"]["file"] = {
-        "class": "logging.handlers.RotatingFileHandler",
-        "level": LOG_LEVEL,
-        "formatter": "default",
-        "filename": str(LOG_FILE),
-        "maxBytes": 10 * 1024 * 1024,
-        "backupCount": 5,
-        "encoding": "utf-8",
-    }
-    logging_config["root"]["handlers"].append("file")
+LOG_DEBUG_SAMPLE_RATE = float(_env_str("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
+# Cola + listener: los requests solo encolan, el I/O (consola / archivo rotativo)
+# ocurre en un thread aparte. JSON con json.dumps real cuando LOG_JSON=1.
+from app.utils.logging_config import configure_logging
 
-logging.config.dictConfig(logging_config)
+configure_logging(
+    level=LOG_LEVEL,
+    json_output=LOG_JSON,
+    log_file=LOG_FILE if LOG_TO_FILE else None,
+    debug_sample_rate=LOG_DEBUG_SAMPLE_RATE,
+)
 logger = logging.getLogger("PlayTimeUY")
 
 # ============================================================
@@ -105,10 +82,9 @@ except Exception:
 # SEGURIDAD AVANZADA
 # ============================================================
 try:
-    from flask_wtf import CSRFProtect
     from flask_talisman import Talisman
 
-    CSRFProtect(app)
+    # CSRF ya lo maneja create_app (app/utils/csrf.py): un segundo mecanismo rechazaría los tokens del primero
     csp = {
         "default-src": "'self'",
         "script-src": ["'self'", "'unsafe-inline'", "cdn.jsdelivr.net"],
@@ -125,9 +101,9 @@ try:
         frame_options="DENY",
         content_security_policy_nonce_in=["script-src"],
     )
-    logger.info("🔒 Seguridad CSRF y Talisman activadas")
+    logger.info("🔒 Talisman activado (CSRF: tokens firmados de la app)")
 except ImportError:
-    logger.warning("⚠️ Flask-WTF o Flask-Talisman no instalados, omitiendo seguridad extra")
+    logger.warning("⚠️ Flask-Talisman no instalado, omitiendo seguridad extra")
 
 # ============================================================
 # SECRET_KEY Y VALIDACIONES DE VARIABLES CRÍTICAS
@@ -209,21 +185,35 @@ def run_server(host: str | None = None, port: int | None = None, debug: bool | N
     p = port or PORT
     d = DEBUG_MODE if debug is None else bool(debug)
 
-    def _shutdown(signum, frame):
-        logger.info("⏹️ Servidor detenido por señal del sistema (%s)", signum)
-        sys.exit(0)
-
-    signal.signal(signal.SIGTERM, _shutdown)
-    signal.signal(signal.SIGINT, _shutdown)
+    # Waitress / dev server no drenan solos: la señal deja de aceptar requests,
+    # espera a los que están en curso y recién ahí corta el loop del servidor
+    from app.utils.shutdown import shutdown_app
 
+    app.extensions["shutdown"].install_signal_handlers()
+    try:
+        _serve(h, p, d)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("⏹️ Servidor detenido")
+        shutdown_app(app)
+
+def _serve(h: str, p: int, d: bool) -> None:
     if ENV == "production":
+        # Mismo servidor que Procfile / render.yaml (gunicorn.conf.py); Waitress queda para Windows
+        if os.name != "nt" and _has_module("gunicorn"):
+            logger.info("🦄 Iniciando con Gunicorn (gunicorn.conf.py)")
+            os.execv(sys.executable, [sys.executable, "-m", "gunicorn", "-c",
+                                      str(BASE_DIR / "gunicorn.conf.py"), "--chdir", str(BASE_DIR),
+                                      "--bind", f"{h}:{p}", "wsgi:app"])
         try:
             from waitress import serve
-            logger.info("🍰 Iniciando con Waitress (producción)")
-            serve(app, host=h, port=p)
         except ImportError:
             logger.warning("⚠️ Waitress no instalado, usando Flask dev server")
             app.run(host=h, port=p, debug=d, threaded=True, use_reloader=False)
+        else:
+            logger.info("🍰 Iniciando con Waitress (producción)")
+            serve(app, host=h, port=p)
     else:
         logger.info("🛠️ Iniciando Flask Dev Server")
         app.run(host=h, port=p, debug=d, threaded=True, use_reloader=True)
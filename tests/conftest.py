@@ -0,0 +1,99 @@
+"""
+Fixtures compartidas
+--------------------
+✅ `import app` sin credenciales reales (service account descartable)
+✅ App con backend SQLite y subidas locales en un directorio temporal (`make_app`
+   para variantes: un valor None deja la clave librada a las variables de entorno)
+✅ `login(uid)`: cliente con sesión iniciada y token CSRF en el encabezado
+✅ Trazas OpenTelemetry en memoria (OTEL_TRACES_EXPORTER=memory)
+"""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+for _key in ("GOOGLE_APPLICATION_CREDENTIALS", "FIREBASE_SERVICE_ACCOUNT"):
+    os.environ.pop(_key, None)
+# Trazas en memoria (tracing_config.memory_exporter), todas muestreadas
+os.environ["OTEL_TRACES_EXPORTER"] = "memory"
+os.environ["OTEL_TRACES_SAMPLER"] = "always_on"
+
+from benchmarks.harness import ensure_importable  # noqa: E402
+
+ensure_importable()
+
+WEBHOOK_SECRET = "test-webhook-secret"
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Fábrica: `make_app(**config)`; lo que no se pase lo resuelven las variables de entorno."""
+    from flask import jsonify
+
+    from app import create_app
+    from app.main.main_routes import set_current_user
+    from app.utils.csrf import generate_csrf_token
+
+    created = []
+
+    def _make(**overrides):
+        config = {
+            "SECRET_KEY": "test-secret",
+            "DATA_BACKEND": "sqlite",
+            "SQLITE_PATH": str(tmp_path / f"test-{len(created)}.sqlite3"),
+            "MEDIA_ROOT": str(tmp_path / "media"),
+            "UPLOAD_BACKEND": "local",
+            "FORCE_HTTPS": False,
+            "DEBUG": False,
+            "PROFILING_ENABLED": False,
+            "METRICS_ENABLED": False,
+            "COMPRESSION_ENABLED": False,
+        }
+        config.update(overrides)
+        application = create_app({k: v for k, v in config.items() if v is not None})
+
+        def login(uid: str):
+            users = application.extensions["repositories"].users
+            doc = users.get(uid)
+            user = doc.to_dict() if doc.exists else {"uid": uid, "role": "buyer"}
+            set_current_user(user)
+            return jsonify({"ok": True, "csrf_token": generate_csrf_token()})
+
+        application.add_url_rule("/test/login/<uid>", "test_login", login, methods=["POST"])
+        # Los templates referencian endpoints que no existen en todas las ramas (igual que benchmarks/harness.py)
+        application.url_build_error_handlers.append(lambda error, endpoint, values: "#")
+        created.append(application)
+        return application
+
+    yield _make
+    for application in created:
+        for name in ("teasers", "waveforms", "classifier"):
+            service = application.extensions.get(name)
+            stop = getattr(service, "shutdown", None) or getattr(service, "close", None)
+            if stop is not None:
+                stop()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def repos(app):
+    return app.extensions["repositories"]
+
+
+@pytest.fixture
+def login(request):
+    """Cliente con sesión de `uid` (en `application`, o en la app del fixture); el token CSRF viaja en X-CSRF-Token."""
+
+    def _login(uid: str, application=None):
+        client = (application or request.getfixturevalue("app")).test_client()
+        token = client.post(f"/test/login/{uid}").get_json()["csrf_token"]
+        client.environ_base["HTTP_X_CSRF_TOKEN"] = token
+        return client
+
+    return _login
@@ -0,0 +1,92 @@
+"""Blobs por sha256: re-subidas sin copia, referencias por contenido y GC de lo que nadie usa."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+
+import pytest
+
+from benchmarks.streaming_uploads import MP4_HEAD, multipart, post_body
+
+VIDEO = MP4_HEAD + bytes(range(256)) * 256
+SHA = hashlib.sha256(VIDEO).hexdigest()
+
+
+@pytest.fixture
+def creator(repos, login):
+    repos.users.create("creator-1", {"uid": "creator-1", "role": "creator", "username": "ana"})
+    return login("creator-1")
+
+
+def _upload(client, data: bytes = VIDEO):
+    body, ctype = multipart({"title": "Clip", "visibility": "public"}, "file", "clip.mp4", data, "video/mp4")
+    r, _ = post_body(client, "/uploads/content", body, ctype)
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()
+
+
+def _direct_upload(client, data: bytes = VIDEO):
+    r = client.post("/uploads/sessions", json={"kind": "content", "content_type": "video/mp4", "size": len(data),
+                                               "title": "Clip", "visibility": "public"})
+    assert r.status_code == 201, r.get_json()
+    session = r.get_json()
+    assert client.put(session["upload"]["url"], data=data).status_code == 200
+    r = client.post(session["complete_url"])
+    assert r.status_code == 200, r.get_json()
+    return r.get_json()
+
+
+def _blob_path(app) -> str:
+    return os.path.join(app.config["MEDIA_ROOT"], "blobs", SHA[:2], SHA[2:4], SHA)
+
+
+def _refs(repos) -> int:
+    return repos.blobs.get(SHA).to_dict()["refs"]
+
+
+def test_same_file_stored_once(app, repos, creator):
+    first, second = _upload(creator), _upload(creator)
+    third = _direct_upload(creator)
+    assert (first["deduplicated"], second["deduplicated"], third["deduplicated"]) == (False, True, True)
+    assert first["sha256"] == second["sha256"] == third["sha256"] == SHA
+    assert _refs(repos) == 3
+    with open(_blob_path(app), "rb") as fh:
+        assert fh.read() == VIDEO
+    staging = os.path.join(app.config["MEDIA_ROOT"], "staging")
+    assert not any(files for _d, _s, files in os.walk(staging))  # la subida directa repetida no dejó copia
+
+
+def test_delete_releases_and_gc_collects(app, repos, creator):
+    first, second = _upload(creator), _upload(creator)
+    blobs = app.extensions["blobs"]
+
+    assert creator.delete(f"/uploads/content/{first['content_id']}").status_code == 200
+    assert creator.delete(f"/uploads/content/{first['content_id']}").status_code == 404  # no suelta dos veces
+    assert _refs(repos) == 1
+    assert blobs.collect_garbage(repos.blobs, grace=0)["blobs"] == 0
+    assert app.test_client().get(second["url"]).data == VIDEO
+
+    assert creator.delete(f"/uploads/content/{second['content_id']}").status_code == 200
+    assert _refs(repos) == 0
+    assert blobs.collect_garbage(repos.blobs)["blobs"] == 0  # todavía dentro del margen
+    stats = blobs.collect_garbage(repos.blobs, now=time.time() + 2 * 3600)
+    assert stats == {"blobs": 1, "bytes": len(VIDEO), "staging": 0}
+    assert not os.path.exists(_blob_path(app)) and not repos.blobs.get(SHA).exists
+
+    again = _upload(creator)  # después del GC el mismo archivo se guarda de nuevo
+    assert again["deduplicated"] is False and app.test_client().get(again["url"]).data == VIDEO
+
+
+def test_gc_removes_abandoned_direct_uploads(app, repos, creator):
+    r = creator.post("/uploads/sessions", json={"kind": "content", "content_type": "video/mp4", "size": len(VIDEO),
+                                                "title": "Clip", "visibility": "public"})
+    assert creator.put(r.get_json()["upload"]["url"], data=VIDEO).status_code == 200
+    blobs = app.extensions["blobs"]
+    assert blobs.collect_garbage(repos.blobs)["staging"] == 0  # el ticket sigue vigente
+    assert blobs.collect_garbage(repos.blobs, now=time.time() + 7 * 24 * 3600)["staging"] == 1
+    staging = os.path.join(app.config["MEDIA_ROOT"], "staging")
+    assert not any(files for _d, _s, files in os.walk(staging))
+    out = app.test_cli_runner().invoke(args=["blobs-gc"]).output
+    assert "0 blobs" in out
@@ -0,0 +1,35 @@
+"""Captura de tráfico: se activa y configura por variables de entorno (run_new no pasa config)."""
+
+from __future__ import annotations
+
+import json
+
+
+def test_capture_enabled_from_environment(make_app, tmp_path, monkeypatch):
+    path = tmp_path / "capture" / "requests.jsonl"
+    monkeypatch.setenv("CAPTURE_ENABLED", "1")
+    monkeypatch.setenv("CAPTURE_PATH", str(path))
+    monkeypatch.setenv("CAPTURE_SAMPLE_RATE", "1")
+    monkeypatch.setenv("CAPTURE_MAX_MB", "2")
+    monkeypatch.setenv("CAPTURE_BACKUP_COUNT", "3")
+    app = make_app()
+
+    capture = app.extensions["traffic_capture"]
+    assert capture.sample_rate == 1.0
+    assert capture.writer._file.maxBytes == 2 * 1024 * 1024
+    assert capture.writer._file.backupCount == 3
+
+    app.test_client().get("/explorar").close()  # la captura se registra al cerrar la respuesta
+    capture.writer.close()  # vacía la cola al archivo
+    rows = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(row["method"], row["path"]) for row in rows] == [("GET", "/explorar")]
+
+
+def test_capture_off_by_default(make_app, monkeypatch):
+    monkeypatch.delenv("CAPTURE_ENABLED", raising=False)
+    assert "traffic_capture" not in make_app().extensions
+
+
+def test_config_wins_over_environment(make_app, monkeypatch):
+    monkeypatch.setenv("CAPTURE_ENABLED", "1")
+    assert "traffic_capture" not in make_app(CAPTURE_ENABLED=False).extensions
@@ -0,0 +1,60 @@
+"""Clasificador de moderación: el proceso del modelo no arranca con create_app."""
+
+from __future__ import annotations
+
+import io
+from types import SimpleNamespace
+
+import pytest
+from flask.cli import routes_command
+from PIL import Image
+
+from app.utils import classifier
+
+
+@pytest.fixture
+def launches(monkeypatch):
+    started = []
+
+    def fake_start(service):
+        started.append(service)
+        service.process = SimpleNamespace(pid=0, poll=lambda: 0)
+
+    monkeypatch.setattr(classifier.ClassifierService, "start", fake_start)
+    return started
+
+
+def _jpeg() -> io.BytesIO:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), "red").save(buf, "JPEG")
+    buf.seek(0)
+    return buf
+
+
+def test_not_started_by_create_app_or_cli(make_app, launches):
+    app = make_app(MODERATION_MODEL="modelo.pt", MODERATION_TIMEOUT=0.1)
+    assert app.test_cli_runner().invoke(routes_command).exit_code == 0
+    assert launches == [] and app.extensions["classifier"].service.process is None
+
+
+def test_started_once_on_first_score(make_app, launches):
+    client = make_app(MODERATION_MODEL="modelo.pt", MODERATION_TIMEOUT=0.1).extensions["classifier"]
+    assert client.score(_jpeg()) is None  # el servicio recién arranca: la subida sigue sin puntaje
+    client.score(_jpeg())
+    assert launches == [client.service]
+
+
+def test_inherited_service_is_not_relaunched(make_app, launches):
+    app = make_app(MODERATION_MODEL="modelo.pt", MODERATION_TIMEOUT=0.1)
+    client = app.extensions["classifier"]
+    client.service.owner_pid = -1  # como un worker que heredó el objeto del master
+    client.score(_jpeg())
+    assert launches == [] and classifier.start_service(app) is False
+
+
+def test_master_starts_service(make_app, launches):
+    from app.utils.workers import master_ready
+
+    app = make_app(MODERATION_MODEL="modelo.pt")
+    master_ready(app)
+    assert launches == [app.extensions["classifier"].service]
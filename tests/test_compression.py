@@ -0,0 +1,110 @@
+"""Compresión de respuestas: ajustes, negociación, qué se deja pasar y estadísticas por ruta."""
+
+from __future__ import annotations
+
+import gzip
+
+import pytest
+from flask import Response
+
+brotli = pytest.importorskip("brotli")
+
+
+def test_settings_from_environment(make_app, monkeypatch):
+    monkeypatch.setenv("COMPRESSION_ENABLED", "1")
+    monkeypatch.setenv("COMPRESSION_MIN_SIZE", "64")
+    monkeypatch.setenv("COMPRESSION_GZIP_LEVEL", "9")
+    monkeypatch.setenv("COMPRESSION_BROTLI_QUALITY", "2")
+    app = make_app(COMPRESSION_ENABLED=None)
+
+    assert "compression" in app.extensions
+    mw = app.wsgi_app
+    while not hasattr(mw, "gzip_level"):  # la captura / el apagado envuelven a la compresión
+        mw = mw.app
+    assert (mw.min_size, mw.gzip_level, mw.brotli_quality) == (64, 9, 2)
+
+
+def test_disabled_from_environment(make_app, monkeypatch):
+    monkeypatch.setenv("COMPRESSION_ENABLED", "0")
+    assert "compression" not in make_app(COMPRESSION_ENABLED=None).extensions
+
+
+def test_invalid_value_falls_back_to_default(make_app, monkeypatch):
+    monkeypatch.setenv("COMPRESSION_MIN_SIZE", "mucho")
+    app = make_app(COMPRESSION_ENABLED=True)
+    r = app.test_client().get("/login", headers={"Accept-Encoding": "gzip"})
+    assert r.headers.get("Content-Encoding") == "gzip"
+    assert b"<form" in gzip.decompress(r.data)
+
+
+TEXT = ("Lorem ipsum dolor sit amet, PlayTimeUY. " * 100).encode()
+
+
+@pytest.fixture
+def compressed_app(make_app, monkeypatch):
+    monkeypatch.delenv("METRICS_TOKEN", raising=False)
+    app = make_app(COMPRESSION_ENABLED=True, COMPRESSION_MIN_SIZE=500, METRICS_ENABLED=True)
+
+    def text(size: int):
+        return Response(TEXT[:size], mimetype="text/plain", headers={"Vary": "Cookie"})
+
+    def stream(size: int):
+        return Response((TEXT[i:i + 100] for i in range(0, size, 100)), mimetype="text/plain")
+
+    def encoded():
+        return Response(gzip.compress(TEXT), mimetype="text/plain", headers={"Content-Encoding": "gzip"})
+
+    def image():
+        return Response(TEXT, mimetype="image/png")
+
+    app.add_url_rule("/test/text/<int:size>", "test_text", text)
+    app.add_url_rule("/test/stream/<int:size>", "test_stream", stream)
+    app.add_url_rule("/test/encoded", "test_encoded", encoded)
+    app.add_url_rule("/test/image", "test_image", image)
+    return app
+
+
+def _get(app, path: str, accept: str = "gzip, br"):
+    return app.test_client().get(path, headers={"Accept-Encoding": accept})
+
+
+def test_small_bodies_stay_uncompressed(compressed_app):
+    for path in ("/test/text/499", "/test/stream/400"):
+        r = _get(compressed_app, path)
+        assert "Content-Encoding" not in r.headers and r.data == TEXT[:int(path.rsplit("/", 1)[1])]
+
+
+def test_brotli_preferred_when_accepted(compressed_app):
+    r = _get(compressed_app, "/test/text/4000")
+    assert r.headers["Content-Encoding"] == "br" and brotli.decompress(r.data) == TEXT[:4000]
+    r = _get(compressed_app, "/test/text/4000", accept="gzip, br;q=0")
+    assert r.headers["Content-Encoding"] == "gzip" and gzip.decompress(r.data) == TEXT[:4000]
+    assert "Content-Encoding" not in _get(compressed_app, "/test/text/4000", accept="identity").headers
+
+
+def test_vary_accept_encoding(compressed_app):
+    r = _get(compressed_app, "/test/text/4000")
+    assert r.headers["Vary"] == "Cookie, Accept-Encoding"
+
+
+def test_streamed_response_compressed_incrementally(compressed_app):
+    r = _get(compressed_app, "/test/stream/4000", accept="gzip")
+    assert r.headers["Content-Encoding"] == "gzip" and r.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(r.data) == TEXT[:4000]
+
+
+def test_encoded_and_binary_responses_pass_through(compressed_app):
+    r = _get(compressed_app, "/test/encoded")
+    assert r.headers["Content-Encoding"] == "gzip" and gzip.decompress(r.data) == TEXT
+    r = _get(compressed_app, "/test/image")
+    assert "Content-Encoding" not in r.headers and r.data == TEXT
+
+
+def test_per_route_stats_in_metrics(compressed_app):
+    assert _get(compressed_app, "/test/text/4000", accept="gzip").data  # se registra al terminar el body
+    stats = compressed_app.extensions["compression"].snapshot()["/test/text/<int:size>"]
+    assert stats["enc_gzip"] >= 1 and stats["ratio"] < 0.5
+
+    body = compressed_app.test_client().get("/metrics").get_data(as_text=True)
+    assert 'playtimeuy_compression_bytes_total{direction="in",encoding="gzip",endpoint="/test/text/<int:size>"}' in body
+    assert 'playtimeuy_compression_cpu_seconds_total{encoding="gzip",endpoint="/test/text/<int:size>"}' in body
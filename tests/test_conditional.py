@@ -0,0 +1,62 @@
+"""GET condicional de /explorar: validado con un agregado, no con el listado entero."""
+
+from __future__ import annotations
+
+import time
+
+
+def _creator(repos, uid: str) -> None:
+    repos.users.create(uid, {"uid": uid, "username": uid, "role": "creator"})
+
+
+def _operations(repos):
+    return {row["operation"]: row for row in repos.stats.snapshot()}
+
+
+def test_explorar_not_modified(app, repos):
+    for i in range(3):
+        _creator(repos, f"creator-{i}")
+    client = app.test_client()
+    first = client.get("/explorar")
+    assert first.status_code == 200 and first.headers.get("ETag")
+
+    repos.stats.reset()
+    again = client.get("/explorar", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    ops = _operations(repos)
+    assert "list_creators" not in ops  # el 304 no trae los perfiles
+    assert ops["newest_creator"]["documents"] == 1
+
+
+def test_explorar_etag_follows_creators(app, repos):
+    _creator(repos, "creator-a")
+    _creator(repos, "creator-b")
+    client = app.test_client()
+    etags = [client.get("/explorar").headers["ETag"]]
+
+    repos.users.update("creator-a", {"username": "nuevo"})
+    etags.append(client.get("/explorar").headers["ETag"])
+    repos.users.update("creator-a", {"username": "otro"})  # la misma, en el mismo segundo
+    etags.append(client.get("/explorar").headers["ETag"])
+    _creator(repos, "creator-c")
+    etags.append(client.get("/explorar").headers["ETag"])
+    repos.users.update("creator-b", {"role": "fan"})
+    etags.append(client.get("/explorar").headers["ETag"])
+    assert len(set(etags)) == len(etags)
+
+
+def test_firestore_count_and_newest():
+    from app.repositories.base import QueryStats, UserRepository
+    from app.repositories.firestore import FirestoreStore
+    from benchmarks.standins import FakeFirestore
+
+    db = FakeFirestore()
+    users = UserRepository(FirestoreStore(db, "users"), QueryStats())
+    for uid in ("a", "b", "c"):
+        users.create(uid, {"uid": uid, "role": "creator"})
+        time.sleep(0.002)
+    users.create("fan", {"uid": "fan", "role": "fan"})
+    before = db.rpc_count
+    total, newest = users.creators_version()
+    assert (total, newest.id) == (3, "c")
+    assert db.rpc_count - before == 2
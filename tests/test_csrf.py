@@ -0,0 +1,80 @@
+"""CSRF: login, logout y creación de pagos; visitantes anónimos atados a su propio `_sid`."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.utils.csrf import ANONYMOUS, CsrfTokens
+
+
+@pytest.fixture
+def fake_login(monkeypatch):
+    import app.main.payments as payments
+
+    monkeypatch.setattr(payments, "firebase_login_password",
+                        lambda email, password: ({"uid": "buyer-1", "email": email, "role": "buyer"}, None))
+
+
+def _visitor_token(client) -> str:
+    r = client.get("/login", headers={"Accept": "application/json"})
+    assert r.status_code == 200
+    return r.get_json()["csrf_token"]
+
+
+def test_anonymous_binding_never_validates():
+    tokens = CsrfTokens({"SECRET_KEY": "x"})
+    assert not tokens.check(tokens.issue(ANONYMOUS), ANONYMOUS)
+
+
+def test_login_requires_token(app, fake_login):
+    r = app.test_client().post("/login", json={"email": "a@b.uy", "password": "x"})
+    assert r.status_code == 403
+
+
+def test_login_with_visitor_token(app, fake_login):
+    client = app.test_client()
+    token = _visitor_token(client)
+    r = client.post("/login", json={"email": "a@b.uy", "password": "x"}, headers={"X-CSRF-Token": token})
+    assert r.status_code == 200
+    assert r.get_json()["user"]["uid"] == "buyer-1"
+
+
+def test_login_form_renders_token(app, fake_login):
+    client = app.test_client()
+    html = client.get("/login").get_data(as_text=True)
+    token = html.split('name="_csrf" value="', 1)[1].split('"', 1)[0]
+    r = client.post("/login", data={"email": "a@b.uy", "password": "x", "_csrf": token})
+    assert r.status_code == 302
+
+
+def test_visitor_token_is_not_shared(app, fake_login):
+    attacker, victim = app.test_client(), app.test_client()
+    token = _visitor_token(attacker)
+    assert token != _visitor_token(victim)
+    r = victim.post("/login", json={"email": "a@b.uy", "password": "x"}, headers={"X-CSRF-Token": token})
+    assert r.status_code == 403
+
+
+def test_logout_is_post_only_and_protected(app, login):
+    client = login("buyer-1")
+    assert client.get("/logout").status_code == 405
+    anonymous_token = client.environ_base.pop("HTTP_X_CSRF_TOKEN")
+    assert client.post("/logout").status_code == 403
+    r = client.post("/logout", headers={"X-CSRF-Token": anonymous_token})
+    assert r.status_code == 302
+    with client.session_transaction() as sess:
+        assert "user" not in sess
+
+
+def test_payment_create_requires_token(app, login):
+    client = login("buyer-1")
+    client.environ_base.pop("HTTP_X_CSRF_TOKEN")
+    r = client.post("/payment/create", json={"amount": 100, "creator_uid": "c1"})
+    assert r.status_code == 403
+
+
+def test_pages_without_forms_do_not_write_session(app, repos):
+    repos.users.create("c1", {"uid": "c1", "username": "c1", "role": "creator"})
+    client = app.test_client()
+    assert "Set-Cookie" not in client.get("/explorar").headers
+    assert "Set-Cookie" in client.get("/login").headers
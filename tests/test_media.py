@@ -0,0 +1,75 @@
+"""/media/<id>: control de acceso por contenido y Range / 206 para adelantar videos."""
+
+from __future__ import annotations
+
+import os
+
+import pytest
+
+VIDEO = bytes(range(256)) * 64
+
+
+@pytest.fixture
+def contents(app, repos):
+    path = os.path.join(app.config["MEDIA_ROOT"], "blobs", "clip.mp4")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(VIDEO)
+    repos.users.create("creator-1", {"uid": "creator-1", "role": "creator", "username": "ana"})
+    repos.users.create("admin-1", {"uid": "admin-1", "role": "admin", "is_admin": True})
+    repos.subscriptions.create("fan-1_creator-1", {"subscriber_uid": "fan-1", "creator_uid": "creator-1",
+                                                   "status": "active"})
+    repos.subscriptions.create("fan-2_creator-1", {"subscriber_uid": "fan-2", "creator_uid": "creator-1",
+                                                   "status": "cancelled"})
+    base = {"creator_uid": "creator-1", "storage_path": "blobs/clip.mp4", "content_type": "video/mp4",
+            "storage_backend": "local", "status": "published"}
+    repos.contents.create("public", {**base, "visibility": "public"})
+    repos.contents.create("private", {**base, "visibility": "subscribers"})
+    repos.contents.create("draft", {**base, "visibility": "subscribers", "status": "draft"})
+    repos.contents.create("deleted", {**base, "visibility": "public", "status": "deleted"})
+    repos.contents.create("outside", {**base, "visibility": "public", "storage_path": "../secreto.mp4"})
+
+
+def test_public_content_is_cacheable(app, contents):
+    r = app.test_client().get("/media/public")
+    assert r.status_code == 200 and r.data == VIDEO
+    assert r.headers["Cache-Control"].startswith("public")
+    assert r.headers["Accept-Ranges"] == "bytes"
+
+
+@pytest.mark.parametrize("uid, status", [
+    (None, 401),
+    ("fan-3", 403),  # sin suscripción
+    ("fan-2", 403),  # suscripción cancelada
+    ("fan-1", 200),
+    ("creator-1", 200),
+    ("admin-1", 200),
+])
+def test_subscriber_content_access(app, login, contents, uid, status):
+    client = login(uid) if uid else app.test_client()
+    r = client.get("/media/private")
+    assert r.status_code == status
+    if status == 200:
+        assert r.data == VIDEO and r.headers["Cache-Control"].startswith("private")
+    else:
+        assert VIDEO[:64] not in r.data
+
+
+def test_unpublished_and_invalid_content(app, login, contents):
+    assert login("fan-1").get("/media/draft").status_code == 404
+    assert login("creator-1").get("/media/draft").status_code == 200
+    for content_id in ("deleted", "outside", "no-existe"):
+        assert app.test_client().get(f"/media/{content_id}").status_code == 404
+
+
+def test_range_requests(app, contents):
+    client = app.test_client()
+    r = client.get("/media/public", headers={"Range": "bytes=100-199"})
+    assert r.status_code == 206 and r.data == VIDEO[100:200]
+    assert r.headers["Content-Range"] == f"bytes 100-199/{len(VIDEO)}"
+    r = client.get("/media/public", headers={"Range": "bytes=-10"})
+    assert r.status_code == 206 and r.data == VIDEO[-10:]
+    r = client.get("/media/public", headers={"Range": f"bytes={len(VIDEO)}-"})
+    assert r.status_code == 416
+    head = client.head("/media/public")
+    assert head.status_code == 200 and int(head.headers["Content-Length"]) == len(VIDEO) and not head.data
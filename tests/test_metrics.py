@@ -0,0 +1,22 @@
+"""Métricas Prometheus: opt-in por variable de entorno y protegidas con METRICS_TOKEN."""
+
+from __future__ import annotations
+
+
+def test_off_by_default(make_app, monkeypatch):
+    monkeypatch.delenv("METRICS_ENABLED", raising=False)
+    app = make_app(METRICS_ENABLED=None)
+    assert "metrics" not in app.view_functions
+    assert app.test_client().get("/metrics").status_code == 404
+
+
+def test_enabled_from_environment_requires_token(make_app, monkeypatch):
+    monkeypatch.setenv("METRICS_ENABLED", "1")
+    monkeypatch.setenv("METRICS_TOKEN", "scraper")
+    client = make_app(METRICS_ENABLED=None).test_client()
+    client.get("/explorar")
+
+    assert client.get("/metrics").status_code == 403
+    r = client.get("/metrics", headers={"Authorization": "Bearer scraper"})
+    assert r.status_code == 200
+    assert b"explorar" in r.data
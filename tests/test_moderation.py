@@ -0,0 +1,38 @@
+"""Cola de moderación: solo admins, `limit` tolerante y acotado."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.main.moderation_routes import MAX_QUEUE_LIMIT
+
+
+@pytest.fixture
+def admin(repos, login):
+    repos.users.create("admin-1", {"uid": "admin-1", "role": "admin", "is_admin": True})
+    return login("admin-1")
+
+
+@pytest.fixture
+def pending(repos):
+    for i in range(MAX_QUEUE_LIMIT + 5):
+        repos.contents.create(f"c{i}", {"creator_uid": "creator-1", "title": f"Foto {i}", "status": "flagged",
+                                        "review": "pending"})
+
+
+def test_queue_is_admin_only(login):
+    assert login("fan-1").get("/admin/moderation/queue").status_code == 403
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("", 50),
+    ("?limit=abc", 50),
+    ("?limit=3", 3),
+    ("?limit=0", 1),
+    ("?limit=-5", 1),
+    ("?limit=100000", MAX_QUEUE_LIMIT),
+])
+def test_queue_limit(admin, pending, query, expected):
+    r = admin.get(f"/admin/moderation/queue{query}")
+    assert r.status_code == 200
+    assert len(r.get_json()["items"]) == expected
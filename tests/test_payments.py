@@ -0,0 +1,49 @@
+"""Pagos: webhook de Mercado Pago (un solo manejador para las dos URLs)."""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+
+import pytest
+
+from tests.conftest import WEBHOOK_SECRET
+
+
+@pytest.fixture(autouse=True)
+def webhook_secret(monkeypatch):
+    import app.main.user_routes as user_routes
+
+    monkeypatch.setattr(user_routes, "MP_WEBHOOK_SECRET", WEBHOOK_SECRET)
+    monkeypatch.setattr(user_routes, "MP", None)
+
+
+def _signed(client, url, payload, secret=WEBHOOK_SECRET):
+    body = json.dumps(payload).encode()
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return client.post(url, data=body, content_type="application/json", headers={"X-Hub-Signature": signature})
+
+
+@pytest.mark.parametrize("url", ["/user/payment/webhook", "/payment/webhook"])
+def test_webhook_updates_payment_and_logs_notification(app, repos, url):
+    repos.payments.create("ref-1", {"external_reference": "ref-1", "buyer_uid": "b1", "status": "pending"})
+    r = _signed(app.test_client(), url, {"external_reference": "ref-1", "status": "approved"})
+    assert r.status_code == 200
+    assert repos.payments.get("ref-1").to_dict()["status"] == "approved"
+    assert len(repos.webhooks.store.find([])) == 1
+
+
+@pytest.mark.parametrize("url", ["/user/payment/webhook", "/payment/webhook"])
+def test_webhook_rejects_bad_signature(app, repos, url):
+    repos.payments.create("ref-1", {"external_reference": "ref-1", "buyer_uid": "b1", "status": "pending"})
+    r = _signed(app.test_client(), url, {"external_reference": "ref-1", "status": "approved"}, secret="otro")
+    assert r.status_code == 403
+    assert repos.payments.get("ref-1").to_dict()["status"] == "pending"
+
+
+def test_both_urls_share_one_view(app):
+    views = {rule.rule: app.view_functions[rule.endpoint] for rule in app.url_map.iter_rules()
+             if rule.rule.endswith("/payment/webhook")}
+    assert set(views) == {"/user/payment/webhook", "/payment/webhook"}
+    assert len(set(views.values())) == 1
@@ -0,0 +1,28 @@
+"""Profiling bajo demanda: opt-in por variable de entorno."""
+
+from __future__ import annotations
+
+
+def test_off_by_default(make_app, monkeypatch):
+    monkeypatch.delenv("PROFILING_ENABLED", raising=False)
+    assert "profiler" not in make_app(PROFILING_ENABLED=None).extensions
+
+
+def test_settings_from_environment(make_app, monkeypatch):
+    monkeypatch.setenv("PROFILING_ENABLED", "1")
+    monkeypatch.setenv("PROFILING_SLOW_MS", "250")
+    monkeypatch.setenv("PROFILING_SAMPLE_MS", "5")
+    monkeypatch.setenv("PROFILING_RING_SIZE", "7")
+    profiler = make_app(PROFILING_ENABLED=None).extensions["profiler"]
+    assert (profiler.slow_s, profiler.interval, profiler.captures.maxlen) == (0.25, 0.005, 7)
+
+
+def test_bad_limit_uses_default(make_app, login, monkeypatch):
+    monkeypatch.setenv("PROFILING_ENABLED", "1")
+    app = make_app(PROFILING_ENABLED=None)
+    app.extensions["repositories"].users.create("admin-1", {"uid": "admin-1", "role": "admin", "is_admin": True})
+    client = login("admin-1", app)
+    for url in ("/admin/profiling/captures?limit=abc", "/admin/profiling/memory/diff?limit=10x"):
+        r = client.get(url)
+        assert r.status_code == 200, url
+        assert r.get_json()["ok"] is True
@@ -0,0 +1,45 @@
+"""Capa de datos: orden de listados y escrituras atómicas entre procesos."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from app.repositories.base import PaymentRepository, QueryStats
+from app.repositories.firestore import FirestoreStore
+from app.repositories.sqlite import SQLiteDatabase, SQLiteStore
+from benchmarks.standins import FakeFirestore
+
+
+def test_payments_without_created_at_are_listed():
+    db = FakeFirestore()
+    payments = PaymentRepository(FirestoreStore(db, "payments"), QueryStats())
+    # Pago anterior al campo `created_at` (escrito sin la capa de datos)
+    db.collection("payments").document("legacy").set({"buyer_uid": "fan-1", "amount": 10})
+    for ref in ("p1", "p2"):
+        time.sleep(0.002)
+        payments.create(ref, {"buyer_uid": "fan-1", "creator_uid": "creator-1", "amount": 20})
+
+    assert [r.id for r in payments.list_by_buyer("fan-1")] == ["p2", "p1", "legacy"]
+    assert [r.id for r in payments.list_by_buyer("fan-1", limit=2)] == ["p2", "p1"]
+    assert [r.id for r in payments.list_by_creator("creator-1")] == ["p2", "p1"]
+
+
+def test_sqlite_merges_are_atomic_across_workers(tmp_path):
+    path = str(tmp_path / "data.sqlite")
+    SQLiteStore(SQLiteDatabase(path), "users").set("u1", {"uid": "u1"})
+
+    def worker(n: int) -> None:
+        # Una base por "worker": locks de proceso distintos, solo los separa SQLite
+        store = SQLiteStore(SQLiteDatabase(path), "users")
+        for i in range(40):
+            store.update("u1", {f"w{n}_{i}": i})
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    data = SQLiteStore(SQLiteDatabase(path), "users").get("u1").to_dict()
+    assert len([k for k in data if k.startswith("w")]) == 4 * 40
@@ -0,0 +1,111 @@
+"""Configuración de create_app: `config`, si no variable de entorno, si no default; un valor inválido no la tumba."""
+
+from __future__ import annotations
+
+from app.utils import classifier, watermark
+from app.utils.csrf import DEFAULT_MAX_AGE, DEFAULT_WINDOW
+from app.utils.image_index import DEFAULT_MAX_DISTANCE, DEFAULT_REFRESH as IMAGE_INDEX_REFRESH
+from app.utils.teasers import DEFAULT_BLUR, DEFAULT_WIDTH, DEFAULT_WORKERS
+from app.utils.text_filter import DEFAULT_REFRESH as TEXT_FILTER_REFRESH
+from app.utils.uploads import DEFAULT_TICKET_MAX_AGE
+from app.utils.waveform import DEFAULT_POINTS
+
+
+def test_csrf_settings(make_app, monkeypatch):
+    monkeypatch.setenv("CSRF_TOKEN_MAX_AGE", "600")
+    monkeypatch.setenv("CSRF_TOKEN_WINDOW", "60")
+    tokens = make_app().extensions["csrf"]
+    assert (tokens.max_age, tokens.window) == (600, 60)
+
+    monkeypatch.setenv("CSRF_TOKEN_MAX_AGE", "una hora")
+    monkeypatch.setenv("CSRF_TOKEN_WINDOW", "")
+    tokens = make_app().extensions["csrf"]
+    assert (tokens.max_age, tokens.window) == (DEFAULT_MAX_AGE, DEFAULT_WINDOW)
+    assert make_app(CSRF_TOKEN_MAX_AGE=30).extensions["csrf"].max_age == 30
+
+
+def test_upload_settings(make_app, monkeypatch):
+    monkeypatch.setenv("UPLOAD_TICKET_MAX_AGE", "120")
+    monkeypatch.setenv("UPLOAD_MAX_CONTENT_MB", "10")
+    uploads = make_app().extensions["uploads"]
+    assert (uploads.max_age, uploads.policies["content"].max_bytes) == (120, 10 * 1024 * 1024)
+
+    monkeypatch.setenv("UPLOAD_TICKET_MAX_AGE", "2h")
+    monkeypatch.setenv("UPLOAD_MAX_CONTENT_MB", "1.5")
+    uploads = make_app().extensions["uploads"]
+    assert (uploads.max_age, uploads.policies["content"].max_bytes) == (DEFAULT_TICKET_MAX_AGE, 2048 * 1024 * 1024)
+
+
+def test_teaser_settings(make_app, monkeypatch):
+    monkeypatch.setenv("TEASER_WORKERS", "3")
+    monkeypatch.setenv("TEASER_WIDTH", "240")
+    monkeypatch.setenv("TEASER_BLUR", "0.5")
+    teasers = make_app().extensions["teasers"]
+    assert (teasers.workers, teasers.options["width"], teasers.options["blur"]) == (3, 240, 0.5)
+
+    monkeypatch.setenv("TEASER_WORKERS", "muchos")
+    monkeypatch.setenv("TEASER_WIDTH", "240px")
+    monkeypatch.setenv("TEASER_BLUR", "")
+    teasers = make_app().extensions["teasers"]
+    assert (teasers.workers, teasers.options["width"], teasers.options["blur"]) == (
+        max(1, DEFAULT_WORKERS), DEFAULT_WIDTH, DEFAULT_BLUR)
+
+
+def test_waveform_settings(make_app, monkeypatch):
+    monkeypatch.setenv("WAVEFORM_POINTS", "64")
+    assert make_app().extensions["waveforms"].points == 64
+    monkeypatch.setenv("WAVEFORM_POINTS", "sesenta")
+    assert make_app().extensions["waveforms"].points == DEFAULT_POINTS
+
+
+def test_watermark_settings(make_app, monkeypatch):
+    monkeypatch.setenv("WATERMARK_QUALITY", "70")
+    monkeypatch.setenv("WATERMARK_OPACITY", "0.3")
+    monkeypatch.setenv("WATERMARK_CACHE_MB", "")
+    marks = make_app().extensions["watermarks"]
+    assert (marks.quality, marks.opacity, marks.cache_bytes) == (70, 0.3, watermark.DEFAULT_CACHE_MB * 2 ** 20)
+
+    monkeypatch.setenv("WATERMARK_MAX_SIDE", "grande")
+    monkeypatch.setenv("WATERMARK_OPACITY", "30%")
+    marks = make_app().extensions["watermarks"]
+    assert (marks.max_side, marks.opacity) == (watermark.DEFAULT_MAX_SIDE, watermark.DEFAULT_OPACITY)
+
+    monkeypatch.setenv("WATERMARK_ENABLED", "0")
+    assert "watermarks" not in make_app().extensions
+    assert "watermarks" in make_app(WATERMARK_ENABLED=True).extensions
+
+
+def test_image_index_settings(make_app, monkeypatch):
+    monkeypatch.setenv("IMAGE_MATCH_DISTANCE", "4")
+    monkeypatch.setenv("IMAGE_INDEX_REFRESH", "0")
+    index = make_app().extensions["image_index"]
+    assert (index.max_distance, index.refresh) == (4, 0)
+
+    monkeypatch.setenv("IMAGE_MATCH_DISTANCE", "cerca")
+    monkeypatch.setenv("IMAGE_INDEX_REFRESH", "5m")
+    index = make_app(IMAGE_INDEX_REFRESH=None).extensions["image_index"]
+    assert (index.max_distance, index.refresh) == (DEFAULT_MAX_DISTANCE, IMAGE_INDEX_REFRESH)
+
+
+def test_classifier_settings(make_app, monkeypatch):
+    monkeypatch.setenv("MODERATION_TIMEOUT", "0.5")
+    monkeypatch.setenv("MODERATION_FLAG_THRESHOLD", "0.9")
+    monkeypatch.setenv("MODERATION_MAX_BATCH", "4")
+    client = make_app(MODERATION_MODEL="modelo.pt").extensions["classifier"]
+    assert (client.timeout, client.threshold) == (0.5, 0.9)
+    assert client.service.argv[client.service.argv.index("--max-batch") + 1] == "4"
+
+    monkeypatch.setenv("MODERATION_TIMEOUT", "2s")
+    monkeypatch.setenv("MODERATION_THREADS", "dos")
+    monkeypatch.setenv("MODERATION_MAX_WAIT_MS", "")
+    client = make_app(MODERATION_MODEL="modelo.pt", MODERATION_MAX_WAIT_MS=None).extensions["classifier"]
+    assert client.timeout == classifier.DEFAULT_TIMEOUT and client.service.threads == classifier.DEFAULT_THREADS
+    argv = client.service.argv
+    assert float(argv[argv.index("--max-wait-ms") + 1]) == classifier.DEFAULT_MAX_WAIT_MS
+
+
+def test_text_filter_settings(make_app, monkeypatch):
+    monkeypatch.setenv("TEXT_FILTER_REFRESH", "0")
+    assert make_app().extensions["text_filter"].refresh == 0
+    monkeypatch.setenv("TEXT_FILTER_REFRESH", "30s")
+    assert make_app(TEXT_FILTER_REFRESH=None).extensions["text_filter"].refresh == TEXT_FILTER_REFRESH
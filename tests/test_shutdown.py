@@ -0,0 +1,92 @@
+"""Apagado ordenado: SIGTERM con carga en curso no pierde requests."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import shutil
+import tempfile
+import threading
+
+import pytest
+
+from app.utils.shutdown import DEFAULT_DRAIN_TIMEOUT, DrainMiddleware, ShutdownCoordinator
+from benchmarks import rolling_restart
+
+posix_only = pytest.mark.skipif(os.name == "nt", reason="señales POSIX")
+
+
+@pytest.fixture
+def workdir():
+    path = tempfile.mkdtemp(prefix="ptuy-test-shutdown-")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _args(**overrides):
+    args = rolling_restart.parse_args([
+        "--workers", "2", "--threads", "4", "--clients", "8", "--slow-ms", "30",
+        "--duration", "3", "--max-requests", "60", "--inflight", "6", "--inflight-ms", "800",
+    ])
+    for key, value in overrides.items():
+        setattr(args, key, value)
+    return args
+
+
+def test_drain_waits_for_in_flight_and_rejects_new():
+    release = threading.Event()
+
+    def slow_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        release.wait(5)
+        return [b"ok"]
+
+    coordinator = ShutdownCoordinator(drain_timeout=5)
+    app = DrainMiddleware(slow_app, coordinator)
+    statuses = []
+
+    def request():
+        body = app({}, lambda status, headers: statuses.append(status))
+        b"".join(body)
+        body.close()
+
+    worker = threading.Thread(target=request)
+    worker.start()
+    while coordinator.in_flight == 0:
+        pass
+    done = threading.Thread(target=coordinator.shutdown)
+    done.start()
+    while not coordinator.draining:
+        pass
+    app({}, lambda status, headers: statuses.append(status))
+    assert statuses == ["200 OK", "503 Service Unavailable"]
+    assert done.is_alive()  # sigue esperando al request en curso
+    release.set()
+    worker.join(5)
+    done.join(5)
+    assert coordinator.report["drained"] is True and coordinator.report["rejected"] == 1
+
+
+def test_drain_timeout_setting(make_app, monkeypatch):
+    monkeypatch.setenv("SHUTDOWN_DRAIN_TIMEOUT", "2.5")
+    assert make_app().extensions["shutdown"].drain_timeout == 2.5
+    monkeypatch.setenv("SHUTDOWN_DRAIN_TIMEOUT", "30s")
+    assert make_app().extensions["shutdown"].drain_timeout == DEFAULT_DRAIN_TIMEOUT
+
+
+@posix_only
+def test_dev_server_sigterm_mid_load(workdir):
+    result = rolling_restart.run_dev(_args(), workdir)
+    assert set(result["final"]) == {200}, result
+    assert set(result["late"]) <= {503, "ConnectError"}, result
+    assert result["missing_logs"] == 0
+
+
+@posix_only
+@pytest.mark.skipif(importlib.util.find_spec("gunicorn") is None, reason="gunicorn no instalado")
+def test_gunicorn_sigterm_mid_load(workdir):
+    result = rolling_restart.run_gunicorn(_args(), workdir)
+    assert set(result["load"]) == {200}, result
+    assert set(result["final"]) == {200}, result
+    assert result["missing_logs"] == 0
+    assert result["exit_code"] == 0
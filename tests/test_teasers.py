@@ -0,0 +1,95 @@
+"""Teasers borrosos de imágenes para suscriptores: render en el pool, ruta pública y backfill."""
+
+from __future__ import annotations
+
+import io
+import os
+import time
+
+import pytest
+from PIL import Image, ImageStat
+
+from app.utils.teasers import DEFAULT_WIDTH, render_teaser, teaser_name
+from benchmarks.streaming_uploads import multipart, post_body
+
+
+def _checkerboard(size=(1200, 800), cell: int = 8) -> Image.Image:
+    image = Image.new("L", size)
+    image.putdata([255 * ((x // cell + y // cell) % 2) for y in range(size[1]) for x in range(size[0])])
+    return image.convert("RGB")
+
+
+def _jpeg(image: Image.Image, **kwargs) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, "JPEG", quality=90, **kwargs)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def creator(repos, login):
+    repos.users.create("creator-1", {"uid": "creator-1", "role": "creator", "username": "ana"})
+    return login("creator-1")
+
+
+def _upload(client, data: bytes, visibility: str):
+    body, ctype = multipart({"title": "Foto", "visibility": visibility}, "file", "f.jpg", data, "image/jpeg")
+    r, _ = post_body(client, "/uploads/content", body, ctype)
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()
+
+
+def _wait_teaser(repos, content_id: str, timeout: float = 30) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if repos.contents.get(content_id).to_dict().get("teaser"):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_render_keeps_no_detail():
+    exif = Image.Exif()
+    exif[0x010F] = "CamaraSecreta"
+    teaser = Image.open(io.BytesIO(render_teaser(_jpeg(_checkerboard(), exif=exif))))
+    assert teaser.format == "JPEG" and teaser.size == (DEFAULT_WIDTH, 213)
+    assert not teaser.getexif()
+    assert max(ImageStat.Stat(teaser.convert("L")).stddev) < 10  # del tablero solo queda gris
+
+    strip = Image.open(io.BytesIO(render_teaser(_jpeg(Image.new("RGB", (3000, 300), "red")))))
+    assert strip.size[0] / strip.size[1] <= 2.01  # panorámicas recortadas al centro
+
+
+def test_subscriber_image_gets_public_teaser(app, repos, creator):
+    result = _upload(creator, _jpeg(_checkerboard()), "subscribers")
+    assert result["teaser_url"] == f"/media/{result['content_id']}/teaser"
+    assert _wait_teaser(repos, result["content_id"])
+
+    anonymous = app.test_client()
+    assert anonymous.get(result["url"]).status_code == 401
+    r = anonymous.get(result["teaser_url"])
+    assert r.status_code == 200 and r.mimetype == "image/jpeg"
+    assert r.headers["Cache-Control"].startswith("public")
+    assert Image.open(io.BytesIO(r.data)).size[0] == DEFAULT_WIDTH
+
+
+def test_public_image_has_no_teaser(app, creator):
+    result = _upload(creator, _jpeg(_checkerboard((400, 300))), "public")
+    assert "teaser_url" not in result
+    assert app.test_client().get(f"/media/{result['content_id']}/teaser").status_code == 404
+
+
+def test_backfill_renders_each_blob_once(app, repos, creator):
+    uploads = app.extensions["uploads"]
+    path = "blobs/foto.jpg"
+    os.makedirs(os.path.dirname(uploads.bucket.path_for(path)), exist_ok=True)
+    with open(uploads.bucket.path_for(path), "wb") as fh:
+        fh.write(_jpeg(_checkerboard((600, 400))))
+    for content_id in ("a", "b"):  # el mismo blob en dos contenidos
+        repos.contents.create(content_id, {"creator_uid": "creator-1", "storage_path": path, "status": "published",
+                                           "content_type": "image/jpeg", "visibility": "subscribers"})
+    stats = app.extensions["teasers"].backfill(repos.contents)
+    assert (stats["rendered"], stats["cached"], stats["failed"]) == (1, 1, 0)
+    assert uploads.bucket.stat(teaser_name(path)) is not None
+    assert all(repos.contents.get(c).to_dict().get("teaser") for c in ("a", "b"))
+    assert app.extensions["teasers"].backfill(repos.contents)["pending"] == 0
+    assert app.extensions["teasers"].backfill(repos.contents, force=True)["rendered"] == 1
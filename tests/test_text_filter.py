@@ -0,0 +1,49 @@
+"""Filtro de términos prohibidos: evasiones detectadas, palabras comunes sin falsos positivos."""
+
+from __future__ import annotations
+
+import pytest
+
+from app.utils.text_filter import DEFAULT_TERMS_PATH, RESERVED, TextFilter
+
+
+@pytest.fixture(scope="module")
+def text_filter():
+    return TextFilter(DEFAULT_TERMS_PATH, refresh=0)
+
+
+@pytest.mark.parametrize("text", [
+    "foro", "Fora", "carro", "el foro de fotos", "Fora de foco", "forrado en dólares", "computadora", "disputa",
+])
+def test_no_false_positives(text_filter, text):
+    assert text_filter.find(text) == []
+
+
+@pytest.mark.parametrize("text, term", [
+    ("forro", "forro"),
+    ("FORRRRO", "forro"),
+    ("f0rr4", "forra"),
+    ("Sos un PUTÁ", "puta"),
+    ("puuuuutoooo", "puto"),
+    ("sos un p.u.t.o", "puto"),
+    ("p u t a madre", "puta"),
+    ("рutа", "puta"),  # р y а cirílicas
+    ("te pago   por-fuera", "pago por fuera"),
+])
+def test_evasions_detected(text_filter, text, term):
+    assert term in {m.term for m in text_filter.find(text)}
+
+
+def test_double_letter_only_counts_in_the_term(text_filter):
+    assert text_filter.censor("hola forro, qué tal el foro") == "hola *****, qué tal el foro"
+    assert text_filter.find("Soy la admin de mi casa", ignore=(RESERVED,)) == []
+
+
+def test_profile_bio_uses_the_filter(repos, login):
+    repos.users.create("creator-1", {"uid": "creator-1", "role": "creator", "username": "ana"})
+    client = login("creator-1")
+    token = client.environ_base["HTTP_X_CSRF_TOKEN"]
+    client.post("/user/profile/edit", data={"_csrf": token, "bio": "Sos un forro"})
+    assert not repos.users.get("creator-1").to_dict().get("bio")
+    client.post("/user/profile/edit", data={"_csrf": token, "bio": "Modero el foro de fotos"})
+    assert repos.users.get("creator-1").to_dict().get("bio") == "Modero el foro de fotos"
@@ -0,0 +1,68 @@
+"""Trazas: create_app configura OpenTelemetry y los spans cubren Flask, SQLite y Mercado Pago."""
+
+from __future__ import annotations
+
+import pytest
+
+import tracing_config
+
+
+class FakePreference:
+    def create(self, data):
+        return {"status": 201, "response": {"id": "pref-1"}}
+
+
+class FakeMP:
+    def preference(self):
+        return FakePreference()
+
+
+@pytest.fixture
+def spans(app):
+    exporter = tracing_config.memory_exporter
+    assert exporter is not None, "OTEL_TRACES_EXPORTER=memory no configuró el exporter"
+    exporter.clear()
+    return exporter
+
+
+def test_configured_once_per_process(app):
+    from opentelemetry import trace
+
+    provider = trace.get_tracer_provider()
+    assert tracing_config.configure_tracing(app) is provider
+    assert app._is_instrumented_by_opentelemetry
+
+
+def test_disabled_by_environment(make_app, monkeypatch):
+    monkeypatch.setenv("TRACING_ENABLED", "off")
+    assert not getattr(make_app(), "_is_instrumented_by_opentelemetry", False)
+
+
+def test_payment_request_spans(app, login, repos, spans, monkeypatch):
+    import app.main.user_routes as user_routes
+
+    monkeypatch.setattr(user_routes, "MP", FakeMP())
+    repos.users.create("buyer-1", {"uid": "buyer-1", "email": "b@playtimeuy.test", "role": "buyer"})
+    client = login("buyer-1")
+    spans.clear()
+
+    r = client.post("/user/payment", json={"amount": 150, "creator_uid": "creator-1"})
+    assert r.status_code == 200
+
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    server = finished["POST /user/payment"]
+    assert server.attributes["http.route"] == "/user/payment"
+    assert server.attributes["http.status_code"] == 200
+
+    mp = finished["mercadopago.preference.create"]
+    assert mp.attributes["peer.service"] == "mercadopago"
+    assert mp.attributes["http.status_code"] == 201
+
+    db = finished["sqlite.set payments"]
+    assert db.attributes["db.system"] == "sqlite"
+    assert db.attributes["db.sql.table"] == "payments"
+
+    trace_id = server.context.trace_id
+    for child in (mp, db):
+        assert child.context.trace_id == trace_id
+        assert child.parent.span_id == server.context.span_id
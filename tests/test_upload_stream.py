@@ -0,0 +1,74 @@
+"""POST /uploads/content: multipart en streaming con hash, firma y límite mientras llega el cuerpo."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+
+import pytest
+
+from benchmarks.streaming_uploads import MP4_HEAD, multipart, post_body
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(UPLOAD_MAX_CONTENT_MB=1)
+
+
+@pytest.fixture
+def creator(repos, login):
+    repos.users.create("creator-1", {"uid": "creator-1", "role": "creator", "username": "ana"})
+    return login("creator-1")
+
+
+def _incoming(app):
+    path = os.path.join(app.config["MEDIA_ROOT"], ".incoming")
+    return os.listdir(path) if os.path.isdir(path) else []
+
+
+def _form(data: bytes, **fields):
+    return multipart({"title": "Clip", "visibility": "public", **fields}, "file", "clip.mp4", data, "video/mp4")
+
+
+def test_streamed_upload_hashes_while_reading(app, creator):
+    data = MP4_HEAD + os.urandom(300 * 1024)
+    r, consumed = post_body(creator, "/uploads/content", *_form(data), chunked=True)
+    assert r.status_code == 201 and consumed >= len(data), r.get_json()
+    assert r.get_json()["sha256"] == hashlib.sha256(data).hexdigest()
+    assert app.test_client().get(r.get_json()["url"]).data == data
+    assert _incoming(app) == []
+
+
+def test_declared_length_over_limit_rejected_before_reading(app, creator):
+    body, ctype = _form(MP4_HEAD + bytes(2 * MB))
+    r, consumed = post_body(creator, "/uploads/content", body, ctype)
+    assert r.status_code == 413 and consumed == 0
+
+
+def test_chunked_body_cut_at_the_limit(app, creator):
+    body, ctype = _form(MP4_HEAD + bytes(4 * MB))
+    r, consumed = post_body(creator, "/uploads/content", body, ctype, chunked=True)
+    assert r.status_code == 413
+    assert consumed < 2 * MB  # no leyó el resto del cuerpo
+    assert _incoming(app) == []
+
+
+def test_signature_checked_not_client_type(app, creator):
+    r, consumed = post_body(creator, "/uploads/content", *_form(b"<html>" + bytes(512 * 1024)), chunked=True)
+    assert r.status_code == 415
+    assert consumed < 256 * 1024 and _incoming(app) == []
+
+
+def test_csrf_checked_before_file_bytes(app, creator):
+    del creator.environ_base["HTTP_X_CSRF_TOKEN"]
+    body, ctype = _form(MP4_HEAD + bytes(512 * 1024), _csrf="token-falso")
+    r, consumed = post_body(creator, "/uploads/content", body, ctype, chunked=True)
+    assert r.status_code == 403
+    assert consumed < 256 * 1024 and _incoming(app) == []
+
+
+def test_buyers_cannot_upload(login):
+    r, consumed = post_body(login("fan-1"), "/uploads/content", *_form(MP4_HEAD + bytes(1024)))
+    assert r.status_code == 403 and consumed == 0
@@ -0,0 +1,116 @@
+"""Subidas directas: tickets firmados, PUT resumable al bucket local y avatares."""
+
+from __future__ import annotations
+
+import io
+import os
+
+import pytest
+from PIL import Image
+
+
+def _png(size=(32, 32), color="blue") -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _session(client, kind: str, data: bytes, content_type: str = "image/png", **extra):
+    r = client.post("/uploads/sessions", json={"kind": kind, "content_type": content_type, "size": len(data), **extra})
+    assert r.status_code == 201, r.get_json()
+    return r.get_json()
+
+
+@pytest.fixture(autouse=True)
+def fans(repos):
+    for uid in ("fan-1", "fan-2"):
+        repos.users.create(uid, {"uid": uid, "role": "buyer", "username": uid})
+
+
+@pytest.fixture
+def creator(repos, login):
+    repos.users.create("creator-1", {"uid": "creator-1", "role": "creator", "username": "ana"})
+    return login("creator-1")
+
+
+def test_avatar_direct_upload(app, login):
+    client = login("fan-1")
+    data = _png()
+    session = _session(client, "avatar", data)
+    assert client.put(session["upload"]["url"], data=data).status_code == 200
+    r = client.post(session["complete_url"])
+    assert r.status_code == 200, r.get_json()
+    url = r.get_json()["avatar_url"]
+    assert url.startswith("/uploads/avatars/fan-1/")
+    served = app.test_client().get(url)
+    assert served.status_code == 200 and served.data == data
+
+
+@pytest.mark.parametrize("path", [
+    "/uploads/avatars/../blobs/aa/bb/secreto",
+    "/uploads/avatars/%2e%2e/blobs/aa/bb/secreto",
+    "/uploads/avatars/..%2fblobs/aa%2fbb%2fsecreto",
+    "/uploads/avatars/fan-1/..",
+])
+def test_avatar_route_stays_in_avatars(app, path):
+    secret = os.path.join(app.config["MEDIA_ROOT"], "blobs", "aa", "bb", "secreto")
+    os.makedirs(os.path.dirname(secret))
+    with open(secret, "wb") as fh:
+        fh.write(b"contenido pago")
+    r = app.test_client().get(path)
+    assert r.status_code == 404
+    assert b"contenido pago" not in r.data
+
+
+def test_resumable_put(login):
+    client = login("fan-1")
+    data = _png((300, 300))
+    url = _session(client, "avatar", data)["upload"]["url"]
+    half = len(data) // 2
+    r = client.put(url, data=data[:half], headers={"Content-Range": f"bytes 0-{half - 1}/{len(data)}"})
+    assert r.status_code == 308 and r.headers["Range"] == f"bytes=0-{half - 1}"
+    r = client.put(url, headers={"Content-Range": f"bytes */{len(data)}"})  # ¿cuánto llegó?
+    assert r.status_code == 308 and r.headers["Range"] == f"bytes=0-{half - 1}"
+    r = client.put(url, data=data[half:], headers={"Content-Range": f"bytes {half}-{len(data) - 1}/{len(data)}"})
+    assert r.status_code == 200
+
+
+def test_put_cannot_exceed_declared_size(app, login):
+    client = login("fan-1")
+    data = _png()
+    session = _session(client, "avatar", data)
+    url = session["upload"]["url"]
+    assert client.put(url, data=data + b"x" * 4096).status_code == 416
+    size = len(data)
+    r = client.put(url, data=b"x" * 10, headers={"Content-Range": f"bytes {size - 5}-{size + 4}/{size}"})
+    assert r.status_code == 416
+    written = [os.path.getsize(os.path.join(d, f)) for d, _s, files in os.walk(app.config["MEDIA_ROOT"]) for f in files]
+    assert all(n <= size for n in written)
+
+
+def test_ticket_checks(login):
+    client = login("fan-1")
+    data = _png()
+    session = _session(client, "avatar", data)
+    token = session["upload"]["url"].rsplit("/", 1)[-1]
+    assert client.put(f"/uploads/local/{token[:-2]}xx", data=data).status_code == 403
+    # El archivo no es lo que se declaró: se borra al confirmar
+    client.put(session["upload"]["url"], data=b"no es un png".ljust(len(data), b"."))
+    assert client.post(session["complete_url"]).status_code == 422
+    # Otro usuario no puede confirmar la subida
+    other = login("fan-2")
+    session = _session(client, "avatar", data)
+    client.put(session["upload"]["url"], data=data)
+    assert other.post(session["complete_url"]).status_code == 403
+
+
+def test_session_policies(creator, login):
+    fan = login("fan-1")
+    assert fan.post("/uploads/sessions", json={"kind": "content", "content_type": "video/mp4",
+                                               "size": 10}).status_code == 403
+    assert creator.post("/uploads/sessions", json={"kind": "avatar", "content_type": "text/html",
+                                                   "size": 10}).status_code == 415
+    assert creator.post("/uploads/sessions", json={"kind": "avatar", "content_type": "image/png",
+                                                   "size": 50 * 1024 * 1024}).status_code == 413
+    assert creator.post("/uploads/sessions", json={"kind": "content", "content_type": "image/png",
+                                                   "size": 10}, headers={"X-CSRF-Token": ""}).status_code == 403
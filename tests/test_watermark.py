@@ -0,0 +1,55 @@
+"""Marca de agua por comprador: copia rastreable para suscriptores, original para la creadora."""
+
+from __future__ import annotations
+
+import io
+
+import pytest
+from PIL import Image
+
+from benchmarks.streaming_uploads import multipart, post_body
+
+
+def _jpeg(size=(800, 600)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (40, 120, 200)).save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def photo(repos, login):
+    repos.users.create("creator-1", {"uid": "creator-1", "role": "creator", "username": "ana"})
+    for uid in ("fan-1", "fan-2"):
+        repos.users.create(uid, {"uid": uid, "role": "buyer", "username": uid})
+        repos.subscriptions.create(f"{uid}_creator-1", {
+            "subscriber_uid": uid, "creator_uid": "creator-1", "status": "active",
+        })
+    creator = login("creator-1")
+    data = _jpeg()
+    token = creator.environ_base["HTTP_X_CSRF_TOKEN"]
+    body, ctype = multipart({"_csrf": token, "title": "Foto", "visibility": "subscribers"}, "file", "f.jpg", data)
+    r, _ = post_body(creator, "/uploads/content", body, ctype)
+    assert r.status_code == 201, r.get_json()
+    return creator, r.get_json()["url"], data
+
+
+def test_subscribers_get_their_own_copy(app, login, photo):
+    creator, url, data = photo
+    a, b = login("fan-1").get(url), login("fan-2").get(url)
+    assert a.status_code == b.status_code == 200
+    assert a.mimetype == "image/jpeg" and a.data != data and a.data != b.data
+    assert "private" in a.headers["Cache-Control"]
+    assert creator.get(url).data == data
+
+    code = app.extensions["watermarks"].code_for("fan-2")
+    out = app.test_cli_runner().invoke(args=["watermark-trace", code, "--creator", "creator-1"]).output
+    assert "fan-2" in out
+
+
+def test_code_follows_secret_key_set_after_create_app(app):
+    # run_new.py fija SECRET_KEY desde FLASK_SECRET_KEY después de create_app
+    watermarks = app.extensions["watermarks"]
+    before = watermarks.code_for("fan-1")
+    app.config["SECRET_KEY"] = "clave-de-produccion"
+    assert watermarks.code_for("fan-1") != before
+    assert watermarks.trace(watermarks.code_for("fan-1"), ["fan-1", "fan-2"]) == "fan-1"
@@ -0,0 +1,79 @@
+"""Duración y forma de onda de los audios: análisis por bloques, en segundo plano al subir y en el backfill."""
+
+from __future__ import annotations
+
+import io
+import os
+import time
+
+import pytest
+
+from app.utils.waveform import DEFAULT_POINTS, AudioError, analyze
+from benchmarks.streaming_uploads import multipart, post_body
+from benchmarks.waveform import _mp3, write_wav
+
+
+def _wav(seconds: float = 2.0, **kwargs) -> bytes:
+    buf = io.BytesIO()
+    write_wav(buf, seconds, **kwargs)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def creator(repos, login):
+    repos.users.create("creator-1", {"uid": "creator-1", "role": "creator", "username": "ana"})
+    return login("creator-1")
+
+
+@pytest.mark.parametrize("width, channels", [(1, 1), (2, 1), (2, 2), (3, 1)])
+def test_wav_peaks_follow_the_envelope(width, channels):
+    result = analyze(io.BytesIO(_wav(width=width, channels=channels)), "audio/wav")
+    wf = result["waveform"]
+    assert result["duration"] == 2.0 and result["channels"] == channels
+    assert DEFAULT_POINTS * 0.9 <= len(wf) <= DEFAULT_POINTS
+    first, second = wf[: len(wf) // 2 - 2], wf[len(wf) // 2 + 2:]
+    assert all(abs(p - 127) <= 3 for p in first) and all(abs(p - 25) <= 3 for p in second)
+
+
+def test_mp3_duration_without_decoder():
+    result = analyze(io.BytesIO(_mp3(1000)), "audio/mpeg")
+    assert result["duration"] == pytest.approx(1000 * 1152 / 44100, abs=0.01)
+    assert "waveform" not in result
+
+
+def test_broken_audio():
+    with pytest.raises(AudioError):
+        analyze(io.BytesIO(b"RIFF\x00\x00\x00\x00WAVEbasura"), "audio/wav")
+
+
+def test_uploaded_audio_gets_waveform(app, creator):
+    body, ctype = multipart({"title": "Tema", "visibility": "subscribers"}, "file", "tema.wav", _wav(), "audio/wav")
+    r, _ = post_body(creator, "/uploads/content", body, ctype)
+    assert r.status_code == 201, r.get_json()
+    url = r.get_json()["waveform_url"]
+
+    anonymous = app.test_client()  # como el teaser: público aunque el audio sea para suscriptores
+    deadline = time.monotonic() + 10
+    r = anonymous.get(url)
+    while r.status_code == 202 and time.monotonic() < deadline:
+        time.sleep(0.02)
+        r = anonymous.get(url)
+    data = r.get_json()
+    assert r.status_code == 200 and data["status"] == "ready" and data["duration"] == 2.0
+    assert len(data["waveform"]) <= DEFAULT_POINTS and r.headers["Cache-Control"].startswith("public")
+
+
+def test_backfill(app, repos):
+    bucket = app.extensions["uploads"].bucket
+    for name, data in (("tema.wav", _wav()), ("roto.wav", b"RIFF\x00\x00\x00\x00WAVEbasura")):
+        path = bucket.path_for(f"blobs/{name}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fh:
+            fh.write(data)
+        repos.contents.create(name, {"creator_uid": "creator-1", "storage_path": f"blobs/{name}",
+                                     "content_type": "audio/wav", "status": "published", "visibility": "public"})
+    stats = app.extensions["waveforms"].backfill(repos.contents)
+    assert (stats["analyzed"], stats["unsupported"], stats["failed"]) == (1, 1, 0)
+    assert repos.contents.get("tema.wav").to_dict()["waveform_status"] == "ready"
+    assert app.test_client().get("/media/roto.wav/waveform").get_json()["status"] == "unsupported"
+    assert app.extensions["waveforms"].backfill(repos.contents)["pending"] == 0
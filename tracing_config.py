@@ -1,29 +1,129 @@
 # tracing_config.py
+"""
+Configuración de OpenTelemetry para PlayTimeUY.
+
+Variables de entorno:
+  OTEL_SERVICE_NAME            nombre del servicio (default: playtimeuy)
+  OTEL_TRACES_SAMPLER          always_on | always_off | traceidratio |
+                               parentbased_always_on | parentbased_traceidratio (default)
+  OTEL_TRACES_SAMPLER_ARG      ratio para *traceidratio (default: 0.1)
+  OTEL_TRACES_EXPORTER         lista separada por comas: otlp, console, memory, none
+                               (default: otlp si hay endpoint configurado, si no none)
+  OTEL_EXPORTER_OTLP_ENDPOINT  endpoint OTLP/HTTP del collector (sin /v1/traces)
+
+create_app llama a configure_tracing (TRACING_ENABLED, por defecto activo).
+El TracerProvider y la instrumentación de requests son globales del proceso:
+se crean una sola vez; cada app nueva solo se instrumenta a sí misma. Con
+preload_app el provider nace en el master de gunicorn y el SDK recrea el
+thread del BatchSpanProcessor en cada worker (os.register_at_fork).
+"""
 import logging
+import os
+import threading
+from typing import List, Optional
+
 from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
 from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
-from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_OFF,
+    ALWAYS_ON,
+    ParentBased,
+    Sampler,
+    TraceIdRatioBased,
+)
 from opentelemetry.instrumentation.flask import FlaskInstrumentor
 from opentelemetry.instrumentation.requests import RequestsInstrumentor
 
 logger = logging.getLogger("PlayTimeUY.tracing")
 
-def configure_tracing(app):
-    # Crear provider de trazas
-    provider = TracerProvider()
-    trace.set_tracer_provider(provider)
+DEFAULT_SAMPLE_RATIO = 0.1
+
+# Exporter en memoria (OTEL_TRACES_EXPORTER=memory) para verificar spans localmente
+memory_exporter: Optional[InMemorySpanExporter] = None
+
+# Provider del proceso (configure_tracing lo crea una vez)
+_provider: Optional[TracerProvider] = None
+_lock = threading.Lock()
+
+
+def build_sampler(name: Optional[str] = None, arg: Optional[str] = None) -> Sampler:
+    name = (name or os.getenv("OTEL_TRACES_SAMPLER") or "parentbased_traceidratio").strip().lower()
+    raw = arg if arg is not None else os.getenv("OTEL_TRACES_SAMPLER_ARG")
+    try:
+        ratio = float(raw) if raw not in (None, "") else DEFAULT_SAMPLE_RATIO
+    except ValueError:
+        logger.warning("⚠️ OTEL_TRACES_SAMPLER_ARG inválido (%s), usando %s", raw, DEFAULT_SAMPLE_RATIO)
+        ratio = DEFAULT_SAMPLE_RATIO
+    ratio = max(0.0, min(1.0, ratio))
+
+    samplers = {
+        "always_on": ALWAYS_ON,
+        "always_off": ALWAYS_OFF,
+        "traceidratio": TraceIdRatioBased(ratio),
+        "parentbased_always_on": ParentBased(ALWAYS_ON),
+        "parentbased_always_off": ParentBased(ALWAYS_OFF),
+        "parentbased_traceidratio": ParentBased(TraceIdRatioBased(ratio)),
+    }
+    if name not in samplers:
+        logger.warning("⚠️ Sampler desconocido '%s', usando parentbased_traceidratio", name)
+        name = "parentbased_traceidratio"
+    return samplers[name]
+
+
+def _exporter_names(names: Optional[str]) -> List[str]:
+    raw = names if names is not None else os.getenv("OTEL_TRACES_EXPORTER")
+    if raw is None:
+        raw = "otlp" if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") else "none"
+    return [n.strip().lower() for n in raw.split(",") if n.strip()]
+
+
+def _build_provider(exporters: Optional[str], sampler: Optional[Sampler]) -> TracerProvider:
+    global memory_exporter
+
+    resource = Resource.create({"service.name": os.getenv("OTEL_SERVICE_NAME", "playtimeuy")})
+    provider = TracerProvider(resource=resource, sampler=sampler or build_sampler())
+
+    for name in _exporter_names(exporters):
+        if name == "none":
+            continue
+        if name == "console":
+            provider.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+        elif name == "otlp":
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
 
-    # Exportar a consola (útil para debug)
-    console_exporter = ConsoleSpanExporter()
-    provider.add_span_processor(BatchSpanProcessor(console_exporter))
+            endpoint = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+            # Sin endpoint explícito el exporter usa sus defaults / OTEL_EXPORTER_OTLP_TRACES_ENDPOINT
+            otlp = OTLPSpanExporter(endpoint=f"{endpoint.rstrip('/')}/v1/traces") if endpoint else OTLPSpanExporter()
+            provider.add_span_processor(BatchSpanProcessor(otlp))
+        elif name == "memory":
+            memory_exporter = InMemorySpanExporter()
+            provider.add_span_processor(SimpleSpanProcessor(memory_exporter))
+        else:
+            logger.warning("⚠️ Exporter de trazas desconocido: %s", name)
+    return provider
 
-    # Exportar también vía OTLP (para collectors o Google Cloud Trace)
-    otlp_exporter = OTLPSpanExporter(endpoint="http://localhost:4318/v1/traces")
-    provider.add_span_processor(BatchSpanProcessor(otlp_exporter))
 
-    # Instrumentar Flask y Requests
-    FlaskInstrumentor().instrument_app(app)
-    RequestsInstrumentor().instrument()
+def configure_tracing(app, exporters: Optional[str] = None, sampler: Optional[Sampler] = None) -> TracerProvider:
+    """
+    Crea el TracerProvider (una vez por proceso), registra exporters según env
+    e instrumenta requests; instrumenta Flask en cada app que recibe.
+    """
+    global _provider
 
-    logger.info("✅ OpenTelemetry tracing inicializado correctamente")
+    with _lock:
+        if _provider is None:
+            _provider = _build_provider(exporters, sampler)
+            trace.set_tracer_provider(_provider)
+            # Firestore / MP / Storage / templates usan spans explícitos (app/utils/tracing.py)
+            RequestsInstrumentor().instrument(tracer_provider=_provider)
+            logger.info(
+                "✅ OpenTelemetry tracing inicializado (sampler=%s, exporters=%s)",
+                _provider.sampler.get_description(),
+                ",".join(_exporter_names(exporters)) or "none",
+            )
+        if not getattr(app, "_is_instrumented_by_opentelemetry", False):
+            FlaskInstrumentor().instrument_app(app, tracer_provider=_provider)
+    return _provider
@@ -0,0 +1,12 @@
+# wsgi.py - Entrada WSGI de PlayTimeUY (producción)
+"""
+Misma app que run_new.py (config, seguridad, proxy). Único punto de entrada
+para gunicorn; workers, threads y reciclado se configuran en gunicorn.conf.py.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from __future__ import annotations
+
+from run_new import app
+
+__all__ = ["app"]